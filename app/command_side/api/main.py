@@ -1,9 +1,13 @@
 """API principal de FastAPI (Command Side) con configuración para producción."""
-from fastapi import FastAPI, HTTPException, status
+import asyncio
+from typing import Any, Dict, List, Optional
+from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from common.dto.command_dto import ClickCommand, ViewCommand, RatingCommand
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter, ValidationError
+from common.dto.command_dto import ClickCommand, ViewCommand, RatingCommand, BatchCommand, BatchCommandItem
 from common.utils.logger import get_logger
+from common.utils.metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics, run_snapshot_writer
 from app.command_side.application.anime_command_handler import AnimeCommandHandler
 from config.settings import settings
 from common.exceptions import AnimeNotFoundError, InvalidRatingError, DomainException
@@ -28,13 +32,23 @@ if settings.ALLOWED_ORIGINS:
         allow_headers=["*"],
     )
 
+if settings.ENABLE_METRICS:
+    app.add_middleware(MetricsMiddleware)
+
 command_handler = AnimeCommandHandler()
+batch_item_adapter = TypeAdapter(BatchCommandItem)
+metrics_writer: Optional[asyncio.Task] = None
 
 
 @app.on_event("startup")
 async def startup():
     """Inicialización al arrancar."""
+    global metrics_writer
     logger.info("Iniciando Command Side API...")
+    if settings.ENABLE_METRICS and settings.METRICS_MULTIPROC_DIR:
+        metrics_writer = asyncio.ensure_future(
+            run_snapshot_writer(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_INTERVAL)
+        )
     try:
         await command_handler.initialize()
         logger.info("Command Side API iniciada correctamente")
@@ -47,6 +61,10 @@ async def startup():
 async def shutdown():
     """Limpieza al cerrar."""
     logger.info("Cerrando Command Side API...")
+    if metrics_writer:
+        # Al cancelarse vuelca una última vez: los contadores de este worker no se pierden
+        metrics_writer.cancel()
+        await asyncio.gather(metrics_writer, return_exceptions=True)
     try:
         await command_handler.cleanup()
         logger.info("Command Side API cerrada correctamente")
@@ -138,6 +156,124 @@ async def register_rating(command: RatingCommand):
         )
 
 
+def _batch_response(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Construye la respuesta de un lote a partir de los resultados por comando."""
+    accepted = sum(1 for result in results if result["status"] == "ok")
+    return {
+        "status": "ok" if accepted == len(results) else "partial",
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "results": results,
+    }
+
+
+@app.post("/batch", status_code=status.HTTP_200_OK)
+async def register_batch(batch: BatchCommand):
+    """Registra un lote mixto de clicks, visualizaciones y calificaciones."""
+    if len(batch.commands) > settings.COMMAND_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"El lote no puede superar {settings.COMMAND_BATCH_MAX_SIZE} comandos"
+        )
+    try:
+        logger.info(f"Registrando lote de {len(batch.commands)} comandos")
+        results = await command_handler.handle_batch(batch.commands)
+        return _batch_response(results)
+    except Exception as e:
+        logger.error(f"Error registrando lote: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error al registrar lote" if settings.is_production else str(e)
+        )
+
+
+@app.post("/batch/ndjson", status_code=status.HTTP_200_OK)
+async def register_batch_ndjson(request: Request):
+    """
+    Registra comandos enviados como NDJSON (un comando JSON por línea).
+    
+    El cuerpo se lee en streaming y se persiste en lotes de
+    COMMAND_BATCH_MAX_SIZE, sin cargar la petición completa en memoria.
+    Cada lote se confirma al enviarse, así que si uno falla la respuesta es
+    un 500 con los resultados ya obtenidos: el lote fallido queda como
+    batch_failed, las líneas siguientes como not_processed y
+    last_committed_index indica la última línea de un lote confirmado.
+    """
+    results: List[Dict[str, Any]] = []
+    pending: List[tuple] = []
+    index = 0
+    last_committed_index: Optional[int] = None
+    failure: Optional[Exception] = None
+    
+    def reject_pending(error: str, message: str):
+        for original_index, _ in pending:
+            results.append({"index": original_index, "status": "error", "error": error, "message": message})
+        pending.clear()
+    
+    async def flush_pending():
+        nonlocal last_committed_index, failure
+        if not pending:
+            return
+        try:
+            chunk_results = await command_handler.handle_batch([command for _, command in pending])
+        except Exception as e:
+            logger.error(f"Error registrando lote NDJSON desde la línea {pending[0][0]}: {e}", exc_info=True)
+            failure = e
+            reject_pending("batch_failed", "Lote no confirmado: falló al persistir o publicar")
+            return
+        for (original_index, _), result in zip(pending, chunk_results):
+            result["index"] = original_index
+            results.append(result)
+        last_committed_index = pending[-1][0]
+        pending.clear()
+    
+    async def handle_line(line: bytes):
+        nonlocal index
+        if not line.strip():
+            return
+        if failure is not None:
+            # Tras un fallo se sigue leyendo solo para informar de cada línea
+            results.append({
+                "index": index,
+                "status": "error",
+                "error": "not_processed",
+                "message": "No procesado: falló un lote anterior",
+            })
+        else:
+            try:
+                pending.append((index, batch_item_adapter.validate_json(line)))
+            except ValidationError as e:
+                results.append({"index": index, "status": "error", "error": "invalid_command", "message": str(e)})
+        index += 1
+        if len(pending) >= settings.COMMAND_BATCH_MAX_SIZE:
+            await flush_pending()
+    
+    try:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                await handle_line(line)
+        await handle_line(buffer)
+    except Exception as e:
+        logger.error(f"Error leyendo lote NDJSON: {e}", exc_info=True)
+        failure = failure or e
+        reject_pending("not_processed", "No procesado: se interrumpió la lectura del cuerpo")
+    await flush_pending()
+    
+    results.sort(key=lambda result: result["index"])
+    response = _batch_response(results)
+    if failure is None:
+        logger.info(f"Lote NDJSON registrado: {index} comandos")
+        return response
+    
+    response["status"] = "error"
+    response["last_committed_index"] = last_committed_index
+    response["detail"] = "Error al registrar lote" if settings.is_production else str(failure)
+    return JSONResponse(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, content=response)
+
+
 @app.get("/health")
 async def health():
     """Endpoint de salud con verificación de dependencias."""
@@ -148,10 +284,16 @@ async def health():
     }
     
     event_store_healthy = await command_handler.event_store.health_check()
-    kafka_healthy = command_handler.kafka_producer.health_check()
+    if settings.EVENT_OUTBOX_ENABLED:
+        # Kafka lo usa el outbox relay, no este servicio
+        kafka_healthy = True
+        kafka_status = "outbox"
+    else:
+        kafka_healthy = await command_handler.kafka_producer.health_check()
+        kafka_status = "healthy" if kafka_healthy else "unhealthy"
     health_status["dependencies"] = {
         "event_store": "healthy" if event_store_healthy else "unhealthy",
-        "kafka": "healthy" if kafka_healthy else "unhealthy"
+        "kafka": kafka_status
     }
     
     if not event_store_healthy or not kafka_healthy:
@@ -164,6 +306,12 @@ async def health():
     return health_status
 
 
+@app.get("/metrics")
+async def metrics():
+    """Métricas del servicio en formato Prometheus (sumadas entre workers con METRICS_MULTIPROC_DIR)."""
+    return Response(render_metrics(settings.METRICS_MULTIPROC_DIR), media_type=CONTENT_TYPE)
+
+
 @app.get("/ready")
 async def readiness():
     """Endpoint de readiness (Kubernetes)."""
@@ -1,13 +1,16 @@
 """Manejador de comandos de anime con logging y manejo de errores."""
 from datetime import datetime
+from typing import Any, Dict, List, Union
 from common.dto.command_dto import ClickCommand, ViewCommand, RatingCommand
 from common.events.anime_events import ClickRegistered, ViewRegistered, RatingGiven
+from common.events.fast_events import AnyEvent, FastClickRegistered, FastViewRegistered, FastRatingGiven
 from common.utils.logger import get_logger
 from app.command_side.infrastructure.event_store import EventStore
-from app.command_side.infrastructure.kafka_producer import KafkaEventProducer
+from app.command_side.infrastructure.kafka_producer import AsyncKafkaEventProducer
 from app.command_side.domain.anime_validator import AnimeValidator
 from common.exceptions import AnimeNotFoundError
 from common.exceptions import InvalidRatingError
+from config.settings import settings
 
 logger = get_logger(__name__)
 
@@ -17,7 +20,7 @@ class AnimeCommandHandler:
     
     def __init__(self):
         self.event_store = EventStore()
-        self.kafka_producer = KafkaEventProducer()
+        self.kafka_producer = AsyncKafkaEventProducer()
         self.anime_validator = AnimeValidator()
 
     
@@ -26,7 +29,9 @@ class AnimeCommandHandler:
         logger.info("Inicializando AnimeCommandHandler...")
         try:
             await self.event_store.connect()
-            self.kafka_producer.connect()
+            if not settings.EVENT_OUTBOX_ENABLED:
+                await self.kafka_producer.connect()
+            await self.anime_validator.initialize()
             logger.info("AnimeCommandHandler inicializado correctamente")
         except Exception as e:
             logger.critical(f"Error al inicializar AnimeCommandHandler: {e}", exc_info=True)
@@ -37,7 +42,7 @@ class AnimeCommandHandler:
         logger.info("Cerrando AnimeCommandHandler...")
         try:
             await self.event_store.close()
-            self.kafka_producer.close()
+            await self.kafka_producer.close()
             await self.anime_validator.close()
             logger.info("AnimeCommandHandler cerrado correctamente")
         except Exception as e:
@@ -48,33 +53,22 @@ class AnimeCommandHandler:
         if not await self.anime_validator.anime_exists(command.anime_id):
             raise AnimeNotFoundError(command.anime_id)
         
-        event = ClickRegistered(
-            aggregate_id=f"anime_{command.anime_id}",
-            anime_id=command.anime_id,
-            user_id=command.user_id,
-            timestamp=datetime.utcnow(),
-        )
+        event = self._build_event(command)
         
         await self.event_store.save_events([event])
         
-        self.kafka_producer.publish_events([event])
+        await self._publish([event])
     
     async def handle_view(self, command: ViewCommand):
         """Maneja el comando de visualización."""
         if not await self.anime_validator.anime_exists(command.anime_id):
             raise AnimeNotFoundError(command.anime_id)
         
-        event = ViewRegistered(
-            aggregate_id=f"anime_{command.anime_id}",
-            anime_id=command.anime_id,
-            user_id=command.user_id,
-            duration_seconds=command.duration_seconds,
-            timestamp=datetime.utcnow(),
-        )
+        event = self._build_event(command)
         
         await self.event_store.save_events([event])
         
-        self.kafka_producer.publish_events([event])
+        await self._publish([event])
     
     async def handle_rating(self, command: RatingCommand):
         """Maneja el comando de calificación."""
@@ -84,15 +78,112 @@ class AnimeCommandHandler:
         if not (1.0 <= command.rating <= 10.0):
             raise InvalidRatingError(command.rating)
 
-        event = RatingGiven(
-            aggregate_id=f"anime_{command.anime_id}",
+        event = self._build_event(command)
+        
+        await self.event_store.save_events([event])
+        
+        await self._publish([event])
+    
+    async def _publish(self, events: List[AnyEvent]):
+        """Publica eventos a Kafka, salvo que los publique el outbox relay."""
+        if settings.EVENT_OUTBOX_ENABLED:
+            return
+        await self.kafka_producer.publish_events(events)
+    
+    def _build_event(self, command: Union[ClickCommand, ViewCommand, RatingCommand]) -> AnyEvent:
+        """Construye el evento correspondiente a un comando."""
+        aggregate_id = f"anime_{command.anime_id}"
+        if settings.EVENT_FAST_PATH_ENABLED:
+            return self._build_fast_event(command, aggregate_id)
+        if isinstance(command, ViewCommand):
+            return ViewRegistered(
+                aggregate_id=aggregate_id,
+                anime_id=command.anime_id,
+                user_id=command.user_id,
+                duration_seconds=command.duration_seconds,
+                timestamp=datetime.utcnow(),
+            )
+        if isinstance(command, RatingCommand):
+            return RatingGiven(
+                aggregate_id=aggregate_id,
+                anime_id=command.anime_id,
+                user_id=command.user_id,
+                rating=command.rating,
+                timestamp=datetime.utcnow(),
+            )
+        return ClickRegistered(
+            aggregate_id=aggregate_id,
             anime_id=command.anime_id,
             user_id=command.user_id,
-            rating=command.rating,
             timestamp=datetime.utcnow(),
         )
+    
+    @staticmethod
+    def _build_fast_event(
+        command: Union[ClickCommand, ViewCommand, RatingCommand],
+        aggregate_id: str,
+    ) -> AnyEvent:
+        """Construye el evento rápido; el comando ya está validado por su DTO."""
+        if isinstance(command, ViewCommand):
+            return FastViewRegistered(
+                aggregate_id=aggregate_id,
+                anime_id=command.anime_id,
+                user_id=command.user_id,
+                duration_seconds=command.duration_seconds,
+            )
+        if isinstance(command, RatingCommand):
+            return FastRatingGiven(
+                aggregate_id=aggregate_id,
+                anime_id=command.anime_id,
+                user_id=command.user_id,
+                rating=command.rating,
+            )
+        return FastClickRegistered(
+            aggregate_id=aggregate_id,
+            anime_id=command.anime_id,
+            user_id=command.user_id,
+        )
+    
+    async def handle_batch(
+        self,
+        commands: List[Union[ClickCommand, ViewCommand, RatingCommand]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Maneja un lote mixto de comandos.
         
-        await self.event_store.save_events([event])
+        Valida todos los anime_id con una sola query, persiste los eventos válidos
+        en una única transacción del Event Store y los publica con un único flush.
         
-        self.kafka_producer.publish_events([event])
-
+        Returns:
+            Resultado por comando, en el mismo orden de entrada
+        """
+        if not commands:
+            return []
+        
+        existing_ids = await self.anime_validator.existing_anime_ids(
+            command.anime_id for command in commands
+        )
+        
+        results: List[Dict[str, Any]] = []
+        events: List[AnyEvent] = []
+        for index, command in enumerate(commands):
+            if command.anime_id not in existing_ids:
+                error = AnimeNotFoundError(command.anime_id)
+                results.append({"index": index, "status": "error", "error": "not_found", "message": str(error)})
+                continue
+            
+            if isinstance(command, RatingCommand) and not (1.0 <= command.rating <= 10.0):
+                error = InvalidRatingError(command.rating)
+                results.append({"index": index, "status": "error", "error": "invalid_rating", "message": str(error)})
+                continue
+            
+            event = self._build_event(command)
+            events.append(event)
+            results.append({"index": index, "status": "ok", "event_id": event.event_id})
+        
+        if events:
+            await self.event_store.save_events(events)
+            await self._publish(events)
+        
+        logger.info(f"Lote procesado: {len(events)} aceptados, {len(commands) - len(events)} rechazados")
+        return results
@@ -1,24 +1,52 @@
 """Agregado base."""
-from typing import List
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
 from common.events.base_event import BaseEvent
 
 
-class Aggregate:
+class Aggregate(ABC):
     """Clase base para agregados."""
     
+    aggregate_type = "Aggregate"
+    
     def __init__(self, aggregate_id: str):
         self.aggregate_id = aggregate_id
         self._uncommitted_events: List[BaseEvent] = []
         self._version = 0
     
+    @property
+    def version(self) -> int:
+        """Número de eventos confirmados aplicados al agregado."""
+        return self._version
+    
     def get_uncommitted_events(self) -> List[BaseEvent]:
         """Retorna los eventos no confirmados."""
         return self._uncommitted_events.copy()
     
     def mark_events_as_committed(self):
         """Marca los eventos como confirmados."""
-        self._uncommitted_events.clear()
         self._version += len(self._uncommitted_events)
+        self._uncommitted_events.clear()
+    
+    def apply(self, event: BaseEvent):
+        """Aplica un evento ya persistido (historial o snapshot + cola)."""
+        self._when(event)
+        self._version += 1
+    
+    @abstractmethod
+    def to_snapshot(self) -> Dict[str, Any]:
+        """Estado plegado serializable a JSON."""
+        pass
+    
+    @abstractmethod
+    def restore_snapshot(self, state: Dict[str, Any], version: int):
+        """Restaura el estado de un snapshot tomado en la versión indicada."""
+        pass
+    
+    @abstractmethod
+    def _when(self, event: BaseEvent):
+        """Actualiza el estado con un evento; lo implementa cada agregado."""
+        pass
     
     def _add_event(self, event: BaseEvent):
         """Añade un evento a la lista de eventos no confirmados."""
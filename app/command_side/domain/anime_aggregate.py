@@ -0,0 +1,57 @@
+"""Agregado de interacciones de un anime."""
+from typing import Any, Dict
+from app.command_side.domain.aggregate import Aggregate
+from common.events.anime_events import ClickRegistered, ViewRegistered, RatingGiven
+from common.events.base_event import BaseEvent
+
+
+class AnimeAggregate(Aggregate):
+    """
+    Estado plegado de los eventos de un anime (aggregate_id anime_{id}).
+    
+    Guarda contadores y la última calificación de cada usuario, que es lo
+    necesario para validar comandos con estado (p. ej. recalificaciones).
+    """
+    
+    aggregate_type = "Anime"
+    
+    def __init__(self, aggregate_id: str):
+        super().__init__(aggregate_id)
+        self.total_clicks = 0
+        self.total_views = 0
+        self.total_duration_seconds = 0
+        self.ratings: Dict[str, float] = {}
+    
+    @property
+    def average_rating(self) -> float:
+        """Media de la última calificación de cada usuario."""
+        if not self.ratings:
+            return 0.0
+        return sum(self.ratings.values()) / len(self.ratings)
+    
+    def _when(self, event: BaseEvent):
+        """Actualiza contadores y calificaciones."""
+        if isinstance(event, ClickRegistered):
+            self.total_clicks += 1
+        elif isinstance(event, ViewRegistered):
+            self.total_views += 1
+            self.total_duration_seconds += event.duration_seconds
+        elif isinstance(event, RatingGiven):
+            self.ratings[event.user_id] = event.rating
+    
+    def to_snapshot(self) -> Dict[str, Any]:
+        """Estado plegado serializable a JSON."""
+        return {
+            "total_clicks": self.total_clicks,
+            "total_views": self.total_views,
+            "total_duration_seconds": self.total_duration_seconds,
+            "ratings": dict(self.ratings),
+        }
+    
+    def restore_snapshot(self, state: Dict[str, Any], version: int):
+        """Restaura el estado de un snapshot tomado en la versión indicada."""
+        self.total_clicks = state["total_clicks"]
+        self.total_views = state["total_views"]
+        self.total_duration_seconds = state["total_duration_seconds"]
+        self.ratings = dict(state["ratings"])
+        self._version = version
@@ -0,0 +1,56 @@
+"""Índice en memoria de IDs de anime válidos."""
+from typing import Iterable
+
+
+class AnimeIdIndex:
+    """
+    Conjunto compacto de IDs de anime implementado como bitmap.
+    
+    Los IDs de MyAnimeList son enteros positivos y densos (< 100k), por lo que
+    un bit por ID ocupa unos pocos KB y permite comprobar la existencia en O(1)
+    sin I/O.
+    """
+    
+    def __init__(self, anime_ids: Iterable[int] = ()):
+        self._bits = bytearray()
+        self._count = 0
+        self.add_many(anime_ids)
+    
+    def __contains__(self, anime_id: int) -> bool:
+        if anime_id < 0:
+            return False
+        byte_index = anime_id >> 3
+        if byte_index >= len(self._bits):
+            return False
+        return bool(self._bits[byte_index] & (1 << (anime_id & 7)))
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def add(self, anime_id: int) -> None:
+        """Añade un ID al índice."""
+        if anime_id < 0:
+            raise ValueError(f"anime_id debe ser positivo, recibido: {anime_id}")
+        byte_index = anime_id >> 3
+        if byte_index >= len(self._bits):
+            self._bits.extend(bytes(byte_index - len(self._bits) + 1))
+        mask = 1 << (anime_id & 7)
+        if not self._bits[byte_index] & mask:
+            self._bits[byte_index] |= mask
+            self._count += 1
+    
+    def add_many(self, anime_ids: Iterable[int]) -> None:
+        """Añade varios IDs al índice."""
+        for anime_id in anime_ids:
+            self.add(anime_id)
+    
+    def discard(self, anime_id: int) -> None:
+        """Elimina un ID del índice si existe."""
+        if anime_id in self:
+            self._bits[anime_id >> 3] &= ~(1 << (anime_id & 7)) & 0xFF
+            self._count -= 1
+    
+    @property
+    def size_bytes(self) -> int:
+        """Memoria ocupada por el bitmap."""
+        return len(self._bits)
@@ -1,15 +1,132 @@
-from typing import Optional
+import asyncio
+from typing import Iterable, Optional, Set
 import asyncpg
+from app.command_side.domain.anime_id_index import AnimeIdIndex
 from common.utils.logger import get_logger
 from config.settings import settings
 
 logger = get_logger(__name__)
 
 class AnimeValidator:
-    """Valida reglas de negocio relacionadas con animes."""
+    """
+    Valida reglas de negocio relacionadas con animes.
+    
+    Tras initialize() las comprobaciones se resuelven contra un índice en
+    memoria de IDs válidos que se refresca en segundo plano. Sin índice se
+    consulta la base de datos en cada llamada.
+    """
     
     def __init__(self):
         self._pool: Optional[asyncpg.Pool] = None
+        self._index: Optional[AnimeIdIndex] = None
+        # pg_snapshot_xmin del último refresco: toda transacción anterior ya estaba
+        # terminada, así que las altas pendientes tienen transaction_id >= este valor
+        self._snapshot_xmin: Optional[int] = None
+        # Último cambio aplicado de anime_catalog_changes (None si la tabla no existe)
+        self._last_change_id: Optional[int] = None
+        self._refresh_count = 0
+        self._refresh_task: Optional[asyncio.Task] = None
+    
+    async def initialize(self):
+        """Carga el índice de IDs y arranca el refresco en segundo plano."""
+        if not settings.ANIME_INDEX_ENABLED:
+            return
+        try:
+            await self.refresh(full=True)
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        except Exception as e:
+            logger.warning(
+                f"No se pudo cargar el índice de animes, se usará la base de datos: {e}",
+                exc_info=True
+            )
+    
+    async def refresh(self, full: bool = False):
+        """
+        Refresca el índice de IDs.
+        
+        El refresco incremental lee los animes insertados por transacciones
+        que no habían terminado en el refresco anterior (en orden de commit,
+        no por created_at, que es la hora de inicio de la transacción) y
+        aplica las altas y bajas registradas en anime_catalog_changes por la
+        sincronización del catálogo; el completo reconstruye el índice.
+        """
+        conn = await asyncpg.connect(
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            database=settings.POSTGRES_DB,
+        )
+        try:
+            # Ambas lecturas sobre el mismo snapshot
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                if full or self._index is None or self._snapshot_xmin is None:
+                    await self._load_full(conn)
+                else:
+                    await self._load_changes(conn)
+        finally:
+            await conn.close()
+    
+    async def _load_full(self, conn: asyncpg.Connection):
+        """Reconstruye el índice con todos los animes."""
+        rows = await conn.fetch("SELECT myanimelist_id FROM animes")
+        index = AnimeIdIndex(row["myanimelist_id"] for row in rows)
+        self._index = index
+        # Sin la columna transaction_id (migración 012) cada refresco es completo
+        self._snapshot_xmin = await conn.fetchval("""
+            SELECT CASE WHEN EXISTS (
+                SELECT 1 FROM pg_attribute
+                WHERE attrelid = 'animes'::regclass AND attname = 'transaction_id' AND NOT attisdropped
+            ) THEN pg_snapshot_xmin(pg_current_snapshot()) END
+        """)
+        self._last_change_id = None
+        if await conn.fetchval("SELECT to_regclass('anime_catalog_changes') IS NOT NULL"):
+            self._last_change_id = await conn.fetchval(
+                "SELECT COALESCE(MAX(change_id), 0) FROM anime_catalog_changes"
+            )
+        logger.info(f"Índice de animes cargado: {len(index)} IDs, {index.size_bytes} bytes")
+    
+    async def _load_changes(self, conn: asyncpg.Connection):
+        """Aplica al índice los animes nuevos y el change log del catálogo."""
+        # Relee las transacciones en curso en el refresco anterior: añadir un ID
+        # dos veces no tiene efecto, y las que siguen en curso se leerán en el próximo
+        rows = await conn.fetch(
+            "SELECT myanimelist_id FROM animes WHERE transaction_id >= $1::xid8",
+            self._snapshot_xmin
+        )
+        for row in rows:
+            self._index.add(row["myanimelist_id"])
+        self._snapshot_xmin = await conn.fetchval("SELECT pg_snapshot_xmin(pg_current_snapshot())")
+        if rows:
+            logger.info(f"Índice de animes actualizado: {len(rows)} IDs nuevos")
+        
+        if self._last_change_id is None:
+            return
+        changes = await conn.fetch("""
+            SELECT change_id, anime_id, change_type
+            FROM anime_catalog_changes
+            WHERE change_id > $1
+            ORDER BY change_id
+        """, self._last_change_id)
+        for change in changes:
+            if change["change_type"] == "delete":
+                self._index.discard(change["anime_id"])
+            elif change["change_type"] == "insert":
+                self._index.add(change["anime_id"])
+            self._last_change_id = change["change_id"]
+        if changes:
+            logger.info(f"Índice de animes actualizado: {len(changes)} cambios del catálogo")
+    
+    async def _refresh_loop(self):
+        """Refresca el índice periódicamente."""
+        while True:
+            await asyncio.sleep(settings.ANIME_INDEX_REFRESH_INTERVAL)
+            self._refresh_count += 1
+            full = self._refresh_count % settings.ANIME_INDEX_FULL_REFRESH_EVERY == 0
+            try:
+                await self.refresh(full=full)
+            except Exception as e:
+                logger.error(f"Error refrescando el índice de animes: {e}", exc_info=True)
     
     async def _get_pool(self):
         """Obtiene el pool de conexiones."""
@@ -25,6 +142,9 @@ class AnimeValidator:
     
     async def anime_exists(self, anime_id: int) -> bool:
         """Verifica si un anime existe en la base de datos."""
+        if self._index is not None:
+            return anime_id in self._index
+        
         pool = await self._get_pool()
         async with pool.acquire() as conn:
             result = await conn.fetchval(
@@ -33,7 +153,31 @@ class AnimeValidator:
             )
             return result
     
+    async def existing_anime_ids(self, anime_ids: Iterable[int]) -> Set[int]:
+        """Retorna el subconjunto de IDs que existen, con una sola query."""
+        ids = list(set(anime_ids))
+        if not ids:
+            return set()
+        
+        if self._index is not None:
+            return {anime_id for anime_id in ids if anime_id in self._index}
+        
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT myanimelist_id FROM animes WHERE myanimelist_id = ANY($1::int[])",
+                ids
+            )
+            return {row["myanimelist_id"] for row in rows}
+    
     async def close(self):
-        """Cierra el pool."""
+        """Detiene el refresco del índice y cierra el pool."""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
         if self._pool:
-            await self._pool.close()
\ No newline at end of file
+            await self._pool.close()
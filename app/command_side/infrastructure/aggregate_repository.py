@@ -0,0 +1,92 @@
+"""Carga de agregados desde snapshot más la cola de eventos del Event Store."""
+from typing import Optional, Tuple, Type
+from app.command_side.domain.aggregate import Aggregate
+from app.command_side.domain.anime_aggregate import AnimeAggregate
+from app.command_side.infrastructure.event_store import EventStore
+from app.command_side.infrastructure.snapshot_store import Snapshot, SnapshotStore
+from common.utils.logger import get_logger
+from config.settings import settings
+
+logger = get_logger(__name__)
+
+
+class AggregateRepository:
+    """
+    Reconstruye agregados sin reproducir todo su historial.
+    
+    Parte del último snapshot y aplica sólo los eventos posteriores a su
+    posición. Si desde el snapshot se plegaron al menos snapshot_interval
+    eventos estables, guarda uno nuevo en la posición del último de ellos.
+    """
+    
+    def __init__(
+        self,
+        event_store: EventStore,
+        snapshot_store: SnapshotStore,
+        aggregate_class: Type[Aggregate] = AnimeAggregate,
+        snapshot_interval: Optional[int] = None,
+    ):
+        self._event_store = event_store
+        self._snapshot_store = snapshot_store
+        self._aggregate_class = aggregate_class
+        self._snapshot_interval = snapshot_interval or settings.AGGREGATE_SNAPSHOT_INTERVAL
+    
+    async def load(self, aggregate_id: str) -> Aggregate:
+        """Carga el agregado con todos los eventos confirmados hasta ahora."""
+        aggregate = self._aggregate_class(aggregate_id)
+        transaction_id, position = 0, 0
+        
+        if settings.AGGREGATE_SNAPSHOTS_ENABLED:
+            snapshot = await self._snapshot_store.get_latest(aggregate_id)
+            if snapshot:
+                aggregate.restore_snapshot(snapshot.state, snapshot.version)
+                transaction_id, position = snapshot.last_transaction_id, snapshot.last_position
+        base_version = aggregate.version
+        
+        # Último evento estable aplicado y el snapshot candidato en su posición
+        stable_position: Optional[Tuple[int, int]] = None
+        candidate: Optional[Snapshot] = None
+        reached_unstable = False
+        
+        async for stored in self._event_store.iter_events_since(aggregate_id, transaction_id, position):
+            if not stored.stable and not reached_unstable:
+                reached_unstable = True
+                candidate = self._build_snapshot(aggregate, stable_position)
+            aggregate.apply(stored.event)
+            if stored.stable:
+                stable_position = (stored.transaction_id, stored.position)
+        
+        if not reached_unstable:
+            candidate = self._build_snapshot(aggregate, stable_position)
+        
+        if (
+            settings.AGGREGATE_SNAPSHOTS_ENABLED
+            and candidate
+            and candidate.version - base_version >= self._snapshot_interval
+        ):
+            await self._save_snapshot(candidate)
+        
+        return aggregate
+    
+    def _build_snapshot(self, aggregate: Aggregate, stable_position: Optional[Tuple[int, int]]) -> Optional[Snapshot]:
+        """Captura el estado actual del agregado en la posición del último evento estable."""
+        if stable_position is None:
+            return None
+        return Snapshot(
+            aggregate_id=aggregate.aggregate_id,
+            aggregate_type=aggregate.aggregate_type,
+            version=aggregate.version,
+            state=aggregate.to_snapshot(),
+            last_transaction_id=stable_position[0],
+            last_position=stable_position[1],
+        )
+    
+    async def _save_snapshot(self, snapshot: Snapshot):
+        """Guarda el snapshot; un fallo no impide devolver el agregado cargado."""
+        try:
+            if await self._snapshot_store.save(snapshot):
+                logger.info(
+                    f"Snapshot guardado: aggregate_id={snapshot.aggregate_id}, version={snapshot.version}"
+                )
+        except Exception as e:
+            logger.error(f"Error guardando snapshot de {snapshot.aggregate_id}: {e}", exc_info=True)
@@ -1,16 +1,41 @@
 """Event Store en PostgreSQL con configuración para producción."""
 import json
+import time
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, AsyncIterator, Dict, List, NamedTuple, Optional, Tuple
 import asyncpg
 from asyncpg import Pool
 from common.events.base_event import BaseEvent
+from common.events.fast_events import AnyEvent, event_json
+from common.events.registry import deserialize_event
 from common.utils.logger import get_logger
+from common.utils.metrics import counter, histogram, register_pool
+from app.command_side.infrastructure.group_commit_writer import GroupCommitWriter
 from common.utils.retry import retry_async
 from config.settings import settings
 
 logger = get_logger(__name__)
 
+EVENT_STORE_WRITE_SECONDS = histogram(
+    "event_store_write_duration_seconds",
+    "Latencia de escritura de eventos en el Event Store (group commit incluye la espera del grupo)",
+    ("mode",),
+)
+EVENT_STORE_EVENTS_WRITTEN = counter(
+    "event_store_events_written_total",
+    "Eventos escritos en el Event Store",
+)
+
+
+class StoredEvent(NamedTuple):
+    """Evento leído del Event Store con su posición en orden de commit."""
+    
+    event: BaseEvent
+    transaction_id: int
+    position: int
+    # Anterior a la transacción activa más antigua: ninguna pendiente puede confirmar antes
+    stable: bool
+
 
 class EventStore:
     """Implementación del Event Store usando PostgreSQL."""
@@ -18,6 +43,7 @@ class EventStore:
     def __init__(self):
         self._pool: Optional[Pool] = None
         self._connected = False
+        self._group_writer: Optional[GroupCommitWriter] = None
     
     async def connect(self):
         """Crea el pool de conexiones con configuración para producción."""
@@ -42,7 +68,16 @@ class EventStore:
                 command_timeout=settings.POSTGRES_COMMAND_TIMEOUT,
             )
             self._connected = True
+            register_pool("event_store", self._pool)
             logger.info("Conexión al Event Store establecida correctamente")
+            
+            if settings.EVENT_STORE_GROUP_COMMIT_ENABLED:
+                self._group_writer = GroupCommitWriter(
+                    self._insert_events_bulk,
+                    max_delay_ms=settings.EVENT_STORE_GROUP_COMMIT_MAX_DELAY_MS,
+                    max_batch_size=settings.EVENT_STORE_GROUP_COMMIT_MAX_BATCH_SIZE,
+                )
+                await self._group_writer.start()
         except Exception as e:
             logger.error(f"Error conectando al Event Store: {e}", exc_info=True)
             self._connected = False
@@ -50,6 +85,12 @@ class EventStore:
     
     async def close(self):
         """Cierra el pool de conexiones."""
+        if self._group_writer:
+            try:
+                await self._group_writer.stop()
+            except Exception as e:
+                logger.error(f"Error deteniendo GroupCommitWriter: {e}", exc_info=True)
+        
         if self._pool:
             try:
                 await self._pool.close()
@@ -59,7 +100,7 @@ class EventStore:
                 logger.error(f"Error cerrando pool del Event Store: {e}", exc_info=True)
     
     @retry_async(max_attempts=3, exceptions=(asyncpg.PostgresError,))
-    async def save_events(self, events: List[BaseEvent]):
+    async def save_events(self, events: List[AnyEvent]):
         """Guarda eventos en el Event Store con retry."""
         if not self._pool or self._pool.is_closing():
             await self.connect()
@@ -68,6 +109,12 @@ class EventStore:
             logger.warning("Intento de guardar lista vacía de eventos")
             return
         
+        start = time.perf_counter()
+        if self._group_writer and self._group_writer.is_running:
+            await self._group_writer.submit(events)
+            EVENT_STORE_WRITE_SECONDS.labels("group_commit").observe(time.perf_counter() - start)
+            return
+        
         try:
             async with self._pool.acquire() as conn:
                 async with conn.transaction():
@@ -77,22 +124,49 @@ class EventStore:
                                 event_id, event_type, aggregate_id, event_data,
                                 occurred_at, version, metadata
                             ) VALUES ($1, $2, $3, $4, $5, $6, $7)
-                            ON CONFLICT (event_id) DO NOTHING
+                            ON CONFLICT (event_id, occurred_at) DO NOTHING
                         """, 
                             event.event_id,
                             event.event_type,
                             event.aggregate_id,
-                            event.model_dump_json(),
+                            event_json(event),
                             event.occurred_at,
                             event.version,
                             json.dumps(event.metadata),
                         )
             
+            EVENT_STORE_WRITE_SECONDS.labels("direct").observe(time.perf_counter() - start)
+            EVENT_STORE_EVENTS_WRITTEN.inc(len(events))
             logger.debug(f"Guardados {len(events)} eventos en Event Store")
         except Exception as e:
             logger.error(f"Error guardando eventos en Event Store: {e}", exc_info=True)
             raise
     
+    async def _insert_events_bulk(self, events: List[AnyEvent]):
+        """Inserta eventos con un único INSERT multi-fila en una transacción."""
+        async with self._pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute("""
+                    INSERT INTO event_store (
+                        event_id, event_type, aggregate_id, event_data,
+                        occurred_at, version, metadata
+                    )
+                    SELECT * FROM unnest(
+                        $1::varchar[], $2::varchar[], $3::varchar[], $4::jsonb[],
+                        $5::timestamp[], $6::int[], $7::jsonb[]
+                    )
+                    ON CONFLICT (event_id, occurred_at) DO NOTHING
+                """,
+                    [event.event_id for event in events],
+                    [event.event_type for event in events],
+                    [event.aggregate_id for event in events],
+                    [event_json(event) for event in events],
+                    [event.occurred_at for event in events],
+                    [event.version for event in events],
+                    [json.dumps(event.metadata) for event in events],
+                )
+        EVENT_STORE_EVENTS_WRITTEN.inc(len(events))
+    
     async def health_check(self) -> bool:
         """Verifica la salud de la conexión al Event Store."""
         try:
@@ -110,8 +184,12 @@ class EventStore:
         self, 
         aggregate_id: str,
         from_version: int = 0
-    ) -> List[BaseEvent]:
-        """Obtiene eventos por aggregate_id."""
+    ) -> List[Dict[str, Any]]:
+        """
+        Obtiene eventos por aggregate_id como dicts.
+        
+        Materializa todo el historial: para agregados grandes usar iter_events().
+        """
         if not self._pool:
             await self.connect()
         
@@ -128,4 +206,102 @@ class EventStore:
                 events.append(event_data)
             
             return events
-
+    
+    async def iter_events(
+        self,
+        aggregate_id: str,
+        after: Optional[Tuple[int, int]] = None,
+        until: Optional[Tuple[int, int]] = None,
+        from_time: Optional[datetime] = None,
+        to_time: Optional[datetime] = None,
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[BaseEvent]:
+        """
+        Recorre los eventos de un agregado con un cursor del servidor.
+        
+        Sólo mantiene en memoria chunk_size filas a la vez, así que el coste no
+        depende del tamaño del historial. La conexión del pool queda ocupada
+        hasta agotar el iterador (o cerrarlo con aclose()).
+        
+        Los límites son posiciones (transaction_id, id) en orden de commit, las
+        mismas de StoredEvent e iter_events_since(): la columna version no sirve
+        para acotar porque los eventos se guardan todos con versión 1.
+        
+        Args:
+            aggregate_id: Agregado a leer
+            after: Posición exclusiva desde la que leer
+            until: Posición inclusiva hasta la que leer
+            from_time: occurred_at inclusivo desde el que leer
+            to_time: occurred_at exclusivo hasta el que leer
+            chunk_size: Filas por fetch (por defecto EVENT_STORE_READ_CHUNK_SIZE)
+        
+        Yields:
+            Eventos tipados en orden de commit
+        """
+        if not self._pool or self._pool.is_closing():
+            await self.connect()
+        
+        conditions = ["aggregate_id = $1"]
+        args: list = [aggregate_id]
+        for operator, position in ((">", after), ("<=", until)):
+            if position is not None:
+                args.extend(position)
+                conditions.append(f"(transaction_id, id) {operator} (${len(args) - 1}::xid8, ${len(args)}::bigint)")
+        for condition, value in (
+            ("occurred_at >= ${}", from_time),
+            ("occurred_at < ${}", to_time),
+        ):
+            if value is not None:
+                args.append(value)
+                conditions.append(condition.format(len(args)))
+        
+        where = " AND ".join(conditions)
+        query = f"""
+            SELECT event_type, event_data::text AS event_data FROM event_store
+            WHERE {where}
+            ORDER BY transaction_id, id
+        """
+        
+        async with self._pool.acquire() as conn:
+            # Los cursores de asyncpg requieren una transacción
+            async with conn.transaction(readonly=True):
+                async for row in conn.cursor(
+                    query, *args, prefetch=chunk_size or settings.EVENT_STORE_READ_CHUNK_SIZE
+                ):
+                    yield deserialize_event(row["event_type"], row["event_data"])
+    
+    async def iter_events_since(
+        self,
+        aggregate_id: str,
+        transaction_id: int = 0,
+        position: int = 0,
+        chunk_size: Optional[int] = None,
+    ) -> AsyncIterator[StoredEvent]:
+        """
+        Recorre los eventos de un agregado posteriores a una posición, en orden de commit.
+        
+        La posición es (transaction_id, id), la misma que usa el outbox relay. Un
+        snapshot sólo debe fijarse en la posición de un evento stable: los que no
+        lo son aún podrían quedar por detrás de una transacción pendiente.
+        """
+        if not self._pool or self._pool.is_closing():
+            await self.connect()
+        
+        async with self._pool.acquire() as conn:
+            async with conn.transaction(readonly=True):
+                async for row in conn.cursor("""
+                    SELECT event_type, event_data::text AS event_data, transaction_id, id,
+                           transaction_id < pg_snapshot_xmin(pg_current_snapshot()) AS stable
+                    FROM event_store
+                    WHERE aggregate_id = $1
+                        AND (transaction_id, id) > ($2::xid8, $3::bigint)
+                    ORDER BY transaction_id, id
+                """, aggregate_id, transaction_id, position,
+                    prefetch=chunk_size or settings.EVENT_STORE_READ_CHUNK_SIZE,
+                ):
+                    yield StoredEvent(
+                        deserialize_event(row["event_type"], row["event_data"]),
+                        row["transaction_id"],
+                        row["id"],
+                        row["stable"],
+                    )
@@ -0,0 +1,183 @@
+"""Mantenimiento de las particiones mensuales del Event Store."""
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional, Tuple
+import asyncpg
+from common.utils.logger import get_logger
+from config.settings import settings
+
+logger = get_logger(__name__)
+
+PARTITION_PREFIX = "event_store_y"
+DEFAULT_PARTITION = "event_store_default"
+
+
+class Partition(NamedTuple):
+    """Partición mensual de event_store: [start, end)."""
+    
+    name: str
+    start: date
+    end: date
+
+
+def month_start(value: date, offset: int = 0) -> date:
+    """Primer día del mes de value desplazado offset meses."""
+    months = value.year * 12 + value.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_for(month: date) -> Partition:
+    """Partición que cubre el mes indicado."""
+    start = month_start(month)
+    return Partition(f"{PARTITION_PREFIX}{start:%Y}m{start:%m}", start, month_start(start, 1))
+
+
+def parse_partition_name(name: str) -> Optional[Partition]:
+    """Partición a partir de su nombre (event_store_yYYYYmMM); None si no sigue el esquema."""
+    if not name.startswith(PARTITION_PREFIX):
+        return None
+    try:
+        start = datetime.strptime(name[len(PARTITION_PREFIX):], "%Ym%m").date()
+    except ValueError:
+        return None
+    return partition_for(start)
+
+
+class EventStorePartitionManager:
+    """
+    Crea particiones futuras de event_store y archiva las antiguas.
+    
+    Las particiones se crean con antelación (premake_months) para que los
+    inserts nunca caigan en la partición por defecto. Las que quedan fuera
+    de la retención se desconectan de event_store y se mueven al esquema de
+    archivo, donde siguen consultables pero ya no participan en lecturas,
+    reconstrucciones ni inserts.
+    """
+    
+    def __init__(
+        self,
+        premake_months: Optional[int] = None,
+        retention_months: Optional[int] = None,
+        archive_schema: Optional[str] = None,
+    ):
+        self._premake_months = (
+            settings.EVENT_STORE_PARTITION_PREMAKE_MONTHS if premake_months is None else premake_months
+        )
+        self._retention_months = (
+            settings.EVENT_STORE_PARTITION_RETENTION_MONTHS if retention_months is None else retention_months
+        )
+        self._archive_schema = archive_schema or settings.EVENT_STORE_ARCHIVE_SCHEMA
+        self._conn: Optional[asyncpg.Connection] = None
+    
+    async def connect(self):
+        """Abre la conexión al Event Store."""
+        if self._conn and not self._conn.is_closed():
+            return
+        self._conn = await asyncpg.connect(
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            database=settings.POSTGRES_EVENT_STORE_DB,
+            command_timeout=settings.POSTGRES_COMMAND_TIMEOUT,
+        )
+    
+    async def close(self):
+        """Cierra la conexión."""
+        if self._conn:
+            await self._conn.close()
+            self._conn = None
+    
+    async def maintain(self, today: Optional[date] = None) -> Tuple[List[Partition], List[Partition]]:
+        """
+        Crea las particiones pendientes y archiva las que superan la retención.
+        
+        Returns:
+            Particiones creadas y particiones archivadas
+        """
+        today = today or datetime.utcnow().date()
+        await self.connect()
+        
+        created = await self.ensure_partitions(today)
+        archived = await self.archive_partitions(today)
+        logger.info(
+            f"Mantenimiento de particiones: {len(created)} creadas, {len(archived)} archivadas"
+        )
+        
+        default_rows = await self._conn.fetchval(f"SELECT count(*) FROM {DEFAULT_PARTITION}")
+        if default_rows:
+            logger.warning(
+                f"{default_rows} eventos en {DEFAULT_PARTITION}: occurred_at fuera de las particiones mensuales"
+            )
+        return created, archived
+    
+    async def list_partitions(self) -> List[Partition]:
+        """Particiones mensuales adjuntas a event_store, ordenadas por mes."""
+        rows = await self._conn.fetch("""
+            SELECT child.relname AS name
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = 'event_store'::regclass
+        """)
+        partitions = [parse_partition_name(row["name"]) for row in rows]
+        return sorted((p for p in partitions if p), key=lambda p: p.start)
+    
+    async def ensure_partitions(self, today: date) -> List[Partition]:
+        """Crea las particiones del mes actual y de los premake_months siguientes."""
+        existing = {partition.name for partition in await self.list_partitions()}
+        created = []
+        for offset in range(self._premake_months + 1):
+            partition = partition_for(month_start(today, offset))
+            if partition.name in existing:
+                continue
+            try:
+                await self._conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {partition.name} PARTITION OF event_store "
+                    f"FOR VALUES FROM ('{partition.start}') TO ('{partition.end}')"
+                )
+            except asyncpg.PostgresError as e:
+                # Normalmente: la partición por defecto ya tiene eventos de ese mes
+                logger.error(f"No se pudo crear la partición {partition.name}: {e}")
+                continue
+            created.append(partition)
+            logger.info(f"Partición creada: {partition.name} [{partition.start}, {partition.end})")
+        return created
+    
+    async def archive_partitions(self, today: date) -> List[Partition]:
+        """
+        Desconecta y mueve al esquema de archivo las particiones anteriores a la retención.
+        
+        Con retention_months=0 no se archiva nada. Con el outbox activo no se
+        archiva una partición que tenga eventos aún no publicados.
+        """
+        if self._retention_months <= 0:
+            return []
+        
+        cutoff = month_start(today, -self._retention_months)
+        archived = []
+        for partition in await self.list_partitions():
+            if partition.end > cutoff:
+                break
+            if settings.EVENT_OUTBOX_ENABLED and await self._has_unpublished_events(partition):
+                logger.warning(f"Partición {partition.name} con eventos sin publicar: no se archiva")
+                break
+            async with self._conn.transaction():
+                await self._conn.execute(f"SET LOCAL lock_timeout = '{settings.POSTGRES_COMMAND_TIMEOUT}s'")
+                await self._conn.execute(f"ALTER TABLE event_store DETACH PARTITION {partition.name}")
+                await self._conn.execute(f"ALTER TABLE {partition.name} SET SCHEMA {self._archive_schema}")
+            archived.append(partition)
+            logger.info(f"Partición archivada: {partition.name} -> {self._archive_schema}")
+        return archived
+    
+    async def _has_unpublished_events(self, partition: Partition) -> bool:
+        """Indica si la partición tiene eventos posteriores al checkpoint más atrasado del outbox."""
+        # Sin checkpoint el relay nunca ha arrancado: nada de la partición consta como publicado
+        if not await self._conn.fetchval("SELECT EXISTS (SELECT 1 FROM outbox_checkpoints)"):
+            return True
+        return await self._conn.fetchval(f"""
+            SELECT EXISTS (
+                SELECT 1
+                FROM {partition.name} e
+                JOIN outbox_checkpoints c
+                  ON (e.transaction_id, e.id) > (c.last_transaction_id, c.last_position)
+            )
+        """)
@@ -0,0 +1,145 @@
+"""Escritor con group commit para el Event Store."""
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+from common.events.fast_events import AnyEvent
+from common.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+_PendingWrite = Tuple[List[AnyEvent], "asyncio.Future"]
+
+
+class GroupCommitWriter:
+    """
+    Agrupa eventos de peticiones concurrentes en una sola transacción.
+    
+    Cada llamada a submit() encola sus eventos y espera a que la transacción
+    compartida haga commit. Un único worker vacía la cola cada pocos
+    milisegundos (o al alcanzar el tamaño máximo) y escribe todo el grupo con
+    un insert multi-fila.
+    """
+    
+    def __init__(
+        self,
+        write_batch: Callable[[List[AnyEvent]], Awaitable[None]],
+        max_delay_ms: int = 5,
+        max_batch_size: int = 500,
+    ):
+        self._write_batch = write_batch
+        self._max_delay = max_delay_ms / 1000
+        self._max_batch_size = max_batch_size
+        self._queue: "asyncio.Queue[Optional[_PendingWrite]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        # Una vez encolado el centinela de stop() no se aceptan más eventos
+        self._stopping = False
+    
+    @property
+    def is_running(self) -> bool:
+        """Indica si el worker está activo."""
+        return self._task is not None and not self._task.done()
+    
+    async def start(self):
+        """Arranca el worker de group commit."""
+        if self.is_running:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"GroupCommitWriter iniciado: max_delay={self._max_delay * 1000:.0f}ms, "
+            f"max_batch_size={self._max_batch_size}"
+        )
+    
+    async def stop(self):
+        """Detiene el worker tras escribir los eventos ya encolados."""
+        if not self.is_running or self._stopping:
+            return
+        self._stopping = True
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("GroupCommitWriter detenido")
+    
+    async def submit(self, events: List[AnyEvent]):
+        """Encola eventos y espera al commit de la transacción que los incluye."""
+        if not self.is_running:
+            raise RuntimeError("GroupCommitWriter no está iniciado. Llama a start() primero.")
+        if self._stopping:
+            raise RuntimeError("GroupCommitWriter se está deteniendo: no acepta más eventos.")
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((events, future))
+        await future
+    
+    async def _run(self):
+        """Bucle del worker: agrupa peticiones pendientes y las escribe juntas."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            
+            group = [first]
+            size = len(first[0])
+            deadline = loop.time() + self._max_delay
+            
+            while size < self._max_batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+                
+                if item is None:
+                    stopping = True
+                    break
+                group.append(item)
+                size += len(item[0])
+            
+            await self._commit_group(group)
+        
+        # Lo encolado detrás del centinela no se escribirá: sus llamadas no deben quedar esperando
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                self._fail(item[1], RuntimeError("GroupCommitWriter detenido antes de escribir los eventos"))
+    
+    async def _commit_group(self, group: List[_PendingWrite]):
+        """Escribe un grupo en una transacción y resuelve los futures de cada llamada."""
+        events = [event for pending_events, _ in group for event in pending_events]
+        try:
+            await self._write_batch(events)
+            logger.debug(f"Group commit: {len(events)} eventos de {len(group)} peticiones")
+            for _, future in group:
+                if not future.done():
+                    future.set_result(None)
+            return
+        except Exception as e:
+            if len(group) == 1:
+                self._fail(group[0][1], e)
+                return
+            logger.warning(
+                f"Group commit de {len(group)} peticiones falló ({e}), "
+                f"reintentando cada petición por separado"
+            )
+        
+        # Aislar el fallo: un evento inválido no debe hacer fallar a las demás peticiones
+        for pending_events, future in group:
+            try:
+                await self._write_batch(pending_events)
+                if not future.done():
+                    future.set_result(None)
+            except Exception as e:
+                self._fail(future, e)
+    
+    @staticmethod
+    def _fail(future: "asyncio.Future", error: Exception):
+        """Propaga un error a quien espera el future."""
+        if not future.done():
+            future.set_exception(error)
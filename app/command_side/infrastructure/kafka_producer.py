@@ -1,42 +1,66 @@
 """Productor de Kafka para eventos."""
+import asyncio
 import json
-from typing import List
+import time
+from typing import List, Optional, Tuple
+from aiokafka import AIOKafkaProducer
 from kafka import KafkaProducer
 from kafka.errors import KafkaError
-from common.events.base_event import BaseEvent
+from common.events.fast_events import AnyEvent
+from common.events.serializer import get_event_serializer
 from common.utils.logger import get_logger
+from common.utils.metrics import counter, histogram
 from config.settings import settings
 
 logger = get_logger(__name__)
 
+KAFKA_PUBLISH_SECONDS = histogram(
+    "kafka_publish_duration_seconds",
+    "Latencia desde el envío de un lote de eventos a Kafka hasta su confirmación",
+)
+KAFKA_EVENTS_PUBLISHED = counter(
+    "kafka_events_published_total",
+    "Eventos confirmados por Kafka",
+)
+KAFKA_PUBLISH_ERRORS = counter(
+    "kafka_publish_errors_total",
+    "Eventos cuya entrega a Kafka falló",
+)
+
 
 class KafkaEventProducer:
     """Productor de eventos a Kafka."""
     
     def __init__(self):
         self._producer: KafkaProducer = None
+        self._serializer = get_event_serializer()
     
     def connect(self):
         """Conecta al broker de Kafka."""
         self._producer = KafkaProducer(
             bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
+            value_serializer=lambda v: v if isinstance(v, bytes) else json.dumps(v).encode("utf-8"),
             key_serializer=lambda k: k.encode("utf-8") if k else None,
+            retries=settings.KAFKA_PRODUCER_RETRIES,
+            retry_backoff_ms=settings.KAFKA_PRODUCER_RETRY_BACKOFF_MS,
         )
     
-    def publish_events(self, events: List[BaseEvent]):
+    def publish_events(self, events: List[AnyEvent]):
         """Publica eventos a Kafka."""
         if not self._producer:
             self.connect()
         
+        start = time.perf_counter()
         for event in events:
             self._producer.send(
                 settings.KAFKA_TOPIC_EVENTS,
                 key=event.aggregate_id,
-                value=event.model_dump(),
+                value=self._serializer.serialize(event),
             )
         
         self._producer.flush()
+        KAFKA_PUBLISH_SECONDS.observe(time.perf_counter() - start)
+        KAFKA_EVENTS_PUBLISHED.inc(len(events))
     
     def close(self):
         """Cierra el productor."""
@@ -55,3 +79,153 @@ class KafkaEventProducer:
             logger.error(f"Health check de Kafka falló: {e}")
             return False
 
+
+
+class AsyncKafkaEventProducer:
+    """
+    Productor de eventos a Kafka nativo de asyncio (aiokafka).
+    
+    Los envíos se encolan en el acumulador del producer y se agrupan según
+    linger/batch size, sin bloquear el event loop mientras están en vuelo.
+    """
+    
+    def __init__(self):
+        self._producer: Optional[AIOKafkaProducer] = None
+        self._serializer = get_event_serializer()
+    
+    async def connect(self):
+        """Conecta al broker de Kafka."""
+        if self._producer:
+            return
+        
+        producer = AIOKafkaProducer(
+            bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
+            value_serializer=lambda v: v if isinstance(v, bytes) else json.dumps(v).encode("utf-8"),
+            key_serializer=lambda k: k.encode("utf-8") if k else None,
+            linger_ms=settings.KAFKA_PRODUCER_LINGER_MS,
+            max_batch_size=settings.KAFKA_PRODUCER_MAX_BATCH_SIZE,
+            compression_type=settings.KAFKA_PRODUCER_COMPRESSION_TYPE,
+            acks=int(settings.KAFKA_PRODUCER_ACKS) if settings.KAFKA_PRODUCER_ACKS != "all" else "all",
+            # aiokafka no limita el número de reintentos: reintenta los errores
+            # recuperables cada retry_backoff_ms hasta agotar request_timeout_ms
+            retry_backoff_ms=settings.KAFKA_PRODUCER_RETRY_BACKOFF_MS,
+            request_timeout_ms=settings.KAFKA_PRODUCER_REQUEST_TIMEOUT_MS,
+        )
+        await producer.start()
+        self._producer = producer
+        logger.info(
+            f"AsyncKafkaEventProducer conectado: linger_ms={settings.KAFKA_PRODUCER_LINGER_MS}, "
+            f"max_batch_size={settings.KAFKA_PRODUCER_MAX_BATCH_SIZE}, "
+            f"compression={settings.KAFKA_PRODUCER_COMPRESSION_TYPE}"
+        )
+    
+    async def send_events(self, events: List[AnyEvent]) -> List["asyncio.Future"]:
+        """
+        Encola eventos para publicar sin esperar la confirmación del broker.
+        
+        Returns:
+            Futures de entrega (uno por evento) que resuelven a RecordMetadata
+        """
+        if not self._producer:
+            await self.connect()
+        
+        futures = []
+        for event in events:
+            future = await self._producer.send(
+                settings.KAFKA_TOPIC_EVENTS,
+                key=event.aggregate_id,
+                value=self._serializer.serialize(event),
+            )
+            futures.append(future)
+        return futures
+    
+    async def send_records(self, records: List[Tuple[str, bytes]]) -> List["asyncio.Future"]:
+        """
+        Encola mensajes ya serializados (key, value) sin esperar confirmación.
+        
+        Returns:
+            Futures de entrega (uno por mensaje)
+        """
+        if not self._producer:
+            await self.connect()
+        
+        futures = []
+        for key, value in records:
+            future = await self._producer.send(settings.KAFKA_TOPIC_EVENTS, key=key, value=value)
+            futures.append(future)
+        return futures
+    
+    async def publish_events(self, events: List[AnyEvent], wait: Optional[bool] = None):
+        """
+        Publica eventos a Kafka.
+        
+        Args:
+            events: Eventos a publicar
+            wait: Esperar la confirmación de entrega; por defecto
+                KAFKA_PRODUCER_WAIT_FOR_DELIVERY
+        """
+        start = time.perf_counter()
+        futures = await self.send_events(events)
+        
+        if wait is None:
+            wait = settings.KAFKA_PRODUCER_WAIT_FOR_DELIVERY
+        if wait:
+            try:
+                await asyncio.gather(*futures)
+            except Exception:
+                KAFKA_PUBLISH_ERRORS.inc(len(events))
+                raise
+            self.record_delivery(start, len(events))
+        else:
+            for future in futures:
+                future.add_done_callback(self._log_delivery_error)
+            asyncio.gather(*futures, return_exceptions=True).add_done_callback(
+                lambda delivery: self._record_background_delivery(start, delivery)
+            )
+    
+    @staticmethod
+    def record_delivery(start: float, count: int):
+        """Registra la latencia de un lote entregado desde start (perf_counter)."""
+        KAFKA_PUBLISH_SECONDS.observe(time.perf_counter() - start)
+        KAFKA_EVENTS_PUBLISHED.inc(count)
+    
+    def _record_background_delivery(self, start: float, delivery: "asyncio.Future"):
+        """Registra la entrega de un lote que nadie espera; los fallos los cuenta _log_delivery_error."""
+        if delivery.cancelled():
+            return
+        delivered = sum(1 for result in delivery.result() if not isinstance(result, BaseException))
+        if delivered:
+            self.record_delivery(start, delivered)
+    
+    @staticmethod
+    def _log_delivery_error(future: "asyncio.Future"):
+        """Registra fallos de entrega de envíos que nadie espera."""
+        if not future.cancelled() and future.exception() is not None:
+            KAFKA_PUBLISH_ERRORS.inc()
+            logger.error(f"Error entregando evento a Kafka: {future.exception()}")
+    
+    async def flush(self):
+        """Espera a que se entreguen todos los mensajes pendientes."""
+        if self._producer:
+            await self._producer.flush()
+    
+    async def close(self):
+        """Cierra el productor, entregando antes los mensajes pendientes."""
+        if self._producer:
+            await self._producer.stop()
+            self._producer = None
+    
+    async def health_check(self) -> bool:
+        """Verifica la salud de la conexión a Kafka."""
+        try:
+            if not self._producer:
+                await self.connect()
+            
+            partitions = await asyncio.wait_for(
+                self._producer.partitions_for(settings.KAFKA_TOPIC_EVENTS),
+                timeout=5
+            )
+            return partitions is not None
+        except Exception as e:
+            logger.error(f"Health check de Kafka falló: {e}")
+            return False
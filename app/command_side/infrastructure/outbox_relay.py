@@ -0,0 +1,197 @@
+"""Relay del outbox transaccional: publica a Kafka los eventos del Event Store."""
+import asyncio
+import json
+import time
+from typing import List, Optional
+import asyncpg
+from app.command_side.infrastructure.kafka_producer import KAFKA_PUBLISH_ERRORS, AsyncKafkaEventProducer
+from common.events.serializer import JsonEventSerializer, get_event_serializer
+from common.utils.logger import get_logger
+from common.utils.metrics import register_pool
+from config.settings import settings
+
+logger = get_logger(__name__)
+
+
+class OutboxRelay:
+    """
+    Lee el Event Store en orden de commit y publica los eventos a Kafka en lotes.
+    
+    Solo se leen filas cuyo transaction_id es anterior a la transacción activa
+    más antigua, de modo que ninguna transacción pendiente puede hacer commit
+    después con una posición ya superada. El checkpoint se guarda tras confirmar
+    la entrega del lote (at-least-once; el consumer es idempotente).
+    """
+    
+    def __init__(self, relay_name: str = "kafka"):
+        self.relay_name = relay_name
+        self.kafka_producer = AsyncKafkaEventProducer()
+        self._serializer = get_event_serializer()
+        self._pool: Optional[asyncpg.Pool] = None
+        self._lock_conn: Optional[asyncpg.Connection] = None
+        self._running = False
+        self._last_transaction_id = 0
+        self._last_position = 0
+        self._published_count = 0
+    
+    async def start(self):
+        """Conecta al Event Store y a Kafka y carga el checkpoint."""
+        logger.info(f"Iniciando OutboxRelay '{self.relay_name}'...")
+        self._pool = await asyncpg.create_pool(
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            database=settings.POSTGRES_EVENT_STORE_DB,
+            min_size=1,
+            max_size=2,
+            command_timeout=settings.POSTGRES_COMMAND_TIMEOUT,
+        )
+        register_pool("outbox", self._pool)
+        await self.kafka_producer.connect()
+        await self._load_checkpoint()
+        self._running = True
+        logger.info(
+            f"OutboxRelay iniciado desde transaction_id={self._last_transaction_id}, "
+            f"position={self._last_position}"
+        )
+    
+    async def stop(self):
+        """Detiene el relay y libera las conexiones."""
+        self._running = False
+        try:
+            await self.kafka_producer.close()
+            if self._lock_conn:
+                await self._lock_conn.close()
+                self._lock_conn = None
+            if self._pool:
+                await self._pool.close()
+            logger.info(f"OutboxRelay detenido. Eventos publicados: {self._published_count}")
+        except Exception as e:
+            logger.error(f"Error deteniendo OutboxRelay: {e}", exc_info=True)
+    
+    async def _load_checkpoint(self):
+        """
+        Lee (o crea) el checkpoint del relay.
+        
+        El primer arranque lo crea en pg_snapshot_xmin del momento: hasta
+        entonces el command side publicaba directamente, así que solo quedan
+        por publicar las transacciones que seguían en curso. Alguna ya
+        confirmada puede publicarse dos veces; el consumer es idempotente.
+        """
+        async with self._pool.acquire() as conn:
+            await conn.execute("""
+                INSERT INTO outbox_checkpoints (relay_name, last_transaction_id, last_position)
+                VALUES ($1, pg_snapshot_xmin(pg_current_snapshot()), 0)
+                ON CONFLICT (relay_name) DO NOTHING
+            """, self.relay_name)
+            row = await conn.fetchrow("""
+                SELECT last_transaction_id, last_position
+                FROM outbox_checkpoints
+                WHERE relay_name = $1
+            """, self.relay_name)
+        self._last_transaction_id = row["last_transaction_id"]
+        self._last_position = row["last_position"]
+    
+    async def _acquire_leadership(self):
+        """Espera a ser la única instancia activa del relay (advisory lock)."""
+        self._lock_conn = await asyncpg.connect(
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            database=settings.POSTGRES_EVENT_STORE_DB,
+        )
+        while self._running:
+            acquired = await self._lock_conn.fetchval(
+                "SELECT pg_try_advisory_lock(hashtext('outbox_relay:' || $1))", self.relay_name
+            )
+            if acquired:
+                # Otra instancia pudo avanzar el checkpoint mientras esperábamos
+                await self._load_checkpoint()
+                return
+            logger.debug("Otra instancia del relay está activa, esperando...")
+            await asyncio.sleep(settings.OUTBOX_RELAY_POLL_INTERVAL_MS / 1000)
+    
+    async def run(self):
+        """Bucle principal: publica lotes mientras haya eventos, si no espera."""
+        await self._acquire_leadership()
+        while self._running:
+            try:
+                published = await self.relay_batch()
+            except Exception as e:
+                logger.error(f"Error publicando lote del outbox: {e}", exc_info=True)
+                await asyncio.sleep(settings.OUTBOX_RELAY_ERROR_BACKOFF_SECONDS)
+                continue
+            
+            if published < settings.OUTBOX_RELAY_BATCH_SIZE:
+                await asyncio.sleep(settings.OUTBOX_RELAY_POLL_INTERVAL_MS / 1000)
+    
+    async def relay_batch(self) -> int:
+        """
+        Publica el siguiente lote de eventos y avanza el checkpoint.
+        
+        Returns:
+            Número de eventos publicados
+        """
+        rows = await self._fetch_batch()
+        if not rows:
+            return 0
+        
+        start = time.perf_counter()
+        futures = await self.kafka_producer.send_records([
+            (row["aggregate_id"], self._encode(row["event_data"])) for row in rows
+        ])
+        try:
+            await asyncio.gather(*futures)
+        except Exception:
+            KAFKA_PUBLISH_ERRORS.inc(len(rows))
+            raise
+        self.kafka_producer.record_delivery(start, len(rows))
+        
+        last = rows[-1]
+        await self._save_checkpoint(last["transaction_id"], last["id"])
+        self._published_count += len(rows)
+        logger.debug(f"Outbox: publicados {len(rows)} eventos hasta la posición {last['id']}")
+        return len(rows)
+    
+    def _encode(self, event_data: str) -> bytes:
+        """Convierte el event_data JSON del Event Store al formato configurado para Kafka."""
+        if isinstance(self._serializer, JsonEventSerializer):
+            # Ya está en el formato de salida: se reenvía sin parsear
+            return event_data.encode("utf-8")
+        return self._serializer.serialize_dict(json.loads(event_data))
+    
+    async def _fetch_batch(self) -> List[asyncpg.Record]:
+        """Lee el siguiente lote de eventos visibles en orden de commit."""
+        async with self._pool.acquire() as conn:
+            return await conn.fetch("""
+                SELECT id, transaction_id, aggregate_id, event_data::text AS event_data
+                FROM event_store
+                WHERE (transaction_id, id) > ($1::xid8, $2::bigint)
+                    AND transaction_id < pg_snapshot_xmin(pg_current_snapshot())
+                ORDER BY transaction_id, id
+                LIMIT $3
+            """, self._last_transaction_id, self._last_position, settings.OUTBOX_RELAY_BATCH_SIZE)
+    
+    async def _save_checkpoint(self, transaction_id: int, position: int):
+        """Persiste la última posición publicada."""
+        async with self._pool.acquire() as conn:
+            await conn.execute("""
+                UPDATE outbox_checkpoints
+                SET last_transaction_id = $2::xid8,
+                    last_position = $3,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE relay_name = $1
+            """, self.relay_name, transaction_id, position)
+        self._last_transaction_id = transaction_id
+        self._last_position = position
+    
+    async def health_check(self) -> dict:
+        """Estado del relay."""
+        return {
+            "status": "healthy" if self._running else "stopped",
+            "published_events": self._published_count,
+            "last_transaction_id": self._last_transaction_id,
+            "last_position": self._last_position,
+        }
@@ -0,0 +1,117 @@
+"""Almacén de snapshots de agregados en el Event Store."""
+import json
+from typing import Any, Dict, Optional
+import asyncpg
+from pydantic import BaseModel
+from common.utils.logger import get_logger
+from config.settings import settings
+
+logger = get_logger(__name__)
+
+
+class Snapshot(BaseModel):
+    """Estado plegado de un agregado en una posición del Event Store."""
+    
+    aggregate_id: str
+    aggregate_type: str
+    version: int
+    state: Dict[str, Any]
+    last_transaction_id: int
+    last_position: int
+    
+    def serialize_state(self) -> str:
+        """Serializa el estado para la columna JSONB."""
+        return json.dumps(self.state, separators=(",", ":"))
+    
+    @classmethod
+    def from_row(cls, row) -> "Snapshot":
+        """Construye el snapshot desde una fila de aggregate_snapshots."""
+        state = row["state"]
+        return cls(
+            aggregate_id=row["aggregate_id"],
+            aggregate_type=row["aggregate_type"],
+            version=row["version"],
+            state=json.loads(state) if isinstance(state, str) else state,
+            last_transaction_id=row["last_transaction_id"],
+            last_position=row["last_position"],
+        )
+
+
+class SnapshotStore:
+    """Lee y guarda el último snapshot de cada agregado (tabla aggregate_snapshots)."""
+    
+    def __init__(self):
+        self._pool: Optional[asyncpg.Pool] = None
+    
+    async def connect(self):
+        """Crea el pool de conexiones al Event Store."""
+        if self._pool and not self._pool.is_closing():
+            return
+        self._pool = await asyncpg.create_pool(
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            database=settings.POSTGRES_EVENT_STORE_DB,
+            min_size=1,
+            max_size=settings.POSTGRES_EVENT_STORE_MAX_CONNECTIONS,
+            command_timeout=settings.POSTGRES_COMMAND_TIMEOUT,
+        )
+        logger.info("Pool de conexiones del SnapshotStore creado correctamente")
+    
+    async def close(self):
+        """Cierra el pool."""
+        if self._pool:
+            try:
+                await self._pool.close()
+                logger.info("Pool de conexiones del SnapshotStore cerrado")
+            except Exception as e:
+                logger.error(f"Error cerrando pool del SnapshotStore: {e}", exc_info=True)
+    
+    async def get_latest(self, aggregate_id: str) -> Optional[Snapshot]:
+        """Obtiene el último snapshot del agregado, si existe."""
+        if not self._pool or self._pool.is_closing():
+            await self.connect()
+        
+        async with self._pool.acquire() as conn:
+            row = await conn.fetchrow("""
+                SELECT aggregate_id, aggregate_type, version, state::text AS state,
+                       last_transaction_id, last_position
+                FROM aggregate_snapshots
+                WHERE aggregate_id = $1
+            """, aggregate_id)
+        return Snapshot.from_row(row) if row else None
+    
+    async def save(self, snapshot: Snapshot) -> bool:
+        """
+        Guarda el snapshot si es más reciente que el almacenado.
+        
+        Returns:
+            True si se guardó; False si otro proceso ya guardó uno igual o más reciente
+        """
+        if not self._pool or self._pool.is_closing():
+            await self.connect()
+        
+        async with self._pool.acquire() as conn:
+            result = await conn.execute("""
+                INSERT INTO aggregate_snapshots (
+                    aggregate_id, aggregate_type, version, state,
+                    last_transaction_id, last_position
+                ) VALUES ($1, $2, $3, $4::jsonb, $5::xid8, $6)
+                ON CONFLICT (aggregate_id) DO UPDATE SET
+                    aggregate_type = EXCLUDED.aggregate_type,
+                    version = EXCLUDED.version,
+                    state = EXCLUDED.state,
+                    last_transaction_id = EXCLUDED.last_transaction_id,
+                    last_position = EXCLUDED.last_position,
+                    created_at = CURRENT_TIMESTAMP
+                WHERE aggregate_snapshots.version < EXCLUDED.version
+            """,
+                snapshot.aggregate_id,
+                snapshot.aggregate_type,
+                snapshot.version,
+                snapshot.serialize_state(),
+                snapshot.last_transaction_id,
+                snapshot.last_position,
+            )
+        return result.endswith(" 1")
@@ -5,3 +5,8 @@ from common.exceptions import GraphQLError
 class InvalidLimitError(GraphQLError):
     """Excepción cuando el límite es inválido."""
     pass
+
+
+class InvalidIdsError(GraphQLError):
+    """Excepción cuando la lista de IDs es inválida."""
+    pass
@@ -0,0 +1,25 @@
+"""DataLoaders por request para agrupar las lecturas de animes y estadísticas."""
+from typing import Dict, List, Optional
+from strawberry.dataloader import DataLoader
+from app.read_side.infrastructure.repository import ReadModelRepository
+
+
+def create_loaders(repo: ReadModelRepository) -> Dict[str, DataLoader]:
+    """
+    Crea los DataLoaders de un request.
+    
+    Todas las cargas de un mismo tick del event loop se resuelven con una sola
+    llamada bulk al repositorio, sin importar la forma de la query.
+    """
+    async def load_animes(anime_ids: List[int]) -> List[Optional[dict]]:
+        rows = await repo.get_animes_by_ids(anime_ids)
+        return [rows.get(anime_id) for anime_id in anime_ids]
+    
+    async def load_anime_stats(anime_ids: List[int]) -> List[Optional[dict]]:
+        rows = await repo.get_anime_stats_by_ids(anime_ids)
+        return [rows.get(anime_id) for anime_id in anime_ids]
+    
+    return {
+        "anime_loader": DataLoader(load_fn=load_animes),
+        "anime_stats_loader": DataLoader(load_fn=load_anime_stats),
+    }
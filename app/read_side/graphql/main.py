@@ -1,14 +1,58 @@
 """Aplicación GraphQL principal con configuración para producción."""
+import asyncio
+from typing import Optional
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from strawberry.fastapi import GraphQLRouter
 from common.utils.logger import get_logger
-from app.read_side.graphql.schema import schema, get_repository
+from common.utils.metrics import (
+    CONTENT_TYPE,
+    REGISTRY,
+    MetricsMiddleware,
+    counter,
+    gauge,
+    render_metrics,
+    run_snapshot_writer,
+)
+from app.read_side.graphql.schema import schema, get_repository, Query
+from app.read_side.graphql.loaders import create_loaders
 from config.settings import settings
 
 logger = get_logger(__name__)
 
+READ_CACHE_REQUESTS = counter(
+    "read_cache_requests_total",
+    "Lecturas del caché del read side por resultado",
+    ("result",),
+)
+READ_CACHE_REMOVALS = counter(
+    "read_cache_removals_total",
+    "Entradas eliminadas del caché del read side por motivo",
+    ("reason",),
+)
+READ_CACHE_ENTRIES = gauge("read_cache_entries", "Entradas en el caché del read side")
+READ_CACHE_BYTES = gauge("read_cache_bytes", "Bytes estimados en el caché del read side")
+
+
+def _collect_cache_metrics() -> None:
+    """Copia las estadísticas del caché; get_cache_stats() lo recorre una sola vez para todas."""
+    cache_stats = get_repository().get_cache_stats()
+    if not cache_stats:
+        return
+    READ_CACHE_REQUESTS.labels("hit").set(cache_stats["hits"])
+    READ_CACHE_REQUESTS.labels("miss").set(cache_stats["misses"])
+    READ_CACHE_REQUESTS.labels("stale_hit").set(cache_stats["stale_hits"])
+    READ_CACHE_REMOVALS.labels("eviction").set(cache_stats["evictions"])
+    READ_CACHE_REMOVALS.labels("expiration").set(cache_stats["expirations"])
+    READ_CACHE_ENTRIES.set(cache_stats["entries"])
+    READ_CACHE_BYTES.set(cache_stats["bytes"])
+
+
+# Se actualizan en cada scrape y en cada volcado para el resto de workers
+REGISTRY.add_collector(_collect_cache_metrics)
+metrics_writer: Optional[asyncio.Task] = None
+
 app = FastAPI(
     title="CQRS Read Side GraphQL",
     version="1.0.0",
@@ -25,14 +69,33 @@ if settings.ALLOWED_ORIGINS:
         allow_headers=["*"],
     )
 
-graphql_app = GraphQLRouter(schema)
+if settings.ENABLE_METRICS:
+    app.add_middleware(MetricsMiddleware)
+
+
+async def get_context() -> dict:
+    """Contexto por request con DataLoaders nuevos (su caché no se comparte entre requests)."""
+    return create_loaders(get_repository())
+
+
+def get_root_value() -> Query:
+    """Instancia raíz para que los resolvers de Query accedan a sus helpers vía self."""
+    return Query()
+
+
+graphql_app = GraphQLRouter(schema, context_getter=get_context, root_value_getter=get_root_value)
 app.include_router(graphql_app, prefix="/graphql")
 
 
 @app.on_event("startup")
 async def startup():
     """Inicialización al arrancar."""
+    global metrics_writer
     logger.info("Iniciando Read Side GraphQL API...")
+    if settings.ENABLE_METRICS and settings.METRICS_MULTIPROC_DIR:
+        metrics_writer = asyncio.ensure_future(
+            run_snapshot_writer(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_INTERVAL)
+        )
     try:
         repo = get_repository()
         await repo.connect()
@@ -46,6 +109,10 @@ async def startup():
 async def shutdown():
     """Limpieza al cerrar."""
     logger.info("Cerrando Read Side GraphQL API...")
+    if metrics_writer:
+        # Al cancelarse vuelca una última vez: los contadores de este worker no se pierden
+        metrics_writer.cancel()
+        await asyncio.gather(metrics_writer, return_exceptions=True)
     try:
         repo = get_repository()
         await repo.close()
@@ -84,7 +151,13 @@ async def health():
 
 @app.get("/metrics")
 async def metrics():
-    """Endpoint de métricas del sistema."""
+    """Métricas del servicio en formato Prometheus (sumadas entre workers con METRICS_MULTIPROC_DIR)."""
+    return Response(render_metrics(settings.METRICS_MULTIPROC_DIR), media_type=CONTENT_TYPE)
+
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Estadísticas del caché en JSON."""
     repo = get_repository()
     cache_stats = repo.get_cache_stats()
     
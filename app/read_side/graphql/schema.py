@@ -2,7 +2,7 @@
 import strawberry
 from typing import List, Optional
 from app.read_side.infrastructure.repository import ReadModelRepository
-from app.read_side.graphql.exceptions import InvalidLimitError
+from app.read_side.graphql.exceptions import InvalidIdsError, InvalidLimitError
 from common.utils.logger import get_logger
 from common.exceptions import GraphQLError, AnimeNotFoundError
 
@@ -31,6 +31,61 @@ class Anime:
     popularity: Optional[int]
 
 
+def _get_loader(info: Optional[strawberry.Info], name: str):
+    """Retorna el DataLoader del request si existe en el contexto."""
+    if info is None or not isinstance(info.context, dict):
+        return None
+    return info.context.get(name)
+
+
+async def _load_anime_row(anime_id: int, info: Optional[strawberry.Info]) -> Optional[dict]:
+    """Carga un anime vía DataLoader o, sin contexto de request, directo del repositorio."""
+    loader = _get_loader(info, "anime_loader")
+    if loader is not None:
+        return await loader.load(anime_id)
+    return await get_repository().get_anime(anime_id)
+
+
+async def _load_anime_stats_row(anime_id: int, info: Optional[strawberry.Info]) -> Optional[dict]:
+    """Carga estadísticas vía DataLoader o, sin contexto de request, directo del repositorio."""
+    loader = _get_loader(info, "anime_stats_loader")
+    if loader is not None:
+        return await loader.load(anime_id)
+    return await get_repository().get_anime_stats(anime_id)
+
+
+async def _load_anime_rows(anime_ids: List[int], info: Optional[strawberry.Info]) -> List[Optional[dict]]:
+    """Carga varios animes vía DataLoader o, sin contexto de request, con una consulta bulk."""
+    loader = _get_loader(info, "anime_loader")
+    if loader is not None:
+        return await loader.load_many(anime_ids)
+    rows = await get_repository().get_animes_by_ids(anime_ids)
+    return [rows.get(anime_id) for anime_id in anime_ids]
+
+
+async def _load_anime_stats_rows(anime_ids: List[int], info: Optional[strawberry.Info]) -> List[Optional[dict]]:
+    """Carga estadísticas de varios animes vía DataLoader o, sin contexto de request, con una consulta bulk."""
+    loader = _get_loader(info, "anime_stats_loader")
+    if loader is not None:
+        return await loader.load_many(anime_ids)
+    rows = await get_repository().get_anime_stats_by_ids(anime_ids)
+    return [rows.get(anime_id) for anime_id in anime_ids]
+
+
+def _row_to_anime(row: dict) -> "Anime":
+    """Transforma una fila de animes a Anime."""
+    return Anime(
+        myanimelist_id=row["myanimelist_id"],
+        title=row["title"],
+        description=row.get("description"),
+        image=row.get("image"),
+        type=row.get("type"),
+        episodes=row.get("episodes"),
+        score=float(row["score"]) if row.get("score") else None,
+        popularity=row.get("popularity"),
+    )
+
+
 @strawberry.type
 class AnimeStats:
     """Estadísticas de un anime."""
@@ -40,6 +95,16 @@ class AnimeStats:
     total_ratings: int
     average_rating: Optional[float]
     total_duration_seconds: int
+    
+    @strawberry.field
+    async def anime(self, info: strawberry.Info) -> Optional[Anime]:
+        """Anime al que pertenecen las estadísticas (agrupado con DataLoader)."""
+        try:
+            row = await _load_anime_row(self.anime_id, info)
+            return _row_to_anime(row) if row else None
+        except Exception as e:
+            logger.error(f"Error al obtener el anime {self.anime_id}: {e}", exc_info=True)
+            raise GraphQLError(str(e))
 
 
 @strawberry.type
@@ -72,7 +137,7 @@ class Query:
             average_rating=float(row["average_rating"]) if row["average_rating"] else None,
             total_duration_seconds=row["total_duration_seconds"] or 0,
         )
-
+    
     def _validate_limit(self, limit: int) -> None:
         """Valida que el límite esté en un rango válido."""
         if limit < 1:
@@ -102,12 +167,11 @@ class Query:
             raise GraphQLError(str(e))
     
     @strawberry.field
-    async def anime_stats(self, anime_id: int) -> Optional[AnimeStats]:
+    async def anime_stats(self, anime_id: int, info: strawberry.Info) -> Optional[AnimeStats]:
         """Obtiene las estadísticas de un anime específico."""
         try:
             self._validate_anime_id(anime_id)
-            repo = get_repository()
-            row = await repo.get_anime_stats(anime_id)
+            row = await _load_anime_stats_row(anime_id, info)
             if not row:
                 return None
             logger.debug(f"Se obtuvo la estadística del anime {anime_id}")
@@ -120,12 +184,11 @@ class Query:
             raise GraphQLError(str(e))
     
     @strawberry.field
-    async def anime(self, anime_id: int) -> Optional[Anime]:
+    async def anime(self, anime_id: int, info: strawberry.Info) -> Optional[Anime]:
         """Obtiene un anime por ID."""
         try:
             self._validate_anime_id(anime_id)
-            repo = get_repository()
-            row = await repo.get_anime(anime_id)
+            row = await _load_anime_row(anime_id, info)
             if not row:
                 return None
             logger.debug(f"Se obtuvo el anime {anime_id}")
@@ -136,19 +199,43 @@ class Query:
         except Exception as e:
             logger.error(f"Error al obtener el anime {anime_id}: {e}", exc_info=True)
             raise GraphQLError(str(e))
-
+    
+    @strawberry.field
+    async def animes(self, ids: List[int], info: strawberry.Info) -> List[Optional[Anime]]:
+        """Obtiene varios animes por ID en una sola consulta, en el orden pedido."""
+        try:
+            self._validate_ids(ids)
+            rows = await _load_anime_rows(ids, info)
+            return [_row_to_anime(row) if row else None for row in rows]
+        except ValueError as e:
+            logger.error(f"Error al obtener los animes {ids}: {e}", exc_info=True)
+            raise InvalidIdsError(str(e))
+        except Exception as e:
+            logger.error(f"Error al obtener los animes {ids}: {e}", exc_info=True)
+            raise GraphQLError(str(e))
+    
+    @strawberry.field
+    async def animes_stats(self, ids: List[int], info: strawberry.Info) -> List[Optional[AnimeStats]]:
+        """Obtiene las estadísticas de varios animes en una sola consulta, en el orden pedido."""
+        try:
+            self._validate_ids(ids)
+            rows = await _load_anime_stats_rows(ids, info)
+            return [self._row_to_anime_stats(row) if row else None for row in rows]
+        except ValueError as e:
+            logger.error(f"Error al obtener las estadísticas de los animes {ids}: {e}", exc_info=True)
+            raise InvalidIdsError(str(e))
+        except Exception as e:
+            logger.error(f"Error al obtener las estadísticas de los animes {ids}: {e}", exc_info=True)
+            raise GraphQLError(str(e))
+    
+    def _validate_ids(self, ids: List[int]) -> None:
+        """Valida la cantidad de IDs de una consulta por lista."""
+        if len(ids) > 100:
+            raise ValueError("No se pueden pedir más de 100 IDs por consulta")
+    
     def _row_to_anime(self, row: dict) -> Anime:
         """Helper para transformar una fila a Anime (evita duplicación)."""
-        return Anime(
-            myanimelist_id=row["myanimelist_id"],
-            title=row["title"],
-            description=row.get("description"),
-            image=row.get("image"),
-            type=row.get("type"),
-            episodes=row.get("episodes"),
-            score=float(row["score"]) if row.get("score") else None,
-            popularity=row.get("popularity"),
-        )
+        return _row_to_anime(row)
 
 
 schema = strawberry.Schema(query=Query)
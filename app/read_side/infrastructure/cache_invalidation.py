@@ -0,0 +1,105 @@
+"""Bus de invalidación de caché entre procesos usando LISTEN/NOTIFY de Postgres."""
+import asyncio
+import json
+from typing import Callable, List, Optional
+import asyncpg
+from common.utils.logger import get_logger
+from config.settings import settings
+
+logger = get_logger(__name__)
+
+# Payload que pide vaciar el caché completo (p. ej. tras reconstruir las proyecciones)
+RESET_PAYLOAD = "*"
+
+
+class CacheInvalidationListener:
+    """
+    Escucha el canal de invalidación y notifica los anime_id modificados.
+    
+    Usa una conexión dedicada (LISTEN no funciona a través del pool). Si la
+    conexión se pierde se reconecta y pide una invalidación completa, ya que
+    las notificaciones emitidas mientras tanto se pierden.
+    """
+    
+    def __init__(
+        self,
+        on_invalidate: Callable[[List[int]], None],
+        on_reset: Callable[[], None],
+        channel: Optional[str] = None,
+        reconnect_interval: float = 5.0,
+    ):
+        self._on_invalidate = on_invalidate
+        self._on_reset = on_reset
+        self._channel = channel or settings.CACHE_INVALIDATION_CHANNEL
+        self._reconnect_interval = reconnect_interval
+        self._conn: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._received = 0
+    
+    async def start(self):
+        """Abre la conexión de escucha e inicia la supervisión."""
+        await self._connect()
+        self._task = asyncio.create_task(self._supervise())
+    
+    async def stop(self):
+        """Detiene la escucha y cierra la conexión."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn and not self._conn.is_closed():
+            try:
+                await self._conn.close()
+            except Exception as e:
+                logger.error(f"Error cerrando conexión de invalidación: {e}", exc_info=True)
+        self._conn = None
+        logger.info("Listener de invalidación de caché detenido")
+    
+    @property
+    def is_connected(self) -> bool:
+        """Indica si la conexión de escucha está activa."""
+        return self._conn is not None and not self._conn.is_closed()
+    
+    async def _connect(self):
+        """Abre una conexión dedicada y se suscribe al canal."""
+        self._conn = await asyncpg.connect(
+            host=settings.POSTGRES_HOST,
+            port=settings.POSTGRES_PORT,
+            user=settings.POSTGRES_USER,
+            password=settings.POSTGRES_PASSWORD,
+            database=settings.POSTGRES_DB,
+        )
+        await self._conn.add_listener(self._channel, self._handle_notification)
+        logger.info(f"Escuchando invalidaciones de caché en el canal '{self._channel}'")
+    
+    async def _supervise(self):
+        """Reconecta si la conexión de escucha se pierde."""
+        while True:
+            await asyncio.sleep(self._reconnect_interval)
+            if self.is_connected:
+                continue
+            try:
+                await self._connect()
+                # Las notificaciones emitidas durante la desconexión se perdieron
+                self._on_reset()
+                logger.warning("Listener de invalidación reconectado; caché vaciado por completo")
+            except Exception as e:
+                logger.error(f"Error reconectando listener de invalidación: {e}", exc_info=True)
+    
+    def _handle_notification(self, connection, pid, channel, payload):
+        """Procesa una notificación con la lista JSON de anime_id modificados."""
+        if payload == RESET_PAYLOAD:
+            self._received += 1
+            self._on_reset()
+            logger.info("Invalidación completa recibida; caché vaciado")
+            return
+        try:
+            anime_ids = [int(anime_id) for anime_id in json.loads(payload)]
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Payload de invalidación inválido: {payload!r} ({e})")
+            return
+        self._received += 1
+        self._on_invalidate(anime_ids)
@@ -0,0 +1,388 @@
+"""
+Carga masiva del catálogo de MAL (CSV) en la tabla animes.
+
+Lee el CSV en streaming por bloques, los parsea (opcionalmente en varios
+procesos) y los copia con COPY a una tabla temporal. Después fusiona todo en
+animes con un único INSERT ... ON CONFLICT que sólo reescribe las filas cuyo
+hash de contenido ha cambiado.
+
+La sincronización incremental compara además el catálogo completo: sólo
+escribe altas, cambios y bajas, los registra en anime_catalog_changes y
+notifica los anime_id afectados al canal de invalidación de caché.
+"""
+import asyncio
+import csv
+import hashlib
+import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+import asyncpg
+from common.exceptions import CatalogSyncError
+from common.utils.logger import get_logger
+from config.settings import settings
+
+logger = get_logger(__name__)
+
+# (columna de animes, cabecera del CSV, tipo)
+COLUMNS: Tuple[Tuple[str, str, str], ...] = (
+    ("myanimelist_id", "myanimelist_id", "int"),
+    ("title", "title", "str"),
+    ("description", "description", "str"),
+    ("image", "image", "str"),
+    ("type", "Type", "str"),
+    ("episodes", "Episodes", "int"),
+    ("status", "Status", "str"),
+    ("premiered", "Premiered", "str"),
+    ("released_season", "Released_Season", "str"),
+    ("released_year", "Released_Year", "numeric"),
+    ("source", "Source", "str"),
+    ("genres", "Genres", "str"),
+    ("themes", "Themes", "str"),
+    ("studios", "Studios", "str"),
+    ("producers", "Producers", "str"),
+    ("demographic", "Demographic", "str"),
+    ("duration", "Duration", "str"),
+    ("rating", "Rating", "str"),
+    ("score", "Score", "numeric"),
+    ("ranked", "Ranked", "int"),
+    ("popularity", "Popularity", "int"),
+    ("members", "Members", "int"),
+    ("favorites", "Favorites", "int"),
+    ("characters", "characters", "json"),
+    ("source_url", "source_url", "str"),
+)
+ANIME_COLUMNS = tuple(column for column, _, _ in COLUMNS)
+STAGING_TABLE = "animes_staging"
+STAGING_COLUMNS = ANIME_COLUMNS + ("content_hash", "row_number")
+
+# Sin las restricciones NOT NULL de animes: las filas incompletas se descartan en el merge
+CREATE_STAGING = f"""
+    DROP TABLE IF EXISTS {STAGING_TABLE};
+    CREATE TEMP TABLE {STAGING_TABLE} AS
+    SELECT {", ".join(ANIME_COLUMNS)}, content_hash, 0::bigint AS row_number
+    FROM animes
+    WITH NO DATA
+"""
+
+# La última aparición de cada myanimelist_id gana; las filas con el mismo hash no se tocan
+MERGE_QUERY = f"""
+    WITH merged AS (
+        INSERT INTO animes ({", ".join(ANIME_COLUMNS)}, content_hash)
+        SELECT DISTINCT ON (myanimelist_id) {", ".join(ANIME_COLUMNS)}, content_hash
+        FROM {STAGING_TABLE}
+        WHERE myanimelist_id IS NOT NULL AND title IS NOT NULL
+        ORDER BY myanimelist_id, row_number DESC
+        ON CONFLICT (myanimelist_id) DO UPDATE SET
+            {", ".join(f"{column} = EXCLUDED.{column}" for column in ANIME_COLUMNS[1:])},
+            content_hash = EXCLUDED.content_hash
+        WHERE animes.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+        RETURNING (xmax = 0) AS inserted
+    )
+    SELECT
+        count(*) FILTER (WHERE inserted) AS inserted,
+        count(*) FILTER (WHERE NOT inserted) AS updated
+    FROM merged
+"""
+
+# Catálogo entrante deduplicado, para comparar con animes en la sincronización
+CREATE_INCOMING = f"""
+    CREATE TEMP TABLE animes_incoming ON COMMIT DROP AS
+    SELECT DISTINCT ON (myanimelist_id) {", ".join(ANIME_COLUMNS)}, content_hash
+    FROM {STAGING_TABLE}
+    WHERE myanimelist_id IS NOT NULL AND title IS NOT NULL
+    ORDER BY myanimelist_id, row_number DESC;
+    ALTER TABLE animes_incoming ADD PRIMARY KEY (myanimelist_id);
+    ANALYZE animes_incoming;
+"""
+
+SYNC_INSERT_QUERY = f"""
+    INSERT INTO animes ({", ".join(ANIME_COLUMNS)}, content_hash)
+    SELECT {", ".join(f"i.{column}" for column in ANIME_COLUMNS)}, i.content_hash
+    FROM animes_incoming i
+    WHERE NOT EXISTS (SELECT 1 FROM animes a WHERE a.myanimelist_id = i.myanimelist_id)
+    RETURNING myanimelist_id
+"""
+
+SYNC_UPDATE_QUERY = f"""
+    UPDATE animes a SET
+        {", ".join(f"{column} = i.{column}" for column in ANIME_COLUMNS[1:])},
+        content_hash = i.content_hash
+    FROM animes_incoming i
+    WHERE a.myanimelist_id = i.myanimelist_id
+      AND a.content_hash IS DISTINCT FROM i.content_hash
+    RETURNING a.myanimelist_id
+"""
+
+SYNC_MISSING_QUERY = """
+    SELECT a.myanimelist_id
+    FROM animes a
+    WHERE NOT EXISTS (SELECT 1 FROM animes_incoming i WHERE i.myanimelist_id = a.myanimelist_id)
+"""
+
+DEFAULT_CHUNK_SIZE = 20000
+# Un CSV truncado no debe vaciar el catálogo: por encima de esta fracción de bajas se aborta
+DEFAULT_MAX_DELETE_FRACTION = 0.1
+NOTIFY_CHUNK_SIZE = 500
+
+
+class CatalogChangeSet(NamedTuple):
+    """anime_id insertados, modificados y eliminados por una sincronización."""
+    
+    inserted: List[int]
+    updated: List[int]
+    deleted: List[int]
+    
+    @property
+    def anime_ids(self) -> List[int]:
+        """Todos los anime_id afectados."""
+        return sorted(set(self.inserted) | set(self.updated) | set(self.deleted))
+
+
+def parse_value(value: Optional[str], field_type: str) -> Optional[Any]:
+    """Parsea un valor del CSV según su tipo."""
+    if not value or value.strip() == "":
+        return None
+    
+    value = value.strip()
+    
+    if field_type == "int":
+        try:
+            # Manejar valores con comas (ej: "2,008,019") o decimales (ej: "12.0")
+            value = value.replace(",", "")
+            try:
+                return int(value)
+            except ValueError:
+                return int(float(value))
+        except (ValueError, OverflowError):
+            return None
+    elif field_type == "numeric":
+        # Decimal y no float: NUMERIC guardaría la expansión binaria completa del float
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            return None
+    elif field_type == "json":
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return None
+    else:
+        return value
+
+
+def parse_record(values: Sequence[Optional[str]]) -> Tuple[Any, ...]:
+    """Convierte los valores crudos de una fila (en el orden de COLUMNS) en una fila de animes."""
+    record = []
+    for value, (_, _, field_type) in zip(values, COLUMNS):
+        parsed = parse_value(value, field_type)
+        if field_type == "json":
+            parsed = json.dumps(parsed) if parsed else None
+        record.append(parsed)
+    return tuple(record)
+
+
+def content_hash(record: Sequence[Any]) -> bytes:
+    """Huella del contenido de una fila de animes."""
+    text = "\x1f".join("" if value is None else str(value) for value in record)
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def parse_chunk(rows: List[List[str]], positions: Sequence[Optional[int]], first_row: int) -> List[Tuple[Any, ...]]:
+    """
+    Parsea un bloque de filas del CSV a registros de la tabla de staging.
+    
+    Args:
+        rows: Filas crudas de csv.reader
+        positions: Índice en la fila de cada columna de COLUMNS (None si falta en el CSV)
+        first_row: Número de la primera fila del bloque, para ordenar duplicados
+    """
+    records = []
+    for offset, row in enumerate(rows):
+        record = parse_record([
+            row[position] if position is not None and position < len(row) else None
+            for position in positions
+        ])
+        records.append(record + (content_hash(record), first_row + offset))
+    return records
+
+
+def header_positions(header: Sequence[str]) -> List[Optional[int]]:
+    """Posición de cada columna de COLUMNS en la cabecera del CSV."""
+    index = {name: position for position, name in enumerate(header)}
+    return [index.get(csv_header) for _, csv_header, _ in COLUMNS]
+
+
+def _raw_chunks(reader: Iterator[List[str]], chunk_size: int) -> Iterator[Tuple[int, List[List[str]]]]:
+    """Agrupa las filas del lector en bloques de chunk_size."""
+    chunk: List[List[str]] = []
+    first_row = 0
+    for row_number, row in enumerate(reader):
+        if not chunk:
+            first_row = row_number
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield first_row, chunk
+            chunk = []
+    if chunk:
+        yield first_row, chunk
+
+
+async def iter_parsed_chunks(
+    csv_path: Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+) -> AsyncIterator[List[Tuple[Any, ...]]]:
+    """
+    Parsea el CSV en streaming y devuelve bloques de registros en orden.
+    
+    Con varios workers los bloques se parsean en procesos aparte; como mucho
+    hay workers + 1 bloques en memoria.
+    """
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        positions = header_positions(header)
+        
+        if workers <= 1:
+            for first_row, rows in _raw_chunks(reader, chunk_size):
+                yield parse_chunk(rows, positions, first_row)
+            return
+        
+        loop = asyncio.get_running_loop()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            pending: "deque[asyncio.Future]" = deque()
+            for first_row, rows in _raw_chunks(reader, chunk_size):
+                pending.append(loop.run_in_executor(executor, parse_chunk, rows, positions, first_row))
+                if len(pending) > workers:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+
+
+async def ensure_catalog_columns(conn: asyncpg.Connection):
+    """Añade a animes la columna con el hash de contenido si no existe."""
+    await conn.execute("ALTER TABLE animes ADD COLUMN IF NOT EXISTS content_hash BYTEA")
+
+
+class CatalogBulkLoader:
+    """Carga el CSV de MAL en animes con COPY y un merge basado en conjuntos."""
+    
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, workers: int = 1):
+        self._chunk_size = chunk_size
+        self._workers = workers
+    
+    async def load(self, conn: asyncpg.Connection, csv_path: Path) -> Dict[str, int]:
+        """
+        Carga el CSV y fusiona los cambios en animes.
+        
+        Returns:
+            Filas leídas, insertadas, actualizadas y sin cambios
+        """
+        staged = await self._stage(conn, csv_path)
+        
+        async with conn.transaction():
+            result = await conn.fetchrow(MERGE_QUERY)
+        await conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        
+        totals = {
+            "rows": staged,
+            "inserted": result["inserted"],
+            "updated": result["updated"],
+        }
+        totals["unchanged"] = staged - totals["inserted"] - totals["updated"]
+        logger.info(
+            f"Catálogo cargado: {totals['inserted']} insertados, {totals['updated']} actualizados, "
+            f"{totals['unchanged']} sin cambios o descartados"
+        )
+        return totals
+    
+    async def sync(
+        self,
+        conn: asyncpg.Connection,
+        csv_path: Path,
+        max_delete_fraction: float = DEFAULT_MAX_DELETE_FRACTION,
+    ) -> CatalogChangeSet:
+        """
+        Sincroniza animes con el CSV completo escribiendo sólo lo que cambia.
+        
+        Inserta los animes nuevos, actualiza los que cambian de hash y borra
+        los que ya no están en el CSV. El change set se registra en
+        anime_catalog_changes y se notifica al canal de invalidación de caché
+        en la misma transacción, así que sólo se ve tras el commit.
+        
+        Raises:
+            CatalogSyncError: Si las bajas superan max_delete_fraction del catálogo
+        """
+        staged = await self._stage(conn, csv_path)
+        
+        async with conn.transaction():
+            # Una sola sincronización a la vez: el change log se escribe en orden de commit
+            await conn.execute("SELECT pg_advisory_xact_lock(hashtext('anime_catalog_sync'))")
+            await conn.execute(CREATE_INCOMING)
+            
+            missing = [row["myanimelist_id"] for row in await conn.fetch(SYNC_MISSING_QUERY)]
+            if missing:
+                total = await conn.fetchval("SELECT count(*) FROM animes")
+                if len(missing) > total * max_delete_fraction:
+                    raise CatalogSyncError(
+                        f"La sincronización eliminaría {len(missing)} de {total} animes "
+                        f"(máximo {max_delete_fraction:.0%}); ¿CSV incompleto?"
+                    )
+            
+            inserted = [row["myanimelist_id"] for row in await conn.fetch(SYNC_INSERT_QUERY)]
+            updated = [row["myanimelist_id"] for row in await conn.fetch(SYNC_UPDATE_QUERY)]
+            if missing:
+                await conn.execute("DELETE FROM animes WHERE myanimelist_id = ANY($1::int[])", missing)
+            
+            changes = CatalogChangeSet(sorted(inserted), sorted(updated), sorted(missing))
+            await self._record_changes(conn, changes)
+        await conn.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}")
+        
+        logger.info(
+            f"Catálogo sincronizado: {staged} filas leídas, {len(changes.inserted)} insertados, "
+            f"{len(changes.updated)} actualizados, {len(changes.deleted)} eliminados"
+        )
+        return changes
+    
+    async def _stage(self, conn: asyncpg.Connection, csv_path: Path) -> int:
+        """Copia el CSV parseado a la tabla de staging; devuelve las filas copiadas."""
+        await ensure_catalog_columns(conn)
+        await conn.execute(CREATE_STAGING)
+        
+        staged = 0
+        async for records in iter_parsed_chunks(csv_path, self._chunk_size, self._workers):
+            await conn.copy_records_to_table(STAGING_TABLE, records=records, columns=STAGING_COLUMNS)
+            staged += len(records)
+            logger.info(f"Catálogo: {staged} filas copiadas a {STAGING_TABLE}")
+        return staged
+    
+    @staticmethod
+    async def _record_changes(conn: asyncpg.Connection, changes: CatalogChangeSet):
+        """Registra el change set y notifica los anime_id afectados."""
+        for change_type, anime_ids in (
+            ("insert", changes.inserted),
+            ("update", changes.updated),
+            ("delete", changes.deleted),
+        ):
+            if anime_ids:
+                await conn.execute("""
+                    INSERT INTO anime_catalog_changes (anime_id, change_type)
+                    SELECT unnest($1::int[]), $2
+                """, anime_ids, change_type)
+        
+        if not settings.CACHE_INVALIDATION_ENABLED:
+            return
+        anime_ids = changes.anime_ids
+        for start in range(0, len(anime_ids), NOTIFY_CHUNK_SIZE):
+            await conn.execute(
+                "SELECT pg_notify($1, $2)",
+                settings.CACHE_INVALIDATION_CHANNEL,
+                json.dumps(anime_ids[start:start + NOTIFY_CHUNK_SIZE]),
+            )
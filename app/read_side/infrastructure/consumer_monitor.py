@@ -0,0 +1,234 @@
+"""
+Seguimiento del lag, el throughput y la latencia extremo a extremo del consumer.
+
+Por partición se guarda el final del log (highwater), el último offset
+confirmado y la siguiente posición a consumir; el lag es final menos
+confirmado, que es lo que se reprocesaría si el consumer cayera. El
+throughput y la latencia desde occurred_at hasta el commit de la proyección
+se agregan en ventanas deslizantes de 10s, 1m y 5m con buckets por segundo,
+así que el coste es fijo sin importar el volumen de eventos.
+"""
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from aiokafka import TopicPartition
+from common.utils.metrics import gauge, histogram
+
+WINDOWS = (10, 60, 300)
+
+KAFKA_CONSUMER_LAG = gauge(
+    "kafka_consumer_lag",
+    "Mensajes por detrás del final de cada partición asignada",
+    ("topic", "partition"),
+)
+KAFKA_CONSUMER_END_OFFSET = gauge(
+    "kafka_consumer_end_offset",
+    "Offset final (highwater) de cada partición asignada",
+    ("topic", "partition"),
+)
+KAFKA_CONSUMER_COMMITTED_OFFSET = gauge(
+    "kafka_consumer_committed_offset",
+    "Último offset confirmado de cada partición asignada",
+    ("topic", "partition"),
+)
+KAFKA_CONSUMER_EVENTS_PER_SECOND = gauge(
+    "kafka_consumer_events_per_second",
+    "Eventos proyectados por segundo en la ventana indicada",
+    ("window",),
+)
+PROJECTION_END_TO_END_SECONDS = histogram(
+    "projection_end_to_end_latency_seconds",
+    "Tiempo desde occurred_at hasta el commit de la proyección",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+
+
+def _occurred_at_timestamp(value: Any) -> Optional[float]:
+    """Epoch de occurred_at (datetime o ISO 8601; naive se interpreta como UTC)."""
+    try:
+        parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class SlidingWindowCounter:
+    """
+    Conteo, suma y máximo de observaciones en una ventana deslizante.
+    
+    Un anillo de max_window buckets de un segundo; los buckets se reutilizan
+    al dar la vuelta, por lo que no hay que purgar nada.
+    """
+    
+    __slots__ = ("_size", "_clock", "_started", "_seconds", "_counts", "_sums", "_maxima")
+    
+    def __init__(self, max_window: int = max(WINDOWS), clock: Callable[[], float] = time.monotonic):
+        self._size = max_window
+        self._clock = clock
+        self._started = int(clock())
+        self._seconds = [-1] * max_window
+        self._counts = [0] * max_window
+        self._sums = [0.0] * max_window
+        self._maxima = [0.0] * max_window
+    
+    def add(self, count: int = 1, total: float = 0.0, maximum: float = 0.0):
+        """Suma count observaciones cuyo total y máximo se indican."""
+        second = int(self._clock())
+        index = second % self._size
+        if self._seconds[index] != second:
+            self._seconds[index] = second
+            self._counts[index] = 0
+            self._sums[index] = 0.0
+            self._maxima[index] = 0.0
+        self._counts[index] += count
+        self._sums[index] += total
+        self._maxima[index] = max(self._maxima[index], maximum)
+    
+    def stats(self, window: int) -> Tuple[int, float, float, int]:
+        """
+        Agregado de los últimos window segundos.
+        
+        Returns:
+            Conteo, suma, máximo y segundos realmente cubiertos (menos que window
+            justo tras arrancar)
+        """
+        window = min(window, self._size)
+        now = int(self._clock())
+        oldest = now - window + 1
+        count, total, maximum = 0, 0.0, 0.0
+        for index, second in enumerate(self._seconds):
+            if oldest <= second <= now:
+                count += self._counts[index]
+                total += self._sums[index]
+                maximum = max(maximum, self._maxima[index])
+        return count, total, maximum, min(window, now - self._started + 1)
+    
+    def rate(self, window: int) -> float:
+        """Observaciones por segundo en la ventana."""
+        count, _, _, covered = self.stats(window)
+        return count / covered
+
+
+class _PartitionState:
+    """Offsets conocidos de una partición."""
+    
+    __slots__ = ("end_offset", "committed", "position")
+    
+    def __init__(self):
+        self.end_offset: Optional[int] = None
+        self.committed: Optional[int] = None
+        self.position: Optional[int] = None
+    
+    @property
+    def lag(self) -> Optional[int]:
+        """Final del log menos lo confirmado (o lo consumido, con auto commit)."""
+        consumed = self.committed if self.committed is not None else self.position
+        if self.end_offset is None or consumed is None:
+            return None
+        return max(self.end_offset - consumed, 0)
+
+
+class ConsumerMonitor:
+    """Estado de lag y throughput de un KafkaEventConsumer."""
+    
+    def __init__(self, clock: Callable[[], float] = time.monotonic, wall_clock: Callable[[], float] = time.time):
+        self._wall_clock = wall_clock
+        self._partitions: Dict[TopicPartition, _PartitionState] = {}
+        self._events = SlidingWindowCounter(clock=clock)
+        self._latency = SlidingWindowCounter(clock=clock)
+        for window in WINDOWS:
+            KAFKA_CONSUMER_EVENTS_PER_SECOND.labels(window).set_function(
+                lambda window=window: self._events.rate(window)
+            )
+    
+    def _partition(self, tp: TopicPartition) -> _PartitionState:
+        state = self._partitions.get(tp)
+        if state is None:
+            state = self._partitions[tp] = _PartitionState()
+        return state
+    
+    def record_events(self, events: Iterable[dict]):
+        """Registra eventos ya proyectados y su latencia desde occurred_at."""
+        now = self._wall_clock()
+        count, measured, total, maximum = 0, 0, 0.0, 0.0
+        for event in events:
+            count += 1
+            occurred_at = _occurred_at_timestamp(event.get("occurred_at"))
+            if occurred_at is None:
+                continue
+            latency = max(now - occurred_at, 0.0)
+            PROJECTION_END_TO_END_SECONDS.observe(latency)
+            measured += 1
+            total += latency
+            maximum = max(maximum, latency)
+        if count:
+            self._events.add(count)
+        if measured:
+            self._latency.add(measured, total, maximum)
+    
+    def record_positions(self, positions: Dict[TopicPartition, int], end_offsets: Dict[TopicPartition, int]):
+        """Actualiza la siguiente posición a consumir y el final del log de cada partición."""
+        for tp, position in positions.items():
+            state = self._partition(tp)
+            state.position = position
+            if tp in end_offsets:
+                state.end_offset = end_offsets[tp]
+                KAFKA_CONSUMER_END_OFFSET.labels(tp.topic, tp.partition).set(state.end_offset)
+            self._update_lag(tp, state)
+    
+    def record_commit(self, offsets: Dict[TopicPartition, int]):
+        """Registra offsets confirmados en Kafka."""
+        for tp, offset in offsets.items():
+            state = self._partition(tp)
+            state.committed = offset
+            KAFKA_CONSUMER_COMMITTED_OFFSET.labels(tp.topic, tp.partition).set(offset)
+            self._update_lag(tp, state)
+    
+    def retain(self, assignment: Iterable[TopicPartition]):
+        """Olvida las particiones que ya no están asignadas (tras un rebalanceo)."""
+        assigned = set(assignment)
+        for tp in [tp for tp in self._partitions if tp not in assigned]:
+            del self._partitions[tp]
+            for metric in (KAFKA_CONSUMER_LAG, KAFKA_CONSUMER_END_OFFSET, KAFKA_CONSUMER_COMMITTED_OFFSET):
+                metric.remove(tp.topic, tp.partition)
+    
+    def _update_lag(self, tp: TopicPartition, state: _PartitionState):
+        if state.lag is not None:
+            KAFKA_CONSUMER_LAG.labels(tp.topic, tp.partition).set(state.lag)
+    
+    def total_lag(self) -> int:
+        """Lag sumado de las particiones asignadas con offsets conocidos."""
+        return sum(state.lag or 0 for state in self._partitions.values())
+    
+    def events_per_second(self) -> Dict[str, float]:
+        """Throughput por ventana ("10s", "60s", "300s")."""
+        return {f"{window}s": round(self._events.rate(window), 3) for window in WINDOWS}
+    
+    def snapshot(self) -> dict:
+        """Lag por partición, throughput y latencia extremo a extremo por ventana."""
+        partitions: List[dict] = []
+        for tp, state in sorted(self._partitions.items(), key=lambda item: (item[0].topic, item[0].partition)):
+            partitions.append({
+                "topic": tp.topic,
+                "partition": tp.partition,
+                "end_offset": state.end_offset,
+                "committed": state.committed,
+                "position": state.position,
+                "lag": state.lag,
+            })
+        
+        latency = {}
+        for window in WINDOWS:
+            count, total, maximum, _ = self._latency.stats(window)
+            latency[f"{window}s"] = {
+                "avg": round(total / count, 3) if count else None,
+                "max": round(maximum, 3) if count else None,
+            }
+        return {
+            "total_lag": self.total_lag(),
+            "partitions": partitions,
+            "events_per_second": self.events_per_second(),
+            "end_to_end_latency_seconds": latency,
+        }
@@ -4,6 +4,7 @@ import asyncpg
 import json
 from datetime import datetime
 from common.utils.logger import get_logger
+from common.utils.metrics import register_pool
 from config.settings import settings
 
 logger = get_logger(__name__)
@@ -27,6 +28,7 @@ class DLQHandler:
                 min_size=1,
                 max_size=5,
             )
+            register_pool("dlq", self._pool)
             logger.info("Pool de conexiones del DLQHandler creado correctamente")
         except Exception as e:
             logger.error(f"Error creando pool de conexiones DLQ: {e}", exc_info=True)
@@ -1,16 +1,25 @@
 """Consumidor de Kafka para procesar eventos."""
-import json
 import asyncio
-from typing import Optional
-from aiokafka import AIOKafkaConsumer
-from aiokafka.errors import KafkaError
+import zlib
+from typing import Dict, List, Optional
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from aiokafka.errors import CommitFailedError, KafkaError
 from app.read_side.projections.event_processor import EventProcessor, EventProcessingError
+from app.read_side.infrastructure.consumer_monitor import ConsumerMonitor
 from app.read_side.infrastructure.dlq_handler import DLQHandler
+from common.events.serializer import decode_event_payload
 from common.utils.logger import get_logger
+from common.utils.metrics import counter
 from config.settings import settings
 
 logger = get_logger(__name__)
 
+KAFKA_CONSUMER_MESSAGES = counter(
+    "kafka_consumer_messages_total",
+    "Mensajes consumidos de Kafka por resultado",
+    ("result",),
+)
+
 
 class KafkaEventConsumer:
     """Consumidor de eventos desde Kafka con manejo robusto de errores."""
@@ -22,6 +31,9 @@ class KafkaEventConsumer:
         self._running = False
         self._processed_count = 0
         self._error_count = 0
+        self.monitor = ConsumerMonitor()
+        KAFKA_CONSUMER_MESSAGES.labels("processed").set_function(lambda: self._processed_count)
+        KAFKA_CONSUMER_MESSAGES.labels("failed").set_function(lambda: self._error_count)
     
     async def start(self):
         """Inicia el consumidor."""
@@ -33,11 +45,12 @@ class KafkaEventConsumer:
             self.consumer = AIOKafkaConsumer(
                 settings.KAFKA_TOPIC_EVENTS,
                 bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
-                value_deserializer=lambda m: json.loads(m.decode("utf-8")),
-                group_id="read-side-consumer-group",
-                enable_auto_commit=True,
+                value_deserializer=decode_event_payload,
+                group_id=settings.KAFKA_CONSUMER_GROUP_ID,
+                auto_offset_reset=settings.KAFKA_CONSUMER_AUTO_OFFSET_RESET,
+                enable_auto_commit=settings.KAFKA_CONSUMER_ENABLE_AUTO_COMMIT,
                 auto_commit_interval_ms=1000,
-                max_poll_records=10,
+                max_poll_records=settings.KAFKA_CONSUMER_MAX_POLL_RECORDS,
             )
             
             await self.consumer.start()
@@ -79,19 +92,67 @@ class KafkaEventConsumer:
         
         logger.info("Iniciando consumo de eventos de Kafka...")
         
+        if settings.KAFKA_CONSUMER_BATCH_ENABLED:
+            await self._consume_batches()
+            return
+        
         try:
-            async for message in self.consumer:
+            while self._running:
+                batches = await self.consumer.getmany(
+                    timeout_ms=settings.KAFKA_CONSUMER_POLL_TIMEOUT_MS,
+                    max_records=settings.KAFKA_CONSUMER_MAX_POLL_RECORDS,
+                )
+                if any(batches.values()):
+                    await self._process_poll_sequentially(batches)
+            logger.info("Consumidor detenido, saliendo del loop")
+        except KafkaError as e:
+            logger.error(f"Error de Kafka: {e}", exc_info=True)
+            raise
+        except Exception as e:
+            logger.error(f"Error inesperado en consume_events: {e}", exc_info=True)
+            raise
+    
+    async def _process_poll_sequentially(self, batches: Dict):
+        """
+        Procesa un poll mensaje a mensaje y confirma sus offsets una sola vez.
+        
+        Los mensajes fallidos van a la DLQ y cuentan como aplicados. Si el
+        consumidor se detiene a mitad del poll solo se confirma lo procesado.
+        """
+        offsets: Dict[TopicPartition, int] = {}
+        for tp, messages in batches.items():
+            for message in messages:
                 if not self._running:
-                    logger.info("Consumidor detenido, saliendo del loop")
                     break
-                
                 try:
                     await self._process_message(message)
                     self._processed_count += 1
+                    self.monitor.record_events([message.value])
                 except Exception as e:
                     self._error_count += 1
                     await self._handle_message_error(message, e)
-                
+                offsets[tp] = message.offset + 1
+        await self._commit_offsets(offsets)
+        self._record_lag(offsets)
+    
+    async def _consume_batches(self):
+        """
+        Consume eventos por poll y procesa cada poll como lotes en paralelo.
+        
+        Los mensajes se agrupan por partición (o por hash del aggregate_id) y cada
+        grupo se procesa en su propia tarea, manteniendo el orden dentro del grupo.
+        El siguiente poll espera a que terminen todos los grupos del actual.
+        """
+        semaphore = asyncio.Semaphore(settings.KAFKA_CONSUMER_MAX_CONCURRENCY)
+        try:
+            while self._running:
+                batches = await self.consumer.getmany(
+                    timeout_ms=settings.KAFKA_CONSUMER_POLL_TIMEOUT_MS,
+                    max_records=settings.KAFKA_CONSUMER_MAX_POLL_RECORDS,
+                )
+                if any(batches.values()):
+                    await self._process_poll(batches, semaphore)
+            logger.info("Consumidor detenido, saliendo del loop")
         except KafkaError as e:
             logger.error(f"Error de Kafka: {e}", exc_info=True)
             raise
@@ -99,6 +160,116 @@ class KafkaEventConsumer:
             logger.error(f"Error inesperado en consume_events: {e}", exc_info=True)
             raise
     
+    def _group_messages(self, batches: Dict) -> List[List]:
+        """Agrupa los mensajes de un poll según KAFKA_CONSUMER_PARALLEL_MODE."""
+        if settings.KAFKA_CONSUMER_PARALLEL_MODE == "partition":
+            return [messages for messages in batches.values() if messages]
+        
+        buckets: Dict[int, List] = {}
+        for partition_messages in batches.values():
+            for message in partition_messages:
+                key = message.key or str(message.value.get("aggregate_id", "")).encode("utf-8")
+                bucket = zlib.crc32(key) % settings.KAFKA_CONSUMER_MAX_CONCURRENCY
+                buckets.setdefault(bucket, []).append(message)
+        return list(buckets.values())
+    
+    async def _process_groups(self, groups: List[List], semaphore: asyncio.Semaphore) -> List:
+        """
+        Procesa los grupos de un poll concurrentemente, limitado por el semáforo.
+        
+        Returns:
+            Resultado por grupo: None o la excepción que lo interrumpió
+        """
+        async def process_group(messages: List):
+            async with semaphore:
+                await self._process_batch(messages)
+        
+        return await asyncio.gather(*(process_group(messages) for messages in groups), return_exceptions=True)
+    
+    async def _process_poll(self, batches: Dict, semaphore: asyncio.Semaphore):
+        """
+        Procesa un poll y confirma el offset contiguo más alto de cada partición.
+        
+        Si un grupo falla, su partición solo se confirma hasta el primer mensaje
+        no aplicado y el error se propaga; esos mensajes se reentregarán.
+        """
+        groups = self._group_messages(batches)
+        results = await self._process_groups(groups, semaphore)
+        
+        first_failed: Dict[TopicPartition, int] = {}
+        for messages, result in zip(groups, results):
+            if isinstance(result, BaseException):
+                for message in messages:
+                    tp = TopicPartition(message.topic, message.partition)
+                    first_failed[tp] = min(first_failed.get(tp, message.offset), message.offset)
+        
+        offsets = {}
+        for tp, messages in batches.items():
+            if not messages:
+                continue
+            if tp not in first_failed:
+                offsets[tp] = messages[-1].offset + 1
+            elif first_failed[tp] > messages[0].offset:
+                offsets[tp] = first_failed[tp]
+        await self._commit_offsets(offsets)
+        self._record_lag({tp: messages[-1].offset + 1 for tp, messages in batches.items() if messages})
+        
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+    
+    async def _commit_offsets(self, offsets: Dict[TopicPartition, int]):
+        """Confirma offsets en Kafka cuando el auto commit está deshabilitado."""
+        if settings.KAFKA_CONSUMER_ENABLE_AUTO_COMMIT or not offsets:
+            return
+        try:
+            await self.consumer.commit(offsets)
+            self.monitor.record_commit(offsets)
+        except CommitFailedError as e:
+            # Hubo un rebalanceo: el nuevo dueño reprocesará estos mensajes y
+            # processed_events los deduplicará
+            logger.warning(f"No se pudieron confirmar offsets tras rebalanceo: {e}")
+    
+    def _record_lag(self, positions: Dict[TopicPartition, int]):
+        """Actualiza en el monitor la posición y el final del log de cada partición."""
+        end_offsets = {}
+        for tp in positions:
+            # None hasta que llega el primer fetch de la partición
+            highwater = self.consumer.highwater(tp)
+            if highwater is not None:
+                end_offsets[tp] = highwater
+        self.monitor.record_positions(positions, end_offsets)
+        self.monitor.retain(self.consumer.assignment())
+    
+    async def _process_batch(self, messages: List):
+        """
+        Procesa un lote de mensajes en una sola transacción.
+        
+        Los eventos inválidos van a la DLQ individualmente. Si falla el lote
+        completo se reprocesa mensaje a mensaje para aislar el evento problemático.
+        """
+        try:
+            failed = await self.event_processor.process_batch([message.value for message in messages])
+        except EventProcessingError as e:
+            logger.warning(f"Fallo procesando lote de {len(messages)} mensajes, reprocesando individualmente: {e}")
+            for message in messages:
+                try:
+                    await self._process_message(message)
+                    self._processed_count += 1
+                    self.monitor.record_events([message.value])
+                except Exception as message_error:
+                    self._error_count += 1
+                    await self._handle_message_error(message, message_error)
+            return
+        
+        messages_by_event = {id(message.value): message for message in messages}
+        for event, error in failed:
+            self._error_count += 1
+            await self._handle_message_error(messages_by_event[id(event)], error)
+        self._processed_count += len(messages) - len(failed)
+        failed_ids = {id(event) for event, _ in failed}
+        self.monitor.record_events(message.value for message in messages if id(message.value) not in failed_ids)
+    
     async def _process_message(self, message):
         """Procesa un mensaje individual."""
         event = message.value
@@ -154,4 +325,10 @@ class KafkaEventConsumer:
             "processed_events": self._processed_count,
             "error_count": self._error_count,
             "consumer_running": self._running and self.consumer is not None,
-        }
\ No newline at end of file
+            "total_lag": self.monitor.total_lag(),
+            "events_per_second": self.monitor.events_per_second(),
+        }
+    
+    async def lag_report(self) -> dict:
+        """Lag por partición, throughput y latencia extremo a extremo (para autoescalado)."""
+        return {"status": "healthy" if self._running else "stopped", **self.monitor.snapshot()}
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""Rankings en memoria para servir los top N como slices."""
+import bisect
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class Leaderboard:
+    """
+    Ranking ordenado de los mejores `capacity` animes según una métrica.
+    
+    Guarda más filas de las que se sirven (capacity > límite máximo) para poder
+    absorber actualizaciones incrementales: si una fila baja fuera de lo
+    conocido se descarta, y cuando quedan menos filas de las necesarias el
+    ranking pide una recarga completa.
+    """
+    
+    def __init__(
+        self,
+        capacity: int,
+        score: Callable[[Dict[str, Any]], Tuple],
+        qualifies: Callable[[Dict[str, Any]], bool],
+    ):
+        self.capacity = capacity
+        self._score = score
+        self._qualifies = qualifies
+        # Ordenadas ascendentemente por (-score, anime_id): la primera es la mejor
+        self._keys: List[Tuple] = []
+        self._rows: List[Dict[str, Any]] = []
+        self._key_by_id: Dict[int, Tuple] = {}
+        # True si la última carga trajo todas las filas que califican
+        self._complete = False
+        self.loaded_at: Optional[float] = None
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Indica si el ranking fue cargado al menos una vez."""
+        return self.loaded_at is not None
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def _sort_key(self, row: Dict[str, Any]) -> Tuple:
+        return tuple(-value for value in self._score(row)) + (row["anime_id"],)
+    
+    def load(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Reemplaza el ranking con filas de una consulta completa (LIMIT capacity)."""
+        # Las filas vienen ya filtradas y ordenadas por la query; se reordenan
+        # con la misma clave que usan las actualizaciones incrementales
+        ranked = sorted(((self._sort_key(row), row) for row in rows), key=lambda item: item[0])[:self.capacity]
+        self._keys = [key for key, _ in ranked]
+        self._rows = [row for _, row in ranked]
+        self._key_by_id = {row["anime_id"]: key for key, row in ranked}
+        self._complete = len(ranked) < self.capacity
+        self.loaded_at = time.time()
+    
+    def apply(self, anime_ids: Iterable[int], rows_by_id: Dict[int, Dict[str, Any]]) -> None:
+        """Aplica el estado actual de los animes modificados."""
+        for anime_id in anime_ids:
+            self._remove(anime_id)
+            row = rows_by_id.get(anime_id)
+            if row is None or not self._qualifies(row):
+                continue
+            key = self._sort_key(row)
+            if self._complete or (self._keys and key < self._keys[-1]):
+                index = bisect.bisect_left(self._keys, key)
+                self._keys.insert(index, key)
+                self._rows.insert(index, row)
+                self._key_by_id[anime_id] = key
+        
+        while len(self._rows) > self.capacity:
+            self._key_by_id.pop(self._rows[-1]["anime_id"], None)
+            self._keys.pop()
+            self._rows.pop()
+            self._complete = False
+    
+    def _remove(self, anime_id: int) -> None:
+        key = self._key_by_id.pop(anime_id, None)
+        if key is None:
+            return
+        index = bisect.bisect_left(self._keys, key)
+        del self._keys[index]
+        del self._rows[index]
+    
+    def needs_reload(self, limit: int, max_age: float) -> bool:
+        """Indica si hace falta una recarga completa para servir `limit` filas."""
+        if not self.is_loaded or time.time() - self.loaded_at > max_age:
+            return True
+        return len(self._rows) < limit and not self._complete
+    
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """Retorna las `limit` mejores filas."""
+        return self._rows[:limit]
@@ -1,10 +1,14 @@
 """Repositorio para acceder al read model."""
-from typing import List, Optional
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 import asyncpg
 from config.settings import settings
 from common.utils.logger import get_logger
 from common.utils.retry import retry_async
 from common.utils.cache import InMemoryCache
+from common.utils.metrics import register_pool
+from app.read_side.infrastructure.cache_invalidation import CacheInvalidationListener
+from app.read_side.infrastructure.leaderboard import Leaderboard
 from common.exceptions import AnimeNotFoundError
 
 
@@ -14,12 +18,49 @@ logger = get_logger(__name__)
 class ReadModelRepository:
     """Repositorio para consultar el read model con manejo robusto de errores."""
     
+    _LEADERBOARD_COLUMNS = (
+        "anime_id, total_clicks, total_views, total_ratings, average_rating, total_duration_seconds"
+    )
+    
     def __init__(self):
         self._pool: Optional[asyncpg.Pool] = None
         self._cache: Optional[InMemoryCache] = None
+        self._invalidation_listener: Optional[CacheInvalidationListener] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        # Versión por clave: una invalidación sólo descarta las cargas de sus claves
+        self._key_versions: Dict[str, int] = {}
+        # Se incrementa en reset_cache para descartar todas las cargas en curso
+        self._generation = 0
+        self._leaderboards: Optional[Dict[str, Leaderboard]] = None
+        self._pending_leaderboard_ids: set = set()
+        self._draining_leaderboard_ids: set = set()
+        # IDs modificados durante cada recarga de ranking en curso: se reaplican tras board.load
+        self._reloading_leaderboard_ids: List[set] = []
+        self._leaderboard_task: Optional[asyncio.Task] = None
+        if settings.LEADERBOARD_ENABLED:
+            self._leaderboards = {
+                "views": Leaderboard(
+                    settings.LEADERBOARD_CAPACITY,
+                    score=lambda row: (row.get("total_views") or 0,),
+                    qualifies=lambda row: (row.get("total_views") or 0) > 0,
+                ),
+                "rating": Leaderboard(
+                    settings.LEADERBOARD_CAPACITY,
+                    score=lambda row: (row.get("average_rating") or 0, row.get("total_ratings") or 0),
+                    qualifies=lambda row: (row.get("average_rating") or 0) > 0 and (row.get("total_ratings") or 0) >= 5,
+                ),
+            }
         if settings.CACHE_ENABLED:
-            self._cache = InMemoryCache(default_ttl=settings.CACHE_DEFAULT_TTL)
-            logger.info(f"Caché habilitado con TTL: {settings.CACHE_DEFAULT_TTL}s")
+            self._cache = InMemoryCache(
+                default_ttl=settings.CACHE_DEFAULT_TTL,
+                max_entries=settings.CACHE_MAX_ENTRIES,
+                max_bytes=settings.CACHE_MAX_BYTES,
+                stale_ttl=settings.CACHE_STALE_TTL if settings.CACHE_STALE_WHILE_REVALIDATE else 0,
+            )
+            logger.info(
+                f"Caché habilitado con TTL: {settings.CACHE_DEFAULT_TTL}s, "
+                f"max_entries={settings.CACHE_MAX_ENTRIES}, max_bytes={settings.CACHE_MAX_BYTES}"
+            )
     
     async def connect(self):
         """Crea el pool de conexiones con configuración optimizada."""
@@ -34,13 +75,31 @@ class ReadModelRepository:
                 max_size=settings.POSTGRES_MAX_CONNECTIONS,
                 command_timeout=settings.POSTGRES_COMMAND_TIMEOUT,
             )
+            register_pool("read_model", self._pool)
             logger.info("Pool de conexiones del ReadModelRepository creado correctamente")
+            if self._cache:
+                self._cache.start_sweeper(settings.CACHE_SWEEP_INTERVAL)
+            if (self._cache or self._leaderboards) and settings.CACHE_INVALIDATION_ENABLED:
+                await self._start_invalidation_listener()
         except Exception as e:
             logger.error(f"Error creando pool de conexiones: {e}", exc_info=True)
             raise
     
     async def close(self):
         """Cierra el pool."""
+        if self._leaderboard_task:
+            # Se espera a que termine: podría estar usando una conexión del pool que se cierra abajo
+            self._leaderboard_task.cancel()
+            try:
+                await self._leaderboard_task
+            except asyncio.CancelledError:
+                pass
+            self._leaderboard_task = None
+        if self._invalidation_listener:
+            await self._invalidation_listener.stop()
+            self._invalidation_listener = None
+        if self._cache:
+            await self._cache.stop_sweeper()
         if self._pool:
             try:
                 await self._pool.close()
@@ -75,15 +134,179 @@ class ReadModelRepository:
         ]
         
         for pattern in patterns:
-            self._cache.delete(pattern)
+            self._invalidate_key(pattern)
         logger.debug(f"Caché invalidado para anime_id: {anime_id}")
     
+    def invalidate_animes(self, anime_ids: List[int]) -> None:
+        """Invalida el caché de varios animes y actualiza los rankings que pueden incluirlos."""
+        self._schedule_leaderboard_update(anime_ids)
+        if not self._cache:
+            return
+        for anime_id in anime_ids:
+            self.invalidate_anime_cache(anime_id)
+        self._cache.delete_prefix("top_")
+        for key in [key for key in self._in_flight if key.startswith("top_")]:
+            self._invalidate_key(key)
+    
+    def _invalidate_key(self, cache_key: str) -> None:
+        """Borra una clave y descarta la carga en curso para ella."""
+        self._key_versions[cache_key] = self._key_versions.get(cache_key, 0) + 1
+        self._cache.delete(cache_key)
+        self._in_flight.pop(cache_key, None)
+    
+    def _load_version(self, cache_key: str) -> tuple:
+        """Versión de una clave al iniciar su carga; si cambia, el resultado no se cachea."""
+        return self._generation, self._key_versions.get(cache_key, 0)
+    
+    def _schedule_leaderboard_update(self, anime_ids: List[int]) -> None:
+        """Encola animes modificados para actualizar los rankings en background."""
+        for reloading_ids in self._reloading_leaderboard_ids:
+            reloading_ids.update(anime_ids)
+        if not self._leaderboards or not any(board.is_loaded for board in self._leaderboards.values()):
+            return
+        self._pending_leaderboard_ids.update(anime_ids)
+        if self._leaderboard_task is None or self._leaderboard_task.done():
+            self._leaderboard_task = asyncio.ensure_future(self._drain_leaderboard_updates())
+    
+    async def _drain_leaderboard_updates(self) -> None:
+        """Aplica a los rankings el estado actual de los animes pendientes."""
+        while self._pending_leaderboard_ids:
+            anime_ids = sorted(self._pending_leaderboard_ids)
+            self._pending_leaderboard_ids.clear()
+            self._draining_leaderboard_ids = set(anime_ids)
+            try:
+                async with self._pool.acquire() as conn:
+                    rows = await conn.fetch(f"""
+                        SELECT {self._LEADERBOARD_COLUMNS}
+                        FROM anime_stats
+                        WHERE anime_id = ANY($1::int[])
+                    """, anime_ids)
+            except Exception as e:
+                # Sin el estado actual no se puede actualizar: se fuerza recarga completa
+                logger.error(f"Error actualizando rankings, se recargarán completos: {e}", exc_info=True)
+                for board in self._leaderboards.values():
+                    board.loaded_at = None
+                self._draining_leaderboard_ids = set()
+                return
+            rows_by_id = {row["anime_id"]: dict(row) for row in rows}
+            for board in self._leaderboards.values():
+                if board.is_loaded:
+                    board.apply(anime_ids, rows_by_id)
+        self._draining_leaderboard_ids = set()
+    
+    async def _leaderboard_top(
+        self,
+        name: str,
+        limit: int,
+        loader: Callable[[int], Awaitable[List[dict]]],
+    ) -> List[dict]:
+        """Sirve el top `limit` desde el ranking en memoria, recargándolo si hace falta."""
+        board = self._leaderboards[name]
+        if board.needs_reload(limit, settings.LEADERBOARD_FULL_REFRESH_INTERVAL):
+            async def reload():
+                # Lo pendiente o leído antes de la query completa puede aplicarse después
+                # de board.load con un estado más viejo: se reaplica al terminar
+                changed_ids = self._pending_leaderboard_ids | self._draining_leaderboard_ids
+                self._reloading_leaderboard_ids.append(changed_ids)
+                try:
+                    board.load(await loader(board.capacity))
+                finally:
+                    self._reloading_leaderboard_ids.remove(changed_ids)
+                logger.debug(f"Ranking {name} recargado con {len(board)} filas")
+                if changed_ids:
+                    self._schedule_leaderboard_update(sorted(changed_ids))
+            
+            # Una sola recarga en curso por ranking
+            task = self._in_flight.get(f"leaderboard:{name}")
+            if task is None:
+                task = asyncio.ensure_future(reload())
+                self._in_flight[f"leaderboard:{name}"] = task
+                task.add_done_callback(lambda _: self._in_flight.pop(f"leaderboard:{name}", None))
+            await asyncio.shield(task)
+        return board.top(limit)
+    
+    def reset_cache(self) -> None:
+        """Vacía el caché completo y descarta las cargas en curso."""
+        for board in (self._leaderboards or {}).values():
+            board.loaded_at = None
+        if not self._cache:
+            return
+        self._generation += 1
+        # Con la generación nueva ninguna carga previa coincide: las versiones pueden empezar de cero
+        self._key_versions.clear()
+        self._in_flight.clear()
+        self._cache.clear()
+    
+    async def _start_invalidation_listener(self) -> None:
+        """Suscribe el caché al bus de invalidación; si falla se sigue sólo con TTL."""
+        listener = CacheInvalidationListener(
+            on_invalidate=self.invalidate_animes,
+            on_reset=self.reset_cache,
+        )
+        try:
+            await listener.start()
+            self._invalidation_listener = listener
+        except Exception as e:
+            logger.warning(f"No se pudo iniciar el listener de invalidación, se usará sólo TTL: {e}")
+    
     def get_cache_stats(self) -> Optional[dict]:
         """Obtiene estadísticas del caché."""
         if not self._cache or not settings.CACHE_STATS_ENABLED:
             return None
         return self._cache.get_stats()
     
+    async def _get_or_load(self, cache_key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Obtiene un valor del caché o lo carga con single-flight.
+        
+        Sólo existe una carga en curso por clave: las peticiones concurrentes
+        esperan su resultado en lugar de repetir la query. Con
+        CACHE_STALE_WHILE_REVALIDATE se sirve el valor expirado mientras la
+        carga se hace en background.
+        """
+        if not self._cache:
+            return await loader()
+        
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Cache HIT para {cache_key}")
+            return cached
+        
+        if settings.CACHE_STALE_WHILE_REVALIDATE:
+            stale = self._cache.get_stale(cache_key)
+            if stale is not None:
+                self._start_load(cache_key, loader)
+                logger.debug(f"Cache STALE para {cache_key}, revalidando en background")
+                return stale
+        
+        # shield: si se cancela un awaiter la carga sigue para los demás
+        return await asyncio.shield(self._start_load(cache_key, loader))
+    
+    def _start_load(self, cache_key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """Retorna la carga en curso para la clave o inicia una nueva."""
+        task = self._in_flight.get(cache_key)
+        if task is not None:
+            return task
+        
+        version = self._load_version(cache_key)
+        
+        async def load():
+            result = await loader()
+            if result is not None and version == self._load_version(cache_key):
+                self._cache.set(cache_key, result)
+            return result
+        
+        def done(finished: asyncio.Task):
+            if self._in_flight.get(cache_key) is finished:
+                del self._in_flight[cache_key]
+            if not finished.cancelled() and finished.exception() is not None:
+                logger.debug(f"Carga fallida para {cache_key}: {finished.exception()}")
+        
+        task = asyncio.ensure_future(load())
+        task.add_done_callback(done)
+        self._in_flight[cache_key] = task
+        return task
+    
     @retry_async(max_attempts=3, exceptions=(asyncpg.PostgresError,))
     async def get_top_animes_by_views(self, limit: int = 10) -> List[dict]:
         """Obtiene los top animes por visualizaciones."""
@@ -93,35 +316,28 @@ class ReadModelRepository:
             
             self._validate_limit(limit)
             
-            cache_key = self._get_cache_key("top_views", limit)
-            if self._cache:
-                cached = self._cache.get(cache_key)
-                if cached is not None:
-                    logger.debug(f"Cache HIT para top_views (limit={limit})")
-                    return cached
-            
-            logger.debug(f"Obteniendo top {limit} animes por visualizaciones")
-            async with self._pool.acquire() as conn:
-                rows = await conn.fetch("""
-                    SELECT 
-                        anime_id,
-                        total_clicks,
-                        total_views,
-                        total_ratings,
-                        average_rating,
-                        total_duration_seconds
-                    FROM anime_stats
-                    WHERE total_views > 0
-                    ORDER BY total_views DESC
-                    LIMIT $1
-                """, limit)
-                logger.debug(f"Se obtuvieron {len(rows)} resultados")
-                results = [dict(row) for row in rows]
-                
-                if self._cache:
-                    self._cache.set(cache_key, results)
-                
-                return results
+            async def load(count: int) -> List[dict]:
+                logger.debug(f"Obteniendo top {count} animes por visualizaciones")
+                async with self._pool.acquire() as conn:
+                    rows = await conn.fetch("""
+                        SELECT 
+                            anime_id,
+                            total_clicks,
+                            total_views,
+                            total_ratings,
+                            average_rating,
+                            total_duration_seconds
+                        FROM anime_stats
+                        WHERE total_views > 0
+                        ORDER BY total_views DESC
+                        LIMIT $1
+                    """, count)
+                    logger.debug(f"Se obtuvieron {len(rows)} resultados")
+                    return [dict(row) for row in rows]
+            
+            if self._leaderboards:
+                return await self._leaderboard_top("views", limit, load)
+            return await self._get_or_load(self._get_cache_key("top_views", limit), lambda: load(limit))
         except Exception as e:
             logger.error(f"Error obteniendo top {limit} animes por visualizaciones: {e}", exc_info=True)
             raise
@@ -135,36 +351,29 @@ class ReadModelRepository:
             
             self._validate_limit(limit)
             
-            cache_key = self._get_cache_key("top_rating", limit)
-            if self._cache:
-                cached = self._cache.get(cache_key)
-                if cached is not None:
-                    logger.debug(f"Cache HIT para top_rating (limit={limit})")
-                    return cached
-            
-            logger.debug(f"Obteniendo top {limit} animes por calificación promedio")
-            async with self._pool.acquire() as conn:
-                rows = await conn.fetch("""
-                    SELECT 
-                        anime_id,
-                        total_clicks,
-                        total_views,
-                        total_ratings,
-                        average_rating,
-                        total_duration_seconds
-                    FROM anime_stats
-                    WHERE average_rating > 0 
-                        AND total_ratings >= 5
-                    ORDER BY average_rating DESC, total_ratings DESC
-                    LIMIT $1
-                """, limit)
-                logger.debug(f"Se obtuvieron {len(rows)} resultados")
-                results = [dict(row) for row in rows]
-                
-                if self._cache:
-                    self._cache.set(cache_key, results)
-                
-                return results
+            async def load(count: int) -> List[dict]:
+                logger.debug(f"Obteniendo top {count} animes por calificación promedio")
+                async with self._pool.acquire() as conn:
+                    rows = await conn.fetch("""
+                        SELECT 
+                            anime_id,
+                            total_clicks,
+                            total_views,
+                            total_ratings,
+                            average_rating,
+                            total_duration_seconds
+                        FROM anime_stats
+                        WHERE average_rating > 0 
+                            AND total_ratings >= 5
+                        ORDER BY average_rating DESC, total_ratings DESC
+                        LIMIT $1
+                    """, count)
+                    logger.debug(f"Se obtuvieron {len(rows)} resultados")
+                    return [dict(row) for row in rows]
+            
+            if self._leaderboards:
+                return await self._leaderboard_top("rating", limit, load)
+            return await self._get_or_load(self._get_cache_key("top_rating", limit), lambda: load(limit))
         except Exception as e:
             logger.error(f"Error obteniendo top {limit} animes por calificación promedio: {e}", exc_info=True)
             raise
@@ -178,26 +387,17 @@ class ReadModelRepository:
             
             self._validate_anime_id(anime_id)
             
-            cache_key = self._get_cache_key("anime_stats", anime_id)
-            if self._cache:
-                cached = self._cache.get(cache_key)
-                if cached is not None:
-                    logger.debug(f"Cache HIT para anime_stats (anime_id={anime_id})")
-                    return cached
-            
-            logger.debug(f"Obteniendo estadísticas del anime {anime_id}")
-            async with self._pool.acquire() as conn:
-                row = await conn.fetchrow("""
-                    SELECT * FROM anime_stats
-                    WHERE anime_id = $1
-                """, anime_id)
-                logger.debug(f"Se obtuvo la estadística del anime {anime_id}")
-                result = dict(row) if row else None
-                
-                if self._cache and result:
-                    self._cache.set(cache_key, result)
-                
-                return result
+            async def load() -> Optional[dict]:
+                logger.debug(f"Obteniendo estadísticas del anime {anime_id}")
+                async with self._pool.acquire() as conn:
+                    row = await conn.fetchrow("""
+                        SELECT * FROM anime_stats
+                        WHERE anime_id = $1
+                    """, anime_id)
+                    logger.debug(f"Se obtuvo la estadística del anime {anime_id}")
+                    return dict(row) if row else None
+            
+            return await self._get_or_load(self._get_cache_key("anime_stats", anime_id), load)
         except ValueError as e:
             raise
         except Exception as e:
@@ -212,28 +412,88 @@ class ReadModelRepository:
                 raise RuntimeError("Repository no está conectado. Llama a connect() primero.")
             self._validate_anime_id(anime_id)
             
-            cache_key = self._get_cache_key("anime", anime_id)
-            if self._cache:
-                cached = self._cache.get(cache_key)
-                if cached is not None:
-                    logger.debug(f"Cache HIT para anime (anime_id={anime_id})")
-                    return cached
-            
-            logger.debug(f"Obteniendo anime {anime_id}")
-            async with self._pool.acquire() as conn:
-                row = await conn.fetchrow("""
-                    SELECT * FROM animes
-                    WHERE myanimelist_id = $1
-                """, anime_id)
-                logger.debug(f"Se obtuvo el anime {anime_id}")
-                result = dict(row) if row else None
-                
-                if self._cache and result:
-                    self._cache.set(cache_key, result)
-                
-                return result
+            async def load() -> Optional[dict]:
+                logger.debug(f"Obteniendo anime {anime_id}")
+                async with self._pool.acquire() as conn:
+                    row = await conn.fetchrow("""
+                        SELECT * FROM animes
+                        WHERE myanimelist_id = $1
+                    """, anime_id)
+                    logger.debug(f"Se obtuvo el anime {anime_id}")
+                    return dict(row) if row else None
+            
+            return await self._get_or_load(self._get_cache_key("anime", anime_id), load)
         except ValueError as e:
             raise
         except Exception as e:
             logger.error(f"Error obteniendo anime {anime_id}: {e}", exc_info=True)
-            raise
\ No newline at end of file
+            raise
+    
+    async def _get_many_or_load(
+        self,
+        prefix: str,
+        ids: List[int],
+        loader: Callable[[List[int]], Awaitable[Dict[int, dict]]],
+    ) -> Dict[int, dict]:
+        """Resuelve varias claves desde el caché y carga las faltantes con una sola query."""
+        found: Dict[int, dict] = {}
+        missing: List[int] = []
+        for anime_id in dict.fromkeys(ids):
+            cached = self._cache.get(self._get_cache_key(prefix, anime_id)) if self._cache else None
+            if cached is not None:
+                found[anime_id] = cached
+            else:
+                missing.append(anime_id)
+        
+        if missing:
+            keys = {anime_id: self._get_cache_key(prefix, anime_id) for anime_id in missing}
+            versions = {anime_id: self._load_version(key) for anime_id, key in keys.items()}
+            loaded = await loader(missing)
+            if self._cache:
+                for anime_id, row in loaded.items():
+                    if anime_id in keys and versions[anime_id] == self._load_version(keys[anime_id]):
+                        self._cache.set(keys[anime_id], row)
+            found.update(loaded)
+        return found
+    
+    @retry_async(max_attempts=3, exceptions=(asyncpg.PostgresError,))
+    async def get_animes_by_ids(self, anime_ids: List[int]) -> Dict[int, dict]:
+        """Obtiene varios animes por ID en un solo round-trip. Retorna {anime_id: fila}."""
+        try:
+            if not self._pool:
+                raise RuntimeError("Repository no está conectado. Llama a connect() primero.")
+            
+            async def load(ids: List[int]) -> Dict[int, dict]:
+                logger.debug(f"Obteniendo {len(ids)} animes")
+                async with self._pool.acquire() as conn:
+                    rows = await conn.fetch("""
+                        SELECT * FROM animes
+                        WHERE myanimelist_id = ANY($1::int[])
+                    """, ids)
+                return {row["myanimelist_id"]: dict(row) for row in rows}
+            
+            return await self._get_many_or_load("anime", [i for i in anime_ids if i >= 1], load)
+        except Exception as e:
+            logger.error(f"Error obteniendo animes {anime_ids}: {e}", exc_info=True)
+            raise
+    
+    @retry_async(max_attempts=3, exceptions=(asyncpg.PostgresError,))
+    async def get_anime_stats_by_ids(self, anime_ids: List[int]) -> Dict[int, dict]:
+        """Obtiene las estadísticas de varios animes en un solo round-trip. Retorna {anime_id: fila}."""
+        try:
+            if not self._pool:
+                raise RuntimeError("Repository no está conectado. Llama a connect() primero.")
+            
+            async def load(ids: List[int]) -> Dict[int, dict]:
+                logger.debug(f"Obteniendo estadísticas de {len(ids)} animes")
+                async with self._pool.acquire() as conn:
+                    rows = await conn.fetch("""
+                        SELECT * FROM anime_stats
+                        WHERE anime_id = ANY($1::int[])
+                    """, ids)
+                return {row["anime_id"]: dict(row) for row in rows}
+            
+            return await self._get_many_or_load("anime_stats", [i for i in anime_ids if i >= 1], load)
+        except Exception as e:
+            logger.error(f"Error obteniendo estadísticas de animes {anime_ids}: {e}", exc_info=True)
+            raise
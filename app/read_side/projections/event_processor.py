@@ -1,15 +1,38 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import asyncpg
+import json
 import time
-from datetime import datetime
+from datetime import datetime, timezone
+from decimal import Decimal
 from common.events.anime_events import ClickRegistered, ViewRegistered, RatingGiven
 from common.utils.logger import get_logger
+from common.utils.metrics import counter, histogram, register_pool
 from common.utils.retry import retry_async
 from common.exceptions import DomainException
 from config.settings import settings
 
 logger = get_logger(__name__)
 
+PROJECTION_EVENT_SECONDS = histogram(
+    "projection_event_duration_seconds",
+    "Latencia de proyección de un evento individual",
+    ("event_type", "status"),
+)
+PROJECTION_BATCH_SECONDS = histogram(
+    "projection_batch_duration_seconds",
+    "Latencia de proyección de un lote de eventos en una transacción",
+)
+PROJECTION_BATCH_SIZE = histogram(
+    "projection_batch_size",
+    "Eventos por lote proyectado",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+)
+PROJECTION_EVENTS = counter(
+    "projection_events_total",
+    "Eventos recibidos por el procesador de proyecciones por resultado",
+    ("result",),
+)
+
 
 class EventProcessingError(DomainException):
     """Excepción lanzada cuando falla el procesamiento de un evento."""
@@ -19,6 +42,10 @@ class EventProcessingError(DomainException):
 class EventProcessor:
     """Procesa eventos y actualiza las proyecciones con idempotencia y logging."""
     
+    BATCH_EVENT_TYPES = ("ClickRegistered", "ViewRegistered", "RatingGiven")
+    # El payload de NOTIFY está limitado a 8000 bytes
+    NOTIFY_CHUNK_SIZE = 500
+    
     def __init__(self):
         self._pool: Optional[asyncpg.Pool] = None
     
@@ -34,6 +61,7 @@ class EventProcessor:
                 min_size=2,
                 max_size=10,
             )
+            register_pool("projections", self._pool)
             logger.info("Pool de conexiones del EventProcessor creado correctamente")
         except Exception as e:
             logger.error(f"Error creando pool de conexiones: {e}", exc_info=True)
@@ -62,22 +90,49 @@ class EventProcessor:
         event_id: str, 
         event_type: str, 
         aggregate_id: str,
-        duration_ms: int,
         status: str = 'success',
         error_message: Optional[str] = None
     ):
-        """Marca un evento como procesado."""
+        """
+        Marca un evento como procesado.
+        
+        La latencia ya no se guarda por evento (processing_duration_ms): se
+        registra en el histograma projection_event_duration_seconds.
+        """
         async with self._pool.acquire() as conn:
             await conn.execute("""
                 INSERT INTO processed_events 
-                (event_id, event_type, aggregate_id, processing_duration_ms, status, error_message)
-                VALUES ($1, $2, $3, $4, $5, $6)
+                (event_id, event_type, aggregate_id, status, error_message)
+                VALUES ($1, $2, $3, $4, $5)
                 ON CONFLICT (event_id) DO UPDATE SET
                     status = EXCLUDED.status,
                     error_message = EXCLUDED.error_message,
-                    processing_duration_ms = EXCLUDED.processing_duration_ms,
                     processed_at = CURRENT_TIMESTAMP
-            """, event_id, event_type, aggregate_id, duration_ms, status, error_message)
+            """, event_id, event_type, aggregate_id, status, error_message)
+    
+    @staticmethod
+    def _observe_event(event_type: str, status: str, start_time: float) -> int:
+        """Registra la latencia de un evento individual; devuelve los milisegundos para el log."""
+        duration = time.perf_counter() - start_time
+        PROJECTION_EVENT_SECONDS.labels(event_type, status).observe(duration)
+        return int(duration * 1000)
+    
+    async def _notify_invalidation(self, conn: asyncpg.Connection, anime_ids: List[int]) -> None:
+        """
+        Emite NOTIFY con los anime_id modificados dentro de la transacción actual.
+        
+        Postgres solo entrega la notificación al hacer commit, así que los
+        repositorios del read side invalidan su caché cuando el cambio ya es visible.
+        """
+        if not settings.CACHE_INVALIDATION_ENABLED or not anime_ids:
+            return
+        ids = sorted(set(anime_ids))
+        for start in range(0, len(ids), self.NOTIFY_CHUNK_SIZE):
+            await conn.execute(
+                "SELECT pg_notify($1, $2)",
+                settings.CACHE_INVALIDATION_CHANNEL,
+                json.dumps(ids[start:start + self.NOTIFY_CHUNK_SIZE]),
+            )
     
     def _validate_event(self, event: Dict[str, Any], required_fields: list) -> None:
         """Valida que un evento tenga los campos requeridos."""
@@ -90,7 +145,7 @@ class EventProcessor:
     @retry_async(max_attempts=3, exceptions=(asyncpg.PostgresError,))
     async def process_click_event(self, event: Dict[str, Any]):
         """Procesa un evento de click con validación e idempotencia."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         event_id = event.get("event_id")
         event_type = event.get("event_type", "ClickRegistered")
         aggregate_id = event.get("aggregate_id")
@@ -123,11 +178,11 @@ class EventProcessor:
                             total_clicks = anime_stats.total_clicks + 1,
                             updated_at = CURRENT_TIMESTAMP
                     """, anime_id)
+                    
+                    await self._notify_invalidation(conn, [anime_id])
             
-            duration_ms = int((time.time() - start_time) * 1000)
-            await self._mark_event_processed(
-                event_id, event_type, aggregate_id, duration_ms, 'success'
-            )
+            await self._mark_event_processed(event_id, event_type, aggregate_id, 'success')
+            duration_ms = self._observe_event(event_type, 'success', start_time)
             logger.info(
                 f"Evento ClickRegistered procesado: anime_id={anime_id}, user_id={user_id}, "
                 f"duration={duration_ms}ms"
@@ -137,10 +192,10 @@ class EventProcessor:
                 self._repository.invalidate_anime_cache(anime_id)
             
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            self._observe_event(event_type, 'error', start_time)
             error_msg = str(e)
             await self._mark_event_processed(
-                event_id, event_type, aggregate_id, duration_ms, 'error', error_msg
+                event_id, event_type, aggregate_id, 'error', error_msg
             )
             logger.error(
                 f"Error procesando evento ClickRegistered {event_id}: {e}",
@@ -151,7 +206,7 @@ class EventProcessor:
     @retry_async(max_attempts=3, exceptions=(asyncpg.PostgresError,))
     async def process_view_event(self, event: Dict[str, Any]):
         """Procesa un evento de visualización con validación e idempotencia."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         event_id = event.get("event_id")
         event_type = event.get("event_type", "ViewRegistered")
         aggregate_id = event.get("aggregate_id")
@@ -190,11 +245,11 @@ class EventProcessor:
                             total_duration_seconds = anime_stats.total_duration_seconds + EXCLUDED.total_duration_seconds,
                             updated_at = CURRENT_TIMESTAMP
                     """, anime_id, duration_seconds)
+                    
+                    await self._notify_invalidation(conn, [anime_id])
             
-            duration_ms = int((time.time() - start_time) * 1000)
-            await self._mark_event_processed(
-                event_id, event_type, aggregate_id, duration_ms, 'success'
-            )
+            await self._mark_event_processed(event_id, event_type, aggregate_id, 'success')
+            duration_ms = self._observe_event(event_type, 'success', start_time)
             logger.info(
                 f"Evento ViewRegistered procesado: anime_id={anime_id}, user_id={user_id}, "
                 f"duration={duration_seconds}s, processing_time={duration_ms}ms"
@@ -204,10 +259,10 @@ class EventProcessor:
                 self._repository.invalidate_anime_cache(anime_id)
 
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            self._observe_event(event_type, 'error', start_time)
             error_msg = str(e)
             await self._mark_event_processed(
-                event_id, event_type, aggregate_id, duration_ms, 'error', error_msg
+                event_id, event_type, aggregate_id, 'error', error_msg
             )
             logger.error(
                 f"Error procesando evento ViewRegistered {event_id}: {e}",
@@ -218,7 +273,7 @@ class EventProcessor:
     @retry_async(max_attempts=3, exceptions=(asyncpg.PostgresError,))
     async def process_rating_event(self, event: Dict[str, Any]):
         """Procesa un evento de calificación con validación e idempotencia."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         event_id = event.get("event_id")
         event_type = event.get("event_type", "RatingGiven")
         aggregate_id = event.get("aggregate_id")
@@ -240,36 +295,15 @@ class EventProcessor:
             
             async with self._pool.acquire() as conn:
                 async with conn.transaction():
-                    await conn.execute("""
-                        INSERT INTO anime_ratings (anime_id, user_id, rating, rated_at)
-                        VALUES ($1, $2, $3, $4)
-                        ON CONFLICT (anime_id, user_id) DO UPDATE SET
-                            rating = EXCLUDED.rating,
-                            rated_at = EXCLUDED.rated_at
-                    """, anime_id, user_id, rating, occurred_at)
-                    
-                    result = await conn.fetchrow("""
-                        SELECT AVG(rating) as avg_rating, COUNT(*) as count
-                        FROM anime_ratings
-                        WHERE anime_id = $1
-                    """, anime_id)
-                    
-                    avg_rating = float(result["avg_rating"]) if result["avg_rating"] else 0.0
-                    count = result["count"]
-                    
-                    await conn.execute("""
-                        INSERT INTO anime_stats (anime_id, total_ratings, average_rating)
-                        VALUES ($1, $2, $3)
-                        ON CONFLICT (anime_id) DO UPDATE SET
-                            total_ratings = EXCLUDED.total_ratings,
-                            average_rating = EXCLUDED.average_rating,
-                            updated_at = CURRENT_TIMESTAMP
-                    """, anime_id, count, avg_rating)
+                    averages = await self._apply_ratings(
+                        conn, {(anime_id, user_id): (rating, self._parse_timestamp(occurred_at))}
+                    )
+                    await self._notify_invalidation(conn, [anime_id])
             
-            duration_ms = int((time.time() - start_time) * 1000)
-            await self._mark_event_processed(
-                event_id, event_type, aggregate_id, duration_ms, 'success'
-            )
+            avg_rating = averages.get(anime_id, 0.0)
+            
+            await self._mark_event_processed(event_id, event_type, aggregate_id, 'success')
+            duration_ms = self._observe_event(event_type, 'success', start_time)
             logger.info(
                 f"Evento RatingGiven procesado: anime_id={anime_id}, user_id={user_id}, "
                 f"rating={rating}, avg_rating={avg_rating:.2f}, processing_time={duration_ms}ms"
@@ -279,13 +313,302 @@ class EventProcessor:
                 self._repository.invalidate_anime_cache(anime_id)
 
         except Exception as e:
-            duration_ms = int((time.time() - start_time) * 1000)
+            self._observe_event(event_type, 'error', start_time)
             error_msg = str(e)
             await self._mark_event_processed(
-                event_id, event_type, aggregate_id, duration_ms, 'error', error_msg
+                event_id, event_type, aggregate_id, 'error', error_msg
             )
             logger.error(
                 f"Error procesando evento RatingGiven {event_id}: {e}",
                 exc_info=True
             )
-            raise EventProcessingError(f"Error procesando evento de calificación: {e}") from e
\ No newline at end of file
+            raise EventProcessingError(f"Error procesando evento de calificación: {e}") from e
+    
+    def _parse_timestamp(self, value: Any) -> datetime:
+        """Convierte occurred_at (datetime o ISO 8601 desde JSON) a datetime naive UTC."""
+        parsed = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    
+    def _validate_batch_event(self, event: Dict[str, Any]) -> None:
+        """Aplica a un evento del lote las mismas validaciones que el procesamiento individual."""
+        event_type = event.get("event_type")
+        if event_type == "ClickRegistered":
+            self._validate_event(event, ["anime_id", "user_id", "occurred_at", "event_id"])
+        elif event_type == "ViewRegistered":
+            self._validate_event(event, ["anime_id", "user_id", "duration_seconds", "occurred_at", "event_id"])
+            if event["duration_seconds"] < 0:
+                raise EventProcessingError(
+                    f"duration_seconds debe ser positivo, recibido: {event['duration_seconds']}"
+                )
+        elif event_type == "RatingGiven":
+            self._validate_event(event, ["anime_id", "user_id", "rating", "occurred_at", "event_id"])
+            rating = float(event["rating"])
+            if not (1.0 <= rating <= 10.0):
+                raise EventProcessingError(f"Rating debe estar entre 1.0 y 10.0, recibido: {rating}")
+        try:
+            self._parse_timestamp(event["occurred_at"])
+        except (TypeError, ValueError) as e:
+            raise EventProcessingError(f"occurred_at inválido: {event['occurred_at']}") from e
+    
+    @retry_async(max_attempts=3, exceptions=(asyncpg.PostgresError,))
+    async def process_batch(self, events: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Exception]]:
+        """
+        Procesa un lote de eventos en una sola transacción.
+        
+        Las marcas de processed_events se reclaman al inicio de la transacción
+        (INSERT ... ON CONFLICT ... RETURNING), de modo que la deduplicación no
+        requiere una query previa: solo se aplican los eventos reclamados. Los
+        contadores se agregan en memoria por (anime_id, user_id) y por anime_id
+        y se aplican con upserts set-based (unnest).
+        
+        Returns:
+            Eventos rechazados por validación junto con su error (para la DLQ)
+        """
+        start_time = time.perf_counter()
+        failed: List[Tuple[Dict[str, Any], Exception]] = []
+        
+        # Validar y deduplicar dentro del lote (el primero gana)
+        valid: Dict[str, Dict[str, Any]] = {}
+        for event in events:
+            if event.get("event_type") not in self.BATCH_EVENT_TYPES:
+                logger.warning(
+                    f"Tipo de evento desconocido: {event.get('event_type')}, evento_id={event.get('event_id', 'unknown')}"
+                )
+                continue
+            try:
+                self._validate_batch_event(event)
+            except (EventProcessingError, TypeError, ValueError) as e:
+                failed.append((event, e))
+                continue
+            valid.setdefault(event["event_id"], event)
+        
+        PROJECTION_EVENTS.labels("invalid").inc(len(failed))
+        if not valid:
+            return failed
+        
+        try:
+            async with self._pool.acquire() as conn:
+                async with conn.transaction():
+                    claimed = await self._claim_events(conn, list(valid.values()))
+                    pending = [event for event_id, event in valid.items() if event_id in claimed]
+                    if pending:
+                        await self._apply_batch(conn, pending)
+                        await self._notify_invalidation(conn, [event["anime_id"] for event in pending])
+        except Exception as e:
+            logger.error(f"Error procesando lote de {len(valid)} eventos: {e}", exc_info=True)
+            raise EventProcessingError(f"Error procesando lote de eventos: {e}") from e
+        
+        duplicates = len(valid) - len(pending)
+        if duplicates:
+            logger.info(f"{duplicates} eventos del lote ya fueron procesados, saltando (idempotencia)")
+        
+        duration = time.perf_counter() - start_time
+        PROJECTION_BATCH_SECONDS.observe(duration)
+        PROJECTION_BATCH_SIZE.observe(len(events))
+        PROJECTION_EVENTS.labels("applied").inc(len(pending))
+        PROJECTION_EVENTS.labels("duplicate").inc(duplicates)
+        duration_ms = int(duration * 1000)
+        logger.info(
+            f"Lote procesado: {len(pending)} eventos, {duplicates} duplicados, "
+            f"{len(failed)} inválidos, processing_time={duration_ms}ms"
+        )
+        
+        if hasattr(self, '_repository') and self._repository:
+            for anime_id in {event["anime_id"] for event in pending}:
+                self._repository.invalidate_anime_cache(anime_id)
+        
+        return failed
+    
+    async def _claim_events(self, conn: asyncpg.Connection, events: List[Dict[str, Any]]) -> set:
+        """
+        Registra los eventos en processed_events dentro de la transacción del lote.
+        
+        Returns:
+            event_id reclamados por este lote; los que ya estaban en 'success' se omiten
+        """
+        rows = await conn.fetch("""
+            INSERT INTO processed_events
+            (event_id, event_type, aggregate_id, status)
+            SELECT event_id, event_type, aggregate_id, 'success'
+            FROM unnest($1::varchar[], $2::varchar[], $3::varchar[]) AS t(event_id, event_type, aggregate_id)
+            ON CONFLICT (event_id) DO UPDATE SET
+                status = EXCLUDED.status,
+                error_message = NULL,
+                processed_at = CURRENT_TIMESTAMP
+            WHERE processed_events.status <> 'success'
+            RETURNING event_id
+        """,
+            [event["event_id"] for event in events],
+            [event["event_type"] for event in events],
+            [event.get("aggregate_id") or f"anime_{event['anime_id']}" for event in events],
+        )
+        return {row["event_id"] for row in rows}
+    
+    async def _apply_batch(self, conn: asyncpg.Connection, events: List[Dict[str, Any]]):
+        """Agrega el lote en memoria y lo aplica con upserts set-based."""
+        clicks: Dict[Tuple[int, str], List] = {}
+        views: Dict[Tuple[int, str], List] = {}
+        ratings: Dict[Tuple[int, str], Tuple[float, datetime]] = {}
+        stats: Dict[int, List[int]] = {}
+        
+        for event in events:
+            key = (event["anime_id"], event["user_id"])
+            occurred_at = self._parse_timestamp(event["occurred_at"])
+            event_type = event["event_type"]
+            
+            if event_type == "ClickRegistered":
+                entry = clicks.setdefault(key, [0, occurred_at])
+                entry[0] += 1
+                entry[1] = max(entry[1], occurred_at)
+                stats.setdefault(key[0], [0, 0, 0])[0] += 1
+            elif event_type == "ViewRegistered":
+                entry = views.setdefault(key, [0, 0, occurred_at])
+                entry[0] += 1
+                entry[1] += event["duration_seconds"]
+                entry[2] = max(entry[2], occurred_at)
+                anime_stats = stats.setdefault(key[0], [0, 0, 0])
+                anime_stats[1] += 1
+                anime_stats[2] += event["duration_seconds"]
+            elif event_type == "RatingGiven":
+                # Si un usuario califica varias veces en el lote, gana la más reciente
+                current = ratings.get(key)
+                if current is None or occurred_at >= current[1]:
+                    ratings[key] = (float(event["rating"]), occurred_at)
+        
+        # Orden estable de claves para que lotes concurrentes bloqueen filas en el mismo orden
+        if clicks:
+            keys = sorted(clicks)
+            await conn.execute("""
+                INSERT INTO anime_clicks (anime_id, user_id, click_count, last_click_at)
+                SELECT * FROM unnest($1::int[], $2::varchar[], $3::int[], $4::timestamp[])
+                ON CONFLICT (anime_id, user_id) DO UPDATE SET
+                    click_count = anime_clicks.click_count + EXCLUDED.click_count,
+                    last_click_at = GREATEST(anime_clicks.last_click_at, EXCLUDED.last_click_at)
+            """,
+                [k[0] for k in keys], [k[1] for k in keys],
+                [clicks[k][0] for k in keys], [clicks[k][1] for k in keys],
+            )
+        
+        if views:
+            keys = sorted(views)
+            await conn.execute("""
+                INSERT INTO anime_views (anime_id, user_id, view_count, total_duration_seconds, last_view_at)
+                SELECT * FROM unnest($1::int[], $2::varchar[], $3::int[], $4::int[], $5::timestamp[])
+                ON CONFLICT (anime_id, user_id) DO UPDATE SET
+                    view_count = anime_views.view_count + EXCLUDED.view_count,
+                    total_duration_seconds = anime_views.total_duration_seconds + EXCLUDED.total_duration_seconds,
+                    last_view_at = GREATEST(anime_views.last_view_at, EXCLUDED.last_view_at)
+            """,
+                [k[0] for k in keys], [k[1] for k in keys],
+                [views[k][0] for k in keys], [views[k][1] for k in keys], [views[k][2] for k in keys],
+            )
+        
+        if stats:
+            anime_ids = sorted(stats)
+            await conn.execute("""
+                INSERT INTO anime_stats (anime_id, total_clicks, total_views, total_duration_seconds)
+                SELECT * FROM unnest($1::int[], $2::int[], $3::int[], $4::int[])
+                ON CONFLICT (anime_id) DO UPDATE SET
+                    total_clicks = anime_stats.total_clicks + EXCLUDED.total_clicks,
+                    total_views = anime_stats.total_views + EXCLUDED.total_views,
+                    total_duration_seconds = anime_stats.total_duration_seconds + EXCLUDED.total_duration_seconds,
+                    updated_at = CURRENT_TIMESTAMP
+            """,
+                anime_ids,
+                [stats[a][0] for a in anime_ids], [stats[a][1] for a in anime_ids], [stats[a][2] for a in anime_ids],
+            )
+        
+        if ratings:
+            await self._apply_ratings(conn, ratings)
+    
+    async def _apply_ratings(
+        self,
+        conn: asyncpg.Connection,
+        ratings: Dict[Tuple[int, str], Tuple[float, datetime]]
+    ) -> Dict[int, float]:
+        """
+        Aplica calificaciones y actualiza rating_sum/total_ratings por delta.
+        
+        Una calificación nueva suma su valor y cuenta uno; una recalificación
+        suma la diferencia con la anterior. Así el coste no depende de cuántas
+        calificaciones tenga el anime.
+        
+        Returns:
+            average_rating resultante por anime_id
+        """
+        keys = sorted(ratings)
+        anime_ids = [k[0] for k in keys]
+        user_ids = [k[1] for k in keys]
+        
+        previous_rows = await conn.fetch("""
+            SELECT r.anime_id, r.user_id, r.rating
+            FROM anime_ratings r
+            JOIN unnest($1::int[], $2::varchar[]) AS k(anime_id, user_id) USING (anime_id, user_id)
+            ORDER BY r.anime_id, r.user_id
+            FOR UPDATE OF r
+        """, anime_ids, user_ids)
+        previous = {(row["anime_id"], row["user_id"]): row["rating"] for row in previous_rows}
+        
+        upserted = await conn.fetch("""
+            INSERT INTO anime_ratings (anime_id, user_id, rating, rated_at)
+            SELECT * FROM unnest($1::int[], $2::varchar[], $3::numeric[], $4::timestamp[])
+            ON CONFLICT (anime_id, user_id) DO UPDATE SET
+                rating = EXCLUDED.rating,
+                rated_at = EXCLUDED.rated_at
+            RETURNING anime_id, user_id, rating, (xmax = 0) AS inserted
+        """, anime_ids, user_ids, [ratings[k][0] for k in keys], [ratings[k][1] for k in keys])
+        
+        sum_deltas: Dict[int, Decimal] = {}
+        count_deltas: Dict[int, int] = {}
+        recompute = set()
+        for row in upserted:
+            anime_id = row["anime_id"]
+            key = (anime_id, row["user_id"])
+            if row["inserted"]:
+                sum_deltas[anime_id] = sum_deltas.get(anime_id, Decimal(0)) + row["rating"]
+                count_deltas[anime_id] = count_deltas.get(anime_id, 0) + 1
+            elif key in previous:
+                sum_deltas[anime_id] = sum_deltas.get(anime_id, Decimal(0)) + row["rating"] - previous[key]
+                count_deltas.setdefault(anime_id, 0)
+            else:
+                # Otra transacción insertó la fila entre el SELECT y el upsert
+                recompute.add(anime_id)
+        
+        delta_ids = sorted(set(sum_deltas) - recompute)
+        rows = []
+        if delta_ids:
+            rows += await conn.fetch("""
+                INSERT INTO anime_stats (anime_id, total_ratings, rating_sum, average_rating)
+                SELECT anime_id, rating_count, rating_sum,
+                       COALESCE(ROUND(rating_sum / NULLIF(rating_count, 0), 2), 0)
+                FROM unnest($1::int[], $2::int[], $3::numeric[]) AS d(anime_id, rating_count, rating_sum)
+                ON CONFLICT (anime_id) DO UPDATE SET
+                    total_ratings = anime_stats.total_ratings + EXCLUDED.total_ratings,
+                    rating_sum = anime_stats.rating_sum + EXCLUDED.rating_sum,
+                    average_rating = COALESCE(ROUND(
+                        (anime_stats.rating_sum + EXCLUDED.rating_sum)
+                        / NULLIF(anime_stats.total_ratings + EXCLUDED.total_ratings, 0), 2), 0),
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING anime_id, average_rating
+            """, delta_ids, [count_deltas[a] for a in delta_ids], [sum_deltas[a] for a in delta_ids])
+        
+        if recompute:
+            logger.warning(f"Recalculando agregado de ratings por concurrencia: anime_ids={sorted(recompute)}")
+            rows += await conn.fetch("""
+                INSERT INTO anime_stats (anime_id, total_ratings, rating_sum, average_rating)
+                SELECT anime_id, COUNT(*), SUM(rating), ROUND(AVG(rating), 2)
+                FROM anime_ratings
+                WHERE anime_id = ANY($1::int[])
+                GROUP BY anime_id
+                ORDER BY anime_id
+                ON CONFLICT (anime_id) DO UPDATE SET
+                    total_ratings = EXCLUDED.total_ratings,
+                    rating_sum = EXCLUDED.rating_sum,
+                    average_rating = EXCLUDED.average_rating,
+                    updated_at = CURRENT_TIMESTAMP
+                RETURNING anime_id, average_rating
+            """, sorted(recompute))
+        
+        return {row["anime_id"]: float(row["average_rating"]) for row in rows}
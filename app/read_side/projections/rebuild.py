@@ -0,0 +1,464 @@
+"""
+Reconstrucción de las proyecciones del read side a partir del Event Store.
+
+Lee event_store con cursores del servidor, pliega los eventos en memoria y
+carga tablas sombra con COPY. Al terminar las intercambia por las tablas vivas
+en una sola transacción.
+"""
+import asyncio
+import json
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Any, Dict, List, Optional, Tuple
+import asyncpg
+from app.read_side.infrastructure.cache_invalidation import RESET_PAYLOAD
+from app.read_side.projections.event_processor import EventProcessor, EventProcessingError
+from common.utils.logger import get_logger
+from config.settings import settings
+
+logger = get_logger(__name__)
+
+# processed_events se reconstruye junto con las proyecciones: así el consumer
+# salta los eventos que ya forman parte de la reconstrucción
+REBUILD_TABLES = ("processed_events", "anime_clicks", "anime_views", "anime_ratings", "anime_stats")
+SHADOW_SUFFIX = "__rebuild"
+OLD_SUFFIX = "__old"
+
+PROCESSED_COLUMNS = ("event_id", "event_type", "aggregate_id")
+CLICK_COLUMNS = ("anime_id", "user_id", "click_count", "last_click_at")
+VIEW_COLUMNS = ("anime_id", "user_id", "view_count", "total_duration_seconds", "last_view_at")
+RATING_COLUMNS = ("anime_id", "user_id", "rating", "rated_at")
+STATS_COLUMNS = (
+    "anime_id", "total_clicks", "total_views", "total_ratings",
+    "average_rating", "total_duration_seconds", "updated_at", "rating_sum",
+)
+
+# anime_ratings.rating es NUMERIC(3, 2): el procesamiento en vivo no puede guardar 10.00
+MAX_STORED_RATING = Decimal("9.99")
+CENT = Decimal("0.01")
+
+# Postgres extrae los campos del JSONB: evita json.loads por evento en Python
+EVENTS_QUERY = """
+    SELECT id, event_id, event_type, aggregate_id, occurred_at,
+           (event_data->>'anime_id')::int AS anime_id,
+           event_data->>'user_id' AS user_id,
+           (event_data->>'duration_seconds')::int AS duration_seconds,
+           (event_data->>'rating')::numeric AS rating
+    FROM event_store
+    WHERE event_type = ANY($1::varchar[])
+      AND (hashtext(aggregate_id) & 2147483647) % $2 = $3
+"""
+
+# Eventos confirmados después del snapshot exportado al inicio de la reconstrucción
+TAIL_QUERY = """
+    SELECT event_data::text AS event_data
+    FROM event_store
+    WHERE transaction_id >= pg_snapshot_xmin($1::text::pg_snapshot)
+      AND NOT pg_visible_in_snapshot(transaction_id, $1::text::pg_snapshot)
+    ORDER BY transaction_id, id
+"""
+
+_INDEX_DEFINITION = re.compile(r"^(CREATE (?:UNIQUE )?INDEX) \S+ ON (?:ONLY )?\S+ ")
+
+
+def storable_rating(value: Any) -> Optional[Decimal]:
+    """
+    Normaliza un rating al valor que guardaría anime_ratings.
+    
+    Returns:
+        El rating redondeado a dos decimales, o None si el procesamiento en vivo lo rechazaría
+    """
+    if value is None:
+        return None
+    rating = Decimal(str(value))
+    if not (1 <= rating <= 10):
+        return None
+    rating = rating.quantize(CENT, rounding=ROUND_HALF_UP)
+    return rating if rating <= MAX_STORED_RATING else None
+
+
+def shadow_index_definition(definition: str, name: str, table: str) -> str:
+    """Reescribe un CREATE INDEX de la tabla viva para crearlo sobre la tabla sombra."""
+    return _INDEX_DEFINITION.sub(
+        lambda match: f"{match.group(1)} {name}{SHADOW_SUFFIX} ON {table}{SHADOW_SUFFIX} ",
+        definition,
+        count=1,
+    )
+
+
+class ProjectionFold:
+    """Estado final de las proyecciones para los eventos de una partición."""
+    
+    def __init__(self):
+        self.clicks: Dict[Tuple[int, str], List] = {}
+        self.views: Dict[Tuple[int, str], List] = {}
+        # (rating, (occurred_at, id)): gana el evento más reciente, el id desempata
+        self.ratings: Dict[Tuple[int, str], Tuple[Decimal, Tuple[datetime, int]]] = {}
+        self.applied = 0
+        self.skipped = 0
+    
+    def apply(self, row) -> bool:
+        """
+        Pliega una fila de EVENTS_QUERY.
+        
+        Returns:
+            False si el evento se descarta porque el procesamiento en vivo lo rechazaría
+        """
+        row_id, _, event_type, _, occurred_at, anime_id, user_id, duration_seconds, rating = row
+        if anime_id is None or user_id is None or occurred_at is None:
+            self.skipped += 1
+            return False
+        key = (anime_id, user_id)
+        
+        if event_type == "ClickRegistered":
+            entry = self.clicks.get(key)
+            if entry is None:
+                self.clicks[key] = [1, occurred_at]
+            else:
+                entry[0] += 1
+                if occurred_at > entry[1]:
+                    entry[1] = occurred_at
+        elif event_type == "ViewRegistered":
+            if duration_seconds is None or duration_seconds < 0:
+                self.skipped += 1
+                return False
+            entry = self.views.get(key)
+            if entry is None:
+                self.views[key] = [1, duration_seconds, occurred_at]
+            else:
+                entry[0] += 1
+                entry[1] += duration_seconds
+                if occurred_at > entry[2]:
+                    entry[2] = occurred_at
+        elif event_type == "RatingGiven":
+            rating = storable_rating(rating)
+            if rating is None:
+                self.skipped += 1
+                return False
+            position = (occurred_at, row_id)
+            current = self.ratings.get(key)
+            if current is None or position > current[1]:
+                self.ratings[key] = (rating, position)
+        else:
+            self.skipped += 1
+            return False
+        
+        self.applied += 1
+        return True
+    
+    def click_records(self) -> List[tuple]:
+        """Filas de anime_clicks."""
+        return [(key[0], key[1], count, last_at) for key, (count, last_at) in self.clicks.items()]
+    
+    def view_records(self) -> List[tuple]:
+        """Filas de anime_views."""
+        return [
+            (key[0], key[1], count, duration, last_at)
+            for key, (count, duration, last_at) in self.views.items()
+        ]
+    
+    def rating_records(self) -> List[tuple]:
+        """Filas de anime_ratings."""
+        return [(key[0], key[1], rating, position[0]) for key, (rating, position) in self.ratings.items()]
+    
+    def stats_records(self, updated_at: datetime) -> List[tuple]:
+        """Filas de anime_stats, agregadas a partir de las filas por usuario."""
+        stats: Dict[int, List] = {}
+        for (anime_id, _), (count, _) in self.clicks.items():
+            stats.setdefault(anime_id, [0, 0, 0, 0, Decimal(0)])[0] += count
+        for (anime_id, _), (count, duration, _) in self.views.items():
+            entry = stats.setdefault(anime_id, [0, 0, 0, 0, Decimal(0)])
+            entry[1] += count
+            entry[2] += duration
+        for (anime_id, _), (rating, _) in self.ratings.items():
+            entry = stats.setdefault(anime_id, [0, 0, 0, 0, Decimal(0)])
+            entry[3] += 1
+            entry[4] += rating
+        
+        records = []
+        for anime_id, (clicks, views, duration, ratings, rating_sum) in stats.items():
+            average = (rating_sum / ratings).quantize(CENT, rounding=ROUND_HALF_UP) if ratings else Decimal(0)
+            records.append((anime_id, clicks, views, ratings, average, duration, updated_at, rating_sum))
+        return records
+
+
+async def _connect(database: str) -> asyncpg.Connection:
+    """Abre una conexión dedicada (cursores y COPY largos no pasan por un pool)."""
+    return await asyncpg.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=database,
+    )
+
+
+async def rebuild_partition(snapshot_id: str, partition: int, partitions: int, fetch_size: int) -> Dict[str, int]:
+    """
+    Reconstruye los aggregate_id cuyo hash cae en la partición indicada.
+    
+    Todos los workers importan el snapshot exportado por el coordinador, así que
+    entre todos leen exactamente los mismos eventos. aggregate_id es
+    anime_{anime_id}: las particiones son disjuntas por anime y cada worker copia
+    sus filas sin combinarlas con las de los demás.
+    """
+    start_time = time.time()
+    fold = ProjectionFold()
+    source = await _connect(settings.POSTGRES_EVENT_STORE_DB)
+    target = await _connect(settings.POSTGRES_DB)
+    copy_task: Optional[asyncio.Task] = None
+    try:
+        async with source.transaction(isolation="repeatable_read", readonly=True):
+            await source.execute(f"SET TRANSACTION SNAPSHOT '{snapshot_id}'")
+            cursor = await source.cursor(
+                EVENTS_QUERY, list(EventProcessor.BATCH_EVENT_TYPES), partitions, partition
+            )
+            while True:
+                rows = await cursor.fetch(fetch_size)
+                if not rows:
+                    break
+                processed = [(row[1], row[2], row[3]) for row in rows if fold.apply(row)]
+                # El COPY del bloque anterior se solapa con el fetch y el plegado de éste
+                if copy_task:
+                    await copy_task
+                copy_task = asyncio.create_task(target.copy_records_to_table(
+                    "processed_events" + SHADOW_SUFFIX, records=processed, columns=PROCESSED_COLUMNS
+                ))
+            if copy_task:
+                await copy_task
+        
+        loads = (
+            ("anime_clicks", fold.click_records(), CLICK_COLUMNS),
+            ("anime_views", fold.view_records(), VIEW_COLUMNS),
+            ("anime_ratings", fold.rating_records(), RATING_COLUMNS),
+            ("anime_stats", fold.stats_records(datetime.utcnow()), STATS_COLUMNS),
+        )
+        counts = {"events": fold.applied + fold.skipped, "applied": fold.applied, "skipped": fold.skipped}
+        for table, records, columns in loads:
+            await target.copy_records_to_table(table + SHADOW_SUFFIX, records=records, columns=columns)
+            counts[table] = len(records)
+    finally:
+        if copy_task and not copy_task.done():
+            copy_task.cancel()
+        await source.close()
+        await target.close()
+    
+    logger.info(
+        f"Partición {partition}/{partitions} reconstruida: {counts['events']} eventos, "
+        f"{counts['skipped']} descartados, duration={time.time() - start_time:.1f}s"
+    )
+    return counts
+
+
+def _run_partition(snapshot_id: str, partition: int, partitions: int, fetch_size: int) -> Dict[str, int]:
+    """Punto de entrada de cada proceso worker."""
+    return asyncio.run(rebuild_partition(snapshot_id, partition, partitions, fetch_size))
+
+
+class ProjectionRebuilder:
+    """
+    Reconstruye anime_clicks, anime_views, anime_ratings, anime_stats y
+    processed_events desde event_store.
+    
+    1. Exporta un snapshot del Event Store que importan todos los workers.
+    2. Cada worker (un proceso por partición de hash de aggregate_id) recorre
+       el Event Store con un cursor, pliega en memoria y carga las tablas
+       sombra con COPY.
+    3. Crea PK e índices sobre las tablas sombra ya cargadas.
+    4. Con las tablas vivas bloqueadas, las intercambia por las sombra, aplica
+       los eventos confirmados después del snapshot y pide a los read sides
+       vaciar su caché.
+    """
+    
+    def __init__(self, workers: Optional[int] = None, fetch_size: Optional[int] = None):
+        self._workers = workers or settings.PROJECTION_REBUILD_WORKERS
+        self._fetch_size = fetch_size or settings.PROJECTION_REBUILD_FETCH_SIZE
+        self._processor = EventProcessor()
+    
+    async def rebuild(self) -> Dict[str, int]:
+        """
+        Ejecuta la reconstrucción completa.
+        
+        Returns:
+            Contadores de eventos leídos, descartados y filas cargadas por tabla
+        """
+        start_time = time.time()
+        source = await _connect(settings.POSTGRES_EVENT_STORE_DB)
+        target = await _connect(settings.POSTGRES_DB)
+        try:
+            definitions = {table: await self._index_definitions(target, table) for table in REBUILD_TABLES}
+            await self._create_shadow_tables(target)
+            try:
+                # El snapshot exportado sólo es importable mientras esta transacción siga abierta
+                async with source.transaction(isolation="repeatable_read", readonly=True):
+                    snapshot_id, snapshot = await source.fetchrow(
+                        "SELECT pg_export_snapshot(), pg_current_snapshot()::text"
+                    )
+                    logger.info(f"Reconstruyendo proyecciones con {self._workers} workers (snapshot {snapshot})")
+                    totals = await self._run_partitions(snapshot_id)
+                await self._build_indexes(definitions)
+                totals["tail"] = await self._swap(target, source, snapshot, definitions)
+            except BaseException:
+                await self._drop_shadow_tables(target)
+                raise
+        finally:
+            await source.close()
+            await target.close()
+        
+        logger.info(
+            f"Proyecciones reconstruidas: {totals['events']} eventos, {totals['skipped']} descartados, "
+            f"{totals['tail']} aplicados tras el snapshot, duration={time.time() - start_time:.1f}s"
+        )
+        return totals
+    
+    async def _run_partitions(self, snapshot_id: str) -> Dict[str, int]:
+        """Lanza un proceso por partición y suma sus contadores."""
+        loop = asyncio.get_running_loop()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self._workers, mp_context=context) as executor:
+            results = await asyncio.gather(*(
+                loop.run_in_executor(
+                    executor, _run_partition, snapshot_id, partition, self._workers, self._fetch_size
+                )
+                for partition in range(self._workers)
+            ))
+        
+        totals: Dict[str, int] = {}
+        for counts in results:
+            for name, value in counts.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+    
+    async def _index_definitions(
+        self, conn: asyncpg.Connection, table: str
+    ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+        """
+        Lee las constraints (PK/UNIQUE) e índices de una tabla viva.
+        
+        Returns:
+            (constraints, índices) como listas de (nombre, definición)
+        """
+        constraints = await conn.fetch("""
+            SELECT conname AS name, pg_get_constraintdef(oid) AS definition
+            FROM pg_constraint
+            WHERE conrelid = $1::regclass AND contype IN ('p', 'u')
+            ORDER BY conname
+        """, table)
+        indexes = await conn.fetch("""
+            SELECT i.relname AS name, pg_get_indexdef(i.oid) AS definition
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = $1::regclass
+              AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid)
+            ORDER BY i.relname
+        """, table)
+        return (
+            [(row["name"], row["definition"]) for row in constraints],
+            [(row["name"], row["definition"]) for row in indexes],
+        )
+    
+    async def _create_shadow_tables(self, conn: asyncpg.Connection):
+        """Crea las tablas sombra vacías y sin índices (COPY es más rápido sin ellos)."""
+        for table in REBUILD_TABLES:
+            await conn.execute(f"DROP TABLE IF EXISTS {table}{SHADOW_SUFFIX}")
+            await conn.execute(
+                f"CREATE TABLE {table}{SHADOW_SUFFIX} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+            )
+    
+    async def _drop_shadow_tables(self, conn: asyncpg.Connection):
+        """Elimina las tablas sombra de una reconstrucción fallida."""
+        for table in REBUILD_TABLES:
+            try:
+                await conn.execute(f"DROP TABLE IF EXISTS {table}{SHADOW_SUFFIX}")
+            except Exception as e:
+                logger.error(f"Error eliminando tabla sombra de {table}: {e}", exc_info=True)
+    
+    async def _build_indexes(self, definitions: Dict[str, Tuple[List, List]]):
+        """Crea PK e índices de todas las tablas sombra en paralelo, una conexión por tabla."""
+        await asyncio.gather(*(
+            self._build_table_indexes(table, *definitions[table]) for table in REBUILD_TABLES
+        ))
+    
+    async def _build_table_indexes(
+        self, table: str, constraints: List[Tuple[str, str]], indexes: List[Tuple[str, str]]
+    ):
+        """Replica sobre la tabla sombra las constraints e índices de la tabla viva."""
+        shadow = table + SHADOW_SUFFIX
+        conn = await _connect(settings.POSTGRES_DB)
+        try:
+            for name, definition in constraints:
+                await conn.execute(f"ALTER TABLE {shadow} ADD CONSTRAINT {name}{SHADOW_SUFFIX} {definition}")
+            for name, definition in indexes:
+                await conn.execute(shadow_index_definition(definition, name, table))
+            await conn.execute(f"ANALYZE {shadow}")
+        finally:
+            await conn.close()
+    
+    async def _swap(
+        self,
+        target: asyncpg.Connection,
+        source: asyncpg.Connection,
+        snapshot: str,
+        definitions: Dict[str, Tuple[List, List]],
+    ) -> int:
+        """
+        Sustituye las tablas vivas por las sombra en una sola transacción.
+        
+        Returns:
+            Número de eventos aplicados tras el snapshot
+        """
+        async with target.transaction():
+            # Bloquea processed_events primero: el consumer lo toca antes que las proyecciones
+            await target.execute(f"LOCK TABLE {', '.join(REBUILD_TABLES)} IN ACCESS EXCLUSIVE MODE")
+            for table in REBUILD_TABLES:
+                constraints, indexes = definitions[table]
+                await target.execute(f"ALTER TABLE {table} RENAME TO {table}{OLD_SUFFIX}")
+                await target.execute(f"ALTER TABLE {table}{SHADOW_SUFFIX} RENAME TO {table}")
+                await target.execute(f"DROP TABLE {table}{OLD_SUFFIX}")
+                for name, _ in constraints:
+                    await target.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {name}{SHADOW_SUFFIX} TO {name}")
+                for name, _ in indexes:
+                    await target.execute(f"ALTER INDEX {name}{SHADOW_SUFFIX} RENAME TO {name}")
+            
+            tail = await self._apply_tail(target, source, snapshot)
+            
+            if settings.CACHE_INVALIDATION_ENABLED:
+                await target.execute(
+                    "SELECT pg_notify($1, $2)", settings.CACHE_INVALIDATION_CHANNEL, RESET_PAYLOAD
+                )
+        return tail
+    
+    async def _apply_tail(self, target: asyncpg.Connection, source: asyncpg.Connection, snapshot: str) -> int:
+        """
+        Aplica sobre las tablas nuevas los eventos confirmados después del snapshot.
+        
+        Se ejecuta con las tablas bloqueadas, así que el consumer no ha podido
+        aplicarlos sobre ellas. Se reclaman en processed_events igual que un lote
+        del consumer, de modo que éste los salte cuando le lleguen de Kafka.
+        Los inválidos se omiten: el consumer los enviará a la DLQ.
+        """
+        rows = await source.fetch(TAIL_QUERY, snapshot)
+        events: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            event = json.loads(row["event_data"])
+            if event.get("event_type") not in EventProcessor.BATCH_EVENT_TYPES:
+                continue
+            try:
+                self._processor._validate_batch_event(event)
+            except (EventProcessingError, TypeError, ValueError):
+                continue
+            if event["event_type"] == "RatingGiven" and storable_rating(event["rating"]) is None:
+                continue
+            events.setdefault(event["event_id"], event)
+        
+        if not events:
+            return 0
+        claimed = await self._processor._claim_events(target, list(events.values()))
+        pending = [event for event_id, event in events.items() if event_id in claimed]
+        if pending:
+            await self._processor._apply_batch(target, pending)
+        return len(pending)
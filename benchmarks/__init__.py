@@ -0,0 +1 @@
+"""Benchmarks reproducibles del command side, las proyecciones y el read side."""
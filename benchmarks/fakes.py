@@ -0,0 +1,251 @@
+"""
+Dobles en proceso de asyncpg y aiokafka para ejecutar los benchmarks sin infraestructura.
+
+fake_infrastructure() sustituye asyncpg.create_pool, asyncpg.connect y el
+AIOKafkaProducer del command side, de modo que los componentes se conectan e
+inicializan por su camino normal. Cada query espera latency_ms (el round trip
+simulado) y FakeDatabase responde con un catálogo y unas estadísticas
+sintéticas deterministas. Así se mide el coste del código propio y cuántas
+llamadas a la base de datos hace cada operación, no el rendimiento de Postgres.
+"""
+import asyncio
+from contextlib import contextmanager
+from decimal import Decimal
+from typing import Any, Dict, Iterator, Sequence
+from unittest.mock import patch
+import asyncpg
+
+_DEFAULTS = {
+    "execute": "OK",
+    "executemany": None,
+    "fetch": [],
+    "fetchrow": None,
+    "fetchval": None,
+    "copy_records_to_table": "COPY 0",
+}
+
+
+class FakeDatabase:
+    """Respuestas sintéticas para las queries del command side, las proyecciones y el read side."""
+    
+    def __init__(self, anime_ids: Sequence[int], latency_ms: float = 0.0):
+        self.anime_ids = list(anime_ids)
+        self._known = set(self.anime_ids)
+        self._latency = latency_ms / 1000
+        self.calls = 0
+        self._by_views = sorted(self.anime_ids, key=lambda anime_id: -self.stats_row(anime_id)["total_views"])
+        self._by_rating = sorted(
+            self.anime_ids,
+            key=lambda anime_id: (-self.stats_row(anime_id)["average_rating"], -self.stats_row(anime_id)["total_ratings"]),
+        )
+    
+    @staticmethod
+    def stats_row(anime_id: int) -> Dict[str, Any]:
+        """Fila de anime_stats derivada del id."""
+        views = anime_id * 7919 % 5000 + 1
+        ratings = anime_id * 31 % 200 + 5
+        return {
+            "anime_id": anime_id,
+            "total_clicks": views * 3,
+            "total_views": views,
+            "total_ratings": ratings,
+            "rating_sum": Decimal(ratings * 7),
+            "average_rating": Decimal(anime_id * 13 % 900 + 100) / 100,
+            "total_duration_seconds": views * 1400,
+        }
+    
+    @staticmethod
+    def anime_row(anime_id: int) -> Dict[str, Any]:
+        """Fila de animes derivada del id."""
+        return {
+            "myanimelist_id": anime_id,
+            "title": f"Anime {anime_id}",
+            "description": None,
+            "image": None,
+            "type": "TV",
+            "episodes": 12,
+            "score": Decimal("7.5"),
+            "popularity": anime_id,
+            "created_at": None,
+        }
+    
+    async def call(self, method: str, query: str, args: tuple) -> Any:
+        """Cuenta la llamada, espera la latencia simulada y responde."""
+        self.calls += 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        result = self.respond(method, " ".join(query.split()), args)
+        return _DEFAULTS[method] if result is None else result
+    
+    def respond(self, method: str, query: str, args: tuple) -> Any:
+        """Resultado de una query; None para la respuesta por defecto del método."""
+        if method == "fetchval":
+            if "FROM animes WHERE myanimelist_id" in query:
+                return args[0] in self._known
+            return None
+        if method == "fetchrow":
+            if "FROM anime_stats" in query and args[0] in self._known:
+                return self.stats_row(args[0])
+            if "FROM animes" in query and args[0] in self._known:
+                return self.anime_row(args[0])
+            return None
+        if method != "fetch":
+            return None
+        
+        if "RETURNING event_id" in query:
+            return [{"event_id": event_id} for event_id in args[0]]
+        if "AS inserted" in query:
+            return [
+                {"anime_id": anime_id, "user_id": user_id, "rating": Decimal(str(rating)), "inserted": True}
+                for anime_id, user_id, rating in zip(args[0], args[1], args[2])
+            ]
+        if "RETURNING anime_id, average_rating" in query:
+            return [{"anime_id": anime_id, "average_rating": Decimal("7.5")} for anime_id in args[0]]
+        if "FROM animes" in query:
+            ids = self.anime_ids if "ANY" not in query else [i for i in args[0] if i in self._known]
+            return [self.anime_row(anime_id) for anime_id in ids]
+        if "FROM anime_stats" in query:
+            if "ANY" in query:
+                return [self.stats_row(anime_id) for anime_id in args[0] if anime_id in self._known]
+            ordered = self._by_views if "ORDER BY total_views" in query else self._by_rating
+            return [self.stats_row(anime_id) for anime_id in ordered[:args[0]]]
+        return None
+
+
+class _FakeTransaction:
+    """Transacción que no hace nada."""
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeConnection:
+    """Conexión de asyncpg que delega cada query en FakeDatabase."""
+    
+    def __init__(self, database: FakeDatabase):
+        self._database = database
+        self._closed = False
+    
+    def transaction(self, **kwargs) -> _FakeTransaction:
+        return _FakeTransaction()
+    
+    async def execute(self, query: str, *args):
+        return await self._database.call("execute", query, args)
+    
+    async def executemany(self, query: str, args):
+        return await self._database.call("executemany", query, (args,))
+    
+    async def fetch(self, query: str, *args):
+        return await self._database.call("fetch", query, args)
+    
+    async def fetchrow(self, query: str, *args):
+        return await self._database.call("fetchrow", query, args)
+    
+    async def fetchval(self, query: str, *args):
+        return await self._database.call("fetchval", query, args)
+    
+    async def copy_records_to_table(self, table_name: str, **kwargs):
+        return await self._database.call("copy_records_to_table", table_name, (kwargs,))
+    
+    async def add_listener(self, channel: str, callback):
+        pass
+    
+    async def remove_listener(self, channel: str, callback):
+        pass
+    
+    def is_closed(self) -> bool:
+        return self._closed
+    
+    async def close(self):
+        self._closed = True
+
+
+class _Acquire:
+    """Context manager de pool.acquire()."""
+    
+    def __init__(self, database: FakeDatabase):
+        self._database = database
+    
+    async def __aenter__(self) -> FakeConnection:
+        return FakeConnection(self._database)
+    
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakePool:
+    """Pool de asyncpg sobre FakeDatabase."""
+    
+    def __init__(self, database: FakeDatabase, max_size: int = 10):
+        self._database = database
+        self._max_size = max_size
+        self._closing = False
+    
+    def acquire(self) -> _Acquire:
+        return _Acquire(self._database)
+    
+    def is_closing(self) -> bool:
+        return self._closing
+    
+    async def close(self):
+        self._closing = True
+    
+    def get_size(self) -> int:
+        return self._max_size
+    
+    def get_idle_size(self) -> int:
+        return self._max_size
+    
+    def get_max_size(self) -> int:
+        return self._max_size
+
+
+class FakeKafkaProducer:
+    """AIOKafkaProducer que confirma cada envío tras latency_ms."""
+    
+    def __init__(self, latency_ms: float = 0.0, **kwargs):
+        self._latency = latency_ms / 1000
+        self.sent = 0
+    
+    async def start(self):
+        pass
+    
+    async def send(self, topic: str, key: Any = None, value: Any = None) -> "asyncio.Future":
+        self.sent += 1
+        future = asyncio.get_running_loop().create_future()
+        if self._latency:
+            asyncio.get_running_loop().call_later(
+                self._latency, lambda: future.done() or future.set_result(None)
+            )
+        else:
+            future.set_result(None)
+        return future
+    
+    async def flush(self):
+        pass
+    
+    async def stop(self):
+        pass
+
+
+@contextmanager
+def fake_infrastructure(anime_ids: Sequence[int], latency_ms: float = 0.0) -> Iterator[FakeDatabase]:
+    """Sustituye Postgres y el producer de Kafka por dobles en proceso mientras dura el bloque."""
+    database = FakeDatabase(anime_ids, latency_ms)
+    
+    async def create_pool(*args, max_size: int = 10, **kwargs) -> FakePool:
+        return FakePool(database, max_size=max_size)
+    
+    async def connect(*args, **kwargs) -> FakeConnection:
+        return FakeConnection(database)
+    
+    def producer(*args, **kwargs) -> FakeKafkaProducer:
+        return FakeKafkaProducer(latency_ms)
+    
+    with patch.object(asyncpg, "create_pool", create_pool), \
+         patch.object(asyncpg, "connect", connect), \
+         patch("app.command_side.infrastructure.kafka_producer.AIOKafkaProducer", producer):
+        yield database
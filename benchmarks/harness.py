@@ -0,0 +1,153 @@
+"""
+Medición de throughput y latencia para los escenarios de benchmark.
+
+run_load() ejecuta una operación asíncrona con N workers concurrentes y
+devuelve un resultado con operaciones/segundo, elementos/segundo (eventos de
+un lote, por ejemplo) y percentiles de latencia. Los resultados se guardan
+en JSON para comparar ejecuciones con compare_results().
+"""
+import asyncio
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from config.settings import settings
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+# Settings que cambian el camino medido; se guardan con cada ejecución
+PERFORMANCE_SETTINGS = (
+    "EVENT_FAST_PATH_ENABLED",
+    "EVENT_SERIALIZATION_FORMAT",
+    "EVENT_STORE_GROUP_COMMIT_ENABLED",
+    "EVENT_OUTBOX_ENABLED",
+    "KAFKA_PRODUCER_WAIT_FOR_DELIVERY",
+    "ANIME_INDEX_ENABLED",
+    "CACHE_ENABLED",
+    "LEADERBOARD_ENABLED",
+    "LOG_LEVEL",
+)
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Percentil q (0-100) con interpolación lineal sobre valores ordenados."""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(
+    scenario: str,
+    case: str,
+    latencies: List[float],
+    elapsed: float,
+    items: int,
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Resultado de un caso: throughput y latencia en milisegundos."""
+    ordered = sorted(latencies)
+    operations = len(ordered)
+    return {
+        "scenario": scenario,
+        "case": case,
+        "concurrency": concurrency,
+        "operations": operations,
+        "items": items,
+        "seconds": round(elapsed, 4),
+        "ops_per_second": round(operations / elapsed, 2) if elapsed else 0.0,
+        "items_per_second": round(items / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ordered) / operations * 1000, 3) if operations else 0.0,
+            "p50": round(percentile(ordered, 50) * 1000, 3),
+            "p95": round(percentile(ordered, 95) * 1000, 3),
+            "p99": round(percentile(ordered, 99) * 1000, 3),
+            "max": round(ordered[-1] * 1000, 3) if operations else 0.0,
+        },
+    }
+
+
+async def run_load(
+    scenario: str,
+    case: str,
+    operation: Callable[[int], Awaitable[Optional[int]]],
+    iterations: int,
+    concurrency: int = 1,
+) -> Dict[str, Any]:
+    """
+    Ejecuta operation(i) iterations veces repartidas entre concurrency workers.
+    
+    operation recibe el índice de la iteración y devuelve cuántos elementos
+    procesó (None cuenta como uno).
+    """
+    latencies: List[float] = []
+    items = 0
+    next_index = 0
+    
+    async def worker():
+        nonlocal items, next_index
+        while next_index < iterations:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            processed = await operation(index)
+            latencies.append(time.perf_counter() - start)
+            items += 1 if processed is None else processed
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, iterations)))))
+    return summarize(scenario, case, latencies, time.perf_counter() - start, items, concurrency)
+
+
+def _git_commit() -> Optional[str]:
+    """Commit actual del repositorio, si se puede obtener."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return result.stdout.strip() or None
+
+
+def environment(target: str) -> Dict[str, Any]:
+    """Contexto de la ejecución: máquina, commit y settings que afectan al rendimiento."""
+    return {
+        "target": target,
+        "started_at": datetime.utcnow().isoformat() + "Z",
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {name: getattr(settings, name) for name in PERFORMANCE_SETTINGS},
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """
+    Regresiones de current frente a baseline.
+    
+    Un caso (scenario, case) presente en ambos regresa si su throughput cae o
+    su p99 sube más de tolerance (fracción) respecto a la línea base.
+    """
+    previous = {(result["scenario"], result["case"]): result for result in baseline.get("results", [])}
+    regressions = []
+    for result in current.get("results", []):
+        base = previous.get((result["scenario"], result["case"]))
+        if base is None:
+            continue
+        name = f"{result['scenario']} [{result['case']}]"
+        if base["items_per_second"] and result["items_per_second"] < base["items_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: items/s {base['items_per_second']} -> {result['items_per_second']}"
+            )
+        base_p99 = base["latency_ms"]["p99"]
+        if base_p99 and result["latency_ms"]["p99"] > base_p99 * (1 + tolerance):
+            regressions.append(f"{name}: p99 {base_p99}ms -> {result['latency_ms']['p99']}ms")
+    return regressions
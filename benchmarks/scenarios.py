@@ -0,0 +1,333 @@
+"""
+Escenarios de benchmark del command side, las proyecciones y el read side.
+
+Cada escenario recibe la configuración, los anime_id a usar y, con target
+"fake", la FakeDatabase para contar llamadas; devuelve un resultado por caso.
+Las cargas de trabajo se generan con una semilla fija para que dos
+ejecuciones midan exactamente las mismas operaciones.
+"""
+import random
+import uuid
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import asyncpg
+import httpx
+from benchmarks.fakes import FakeDatabase, fake_infrastructure
+from benchmarks.harness import environment, run_load
+from common.dto.command_dto import ClickCommand
+from common.utils.logger import get_logger
+from config.settings import settings
+
+logger = get_logger(__name__)
+
+EVENT_TYPES = ("ClickRegistered", "ViewRegistered", "RatingGiven")
+
+TOP_BY_VIEWS_QUERY = """
+query TopByViews($limit: Int!) {
+  topAnimesByViews(limit: $limit) { animeId totalViews averageRating anime { title } }
+}
+"""
+ANIME_STATS_QUERY = """
+query AnimeStats($animeId: Int!) {
+  animeStats(animeId: $animeId) { animeId totalClicks totalViews averageRating anime { title } }
+}
+"""
+
+
+class BenchmarkError(Exception):
+    """Una operación del benchmark no terminó como se esperaba."""
+
+
+class BenchmarkConfig(NamedTuple):
+    """Parámetros de una ejecución."""
+    
+    target: str = "fake"
+    iterations: int = 2000
+    warmup: int = 50
+    concurrency: Tuple[int, ...] = (1, 16, 64)
+    batch_sizes: Tuple[int, ...] = (1, 10, 100, 1000)
+    projection_batch_size: int = 100
+    anime_count: int = 500
+    hot_animes: int = 100
+    fake_latency_ms: float = 0.5
+    seed: int = 42
+
+
+async def _run_case(
+    config: BenchmarkConfig,
+    database: Optional[FakeDatabase],
+    scenario: str,
+    case: str,
+    operation: Callable[[int], Awaitable[Optional[int]]],
+    iterations: int,
+    concurrency: int = 1,
+    warmup: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Calienta, mide y añade las llamadas a la base de datos por operación (solo con fakes)."""
+    for index in range(config.warmup if warmup is None else warmup):
+        await operation(-index - 1)
+    calls = database.calls if database else 0
+    result = await run_load(scenario, case, operation, iterations, concurrency)
+    if database is not None:
+        result["db_calls_per_operation"] = round((database.calls - calls) / max(result["operations"], 1), 2)
+    logger.info(
+        f"{scenario} [{case}]: {result['items_per_second']} items/s, p99={result['latency_ms']['p99']}ms"
+    )
+    return result
+
+
+async def bench_command_click(
+    config: BenchmarkConfig, anime_ids: Sequence[int], database: Optional[FakeDatabase]
+) -> List[Dict[str, Any]]:
+    """POST /click a través de la API y AnimeCommandHandler (validación, Event Store y Kafka)."""
+    from app.command_side.api import main as command_api
+    
+    rng = random.Random(config.seed)
+    payloads = [
+        {"anime_id": rng.choice(anime_ids), "user_id": f"bench-user-{rng.randrange(10000)}"}
+        for _ in range(config.iterations + config.warmup)
+    ]
+    results = []
+    await command_api.command_handler.initialize()
+    try:
+        transport = httpx.ASGITransport(app=command_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            async def click(index: int):
+                response = await client.post("/click", json=payloads[index])
+                if response.status_code != 201:
+                    raise BenchmarkError(f"/click devolvió {response.status_code}: {response.text}")
+            
+            for concurrency in config.concurrency:
+                results.append(await _run_case(
+                    config, database, "command_click", f"concurrency={concurrency}",
+                    click, config.iterations, concurrency,
+                ))
+    finally:
+        await command_api.command_handler.cleanup()
+    return results
+
+
+async def bench_event_store(
+    config: BenchmarkConfig, anime_ids: Sequence[int], database: Optional[FakeDatabase]
+) -> List[Dict[str, Any]]:
+    """EventStore.save_events con lotes de distintos tamaños; items/s son eventos por segundo."""
+    from app.command_side.application.anime_command_handler import AnimeCommandHandler
+    from app.command_side.infrastructure.event_store import EventStore
+    
+    rng = random.Random(config.seed)
+    builder = AnimeCommandHandler()
+    store = EventStore()
+    results = []
+    await store.connect()
+    try:
+        for batch_size in config.batch_sizes:
+            operations = max(10, config.iterations // batch_size)
+            warmup = min(config.warmup, operations // 10)
+            for concurrency in config.concurrency:
+                # Eventos nuevos por caso, construidos antes de medir: solo cuenta la escritura
+                batches = [
+                    [
+                        builder._build_event(ClickCommand(
+                            anime_id=rng.choice(anime_ids), user_id=f"bench-user-{rng.randrange(10000)}"
+                        ))
+                        for _ in range(batch_size)
+                    ]
+                    for _ in range(operations + warmup)
+                ]
+                
+                async def save(index: int, batches=batches) -> int:
+                    await store.save_events(batches[index])
+                    return batch_size
+                
+                results.append(await _run_case(
+                    config, database, "event_store_save", f"batch={batch_size},concurrency={concurrency}",
+                    save, operations, concurrency, warmup,
+                ))
+    finally:
+        await store.close()
+    return results
+
+
+def _projection_event(event_type: str, anime_id: int, user_id: str, rng: random.Random) -> Dict[str, Any]:
+    """Evento tal como lo entrega el consumer a EventProcessor."""
+    event = {
+        # Siempre nuevo: con la semilla fija una segunda ejecución live solo vería duplicados
+        "event_id": str(uuid.uuid4()),
+        "event_type": event_type,
+        "aggregate_id": f"anime_{anime_id}",
+        "anime_id": anime_id,
+        "user_id": user_id,
+        "occurred_at": datetime.utcnow(),
+        "version": 1,
+    }
+    if event_type == "ViewRegistered":
+        event["duration_seconds"] = rng.randint(60, 1800)
+    elif event_type == "RatingGiven":
+        # anime_ratings.rating es NUMERIC(3, 2): 10.0 no cabe en la columna
+        event["rating"] = rng.randint(2, 19) / 2
+    return event
+
+
+async def bench_projection(
+    config: BenchmarkConfig, anime_ids: Sequence[int], database: Optional[FakeDatabase]
+) -> List[Dict[str, Any]]:
+    """EventProcessor por tipo de evento, evento a evento y con process_batch."""
+    from app.read_side.projections.event_processor import EventProcessor
+    
+    rng = random.Random(config.seed)
+    processor = EventProcessor()
+    single_handlers = {
+        "ClickRegistered": processor.process_click_event,
+        "ViewRegistered": processor.process_view_event,
+        "RatingGiven": processor.process_rating_event,
+    }
+    batch_size = config.projection_batch_size
+    results = []
+    await processor.connect()
+    try:
+        for event_type in EVENT_TYPES:
+            def events(count: int) -> List[Dict[str, Any]]:
+                return [
+                    _projection_event(event_type, rng.choice(anime_ids), f"bench-user-{rng.randrange(10000)}", rng)
+                    for _ in range(count)
+                ]
+            
+            singles = events(config.iterations + config.warmup)
+            handler = single_handlers[event_type]
+            
+            async def process_single(index: int):
+                await handler(singles[index])
+            
+            results.append(await _run_case(
+                config, database, "projection", f"{event_type},mode=single", process_single, config.iterations,
+            ))
+            
+            operations = max(10, config.iterations // batch_size)
+            warmup = min(config.warmup, operations // 10)
+            batches = [events(batch_size) for _ in range(operations + warmup)]
+            
+            async def process_batch(index: int) -> int:
+                failed = await processor.process_batch(batches[index])
+                if failed:
+                    raise BenchmarkError(f"process_batch rechazó {len(failed)} eventos: {failed[0][1]}")
+                return batch_size
+            
+            results.append(await _run_case(
+                config, database, "projection", f"{event_type},mode=batch,batch={batch_size}",
+                process_batch, operations, 1, warmup,
+            ))
+    finally:
+        await processor.close()
+    return results
+
+
+async def bench_graphql(
+    config: BenchmarkConfig, anime_ids: Sequence[int], database: Optional[FakeDatabase]
+) -> List[Dict[str, Any]]:
+    """
+    topAnimesByViews y animeStats por HTTP contra la app GraphQL, con caché frío y caliente.
+    
+    En frío se vacía el caché (y los rankings en memoria) antes de cada
+    petición; en caliente se consultan una vez todas las claves antes de medir.
+    """
+    from app.read_side.graphql import main as read_api
+    from app.read_side.graphql.schema import get_repository
+    
+    rng = random.Random(config.seed)
+    hot_ids = list(anime_ids[:config.hot_animes])
+    stats_ids = [rng.choice(hot_ids) for _ in range(config.iterations)]
+    queries = {
+        "topAnimesByViews": lambda index: {"query": TOP_BY_VIEWS_QUERY, "variables": {"limit": 10}},
+        "animeStats": lambda index: {
+            "query": ANIME_STATS_QUERY,
+            "variables": {"animeId": stats_ids[index] if index >= 0 else hot_ids[-index - 1]},
+        },
+    }
+    repo = get_repository()
+    results = []
+    await repo.connect()
+    try:
+        transport = httpx.ASGITransport(app=read_api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name, payload in queries.items():
+                for cache in ("cold", "warm"):
+                    async def query(index: int, payload=payload, cold=cache == "cold"):
+                        if cold:
+                            repo.reset_cache()
+                        response = await client.post("/graphql", json=payload(index))
+                        body = response.json()
+                        if response.status_code != 200 or body.get("errors"):
+                            raise BenchmarkError(f"{name} falló: {response.status_code} {body.get('errors')}")
+                    
+                    for concurrency in config.concurrency:
+                        repo.reset_cache()
+                        if cache == "warm":
+                            for index in range(len(hot_ids)):
+                                await query(-index - 1)
+                        before = repo.get_cache_stats()
+                        result = await _run_case(
+                            config, database, "graphql", f"{name},cache={cache},concurrency={concurrency}",
+                            query, config.iterations, concurrency, warmup=0,
+                        )
+                        after = repo.get_cache_stats()
+                        if before and after:
+                            hits = after["hits"] - before["hits"]
+                            lookups = hits + after["misses"] - before["misses"]
+                            result["cache_hit_ratio"] = round(hits / lookups, 3) if lookups else None
+                        results.append(result)
+    finally:
+        await repo.close()
+    return results
+
+
+SCENARIOS: Dict[str, Callable[..., Awaitable[List[Dict[str, Any]]]]] = {
+    "command_click": bench_command_click,
+    "event_store": bench_event_store,
+    "projection": bench_projection,
+    "graphql": bench_graphql,
+}
+
+
+async def _sample_anime_ids(limit: int) -> List[int]:
+    """anime_id existentes en el catálogo, para que los comandos y queries no fallen."""
+    conn = await asyncpg.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+    )
+    try:
+        rows = await conn.fetch("SELECT myanimelist_id FROM animes ORDER BY myanimelist_id LIMIT $1", limit)
+    finally:
+        await conn.close()
+    if not rows:
+        raise BenchmarkError("La tabla animes está vacía: carga el catálogo antes de ejecutar con --target live")
+    return [row["myanimelist_id"] for row in rows]
+
+
+async def run_benchmarks(scenarios: Sequence[str], config: BenchmarkConfig) -> Dict[str, Any]:
+    """
+    Ejecuta los escenarios indicados y devuelve el documento JSON de resultados.
+    
+    Con target "live" se usan Postgres y Kafka según settings (escriben en
+    event_store y en el read model: usar una base de datos de pruebas); con
+    "fake" se usan los dobles en proceso de benchmarks.fakes.
+    """
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"Escenarios desconocidos: {unknown}. Disponibles: {list(SCENARIOS)}")
+    if config.target not in ("fake", "live"):
+        raise ValueError(f"target debe ser 'fake' o 'live', recibido: {config.target}")
+    
+    document = {"environment": environment(config.target), "config": config._asdict(), "results": []}
+    if config.target == "fake":
+        context = fake_infrastructure(range(1, config.anime_count + 1), config.fake_latency_ms)
+    else:
+        context = nullcontext()
+    with context as database:
+        anime_ids = database.anime_ids if database else await _sample_anime_ids(config.anime_count)
+        for name in scenarios:
+            document["results"].extend(await SCENARIOS[name](config, anime_ids, database))
+    return document
@@ -3,11 +3,20 @@ from .command_dto import (
     ClickCommand,
     ViewCommand,
     RatingCommand,
+    ClickBatchItem,
+    ViewBatchItem,
+    RatingBatchItem,
+    BatchCommandItem,
+    BatchCommand,
 )
 
 __all__ = [
     "ClickCommand",
     "ViewCommand",
     "RatingCommand",
+    "ClickBatchItem",
+    "ViewBatchItem",
+    "RatingBatchItem",
+    "BatchCommandItem",
+    "BatchCommand",
 ]
-
@@ -1,4 +1,5 @@
 """DTOs para comandos."""
+from typing import Annotated, List, Literal, Union
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -25,3 +26,32 @@ class RatingCommand(BaseModel):
     user_id: str
     rating: float = Field(ge=0.0, le=10.0)
 
+
+class ClickBatchItem(ClickCommand):
+    """Click dentro de un lote de comandos."""
+    
+    type: Literal["click"]
+
+
+class ViewBatchItem(ViewCommand):
+    """Visualización dentro de un lote de comandos."""
+    
+    type: Literal["view"]
+
+
+class RatingBatchItem(RatingCommand):
+    """Calificación dentro de un lote de comandos."""
+    
+    type: Literal["rating"]
+
+
+BatchCommandItem = Annotated[
+    Union[ClickBatchItem, ViewBatchItem, RatingBatchItem],
+    Field(discriminator="type"),
+]
+
+
+class BatchCommand(BaseModel):
+    """Comando para registrar un lote mixto de interacciones."""
+    
+    commands: List[BatchCommandItem] = Field(min_length=1)
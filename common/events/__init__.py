@@ -5,11 +5,18 @@ from .anime_events import (
     ViewRegistered,
     RatingGiven,
 )
+from .registry import EVENT_TYPES, deserialize_event
+from .serializer import EventSerializer, get_event_serializer, decode_event_payload
 
 __all__ = [
     "BaseEvent",
     "ClickRegistered",
     "ViewRegistered",
     "RatingGiven",
+    "EVENT_TYPES",
+    "deserialize_event",
+    "EventSerializer",
+    "get_event_serializer",
+    "decode_event_payload",
 ]
 
@@ -0,0 +1,147 @@
+"""
+Representación ligera de eventos para el camino caliente del command side.
+
+Los modelos Pydantic siguen siendo el esquema público; estas clases con
+slots se construyen sin validación (los comandos ya están validados) y
+serializan una sola vez a JSON, idéntico a model_dump_json(). Los mismos
+bytes se reutilizan para el Event Store y para Kafka.
+"""
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, ClassVar, Dict, Optional, Tuple, Type, Union
+from common.events.anime_events import ClickRegistered, ViewRegistered, RatingGiven
+from common.events.base_event import BaseEvent
+
+# Mismo JSON compacto y UTF-8 sin escapar que emite Pydantic
+_encode_json = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+_quote = json.encoder.encode_basestring
+
+# Bits de versión (4) y variante (RFC 4122) de un UUID aleatorio
+_UUID4_MASK = ~(0xF000 << 64) & ~(0xC000 << 48)
+_UUID4_BITS = (0x4000 << 64) | (0x8000 << 48)
+
+
+def new_event_id() -> str:
+    """UUID4 en texto, como str(uuid.uuid4()) pero sin construir el objeto UUID."""
+    value = "%032x" % ((int.from_bytes(os.urandom(16), "big") & _UUID4_MASK) | _UUID4_BITS)
+    return f"{value[:8]}-{value[8:12]}-{value[12:16]}-{value[16:20]}-{value[20:]}"
+
+
+@dataclass(slots=True, kw_only=True)
+class FastEvent:
+    """
+    Evento con slots y JSON precalculado.
+    
+    El JSON se genera al primer uso y se cachea: a partir de ahí el evento
+    no debe modificarse.
+    """
+    
+    event_type: ClassVar[str] = ""
+    model: ClassVar[Type[BaseEvent]] = BaseEvent
+    # Campos propios del tipo, en el orden de declaración del modelo Pydantic
+    _payload_fields: ClassVar[Tuple[str, ...]] = ()
+    
+    aggregate_id: str
+    anime_id: int
+    user_id: str
+    timestamp: datetime = field(default_factory=datetime.utcnow)
+    event_id: str = field(default_factory=new_event_id)
+    occurred_at: datetime = field(default_factory=datetime.utcnow)
+    version: int = 1
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    _json: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    _json_bytes: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Mismo dict (y orden de claves) que model_dump()."""
+        data = {
+            "event_id": self.event_id,
+            "event_type": self.event_type,
+            "aggregate_id": self.aggregate_id,
+            "occurred_at": self.occurred_at,
+            "version": self.version,
+            "metadata": self.metadata,
+            "anime_id": self.anime_id,
+            "user_id": self.user_id,
+        }
+        for name in self._payload_fields:
+            data[name] = getattr(self, name)
+        data["timestamp"] = self.timestamp
+        return data
+    
+    def to_json(self) -> str:
+        """JSON del evento, idéntico a model_dump_json(); se calcula una vez."""
+        if self._json is None:
+            metadata = _encode_json(self.metadata) if self.metadata else "{}"
+            self._json = (
+                f'{{"event_id":{_quote(self.event_id)},"event_type":"{self.event_type}",'
+                f'"aggregate_id":{_quote(self.aggregate_id)},"occurred_at":"{self.occurred_at.isoformat()}",'
+                f'"version":{self.version:d},"metadata":{metadata},'
+                f'"anime_id":{self.anime_id:d},"user_id":{_quote(self.user_id)}{self._payload_json()},'
+                f'"timestamp":"{self.timestamp.isoformat()}"}}'
+            )
+        return self._json
+    
+    def to_json_bytes(self) -> bytes:
+        """JSON del evento en UTF-8, listo para Kafka."""
+        if self._json_bytes is None:
+            self._json_bytes = self.to_json().encode("utf-8")
+        return self._json_bytes
+    
+    def _payload_json(self) -> str:
+        """Campos propios del tipo ya codificados, precedidos de coma."""
+        return ""
+    
+    def to_model(self) -> BaseEvent:
+        """Convierte al modelo Pydantic público (con validación)."""
+        return self.model(**self.to_dict())
+
+
+@dataclass(slots=True, kw_only=True)
+class FastClickRegistered(FastEvent):
+    """Camino rápido de ClickRegistered."""
+    
+    event_type: ClassVar[str] = "ClickRegistered"
+    model: ClassVar[Type[BaseEvent]] = ClickRegistered
+
+
+@dataclass(slots=True, kw_only=True)
+class FastViewRegistered(FastEvent):
+    """Camino rápido de ViewRegistered."""
+    
+    event_type: ClassVar[str] = "ViewRegistered"
+    model: ClassVar[Type[BaseEvent]] = ViewRegistered
+    _payload_fields: ClassVar[Tuple[str, ...]] = ("duration_seconds",)
+    
+    duration_seconds: int
+    
+    def _payload_json(self) -> str:
+        """Campos propios del tipo ya codificados, precedidos de coma."""
+        return f',"duration_seconds":{self.duration_seconds:d}'
+
+
+@dataclass(slots=True, kw_only=True)
+class FastRatingGiven(FastEvent):
+    """Camino rápido de RatingGiven."""
+    
+    event_type: ClassVar[str] = "RatingGiven"
+    model: ClassVar[Type[BaseEvent]] = RatingGiven
+    _payload_fields: ClassVar[Tuple[str, ...]] = ("rating",)
+    
+    rating: float
+    
+    def _payload_json(self) -> str:
+        """Campos propios del tipo ya codificados, precedidos de coma."""
+        return f',"rating":{float(self.rating)!r}'
+
+
+AnyEvent = Union[BaseEvent, FastEvent]
+
+
+def event_json(event: AnyEvent) -> str:
+    """JSON del evento para la columna event_data, sin reserializar eventos rápidos."""
+    if isinstance(event, FastEvent):
+        return event.to_json()
+    return event.model_dump_json()
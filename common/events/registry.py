@@ -0,0 +1,26 @@
+"""Registro de tipos de evento para reconstruirlos desde el Event Store."""
+from typing import Dict, Type, Union
+from common.exceptions import UnknownEventTypeError
+from .base_event import BaseEvent
+from .anime_events import ClickRegistered, ViewRegistered, RatingGiven
+
+EVENT_TYPES: Dict[str, Type[BaseEvent]] = {
+    "ClickRegistered": ClickRegistered,
+    "ViewRegistered": ViewRegistered,
+    "RatingGiven": RatingGiven,
+}
+
+
+def deserialize_event(event_type: str, payload: Union[str, bytes, dict]) -> BaseEvent:
+    """
+    Construye el evento tipado a partir de su JSON (o dict) almacenado.
+    
+    Raises:
+        UnknownEventTypeError: si event_type no está registrado
+    """
+    event_class = EVENT_TYPES.get(event_type)
+    if event_class is None:
+        raise UnknownEventTypeError(event_type)
+    if isinstance(payload, dict):
+        return event_class.model_validate(payload)
+    return event_class.model_validate_json(payload)
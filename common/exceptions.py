@@ -30,4 +30,17 @@ class EventProcessingError(DomainException):
 
 class GraphQLError(DomainException):
     """Excepción lanzada cuando falla un query GraphQL."""
-    pass
\ No newline at end of file
+    pass
+
+class UnknownEventTypeError(DomainException):
+    """Excepción lanzada cuando no hay clase registrada para un tipo de evento."""
+    
+    def __init__(self, event_type: str, message: Optional[str] = None):
+        self.event_type = event_type
+        if message is None:
+            message = f"Tipo de evento desconocido: {event_type}"
+        super().__init__(message)
+
+class CatalogSyncError(DomainException):
+    """Excepción lanzada cuando se aborta una sincronización del catálogo de animes."""
+    pass
@@ -1,5 +1,8 @@
 """Servicio de caché in-memory con TTL."""
+import asyncio
+import sys
 import time
+from collections import OrderedDict
 from typing import Optional, Dict, Any
 from threading import Lock
 from common.utils.logger import get_logger
@@ -10,25 +13,59 @@ logger = get_logger(__name__)
 class CacheEntry:
     """Entrada del caché con timestamp de expiración."""
     
-    def __init__(self, value: Any, ttl: int):
+    __slots__ = ("value", "expires_at", "created_at", "size")
+    
+    def __init__(self, value: Any, ttl: int, size: int = 0):
         self.value = value
         self.expires_at = time.time() + ttl
         self.created_at = time.time()
+        self.size = size
     
     def is_expired(self) -> bool:
         """Verifica si la entrada ha expirado."""
         return time.time() > self.expires_at
 
 
+def _estimate_size(value: Any) -> int:
+    """Estima los bytes que ocupa un valor recorriendo dicts, listas y tuplas."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + _estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_estimate_size(item) for item in value)
+    return size
+
+
 class InMemoryCache:
-    """Caché in-memory con TTL y métricas."""
+    """
+    Caché in-memory con TTL, desalojo LRU y métricas.
     
-    def __init__(self, default_ttl: int = 300):
-        self._cache: Dict[str, CacheEntry] = {}
+    Está acotado por número de entradas y por bytes estimados; al superar
+    cualquiera de los dos límites se desalojan las entradas menos usadas
+    recientemente. Todas las operaciones son O(1) salvo la estimación del
+    tamaño del valor en set().
+    """
+    
+    def __init__(
+        self,
+        default_ttl: int = 300,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        stale_ttl: int = 0,
+    ):
+        self._cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
         self._lock = Lock()
         self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stale_ttl = stale_ttl
+        self._bytes = 0
         self._hits = 0
         self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._stale_hits = 0
+        self._sweeper_task: Optional[asyncio.Task] = None
     
     def get(self, key: str) -> Optional[Any]:
         """Obtiene un valor del caché."""
@@ -41,44 +78,101 @@ class InMemoryCache:
                 return None
             
             if entry.is_expired():
-                del self._cache[key]
+                if self._is_past_stale(entry):
+                    self._remove(key)
+                    self._expirations += 1
                 self._misses += 1
                 logger.debug(f"Cache MISS (expired) para key: {key}")
                 return None
             
+            self._cache.move_to_end(key)
             self._hits += 1
             logger.debug(f"Cache HIT para key: {key}")
             return entry.value
     
+    def get_stale(self, key: str) -> Optional[Any]:
+        """
+        Obtiene un valor expirado que aún está dentro de stale_ttl.
+        
+        Se usa para servir el valor anterior mientras se recarga.
+        """
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None or not entry.is_expired() or self._is_past_stale(entry):
+                return None
+            self._stale_hits += 1
+            return entry.value
+    
+    def _is_past_stale(self, entry: CacheEntry) -> bool:
+        """Indica si una entrada ya no puede servirse ni como valor obsoleto."""
+        return time.time() > entry.expires_at + self.stale_ttl
+    
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
         """Guarda un valor en el caché."""
+        ttl = ttl or self.default_ttl
+        size = _estimate_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            logger.debug(f"Cache SET omitido para key: {key}, {size} bytes superan el límite")
+            return
+        
         with self._lock:
-            ttl = ttl or self.default_ttl
-            self._cache[key] = CacheEntry(value, ttl)
+            self._remove(key)
+            self._cache[key] = CacheEntry(value, ttl, size)
+            self._bytes += size
+            self._evict_if_needed()
             logger.debug(f"Cache SET para key: {key} con TTL: {ttl}s")
     
     def delete(self, key: str) -> None:
         """Elimina una entrada del caché."""
         with self._lock:
-            if key in self._cache:
-                del self._cache[key]
+            if self._remove(key):
                 logger.debug(f"Cache DELETE para key: {key}")
     
+    def delete_prefix(self, prefix: str) -> int:
+        """Elimina todas las entradas cuya clave empieza por prefix. Retorna cuántas eliminó."""
+        with self._lock:
+            keys = [key for key in self._cache if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+        if keys:
+            logger.debug(f"Cache DELETE de {len(keys)} entradas con prefijo: {prefix}")
+        return len(keys)
+    
     def clear(self) -> None:
         """Limpia todo el caché."""
         with self._lock:
             self._cache.clear()
+            self._bytes = 0
             logger.info("Cache CLEAR ejecutado")
     
+    def _remove(self, key: str) -> bool:
+        """Quita una entrada y descuenta su tamaño. Debe llamarse con el lock tomado."""
+        entry = self._cache.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry.size
+        return True
+    
+    def _evict_if_needed(self) -> None:
+        """Desaloja las entradas LRU hasta respetar los límites. Debe llamarse con el lock tomado."""
+        while self._cache and (
+            (self.max_entries and len(self._cache) > self.max_entries)
+            or (self.max_bytes and self._bytes > self.max_bytes)
+        ):
+            _, entry = self._cache.popitem(last=False)
+            self._bytes -= entry.size
+            self._evictions += 1
+    
     def _cleanup_expired(self) -> None:
         """Limpia entradas expiradas."""
         with self._lock:
             expired_keys = [
                 key for key, entry in self._cache.items()
-                if entry.is_expired()
+                if self._is_past_stale(entry)
             ]
             for key in expired_keys:
-                del self._cache[key]
+                self._remove(key)
+            self._expirations += len(expired_keys)
             
             if expired_keys:
                 logger.debug(f"Cache cleanup: {len(expired_keys)} entradas expiradas eliminadas")
@@ -96,6 +190,12 @@ class InMemoryCache:
                 "total_requests": total_requests,
                 "hit_rate": round(hit_rate, 2),
                 "entries": len(self._cache),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "stale_hits": self._stale_hits,
                 "default_ttl": self.default_ttl,
             }
     
@@ -104,4 +204,32 @@ class InMemoryCache:
         with self._lock:
             self._hits = 0
             self._misses = 0
-            logger.debug("Cache stats reseteadas")
\ No newline at end of file
+            self._evictions = 0
+            self._expirations = 0
+            self._stale_hits = 0
+            logger.debug("Cache stats reseteadas")
+    
+    def start_sweeper(self, interval: float) -> None:
+        """Inicia una tarea en background que elimina entradas expiradas periódicamente."""
+        if self._sweeper_task and not self._sweeper_task.done():
+            return
+        self._sweeper_task = asyncio.create_task(self._sweep_loop(interval))
+    
+    async def stop_sweeper(self) -> None:
+        """Detiene la tarea de limpieza."""
+        if self._sweeper_task:
+            self._sweeper_task.cancel()
+            try:
+                await self._sweeper_task
+            except asyncio.CancelledError:
+                pass
+            self._sweeper_task = None
+    
+    async def _sweep_loop(self, interval: float) -> None:
+        """Loop de limpieza de entradas expiradas."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self._cleanup_expired()
+            except Exception as e:
+                logger.error(f"Error limpiando caché: {e}", exc_info=True)
\ No newline at end of file
@@ -0,0 +1,556 @@
+"""
+Registro de métricas en proceso con exposición en formato texto de Prometheus.
+
+Contadores, gauges e histogramas con buckets fijos, con o sin labels. Las
+métricas se declaran a nivel de módulo y se actualizan desde el event loop
+del servicio, así que no llevan locks. Los valores que ya existen en otro
+objeto (tamaño de un pool, estadísticas de la caché) se leen al hacer scrape
+con set_function().
+
+Los APIs exponen /metrics con MetricsMiddleware midiendo la latencia por
+endpoint; los procesos sin servidor HTTP (consumer, relay) usan
+start_metrics_server().
+
+Con varios workers de uvicorn cada proceso tiene su propio registro. Si se
+indica un directorio multiproceso, cada worker vuelca una instantánea JSON
+de su registro (run_snapshot_writer) y el que atiende el scrape las suma
+todas (render_metrics): contadores e histogramas de todos los procesos, aun
+los ya terminados, para que sigan siendo monótonos; gauges sólo de los
+procesos vivos.
+"""
+import asyncio
+import json
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from common.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Segundos, de 0.5ms a 10s: cubren desde un insert agrupado hasta un lote lento
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    """Valor de una muestra en formato Prometheus."""
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    """Escapa un valor de label."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """Bloque {name="value",...}; vacío si no hay labels."""
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Value:
+    """Valor de un contador o gauge para una combinación de labels."""
+    
+    __slots__ = ("value", "function")
+    
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+    
+    def inc(self, amount: float = 1):
+        """Incrementa el valor."""
+        self.value += amount
+    
+    def dec(self, amount: float = 1):
+        """Decrementa el valor."""
+        self.value -= amount
+    
+    def set(self, value: float):
+        """Fija el valor."""
+        self.value = value
+    
+    def set_function(self, function: Callable[[], float]):
+        """Lee el valor de function() en cada scrape."""
+        self.function = function
+    
+    def get(self) -> float:
+        """Valor actual."""
+        return self.function() if self.function else self.value
+
+
+class _HistogramValue:
+    """Histograma con buckets fijos para una combinación de labels."""
+    
+    __slots__ = ("upper_bounds", "counts", "sum", "count")
+    
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        # Un bucket más para +Inf; los conteos no son acumulados hasta el render
+        self.counts = [0] * (len(upper_bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        """Registra una observación."""
+        self.counts[bisect_left(self.upper_bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def time(self) -> "_Timer":
+        """Context manager que observa la duración del bloque en segundos."""
+        return _Timer(self)
+
+
+class _Timer:
+    """Mide con perf_counter la duración de un bloque (síncrono o asíncrono)."""
+    
+    __slots__ = ("_histogram", "_start")
+    
+    def __init__(self, histogram: _HistogramValue):
+        self._histogram = histogram
+        self._start = 0.0
+    
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.perf_counter() - self._start)
+    
+    async def __aenter__(self):
+        return self.__enter__()
+    
+    async def __aexit__(self, *exc_info):
+        self.__exit__(*exc_info)
+
+
+class Metric:
+    """Métrica con nombre, ayuda y labels; los métodos sin labels actúan sobre el valor por defecto."""
+    
+    type = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+    
+    def labels(self, *values: Any):
+        """Valor para una combinación de labels (en el orden de labelnames)."""
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} espera los labels {self.labelnames}, recibidos {key}")
+            child = self._children[key] = self._new_value()
+        return child
+    
+    def clear(self):
+        """Elimina todas las combinaciones de labels."""
+        self._children.clear()
+    
+    def remove(self, *values: Any):
+        """Elimina una combinación de labels, si existe."""
+        self._children.pop(tuple(str(value) for value in values), None)
+    
+    def _new_value(self):
+        return _Value()
+    
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} tiene labels: usar labels()")
+        return self.labels()
+    
+    def samples(self) -> Iterator[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """(sufijo, nombres de labels, valores de labels, valor) de cada muestra."""
+        for key, child in list(self._children.items()):
+            try:
+                value = child.get()
+            except Exception as e:
+                logger.debug(f"No se pudo leer la métrica {self.name}{key}: {e}")
+                continue
+            yield "", self.labelnames, key, value
+    
+    def render(self) -> List[str]:
+        """Líneas en formato texto de Prometheus."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """Contador monótono."""
+    
+    type = "counter"
+    
+    def inc(self, amount: float = 1):
+        """Incrementa el contador sin labels."""
+        self._default().inc(amount)
+    
+    def set_function(self, function: Callable[[], float]):
+        """Lee el contador sin labels de function() en cada scrape."""
+        self._default().set_function(function)
+
+
+class Gauge(Metric):
+    """Valor que sube y baja."""
+    
+    type = "gauge"
+    
+    def inc(self, amount: float = 1):
+        """Incrementa el gauge sin labels."""
+        self._default().inc(amount)
+    
+    def dec(self, amount: float = 1):
+        """Decrementa el gauge sin labels."""
+        self._default().dec(amount)
+    
+    def set(self, value: float):
+        """Fija el gauge sin labels."""
+        self._default().set(value)
+    
+    def set_function(self, function: Callable[[], float]):
+        """Lee el gauge sin labels de function() en cada scrape."""
+        self._default().set_function(function)
+
+
+class Histogram(Metric):
+    """Distribución de observaciones en buckets fijos."""
+    
+    type = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        if "le" in self.labelnames:
+            raise ValueError("'le' está reservado para los buckets del histograma")
+        self.upper_bounds = tuple(sorted(buckets))
+    
+    def _new_value(self):
+        return _HistogramValue(self.upper_bounds)
+    
+    def observe(self, value: float):
+        """Registra una observación en el histograma sin labels."""
+        self._default().observe(value)
+    
+    def time(self) -> _Timer:
+        """Context manager que observa la duración del bloque en el histograma sin labels."""
+        return self._default().time()
+    
+    def samples(self) -> Iterator[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        """Buckets acumulados, _sum y _count de cada combinación de labels."""
+        bucket_names = self.labelnames + ("le",)
+        bounds = [_format_value(bound) for bound in self.upper_bounds] + ["+Inf"]
+        for key, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts):
+                cumulative += count
+                yield "_bucket", bucket_names, key + (bound,), cumulative
+            yield "_sum", self.labelnames, key, child.sum
+            yield "_count", self.labelnames, key, child.count
+
+
+class MetricsRegistry:
+    """Conjunto de métricas de un proceso."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+    
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Metric:
+        # Idempotente: un módulo recargado (o dos módulos) pueden declarar la misma métrica
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"La métrica {name} ya existe con otro tipo o labels")
+        return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Declara (o devuelve) un contador."""
+        return self._get_or_create(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Declara (o devuelve) un gauge."""
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Declara (o devuelve) un histograma."""
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+    
+    def get(self, name: str) -> Optional[Metric]:
+        """Métrica registrada con ese nombre."""
+        return self._metrics.get(name)
+    
+    def add_collector(self, collector: Callable[[], None]):
+        """
+        Registra una función que actualiza métricas antes de cada render o snapshot.
+        
+        Sirve para copiar de una vez varios valores que salen de una misma
+        lectura costosa; para un único valor basta set_function().
+        """
+        self._collectors.append(collector)
+    
+    def _collect(self):
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.debug(f"Error actualizando métricas: {e}")
+    
+    def render(self) -> str:
+        """Todas las métricas en formato texto de Prometheus."""
+        self._collect()
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+    
+    def snapshot(self) -> List[dict]:
+        """Valores actuales serializables a JSON, para agregarlos entre procesos."""
+        self._collect()
+        metrics = []
+        for metric in self._metrics.values():
+            data = {
+                "name": metric.name,
+                "type": metric.type,
+                "documentation": metric.documentation,
+                "labelnames": list(metric.labelnames),
+            }
+            if isinstance(metric, Histogram):
+                data["buckets"] = list(metric.upper_bounds)
+                data["samples"] = [
+                    [list(key), child.counts, child.sum, child.count]
+                    for key, child in list(metric._children.items())
+                ]
+            else:
+                data["samples"] = [[list(values), value] for _, _, values, value in metric.samples()]
+            metrics.append(data)
+        return metrics
+    
+    def merge(self, snapshot: List[dict], include_gauges: bool = True):
+        """Suma a este registro los valores de un snapshot de otro proceso."""
+        for data in snapshot:
+            labelnames = tuple(data["labelnames"])
+            if data["type"] == "histogram":
+                metric = self.histogram(data["name"], data["documentation"], labelnames, buckets=data["buckets"])
+                for values, counts, total, count in data["samples"]:
+                    child = metric.labels(*values)
+                    child.counts = [a + b for a, b in zip(child.counts, counts)]
+                    child.sum += total
+                    child.count += count
+            elif data["type"] == "counter" or include_gauges:
+                declare = self.counter if data["type"] == "counter" else self.gauge
+                metric = declare(data["name"], data["documentation"], labelnames)
+                for values, value in data["samples"]:
+                    metric.labels(*values).inc(value)
+
+
+REGISTRY = MetricsRegistry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP por endpoint",
+    ("method", "endpoint", "status"),
+)
+DB_POOL_CONNECTIONS = gauge(
+    "db_pool_connections",
+    "Conexiones del pool de PostgreSQL por estado",
+    ("pool", "state"),
+)
+DB_POOL_MAX_CONNECTIONS = gauge(
+    "db_pool_max_connections",
+    "Tamaño máximo del pool de PostgreSQL",
+    ("pool",),
+)
+
+
+def register_pool(name: str, pool) -> None:
+    """Expone la ocupación de un pool de asyncpg; se lee al hacer scrape."""
+    DB_POOL_CONNECTIONS.labels(name, "in_use").set_function(lambda: pool.get_size() - pool.get_idle_size())
+    DB_POOL_CONNECTIONS.labels(name, "idle").set_function(pool.get_idle_size)
+    DB_POOL_MAX_CONNECTIONS.labels(name).set_function(pool.get_max_size)
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mide la latencia de cada petición HTTP.
+    
+    El endpoint es la plantilla de la ruta (/anime/{id}), no la URL, para
+    que el número de series no dependa de los parámetros.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status_code = 500
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.labels(scope["method"], endpoint, status_code).observe(
+                time.perf_counter() - start
+            )
+
+
+async def start_metrics_server(
+    host: str,
+    port: int,
+    health: Optional[Callable[[], Awaitable[dict]]] = None,
+    registry: MetricsRegistry = REGISTRY,
+    routes: Optional[Dict[str, Callable[[], Awaitable[dict]]]] = None,
+) -> asyncio.AbstractServer:
+    """
+    Servidor HTTP mínimo con /metrics (y /health si se indica) para procesos sin API.
+    
+    Atiende una petición por conexión; basta para el scrape de Prometheus y
+    las sondas del orquestador. routes añade endpoints JSON extra; como
+    /health, responden 503 si el resultado trae un status distinto de
+    "healthy". Si el puerto está ocupado lanza OSError: un proceso que
+    arranca sin métricas ni sonda de salud no debe pasar desapercibido.
+    """
+    json_routes = dict(routes or {})
+    if health is not None:
+        json_routes["/health"] = health
+    
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            method, path = (parts[0], parts[1].split("?", 1)[0]) if len(parts) >= 2 else ("", "")
+            
+            if method != "GET":
+                status, content_type, body = "405 Method Not Allowed", "text/plain", b""
+            elif path == "/metrics":
+                status, content_type, body = "200 OK", CONTENT_TYPE, registry.render().encode("utf-8")
+            elif path in json_routes:
+                result = await json_routes[path]()
+                healthy = result.get("status", "healthy") == "healthy"
+                status = "200 OK" if healthy else "503 Service Unavailable"
+                content_type, body = "application/json", json.dumps(result, default=str).encode("utf-8")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain", b""
+            
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug(f"Error atendiendo petición de métricas: {e}")
+        finally:
+            writer.close()
+    
+    try:
+        server = await asyncio.start_server(handle, host, port)
+    except OSError as e:
+        logger.error(f"No se pudo abrir el servidor de métricas en {host}:{port}: {e}")
+        raise
+    logger.info(f"Servidor de métricas escuchando en {host}:{port}")
+    return server
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"metrics_{pid}.json")
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe pero es de otro usuario
+        pass
+    return True
+
+
+def write_snapshot(directory: str, registry: MetricsRegistry = REGISTRY) -> None:
+    """Vuelca el registro de este proceso en el directorio multiproceso (reemplazo atómico)."""
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory, os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"pid": os.getpid(), "metrics": registry.snapshot()}, f)
+    os.replace(tmp_path, path)
+
+
+def render_metrics(multiproc_dir: Optional[str] = None, registry: MetricsRegistry = REGISTRY) -> str:
+    """
+    Métricas en formato Prometheus; con multiproc_dir, sumadas entre todos los workers.
+    
+    El snapshot propio se escribe antes de leer, así que el worker que atiende
+    el scrape siempre aporta valores actuales; los demás, los de su último
+    volcado.
+    """
+    if not multiproc_dir:
+        return registry.render()
+    write_snapshot(multiproc_dir, registry)
+    merged = MetricsRegistry()
+    for name in sorted(os.listdir(multiproc_dir)):
+        if not (name.startswith("metrics_") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(multiproc_dir, name), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Snapshot de métricas ilegible {name}: {e}")
+            continue
+        merged.merge(data["metrics"], include_gauges=_pid_alive(data["pid"]))
+    return merged.render()
+
+
+async def run_snapshot_writer(directory: str, interval: float, registry: MetricsRegistry = REGISTRY):
+    """Vuelca el registro cada `interval` segundos, y una última vez al cancelarse."""
+    try:
+        while True:
+            try:
+                write_snapshot(directory, registry)
+            except OSError as e:
+                logger.warning(f"No se pudo escribir el snapshot de métricas en {directory}: {e}")
+            await asyncio.sleep(interval)
+    finally:
+        try:
+            write_snapshot(directory, registry)
+        except OSError as e:
+            logger.warning(f"No se pudo escribir el snapshot de métricas en {directory}: {e}")
@@ -1,5 +1,6 @@
 """Configuración de la aplicación con validación para producción."""
 import os
+import re
 from pydantic import Field, validator
 from pydantic_settings import BaseSettings
 from typing import Optional
@@ -27,20 +28,51 @@ class Settings(BaseSettings):
     POSTGRES_EVENT_STORE_DB: str = Field(default="cqrs_event_store", description="Base de datos del Event Store")
     POSTGRES_EVENT_STORE_MAX_CONNECTIONS: int = Field(default=10, ge=1, le=100)
     POSTGRES_EVENT_STORE_MIN_CONNECTIONS: int = Field(default=2, ge=1)
+    EVENT_STORE_GROUP_COMMIT_ENABLED: bool = Field(default=False, description="Agrupar escrituras concurrentes en una transacción")
+    EVENT_STORE_GROUP_COMMIT_MAX_DELAY_MS: int = Field(default=5, ge=0, description="Espera máxima para agrupar eventos")
+    EVENT_STORE_GROUP_COMMIT_MAX_BATCH_SIZE: int = Field(default=500, ge=1, description="Máximo de eventos por transacción")
+    EVENT_STORE_READ_CHUNK_SIZE: int = Field(default=1000, ge=1, description="Eventos por fetch al leer el historial de un agregado")
+    EVENT_STORE_PARTITION_PREMAKE_MONTHS: int = Field(default=3, ge=1, description="Particiones mensuales del Event Store creadas por adelantado")
+    EVENT_STORE_PARTITION_RETENTION_MONTHS: int = Field(default=0, ge=0, description="Meses de eventos que se mantienen en event_store antes de archivar la partición (0 = nunca)")
+    EVENT_STORE_ARCHIVE_SCHEMA: str = Field(default="event_store_archive", description="Esquema al que se mueven las particiones archivadas")
+    AGGREGATE_SNAPSHOTS_ENABLED: bool = Field(default=True, description="Cargar agregados desde snapshots y guardarlos periódicamente")
+    AGGREGATE_SNAPSHOT_INTERVAL: int = Field(default=1000, ge=1, description="Eventos nuevos desde el último snapshot para guardar otro")
     
     # Kafka
     KAFKA_BOOTSTRAP_SERVERS: str = Field(default="localhost:9092", description="Servidores de Kafka")
     KAFKA_TOPIC_EVENTS: str = Field(default="anime-events", description="Topic para eventos")
-    KAFKA_PRODUCER_RETRIES: int = Field(default=3, ge=0, description="Intentos de retry para producer")
+    KAFKA_PRODUCER_RETRIES: int = Field(default=3, ge=0, description="Intentos de retry del producer síncrono (kafka-python)")
+    KAFKA_PRODUCER_RETRY_BACKOFF_MS: int = Field(default=100, ge=0, description="Espera entre reintentos de envío a Kafka")
+    KAFKA_PRODUCER_REQUEST_TIMEOUT_MS: int = Field(default=40000, ge=1, description="Plazo de un envío a Kafka; aiokafka reintenta hasta agotarlo")
+    KAFKA_PRODUCER_LINGER_MS: int = Field(default=5, ge=0, description="Tiempo de espera para agrupar mensajes en un batch")
+    KAFKA_PRODUCER_MAX_BATCH_SIZE: int = Field(default=65536, ge=1, description="Tamaño máximo del batch por partición en bytes")
+    KAFKA_PRODUCER_COMPRESSION_TYPE: Optional[str] = Field(default=None, description="Compresión: gzip, snappy, lz4, zstd o vacío")
+    KAFKA_PRODUCER_ACKS: str = Field(default="all", description="Acks requeridos: 0, 1 o all")
+    KAFKA_PRODUCER_WAIT_FOR_DELIVERY: bool = Field(default=True, description="Esperar confirmación del broker antes de responder")
+    EVENT_FAST_PATH_ENABLED: bool = Field(default=True, description="Construir eventos del command side sin validación Pydantic y serializarlos una sola vez")
+    EVENT_SERIALIZATION_FORMAT: str = Field(default="json", description="Formato de los eventos en Kafka: json o binary")
+    EVENT_OUTBOX_ENABLED: bool = Field(default=False, description="Publicar a Kafka desde el outbox relay en lugar del command side")
+    OUTBOX_RELAY_BATCH_SIZE: int = Field(default=1000, ge=1, description="Eventos por lote del outbox relay")
+    OUTBOX_RELAY_POLL_INTERVAL_MS: int = Field(default=200, ge=1, description="Espera entre lecturas cuando no hay eventos nuevos")
+    OUTBOX_RELAY_ERROR_BACKOFF_SECONDS: int = Field(default=5, ge=1, description="Espera tras un error del relay")
     KAFKA_CONSUMER_GROUP_ID: str = Field(default="read-side-consumer-group", description="Group ID del consumer")
     KAFKA_CONSUMER_AUTO_OFFSET_RESET: str = Field(default="earliest", description="Auto offset reset")
     KAFKA_CONSUMER_ENABLE_AUTO_COMMIT: bool = Field(default=False, description="Auto commit de offsets")
+    KAFKA_CONSUMER_BATCH_ENABLED: bool = Field(default=True, description="Procesar los eventos en lotes por poll")
+    KAFKA_CONSUMER_MAX_POLL_RECORDS: int = Field(default=500, description="Máximo de mensajes por poll del consumer")
+    KAFKA_CONSUMER_POLL_TIMEOUT_MS: int = Field(default=1000, description="Timeout en ms de cada poll del consumer")
+    KAFKA_CONSUMER_MAX_CONCURRENCY: int = Field(default=4, ge=1, description="Grupos de mensajes procesados en paralelo por poll")
+    KAFKA_CONSUMER_PARALLEL_MODE: str = Field(default="partition", description="Agrupación para procesar en paralelo (partition, key)")
     
     # API - Command Side
     API_HOST: str = Field(default="0.0.0.0", description="Host del API")
     API_PORT: int = Field(default_factory=lambda: int(os.getenv("PORT", "8000")), ge=1, le=65535, description="Puerto del API")
     API_WORKERS: int = Field(default=4, ge=1, le=32, description="Número de workers")
     API_RELOAD: bool = Field(default=False, description="Auto-reload (solo desarrollo)")
+    ANIME_INDEX_ENABLED: bool = Field(default=True, description="Validar anime_id contra un índice en memoria")
+    ANIME_INDEX_REFRESH_INTERVAL: int = Field(default=60, ge=1, description="Intervalo de refresco incremental del índice en segundos")
+    ANIME_INDEX_FULL_REFRESH_EVERY: int = Field(default=10, ge=1, description="Cada cuántos refrescos se reconstruye el índice completo")
+    COMMAND_BATCH_MAX_SIZE: int = Field(default=1000, ge=1, le=10000, description="Máximo de comandos por lote en /batch")
     
     # GraphQL - Read Side
     GRAPHQL_HOST: str = Field(default="0.0.0.0", description="Host de GraphQL")
@@ -57,13 +89,34 @@ class Settings(BaseSettings):
     )
     
     # Monitoring
-    ENABLE_METRICS: bool = Field(default=True, description="Habilitar métricas")
-    METRICS_PORT: int = Field(default=9090, ge=1, le=65535, description="Puerto para métricas")
+    ENABLE_METRICS: bool = Field(default=True, description="Habilitar métricas (/metrics en formato Prometheus)")
+    METRICS_HOST: str = Field(default="0.0.0.0", description="Host del servidor de métricas del consumer y del relay")
+    CONSUMER_METRICS_PORT: int = Field(default=9090, ge=1, le=65535, description="Puerto del servidor de métricas del consumer")
+    RELAY_METRICS_PORT: int = Field(default=9091, ge=1, le=65535, description="Puerto del servidor de métricas del outbox relay")
+    METRICS_MULTIPROC_DIR: Optional[str] = Field(
+        default=None,
+        description="Directorio donde los workers de un API vuelcan sus métricas para sumarlas en /metrics (vacío: sólo el proceso actual)"
+    )
+    METRICS_FLUSH_INTERVAL: float = Field(default=5.0, gt=0, description="Segundos entre volcados de métricas de cada worker")
     
     # Cache
     CACHE_ENABLED: bool = Field(default=True, description="Habilitar caché")
     CACHE_DEFAULT_TTL: int = Field(default=300, ge=1, description="TTL por defecto en segundos (5 minutos)")
     CACHE_STATS_ENABLED: bool = Field(default=True, description="Habilitar estadísticas de caché")
+    CACHE_MAX_ENTRIES: int = Field(default=10000, ge=1, description="Máximo de entradas en caché (desalojo LRU)")
+    CACHE_MAX_BYTES: int = Field(default=64 * 1024 * 1024, ge=1, description="Máximo de bytes estimados en caché")
+    CACHE_SWEEP_INTERVAL: int = Field(default=60, ge=1, description="Intervalo en segundos de limpieza de entradas expiradas")
+    CACHE_STALE_WHILE_REVALIDATE: bool = Field(default=False, description="Servir valores expirados mientras se recargan en background")
+    CACHE_STALE_TTL: int = Field(default=30, ge=1, description="Segundos que un valor expirado puede servirse mientras se revalida")
+    LEADERBOARD_ENABLED: bool = Field(default=True, description="Servir los top por views/rating desde rankings en memoria")
+    LEADERBOARD_CAPACITY: int = Field(default=200, ge=100, description="Filas mantenidas por ranking (>= límite máximo de 100)")
+    LEADERBOARD_FULL_REFRESH_INTERVAL: int = Field(default=300, ge=1, description="Segundos entre recargas completas de los rankings")
+    CACHE_INVALIDATION_ENABLED: bool = Field(default=True, description="Invalidar cachés del read side vía LISTEN/NOTIFY")
+    CACHE_INVALIDATION_CHANNEL: str = Field(default="anime_cache_invalidation", description="Canal de Postgres para invalidación de caché")
+    
+    # Projection rebuild
+    PROJECTION_REBUILD_WORKERS: int = Field(default=4, ge=1, le=64, description="Procesos que reconstruyen las proyecciones en paralelo")
+    PROJECTION_REBUILD_FETCH_SIZE: int = Field(default=50000, ge=1000, description="Eventos leídos por fetch del cursor del Event Store")
 
     @validator("ENVIRONMENT")
     def validate_environment(cls, v):
@@ -73,6 +126,47 @@ class Settings(BaseSettings):
             raise ValueError(f"ENVIRONMENT debe ser uno de: {', '.join(allowed)}")
         return v
     
+    @validator("KAFKA_PRODUCER_COMPRESSION_TYPE")
+    def validate_compression_type(cls, v):
+        """Valida que el tipo de compresión sea soportado."""
+        if not v:
+            return None
+        allowed = ["gzip", "snappy", "lz4", "zstd"]
+        if v not in allowed:
+            raise ValueError(f"KAFKA_PRODUCER_COMPRESSION_TYPE debe ser uno de: {', '.join(allowed)}")
+        return v
+    
+    @validator("EVENT_SERIALIZATION_FORMAT")
+    def validate_event_serialization_format(cls, v):
+        """Valida el formato de serialización de eventos."""
+        allowed = ["json", "binary"]
+        if v not in allowed:
+            raise ValueError(f"EVENT_SERIALIZATION_FORMAT debe ser uno de: {', '.join(allowed)}")
+        return v
+    
+    @validator("EVENT_STORE_ARCHIVE_SCHEMA")
+    def validate_archive_schema(cls, v):
+        """Valida que el esquema de archivo sea un identificador SQL simple."""
+        if not re.fullmatch(r"[a-z_][a-z0-9_]*", v):
+            raise ValueError("EVENT_STORE_ARCHIVE_SCHEMA debe ser un identificador en minúsculas (a-z, 0-9, _)")
+        return v
+    
+    @validator("KAFKA_PRODUCER_ACKS")
+    def validate_acks(cls, v):
+        """Valida el valor de acks del producer."""
+        allowed = ["0", "1", "all"]
+        if v not in allowed:
+            raise ValueError(f"KAFKA_PRODUCER_ACKS debe ser uno de: {', '.join(allowed)}")
+        return v
+    
+    @validator("KAFKA_CONSUMER_PARALLEL_MODE")
+    def validate_consumer_parallel_mode(cls, v):
+        """Valida el modo de paralelismo del consumer."""
+        allowed = ["partition", "key"]
+        if v not in allowed:
+            raise ValueError(f"KAFKA_CONSUMER_PARALLEL_MODE debe ser uno de: {allowed}")
+        return v
+    
     @validator("LOG_LEVEL")
     def validate_log_level(cls, v):
         """Valida que el nivel de log sea válido."""
@@ -1,10 +1,26 @@
 """Script para cargar el dataset de MAL desde CSV a PostgreSQL."""
+import argparse
 import asyncio
 import csv
-import json
+import sys
 from pathlib import Path
-from typing import Optional
+
+# Añadir el directorio raíz al PYTHONPATH
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
 import asyncpg
+from app.read_side.infrastructure.catalog_loader import (
+    ANIME_COLUMNS,
+    COLUMNS,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MAX_DELETE_FRACTION,
+    CatalogBulkLoader,
+    content_hash,
+    ensure_catalog_columns,
+    parse_record,
+)
+from common.exceptions import CatalogSyncError
 from config.settings import settings
 
 
@@ -46,35 +62,8 @@ async def create_table(conn: asyncpg.Connection):
     """)
 
 
-def parse_value(value: str, field_type: str) -> Optional[any]:
-    """Parsea un valor del CSV según su tipo."""
-    if not value or value.strip() == "":
-        return None
-    
-    value = value.strip()
-    
-    if field_type == "int":
-        try:
-            # Manejar valores con comas (ej: "2,008,019")
-            return int(value.replace(",", ""))
-        except (ValueError, AttributeError):
-            return None
-    elif field_type == "float":
-        try:
-            return float(value)
-        except (ValueError, AttributeError):
-            return None
-    elif field_type == "json":
-        try:
-            return json.loads(value)
-        except (json.JSONDecodeError, AttributeError):
-            return None
-    else:
-        return value
-
-
 async def load_csv_to_db(csv_path: Path, batch_size: int = 100):
-    """Carga el CSV a PostgreSQL."""
+    """Carga el CSV a PostgreSQL fila a fila, en lotes de executemany."""
     conn = await asyncpg.connect(
         host=settings.POSTGRES_HOST,
         port=settings.POSTGRES_PORT,
@@ -85,6 +74,7 @@ async def load_csv_to_db(csv_path: Path, batch_size: int = 100):
     
     try:
         await create_table(conn)
+        await ensure_catalog_columns(conn)
         
         # Leer CSV
         with open(csv_path, "r", encoding="utf-8") as f:
@@ -93,36 +83,7 @@ async def load_csv_to_db(csv_path: Path, batch_size: int = 100):
             total_inserted = 0
             
             for row in reader:
-                # Parsear valores
-                anime_data = {
-                    "myanimelist_id": parse_value(row.get("myanimelist_id", ""), "int"),
-                    "title": parse_value(row.get("title", ""), "str"),
-                    "description": parse_value(row.get("description", ""), "str"),
-                    "image": parse_value(row.get("image", ""), "str"),
-                    "type": parse_value(row.get("Type", ""), "str"),
-                    "episodes": parse_value(row.get("Episodes", ""), "float"),
-                    "status": parse_value(row.get("Status", ""), "str"),
-                    "premiered": parse_value(row.get("Premiered", ""), "str"),
-                    "released_season": parse_value(row.get("Released_Season", ""), "str"),
-                    "released_year": parse_value(row.get("Released_Year", ""), "float"),
-                    "source": parse_value(row.get("Source", ""), "str"),
-                    "genres": parse_value(row.get("Genres", ""), "str"),
-                    "themes": parse_value(row.get("Themes", ""), "str"),
-                    "studios": parse_value(row.get("Studios", ""), "str"),
-                    "producers": parse_value(row.get("Producers", ""), "str"),
-                    "demographic": parse_value(row.get("Demographic", ""), "str"),
-                    "duration": parse_value(row.get("Duration", ""), "str"),
-                    "rating": parse_value(row.get("Rating", ""), "str"),
-                    "score": parse_value(row.get("Score", ""), "float"),
-                    "ranked": parse_value(row.get("Ranked", ""), "int"),
-                    "popularity": parse_value(row.get("Popularity", ""), "int"),
-                    "members": parse_value(row.get("Members", ""), "int"),
-                    "favorites": parse_value(row.get("Favorites", ""), "int"),
-                    "characters": parse_value(row.get("characters", ""), "json"),
-                    "source_url": parse_value(row.get("source_url", ""), "str"),
-                }
-                
-                batch.append(anime_data)
+                batch.append(parse_record([row.get(csv_header) for _, csv_header, _ in COLUMNS]))
                 
                 if len(batch) >= batch_size:
                     await insert_batch(conn, batch)
@@ -143,86 +104,112 @@ async def load_csv_to_db(csv_path: Path, batch_size: int = 100):
 
 async def insert_batch(conn: asyncpg.Connection, batch: list):
     """Inserta un batch de registros."""
-    await conn.executemany("""
-        INSERT INTO animes (
-            myanimelist_id, title, description, image, type, episodes,
-            status, premiered, released_season, released_year, source,
-            genres, themes, studios, producers, demographic, duration,
-            rating, score, ranked, popularity, members, favorites,
-            characters, source_url
-        ) VALUES (
-            $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13,
-            $14, $15, $16, $17, $18, $19, $20, $21, $22, $23, $24
-        ) ON CONFLICT (myanimelist_id) DO UPDATE SET
-            title = EXCLUDED.title,
-            description = EXCLUDED.description,
-            image = EXCLUDED.image,
-            type = EXCLUDED.type,
-            episodes = EXCLUDED.episodes,
-            status = EXCLUDED.status,
-            premiered = EXCLUDED.premiered,
-            released_season = EXCLUDED.released_season,
-            released_year = EXCLUDED.released_year,
-            source = EXCLUDED.source,
-            genres = EXCLUDED.genres,
-            themes = EXCLUDED.themes,
-            studios = EXCLUDED.studios,
-            producers = EXCLUDED.producers,
-            demographic = EXCLUDED.demographic,
-            duration = EXCLUDED.duration,
-            rating = EXCLUDED.rating,
-            score = EXCLUDED.score,
-            ranked = EXCLUDED.ranked,
-            popularity = EXCLUDED.popularity,
-            members = EXCLUDED.members,
-            favorites = EXCLUDED.favorites,
-            characters = EXCLUDED.characters,
-            source_url = EXCLUDED.source_url
-    """, [
-        (
-            item["myanimelist_id"],
-            item["title"],
-            item["description"],
-            item["image"],
-            item["type"],
-            int(item["episodes"]) if item["episodes"] else None,
-            item["status"],
-            item["premiered"],
-            item["released_season"],
-            float(item["released_year"]) if item["released_year"] else None,
-            item["source"],
-            item["genres"],
-            item["themes"],
-            item["studios"],
-            item["producers"],
-            item["demographic"],
-            item["duration"],
-            item["rating"],
-            item["score"],
-            item["ranked"],
-            item["popularity"],
-            item["members"],
-            item["favorites"],
-            json.dumps(item["characters"]) if item["characters"] else None,
-            item["source_url"],
-        )
-        for item in batch
-    ])
-
-
-async def main():
-    """Función principal."""
-    csv_path = Path(__file__).parent.parent / "data" / "mal_anime.csv"
+    placeholders = ", ".join(f"${position}" for position in range(1, len(ANIME_COLUMNS) + 2))
+    updates = ",\n            ".join(f"{column} = EXCLUDED.{column}" for column in ANIME_COLUMNS[1:])
+    await conn.executemany(f"""
+        INSERT INTO animes ({", ".join(ANIME_COLUMNS)}, content_hash)
+        VALUES ({placeholders})
+        ON CONFLICT (myanimelist_id) DO UPDATE SET
+            {updates},
+            content_hash = EXCLUDED.content_hash
+    """, [record + (content_hash(record),) for record in batch])
+
+
+async def load_csv_bulk(csv_path: Path, chunk_size: int, workers: int):
+    """Carga el CSV con COPY a una tabla de staging y un merge en bloque."""
+    conn = await asyncpg.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+        command_timeout=None,
+    )
+    
+    try:
+        await create_table(conn)
+        totals = await CatalogBulkLoader(chunk_size=chunk_size, workers=workers).load(conn, csv_path)
+    finally:
+        await conn.close()
     
+    print(f"Filas leídas: {totals['rows']}")
+    print(f"Insertados: {totals['inserted']}, actualizados: {totals['updated']}, sin cambios o descartados: {totals['unchanged']}")
+
+
+async def sync_csv(csv_path: Path, chunk_size: int, workers: int, max_delete_fraction: float):
+    """Sincroniza animes con el CSV: altas, cambios y bajas, con change log e invalidación de caché."""
+    conn = await asyncpg.connect(
+        host=settings.POSTGRES_HOST,
+        port=settings.POSTGRES_PORT,
+        user=settings.POSTGRES_USER,
+        password=settings.POSTGRES_PASSWORD,
+        database=settings.POSTGRES_DB,
+        command_timeout=None,
+    )
+    
+    try:
+        await create_table(conn)
+        loader = CatalogBulkLoader(chunk_size=chunk_size, workers=workers)
+        changes = await loader.sync(conn, csv_path, max_delete_fraction)
+    except CatalogSyncError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        await conn.close()
+    
+    print(f"Insertados: {len(changes.inserted)}, actualizados: {len(changes.updated)}, eliminados: {len(changes.deleted)}")
+
+
+async def main(
+    csv_path: Path,
+    bulk: bool,
+    sync: bool,
+    chunk_size: int,
+    workers: int,
+    max_delete_fraction: float,
+):
+    """Función principal."""
     if not csv_path.exists():
         print(f"Error: No se encuentra el archivo {csv_path}")
         return
     
     print(f"Cargando datos desde {csv_path}...")
-    await load_csv_to_db(csv_path)
+    if sync:
+        await sync_csv(csv_path, chunk_size, workers, max_delete_fraction)
+    elif bulk:
+        await load_csv_bulk(csv_path, chunk_size, workers)
+    else:
+        await load_csv_to_db(csv_path)
     print("Carga completada!")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
-
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "csv_path", nargs="?", type=Path, default=root_dir / "data" / "mal_anime.csv",
+        help="CSV del dataset de MAL",
+    )
+    parser.add_argument(
+        "--bulk", action="store_true",
+        help="Cargar con COPY + merge en bloque, saltando las filas sin cambios",
+    )
+    parser.add_argument(
+        "--sync", action="store_true",
+        help="Sincronizar el catálogo completo: insertar, actualizar y borrar sólo lo que cambia",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+        help="Filas por bloque de COPY en modo --bulk/--sync",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="Procesos para parsear el CSV en modo --bulk/--sync",
+    )
+    parser.add_argument(
+        "--max-delete-fraction", type=float, default=DEFAULT_MAX_DELETE_FRACTION,
+        help="Fracción máxima del catálogo que --sync puede borrar antes de abortar",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(
+        args.csv_path, args.bulk, args.sync, args.chunk_size, args.workers, args.max_delete_fraction,
+    ))
@@ -0,0 +1,43 @@
+"""Script para crear las particiones futuras del Event Store y archivar las antiguas."""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Añadir el directorio raíz al PYTHONPATH
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from app.command_side.infrastructure.event_store_partitions import EventStorePartitionManager
+from config.settings import settings
+
+
+async def main(premake_months: int, retention_months: int):
+    """Función principal."""
+    manager = EventStorePartitionManager(premake_months=premake_months, retention_months=retention_months)
+    
+    try:
+        created, archived = await manager.maintain()
+    finally:
+        await manager.close()
+    
+    for partition in created:
+        print(f"✓ Partición creada: {partition.name} [{partition.start}, {partition.end})")
+    for partition in archived:
+        print(f"✓ Partición archivada: {partition.name} -> {settings.EVENT_STORE_ARCHIVE_SCHEMA}")
+    if not created and not archived:
+        print("✓ Particiones del Event Store al día")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--premake-months", type=int, default=settings.EVENT_STORE_PARTITION_PREMAKE_MONTHS,
+        help="Meses futuros con partición creada de antemano",
+    )
+    parser.add_argument(
+        "--retention-months", type=int, default=settings.EVENT_STORE_PARTITION_RETENTION_MONTHS,
+        help="Meses que se mantienen en event_store (0 = no archivar)",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.premake_months, args.retention_months))
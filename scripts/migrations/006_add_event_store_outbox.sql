@@ -0,0 +1,22 @@
+-- Migración: Outbox transaccional sobre el Event Store
+-- Descripción: Añade una posición global segura respecto al commit y el checkpoint del relay a Kafka
+
+-- (transaction_id, id) define el orden global de publicación. id por sí solo no basta:
+-- una transacción que obtiene un id menor puede hacer commit después de otra con id mayor.
+ALTER TABLE event_store
+    ADD COLUMN IF NOT EXISTS transaction_id xid8 NOT NULL DEFAULT pg_current_xact_id();
+
+CREATE INDEX IF NOT EXISTS idx_event_store_transaction_position
+ON event_store(transaction_id, id);
+
+CREATE TABLE IF NOT EXISTS outbox_checkpoints (
+    relay_name VARCHAR(100) PRIMARY KEY,
+    last_transaction_id xid8 NOT NULL,
+    last_position BIGINT NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- El checkpoint no se siembra aquí: lo crea el relay en su primer arranque con el outbox activo,
+-- en la posición segura de ese momento (los eventos anteriores los publicó el command side).
+
+COMMENT ON TABLE outbox_checkpoints IS 'Última posición (transaction_id, id) publicada a Kafka por cada relay';
@@ -0,0 +1,17 @@
+-- Agregado incremental de ratings en anime_stats
+-- average_rating se deriva de rating_sum / total_ratings sin recorrer anime_ratings
+
+ALTER TABLE anime_stats
+ADD COLUMN IF NOT EXISTS rating_sum NUMERIC(14, 2) NOT NULL DEFAULT 0;
+
+-- Backfill desde las calificaciones existentes
+UPDATE anime_stats s
+SET rating_sum = r.rating_sum,
+    total_ratings = r.rating_count,
+    average_rating = ROUND(r.rating_sum / r.rating_count, 2)
+FROM (
+    SELECT anime_id, SUM(rating) AS rating_sum, COUNT(*) AS rating_count
+    FROM anime_ratings
+    GROUP BY anime_id
+) r
+WHERE s.anime_id = r.anime_id;
@@ -0,0 +1,5 @@
+-- Migración: Índice para leer el historial de un agregado en orden
+-- Descripción: Permite recorrer los eventos de un agregado por (version, id) con un cursor sin ordenar en memoria
+
+CREATE INDEX IF NOT EXISTS idx_event_store_aggregate_version
+ON event_store(aggregate_id, version, id);
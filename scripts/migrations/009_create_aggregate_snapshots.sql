@@ -0,0 +1,19 @@
+-- Migración: Snapshots de agregados
+-- Descripción: Estado plegado de cada agregado en una posición del Event Store, para cargarlo sin reproducir todo su historial
+
+CREATE TABLE IF NOT EXISTS aggregate_snapshots (
+    aggregate_id VARCHAR(255) PRIMARY KEY,
+    aggregate_type VARCHAR(100) NOT NULL,
+    version INTEGER NOT NULL,
+    state JSONB NOT NULL,
+    -- Posición (transaction_id, id) del último evento incluido, en orden de commit
+    last_transaction_id xid8 NOT NULL,
+    last_position BIGINT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Cola de eventos de un agregado posterior a un snapshot
+CREATE INDEX IF NOT EXISTS idx_event_store_aggregate_transaction_position
+ON event_store(aggregate_id, transaction_id, id);
+
+COMMENT ON TABLE aggregate_snapshots IS 'Último snapshot de cada agregado; version es el número de eventos plegados';
@@ -0,0 +1,104 @@
+-- Migración: Particionado mensual del Event Store
+-- Descripción: Convierte event_store en una tabla particionada por rango de occurred_at (una partición por mes)
+-- con índices BRIN sobre el tiempo. Las particiones futuras las crea scripts/manage_event_store_partitions.py.
+
+-- Las restricciones únicas de una tabla particionada deben incluir la clave de partición:
+-- la clave primaria pasa a ser (id, occurred_at) y la deduplicación por event_id a (event_id, occurred_at).
+-- Un reintento del mismo evento conserva su occurred_at, así que sigue siendo idempotente.
+
+CREATE SCHEMA IF NOT EXISTS event_store_archive;
+
+DO $$
+DECLARE
+    first_month DATE;
+    last_month DATE;
+    month_start DATE;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'event_store'::regclass
+    ) THEN
+        RETURN;
+    END IF;
+
+    LOCK TABLE event_store IN ACCESS EXCLUSIVE MODE;
+
+    -- La secuencia de id sobrevive a la tabla original
+    ALTER SEQUENCE event_store_id_seq OWNED BY NONE;
+
+    CREATE TABLE event_store__partitioned (
+        id BIGINT NOT NULL DEFAULT nextval('event_store_id_seq'),
+        event_id VARCHAR(255) NOT NULL,
+        event_type VARCHAR(255) NOT NULL,
+        aggregate_id VARCHAR(255) NOT NULL,
+        event_data JSONB NOT NULL,
+        occurred_at TIMESTAMP NOT NULL,
+        version INTEGER NOT NULL DEFAULT 1,
+        metadata JSONB DEFAULT '{}',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        transaction_id xid8 NOT NULL DEFAULT pg_current_xact_id()
+    ) PARTITION BY RANGE (occurred_at);
+
+    -- Un mes por partición desde el evento más antiguo hasta dos meses por delante
+    SELECT date_trunc('month', COALESCE(MIN(occurred_at), CURRENT_TIMESTAMP))::date
+    INTO first_month
+    FROM event_store;
+    last_month := (date_trunc('month', CURRENT_TIMESTAMP) + INTERVAL '2 months')::date;
+
+    month_start := first_month;
+    WHILE month_start <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF event_store__partitioned FOR VALUES FROM (%L) TO (%L)',
+            'event_store_' || to_char(month_start, '"y"YYYY"m"MM'),
+            month_start,
+            (month_start + INTERVAL '1 month')::date
+        );
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+
+    -- Red de seguridad para eventos fuera de las particiones creadas
+    CREATE TABLE event_store_default PARTITION OF event_store__partitioned DEFAULT;
+
+    -- Conserva id y transaction_id: el orden (transaction_id, id) del outbox no cambia
+    INSERT INTO event_store__partitioned (
+        id, event_id, event_type, aggregate_id, event_data,
+        occurred_at, version, metadata, created_at, transaction_id
+    )
+    SELECT id, event_id, event_type, aggregate_id, event_data,
+           occurred_at, version, metadata, created_at, transaction_id
+    FROM event_store;
+
+    DROP TABLE event_store;
+    ALTER TABLE event_store__partitioned RENAME TO event_store;
+    ALTER SEQUENCE event_store_id_seq OWNED BY event_store.id;
+
+    ALTER TABLE event_store ADD CONSTRAINT event_store_pkey PRIMARY KEY (id, occurred_at);
+    ALTER TABLE event_store ADD CONSTRAINT event_store_event_id_key UNIQUE (event_id, occurred_at);
+END
+$$;
+
+-- Índices por partición: cada uno crece sólo con los eventos de su mes.
+-- occurred_at llega casi ordenado, así que BRIN ocupa unas pocas páginas frente a un B-tree por fila.
+CREATE INDEX IF NOT EXISTS idx_event_store_occurred_at
+ON event_store USING BRIN (occurred_at) WITH (pages_per_range = 32);
+
+CREATE INDEX IF NOT EXISTS idx_event_store_created_at
+ON event_store USING BRIN (created_at) WITH (pages_per_range = 32);
+
+CREATE INDEX IF NOT EXISTS idx_event_store_transaction_position
+ON event_store(transaction_id, id);
+
+-- Los mismos índices que crea 001: la tabla original se descarta con los suyos, y así una
+-- base migrada y una nueva tienen el mismo esquema (001 se vuelve a ejecutar sin efecto)
+CREATE INDEX IF NOT EXISTS idx_event_store_aggregate_id
+ON event_store(aggregate_id);
+
+CREATE INDEX IF NOT EXISTS idx_event_store_event_type
+ON event_store(event_type);
+
+CREATE INDEX IF NOT EXISTS idx_event_store_aggregate_version
+ON event_store(aggregate_id, version, id);
+
+CREATE INDEX IF NOT EXISTS idx_event_store_aggregate_transaction_position
+ON event_store(aggregate_id, transaction_id, id);
+
+COMMENT ON TABLE event_store IS 'Event Store particionado por mes de occurred_at; las particiones antiguas se archivan en event_store_archive';
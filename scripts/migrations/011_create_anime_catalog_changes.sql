@@ -0,0 +1,15 @@
+-- Migración: Registro de cambios del catálogo de animes
+-- Descripción: Altas, cambios y bajas escritos por la sincronización incremental del catálogo,
+-- para que el índice de IDs del command side se actualice sin releer animes completa
+
+CREATE TABLE IF NOT EXISTS anime_catalog_changes (
+    change_id BIGSERIAL PRIMARY KEY,
+    anime_id INTEGER NOT NULL,
+    change_type VARCHAR(10) NOT NULL CHECK (change_type IN ('insert', 'update', 'delete')),
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_anime_catalog_changes_changed_at
+ON anime_catalog_changes(changed_at);
+
+COMMENT ON TABLE anime_catalog_changes IS 'Change log del catálogo de animes; change_id crece en orden de commit (una sincronización a la vez)';
@@ -0,0 +1,12 @@
+-- Migración: Posición de commit en animes
+-- Descripción: Transacción que insertó cada anime, para que el índice de IDs del command side
+-- lea las altas en orden de commit. created_at es la hora de inicio de la transacción: una carga
+-- que empezó antes pero hizo commit después de un refresco quedaría por debajo de la marca.
+
+ALTER TABLE animes
+    ADD COLUMN IF NOT EXISTS transaction_id xid8 NOT NULL DEFAULT pg_current_xact_id();
+
+CREATE INDEX IF NOT EXISTS idx_animes_transaction_id
+ON animes(transaction_id);
+
+COMMENT ON COLUMN animes.transaction_id IS 'Transacción que insertó la fila; el índice de IDs relee desde pg_snapshot_xmin de su último refresco';
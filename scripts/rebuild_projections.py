@@ -0,0 +1,39 @@
+"""Script para reconstruir las proyecciones del read side desde el Event Store."""
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Añadir el directorio raíz al PYTHONPATH
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from app.read_side.projections.rebuild import ProjectionRebuilder
+from config.settings import settings
+
+
+async def main(workers: int, fetch_size: int):
+    """Función principal."""
+    rebuilder = ProjectionRebuilder(workers=workers, fetch_size=fetch_size)
+    
+    print(f"Reconstruyendo proyecciones desde {settings.POSTGRES_EVENT_STORE_DB} con {workers} workers...")
+    totals = await rebuilder.rebuild()
+    
+    print(f"✓ Eventos leídos: {totals['events']} ({totals['skipped']} descartados)")
+    print(f"✓ Eventos aplicados tras el snapshot: {totals['tail']}")
+    for table in ("anime_clicks", "anime_views", "anime_ratings", "anime_stats"):
+        print(f"✓ {table}: {totals.get(table, 0)} filas")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--workers", type=int, default=settings.PROJECTION_REBUILD_WORKERS,
+        help="Procesos en paralelo (particiones por hash de aggregate_id)",
+    )
+    parser.add_argument(
+        "--fetch-size", type=int, default=settings.PROJECTION_REBUILD_FETCH_SIZE,
+        help="Eventos leídos por fetch del cursor",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.workers, args.fetch_size))
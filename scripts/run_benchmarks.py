@@ -0,0 +1,85 @@
+"""Script para ejecutar los benchmarks de throughput y latencia y guardar los resultados en JSON."""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+# Añadir el directorio raíz al PYTHONPATH
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from benchmarks.harness import compare_results
+from benchmarks.scenarios import SCENARIOS, BenchmarkConfig, run_benchmarks
+
+
+def _int_list(value: str):
+    return tuple(int(item) for item in value.split(",") if item)
+
+
+async def main(args) -> int:
+    """Función principal; devuelve el código de salida."""
+    # Los logs van a stdout: por defecto solo avisos, para no medir ni mezclar el logging por petición
+    logging.getLogger().setLevel(getattr(logging, args.log_level))
+    config = BenchmarkConfig(
+        target=args.target,
+        iterations=args.iterations,
+        warmup=args.warmup,
+        concurrency=args.concurrency,
+        batch_sizes=args.batch_sizes,
+        projection_batch_size=args.projection_batch_size,
+        anime_count=args.anime_count,
+        fake_latency_ms=args.fake_latency_ms,
+        seed=args.seed,
+    )
+    document = await run_benchmarks(args.scenarios, config)
+    
+    output = json.dumps(document, indent=2, default=str)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    
+    for result in document["results"]:
+        print(
+            f"{result['scenario']:<18} {result['case']:<48} "
+            f"{result['items_per_second']:>12.1f} items/s  p99 {result['latency_ms']['p99']:>9.3f}ms",
+            file=sys.stderr,
+        )
+    
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare_results(document, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"✗ Regresión: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"✓ Sin regresiones respecto a {args.compare} (tolerancia {args.tolerance:.0%})", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "scenarios", nargs="*", default=list(SCENARIOS),
+        help=f"Escenarios a ejecutar (por defecto todos): {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument(
+        "--target", choices=("fake", "live"), default="fake",
+        help="fake: dobles en proceso; live: Postgres y Kafka según la configuración (usar una base de pruebas)",
+    )
+    parser.add_argument("--iterations", type=int, default=2000, help="Operaciones medidas por caso")
+    parser.add_argument("--warmup", type=int, default=50, help="Operaciones previas sin medir por caso")
+    parser.add_argument("--concurrency", type=_int_list, default=(1, 16, 64), help="Niveles de concurrencia, p. ej. 1,16,64")
+    parser.add_argument("--batch-sizes", type=_int_list, default=(1, 10, 100, 1000), help="Tamaños de lote de save_events")
+    parser.add_argument("--projection-batch-size", type=int, default=100, help="Eventos por lote en process_batch")
+    parser.add_argument("--anime-count", type=int, default=500, help="anime_id distintos en la carga de trabajo")
+    parser.add_argument("--fake-latency-ms", type=float, default=0.5, help="Latencia simulada por query con --target fake")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de la carga de trabajo")
+    parser.add_argument("--output", help="Fichero JSON de resultados (por defecto stdout)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior contra el que detectar regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Empeoramiento tolerado antes de fallar (0.1 = 10%%)")
+    parser.add_argument("--log-level", default="WARNING", choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
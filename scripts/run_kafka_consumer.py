@@ -8,13 +8,23 @@ root_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(root_dir))
 
 from app.read_side.infrastructure.kafka_consumer import KafkaEventConsumer
+from common.utils.metrics import start_metrics_server
+from config.settings import settings
 
 
 async def main():
     """Función principal."""
     consumer = KafkaEventConsumer()
+    metrics_server = None
     
     try:
+        if settings.ENABLE_METRICS:
+            metrics_server = await start_metrics_server(
+                settings.METRICS_HOST,
+                settings.CONSUMER_METRICS_PORT,
+                health=consumer.health_check,
+                routes={"/lag": consumer.lag_report},
+            )
         await consumer.start()
         print("Consumidor de Kafka iniciado. Presiona Ctrl+C para detener.")
         await consumer.consume_events()
@@ -22,6 +32,8 @@ async def main():
         print("\nDeteniendo consumidor...")
     finally:
         await consumer.stop()
+        if metrics_server:
+            metrics_server.close()
         print("Consumidor detenido.")
 
 
@@ -58,6 +58,13 @@ async def main():
     migrations = [
         (settings.POSTGRES_EVENT_STORE_DB, migrations_dir / "001_create_event_store.sql"),
         (settings.POSTGRES_DB, migrations_dir / "002_create_read_model.sql"),
+        (settings.POSTGRES_EVENT_STORE_DB, migrations_dir / "006_add_event_store_outbox.sql"),
+        (settings.POSTGRES_DB, migrations_dir / "007_add_rating_sum.sql"),
+        (settings.POSTGRES_EVENT_STORE_DB, migrations_dir / "008_add_event_store_aggregate_version_index.sql"),
+        (settings.POSTGRES_EVENT_STORE_DB, migrations_dir / "009_create_aggregate_snapshots.sql"),
+        (settings.POSTGRES_EVENT_STORE_DB, migrations_dir / "010_partition_event_store.sql"),
+        (settings.POSTGRES_DB, migrations_dir / "011_create_anime_catalog_changes.sql"),
+        (settings.POSTGRES_DB, migrations_dir / "012_add_animes_transaction_id.sql"),
     ]
     
     print("Ejecutando migraciones...")
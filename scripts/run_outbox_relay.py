@@ -0,0 +1,42 @@
+"""Script para ejecutar el outbox relay (Event Store -> Kafka)."""
+import asyncio
+import sys
+from pathlib import Path
+
+# Añadir el directorio raíz al PYTHONPATH
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+from app.command_side.infrastructure.outbox_relay import OutboxRelay
+from common.utils.metrics import start_metrics_server
+from config.settings import settings
+
+
+async def main():
+    """Función principal."""
+    if not settings.EVENT_OUTBOX_ENABLED:
+        print("EVENT_OUTBOX_ENABLED=false: el command side publica directamente a Kafka. Saliendo.")
+        return
+    
+    relay = OutboxRelay()
+    metrics_server = None
+    
+    try:
+        if settings.ENABLE_METRICS:
+            metrics_server = await start_metrics_server(
+                settings.METRICS_HOST, settings.RELAY_METRICS_PORT, health=relay.health_check
+            )
+        await relay.start()
+        print("Outbox relay iniciado. Presiona Ctrl+C para detener.")
+        await relay.run()
+    except KeyboardInterrupt:
+        print("\nDeteniendo outbox relay...")
+    finally:
+        await relay.stop()
+        if metrics_server:
+            metrics_server.close()
+        print("Outbox relay detenido.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -7,6 +7,13 @@ python scripts/create_databases.py || echo "Advertencia: Error creando bases de
 echo "Ejecutando migraciones..."
 python scripts/run_migrations.py || echo "Advertencia: Las migraciones pueden haber fallado o ya estar aplicadas"
 
+echo "Creando particiones del Event Store..."
+python scripts/manage_event_store_partitions.py || echo "Advertencia: Error en el mantenimiento de particiones"
+
+# Cada worker vuelca sus métricas aquí y /metrics las suma; se vacía en cada arranque
+export METRICS_MULTIPROC_DIR=${METRICS_MULTIPROC_DIR:-/tmp/metrics/command}
+rm -rf "$METRICS_MULTIPROC_DIR" && mkdir -p "$METRICS_MULTIPROC_DIR"
+
 PORT=${PORT:-8000}
 echo "Iniciando Command Side API en puerto $PORT..."
 exec python -m uvicorn app.command_side.api.main:app --host 0.0.0.0 --port $PORT --workers 4
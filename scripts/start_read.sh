@@ -7,6 +7,10 @@ python scripts/create_databases.py || echo "Advertencia: Error creando bases de
 echo "Ejecutando migraciones..."
 python scripts/run_migrations.py || echo "Advertencia: Las migraciones pueden haber fallado o ya estar aplicadas"
 
+# Cada worker vuelca sus métricas aquí y /metrics las suma; se vacía en cada arranque
+export METRICS_MULTIPROC_DIR=${METRICS_MULTIPROC_DIR:-/tmp/metrics/read}
+rm -rf "$METRICS_MULTIPROC_DIR" && mkdir -p "$METRICS_MULTIPROC_DIR"
+
 PORT=${PORT:-8001}
 echo "Iniciando Read Side GraphQL en puerto $PORT..."
 exec python -m uvicorn app.read_side.graphql.main:app --host 0.0.0.0 --port $PORT --workers 4
@@ -0,0 +1,11 @@
+#!/bin/bash
+set -e
+
+echo "Esperando a que la base de datos esté lista..."
+until python scripts/check_db.py; do
+  echo "Esperando PostgreSQL..."
+  sleep 2
+done
+
+echo "Iniciando Outbox Relay..."
+exec python scripts/run_outbox_relay.py
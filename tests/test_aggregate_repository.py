@@ -0,0 +1,113 @@
+"""Tests para AggregateRepository y SnapshotStore."""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.command_side.domain.anime_aggregate import AnimeAggregate
+from app.command_side.infrastructure.aggregate_repository import AggregateRepository
+from app.command_side.infrastructure.event_store import StoredEvent
+from app.command_side.infrastructure.snapshot_store import Snapshot, SnapshotStore
+from common.events.anime_events import ClickRegistered
+
+
+def _stored(position, stable=True, transaction_id=100):
+    """Evento de click en una posición del Event Store."""
+    event = ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id=f"user{position}")
+    return StoredEvent(event, transaction_id, position, stable)
+
+
+def _event_store(stored_events):
+    """Mock de EventStore cuyo iter_events_since devuelve los eventos dados."""
+    event_store = MagicMock()
+    
+    async def iter_events_since(aggregate_id, transaction_id=0, position=0):
+        for stored in stored_events:
+            yield stored
+    
+    event_store.iter_events_since = MagicMock(side_effect=iter_events_since)
+    return event_store
+
+
+@pytest.fixture
+def snapshot_store():
+    """Fixture con un SnapshotStore simulado sin snapshots."""
+    store = MagicMock()
+    store.get_latest = AsyncMock(return_value=None)
+    store.save = AsyncMock(return_value=True)
+    return store
+
+
+@pytest.mark.asyncio
+async def test_load_starts_from_snapshot_and_applies_tail(snapshot_store):
+    """Test que load() restaura el snapshot y sólo lee los eventos posteriores."""
+    snapshot_store.get_latest.return_value = Snapshot(
+        aggregate_id="anime_1",
+        aggregate_type="Anime",
+        version=1000,
+        state={"total_clicks": 1000, "total_views": 0, "total_duration_seconds": 0, "ratings": {}},
+        last_transaction_id=90,
+        last_position=5000,
+    )
+    event_store = _event_store([_stored(5001), _stored(5002)])
+    repository = AggregateRepository(event_store, snapshot_store, snapshot_interval=10)
+    
+    aggregate = await repository.load("anime_1")
+    
+    assert isinstance(aggregate, AnimeAggregate)
+    assert aggregate.version == 1002
+    assert aggregate.total_clicks == 1002
+    event_store.iter_events_since.assert_called_once_with("anime_1", 90, 5000)
+    snapshot_store.save.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_load_saves_snapshot_at_last_stable_event(snapshot_store):
+    """Test que el snapshot se fija en el último evento estable, no en los pendientes."""
+    event_store = _event_store([
+        _stored(1), _stored(2), _stored(3), _stored(4, stable=False, transaction_id=200),
+    ])
+    repository = AggregateRepository(event_store, snapshot_store, snapshot_interval=3)
+    
+    aggregate = await repository.load("anime_1")
+    
+    assert aggregate.version == 4
+    snapshot = snapshot_store.save.call_args.args[0]
+    assert snapshot.version == 3
+    assert snapshot.state["total_clicks"] == 3
+    assert (snapshot.last_transaction_id, snapshot.last_position) == (100, 3)
+
+
+@pytest.mark.asyncio
+async def test_load_snapshot_failure_still_returns_aggregate(snapshot_store):
+    """Test que un error guardando el snapshot no hace fallar la carga."""
+    snapshot_store.save.side_effect = Exception("db caída")
+    repository = AggregateRepository(_event_store([_stored(1), _stored(2)]), snapshot_store, snapshot_interval=1)
+    
+    aggregate = await repository.load("anime_1")
+    
+    assert aggregate.version == 2
+
+
+@pytest.mark.asyncio
+async def test_snapshot_store_get_latest_parses_state():
+    """Test que get_latest() reconstruye el snapshot desde la fila."""
+    store = SnapshotStore()
+    conn = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value={
+        "aggregate_id": "anime_1",
+        "aggregate_type": "Anime",
+        "version": 7,
+        "state": '{"total_clicks": 7}',
+        "last_transaction_id": 12,
+        "last_position": 34,
+    })
+    context = AsyncMock()
+    context.__aenter__ = AsyncMock(return_value=conn)
+    context.__aexit__ = AsyncMock(return_value=None)
+    store._pool = MagicMock()
+    store._pool.is_closing = MagicMock(return_value=False)
+    store._pool.acquire = MagicMock(return_value=context)
+    
+    snapshot = await store.get_latest("anime_1")
+    
+    assert snapshot.version == 7
+    assert snapshot.state == {"total_clicks": 7}
+    assert snapshot.last_position == 34
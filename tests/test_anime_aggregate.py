@@ -0,0 +1,58 @@
+"""Tests para AnimeAggregate."""
+from app.command_side.domain.anime_aggregate import AnimeAggregate
+from common.events.anime_events import ClickRegistered, ViewRegistered, RatingGiven
+
+
+def _events():
+    """Historial de ejemplo de anime_1."""
+    return [
+        ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id="user1"),
+        ViewRegistered(aggregate_id="anime_1", anime_id=1, user_id="user1", duration_seconds=120),
+        RatingGiven(aggregate_id="anime_1", anime_id=1, user_id="user1", rating=6.0),
+        RatingGiven(aggregate_id="anime_1", anime_id=1, user_id="user1", rating=8.0),
+        RatingGiven(aggregate_id="anime_1", anime_id=1, user_id="user2", rating=9.0),
+    ]
+
+
+def test_apply_folds_events():
+    """Test que apply() pliega contadores y la última calificación por usuario."""
+    aggregate = AnimeAggregate("anime_1")
+    for event in _events():
+        aggregate.apply(event)
+    
+    assert aggregate.version == 5
+    assert aggregate.total_clicks == 1
+    assert aggregate.total_views == 1
+    assert aggregate.total_duration_seconds == 120
+    assert aggregate.ratings == {"user1": 8.0, "user2": 9.0}
+    assert aggregate.average_rating == 8.5
+
+
+def test_snapshot_round_trip():
+    """Test que restaurar un snapshot equivale a reproducir el historial."""
+    aggregate = AnimeAggregate("anime_1")
+    for event in _events():
+        aggregate.apply(event)
+    
+    restored = AnimeAggregate("anime_1")
+    restored.restore_snapshot(aggregate.to_snapshot(), aggregate.version)
+    restored.apply(ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id="user3"))
+    
+    assert restored.version == 6
+    assert restored.total_clicks == 2
+    assert restored.ratings == aggregate.ratings
+
+
+def test_mark_events_as_committed_advances_version():
+    """Test que confirmar los eventos pendientes avanza la versión."""
+    aggregate = AnimeAggregate("anime_1")
+    aggregate._add_event(ClickRegistered(aggregate_id="", anime_id=1, user_id="user1"))
+    aggregate._add_event(ClickRegistered(aggregate_id="", anime_id=1, user_id="user1"))
+    
+    events = aggregate.get_uncommitted_events()
+    aggregate.mark_events_as_committed()
+    
+    assert [event.version for event in events] == [1, 2]
+    assert events[0].aggregate_id == "anime_1"
+    assert aggregate.version == 2
+    assert aggregate.get_uncommitted_events() == []
@@ -19,11 +19,11 @@ def mock_event_store():
 
 @pytest.fixture
 def mock_kafka_producer():
-    """Fixture para KafkaEventProducer mock."""
+    """Fixture para AsyncKafkaEventProducer mock."""
     producer = MagicMock()
-    producer.connect = MagicMock()
-    producer.close = MagicMock()
-    producer.publish_events = MagicMock()
+    producer.connect = AsyncMock()
+    producer.close = AsyncMock()
+    producer.publish_events = AsyncMock()
     return producer
 
 
@@ -32,6 +32,7 @@ def mock_anime_validator():
     """Fixture para AnimeValidator mock."""
     validator = MagicMock()
     validator.anime_exists = AsyncMock(return_value=True)
+    validator.initialize = AsyncMock()
     validator.close = AsyncMock()
     return validator
 
@@ -40,7 +41,7 @@ def mock_anime_validator():
 def handler(mock_event_store, mock_kafka_producer, mock_anime_validator):
     """Fixture para AnimeCommandHandler con mocks."""
     with patch('app.command_side.application.anime_command_handler.EventStore', return_value=mock_event_store), \
-         patch('app.command_side.application.anime_command_handler.KafkaEventProducer', return_value=mock_kafka_producer), \
+         patch('app.command_side.application.anime_command_handler.AsyncKafkaEventProducer', return_value=mock_kafka_producer), \
          patch('app.command_side.application.anime_command_handler.AnimeValidator', return_value=mock_anime_validator):
         handler = AnimeCommandHandler()
         return handler
@@ -174,12 +175,13 @@ async def test_handle_rating_valid_boundaries(handler, mock_anime_validator, moc
 
 
 @pytest.mark.asyncio
-async def test_initialize(handler, mock_event_store, mock_kafka_producer):
+async def test_initialize(handler, mock_event_store, mock_kafka_producer, mock_anime_validator):
     """Test que initialize() inicializa correctamente los componentes."""
     await handler.initialize()
     
     mock_event_store.connect.assert_called_once()
     mock_kafka_producer.connect.assert_called_once()
+    mock_anime_validator.initialize.assert_called_once()
 
 
 @pytest.mark.asyncio
@@ -189,4 +191,83 @@ async def test_cleanup(handler, mock_event_store, mock_kafka_producer, mock_anim
     
     mock_event_store.close.assert_called_once()
     mock_kafka_producer.close.assert_called_once()
-    mock_anime_validator.close.assert_called_once()
\ No newline at end of file
+    mock_anime_validator.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_handle_batch_mixed_commands(handler, mock_anime_validator, mock_event_store, mock_kafka_producer):
+    """Test que handle_batch persiste y publica un lote mixto en una sola llamada."""
+    mock_anime_validator.existing_anime_ids = AsyncMock(return_value={1, 2})
+    commands = [
+        ClickCommand(anime_id=1, user_id="user123"),
+        ViewCommand(anime_id=2, user_id="user123", duration_seconds=60),
+        RatingCommand(anime_id=1, user_id="user123", rating=9.0),
+    ]
+    
+    results = await handler.handle_batch(commands)
+    
+    assert [result["status"] for result in results] == ["ok", "ok", "ok"]
+    mock_anime_validator.existing_anime_ids.assert_called_once()
+    mock_anime_validator.anime_exists.assert_not_called()
+    mock_event_store.save_events.assert_called_once()
+    saved_events = mock_event_store.save_events.call_args[0][0]
+    assert [event.event_type for event in saved_events] == ["ClickRegistered", "ViewRegistered", "RatingGiven"]
+    assert [result["event_id"] for result in results] == [event.event_id for event in saved_events]
+    mock_kafka_producer.publish_events.assert_called_once_with(saved_events)
+
+
+@pytest.mark.asyncio
+async def test_handle_batch_partial_errors(handler, mock_anime_validator, mock_event_store):
+    """Test que handle_batch reporta errores por comando sin rechazar el lote."""
+    mock_anime_validator.existing_anime_ids = AsyncMock(return_value={1})
+    commands = [
+        ClickCommand(anime_id=999, user_id="user123"),
+        RatingCommand.model_construct(anime_id=1, user_id="user123", rating=0.5),
+        ClickCommand(anime_id=1, user_id="user123"),
+    ]
+    
+    results = await handler.handle_batch(commands)
+    
+    assert results[0]["error"] == "not_found"
+    assert results[1]["error"] == "invalid_rating"
+    assert results[2]["status"] == "ok"
+    saved_events = mock_event_store.save_events.call_args[0][0]
+    assert len(saved_events) == 1
+
+
+@pytest.mark.asyncio
+async def test_handle_batch_all_rejected(handler, mock_anime_validator, mock_event_store, mock_kafka_producer):
+    """Test que handle_batch no escribe nada si todos los comandos son inválidos."""
+    mock_anime_validator.existing_anime_ids = AsyncMock(return_value=set())
+    
+    results = await handler.handle_batch([ClickCommand(anime_id=999, user_id="user123")])
+    
+    assert results[0]["status"] == "error"
+    mock_event_store.save_events.assert_not_called()
+    mock_kafka_producer.publish_events.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_handle_click_with_outbox_skips_kafka(handler, mock_event_store, mock_kafka_producer):
+    """Test que con el outbox activo el handler solo escribe en el Event Store."""
+    command = ClickCommand(anime_id=1, user_id="user123")
+    
+    with patch('app.command_side.application.anime_command_handler.settings.EVENT_OUTBOX_ENABLED', True):
+        await handler.initialize()
+        await handler.handle_click(command)
+    
+    mock_event_store.save_events.assert_called_once()
+    mock_kafka_producer.connect.assert_not_called()
+    mock_kafka_producer.publish_events.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_build_event_without_fast_path(handler, mock_event_store, monkeypatch):
+    """Test que con EVENT_FAST_PATH_ENABLED=false se construyen los modelos Pydantic."""
+    from common.events.anime_events import RatingGiven
+    from config.settings import settings
+    monkeypatch.setattr(settings, "EVENT_FAST_PATH_ENABLED", False)
+    
+    await handler.handle_rating(RatingCommand(anime_id=1, user_id="user123", rating=8.5))
+    
+    saved_events = mock_event_store.save_events.call_args[0][0]
+    assert isinstance(saved_events[0], RatingGiven)
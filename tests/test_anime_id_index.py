@@ -0,0 +1,41 @@
+"""Tests para AnimeIdIndex."""
+import pytest
+from app.command_side.domain.anime_id_index import AnimeIdIndex
+
+
+def test_index_membership():
+    """Test que el índice responde correctamente a la pertenencia."""
+    index = AnimeIdIndex([1, 20, 5114, 52991])
+    
+    assert 1 in index
+    assert 5114 in index
+    assert 52991 in index
+    assert 2 not in index
+    assert 10 ** 9 not in index
+    assert -1 not in index
+    assert len(index) == 4
+
+
+def test_index_add_and_discard():
+    """Test que add() y discard() mantienen el conteo."""
+    index = AnimeIdIndex()
+    index.add(7)
+    index.add(7)
+    assert len(index) == 1
+    
+    index.discard(7)
+    index.discard(7)
+    assert 7 not in index
+    assert len(index) == 0
+
+
+def test_index_is_compact():
+    """Test que el bitmap usa un bit por ID."""
+    index = AnimeIdIndex(range(1, 60000))
+    assert index.size_bytes <= 60000 // 8 + 1
+
+
+def test_index_rejects_negative_ids():
+    """Test que add() rechaza IDs negativos."""
+    with pytest.raises(ValueError):
+        AnimeIdIndex([-5])
@@ -100,4 +100,145 @@ async def test_anime_validator_close_no_pool():
     validator = AnimeValidator()
     
     await validator.close()
-    assert validator._pool is None
\ No newline at end of file
+    assert validator._pool is None
+
+@pytest.mark.asyncio
+async def test_existing_anime_ids():
+    """Test que existing_anime_ids resuelve un lote de IDs con una sola query."""
+    validator = AnimeValidator()
+    
+    mock_conn = AsyncMock()
+    mock_conn.fetch = AsyncMock(return_value=[{"myanimelist_id": 1}, {"myanimelist_id": 3}])
+    
+    mock_pool = MagicMock()
+    mock_context = AsyncMock()
+    mock_context.__aenter__ = AsyncMock(return_value=mock_conn)
+    mock_context.__aexit__ = AsyncMock(return_value=None)
+    mock_pool.acquire = MagicMock(return_value=mock_context)
+    validator._pool = mock_pool
+    
+    result = await validator.existing_anime_ids([1, 2, 3, 1])
+    
+    assert result == {1, 3}
+    mock_conn.fetch.assert_called_once()
+    assert sorted(mock_conn.fetch.call_args[0][1]) == [1, 2, 3]
+
+
+def _refresh_conn(has_change_log=False, last_change_id=0, snapshot_xmins=(100, 105)):
+    """Conexión simulada para refresh(): transacción, posiciones de snapshot y change log."""
+    mock_conn = AsyncMock()
+    mock_transaction = AsyncMock()
+    mock_transaction.__aenter__ = AsyncMock(return_value=None)
+    mock_transaction.__aexit__ = AsyncMock(return_value=None)
+    mock_conn.transaction = MagicMock(return_value=mock_transaction)
+    # Carga completa: xmin del snapshot, existencia del change log y su último cambio;
+    # cada refresco incremental lee el nuevo xmin
+    fetchval_results = [snapshot_xmins[0]] + ([True, last_change_id] if has_change_log else [False])
+    fetchval_results += list(snapshot_xmins[1:])
+    mock_conn.fetchval = AsyncMock(side_effect=fetchval_results)
+    return mock_conn
+
+
+@pytest.mark.asyncio
+async def test_anime_exists_uses_index_without_io():
+    """Test que anime_exists no consulta la base de datos cuando hay índice."""
+    validator = AnimeValidator()
+    
+    mock_conn = _refresh_conn()
+    mock_conn.fetch = AsyncMock(return_value=[{"myanimelist_id": 1}, {"myanimelist_id": 5114}])
+    
+    with patch('app.command_side.domain.anime_validator.asyncpg.connect', new_callable=AsyncMock) as mock_connect, \
+         patch('app.command_side.domain.anime_validator.asyncpg.create_pool', new_callable=AsyncMock) as mock_create_pool:
+        mock_connect.return_value = mock_conn
+        await validator.refresh(full=True)
+        
+        assert await validator.anime_exists(5114) is True
+        assert await validator.anime_exists(2) is False
+        assert await validator.existing_anime_ids([1, 2, 5114]) == {1, 5114}
+        mock_create_pool.assert_not_called()
+        mock_conn.close.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_refresh_incremental_adds_new_ids():
+    """Test que el refresco incremental lee desde el xmin del snapshot anterior, en orden de commit."""
+    validator = AnimeValidator()
+    
+    mock_conn = _refresh_conn(snapshot_xmins=(100, 105, 120))
+    mock_conn.fetch = AsyncMock(side_effect=[
+        [{"myanimelist_id": 1}],
+        [{"myanimelist_id": 2}],
+        [{"myanimelist_id": 3}],
+    ])
+    
+    with patch('app.command_side.domain.anime_validator.asyncpg.connect', new_callable=AsyncMock) as mock_connect:
+        mock_connect.return_value = mock_conn
+        await validator.refresh(full=True)
+        await validator.refresh()
+        await validator.refresh()
+    
+    first, second = mock_conn.fetch.call_args_list[1:]
+    assert "transaction_id >= $1::xid8" in first[0][0]
+    assert first[0][1] == 100
+    assert second[0][1] == 105
+    assert validator._snapshot_xmin == 120
+    assert await validator.existing_anime_ids([1, 2, 3]) == {1, 2, 3}
+
+
+@pytest.mark.asyncio
+async def test_refresh_is_full_without_transaction_id_column():
+    """Test que sin la columna transaction_id cada refresco reconstruye el índice."""
+    validator = AnimeValidator()
+    
+    mock_conn = _refresh_conn(snapshot_xmins=(None,))
+    mock_conn.fetchval = AsyncMock(side_effect=[None, False, None, False])
+    mock_conn.fetch = AsyncMock(side_effect=[[{"myanimelist_id": 1}], [{"myanimelist_id": 2}]])
+    
+    with patch('app.command_side.domain.anime_validator.asyncpg.connect', new_callable=AsyncMock) as mock_connect:
+        mock_connect.return_value = mock_conn
+        await validator.refresh(full=True)
+        await validator.refresh()
+    
+    assert mock_conn.fetch.call_args_list[1][0][0] == "SELECT myanimelist_id FROM animes"
+    assert await validator.existing_anime_ids([1, 2]) == {2}
+
+
+@pytest.mark.asyncio
+async def test_refresh_incremental_applies_catalog_changes():
+    """Test que el refresco incremental aplica altas y bajas del change log del catálogo."""
+    validator = AnimeValidator()
+    
+    mock_conn = _refresh_conn(has_change_log=True, last_change_id=10)
+    mock_conn.fetch = AsyncMock(side_effect=[
+        [{"myanimelist_id": 1}, {"myanimelist_id": 2}],
+        [],
+        [
+            {"change_id": 11, "anime_id": 2, "change_type": "delete"},
+            {"change_id": 12, "anime_id": 7, "change_type": "insert"},
+            {"change_id": 13, "anime_id": 1, "change_type": "update"},
+        ],
+    ])
+    
+    with patch('app.command_side.domain.anime_validator.asyncpg.connect', new_callable=AsyncMock) as mock_connect:
+        mock_connect.return_value = mock_conn
+        await validator.refresh(full=True)
+        await validator.refresh()
+    
+    changes_call = mock_conn.fetch.call_args_list[2]
+    assert "anime_catalog_changes" in changes_call[0][0]
+    assert changes_call[0][1] == 10
+    assert validator._last_change_id == 13
+    assert await validator.existing_anime_ids([1, 2, 7]) == {1, 7}
+
+
+@pytest.mark.asyncio
+async def test_initialize_falls_back_to_database_on_error():
+    """Test que initialize() no falla si no puede cargar el índice."""
+    validator = AnimeValidator()
+    
+    with patch('app.command_side.domain.anime_validator.asyncpg.connect', new_callable=AsyncMock) as mock_connect:
+        mock_connect.side_effect = OSError("Connection refused")
+        await validator.initialize()
+    
+    assert validator._index is None
+    assert validator._refresh_task is None
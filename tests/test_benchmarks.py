@@ -0,0 +1,96 @@
+"""Tests para el harness de benchmarks y su ejecución con los dobles en proceso."""
+import asyncio
+import pytest
+from benchmarks.harness import compare_results, percentile, run_load, summarize
+from benchmarks.scenarios import BenchmarkConfig, run_benchmarks
+
+
+def test_percentile_interpolates_between_samples():
+    """Los percentiles interpolan linealmente; una sola muestra es todos los percentiles."""
+    values = [1.0, 2.0, 3.0, 4.0]
+    
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 50) == 2.5
+    assert percentile(values, 100) == 4.0
+    assert percentile([7.0], 99) == 7.0
+    assert percentile([], 99) == 0.0
+
+
+def test_summarize_reports_throughput_and_latency_in_ms():
+    """El resumen expresa la latencia en milisegundos y el throughput por operación y por elemento."""
+    result = summarize("scenario", "case", [0.001, 0.003], elapsed=0.5, items=20, concurrency=2)
+    
+    assert result["operations"] == 2
+    assert result["ops_per_second"] == 4.0
+    assert result["items_per_second"] == 40.0
+    assert result["latency_ms"]["mean"] == 2.0
+    assert result["latency_ms"]["max"] == 3.0
+
+
+@pytest.mark.asyncio
+async def test_run_load_runs_every_iteration_once_with_concurrency():
+    """Cada índice se ejecuta una vez y los workers se solapan hasta el límite de concurrencia."""
+    seen = []
+    in_flight = 0
+    peak = 0
+    
+    async def operation(index: int) -> int:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        seen.append(index)
+        in_flight -= 1
+        return 3
+    
+    result = await run_load("scenario", "case", operation, iterations=20, concurrency=4)
+    
+    assert sorted(seen) == list(range(20))
+    assert peak == 4
+    assert result["items"] == 60
+
+
+def test_compare_results_flags_throughput_and_p99_regressions():
+    """Solo regresan los casos comunes que empeoran más que la tolerancia."""
+    def result(case, items_per_second, p99):
+        return {"scenario": "s", "case": case, "items_per_second": items_per_second, "latency_ms": {"p99": p99}}
+    
+    baseline = {"results": [result("a", 1000, 10), result("b", 1000, 10), result("c", 1000, 10)]}
+    current = {"results": [result("a", 950, 10.5), result("b", 800, 10), result("c", 1000, 20), result("new", 1, 99)]}
+    
+    regressions = compare_results(current, baseline, tolerance=0.1)
+    
+    assert regressions == ["s [b]: items/s 1000 -> 800", "s [c]: p99 10ms -> 20ms"]
+
+
+@pytest.mark.asyncio
+async def test_fake_run_covers_all_scenarios():
+    """Con target fake todos los escenarios terminan sin infraestructura y cuentan las queries."""
+    config = BenchmarkConfig(
+        iterations=20,
+        warmup=2,
+        concurrency=(1, 4),
+        batch_sizes=(1, 10),
+        projection_batch_size=10,
+        anime_count=20,
+        hot_animes=5,
+        fake_latency_ms=0,
+    )
+    
+    document = await run_benchmarks(["command_click", "event_store", "projection", "graphql"], config)
+    results = {(result["scenario"], result["case"]): result for result in document["results"]}
+    
+    assert document["environment"]["target"] == "fake"
+    assert len(results) == 2 + 4 + 6 + 8
+    assert results[("event_store_save", "batch=10,concurrency=4")]["items"] == 100
+    assert results[("projection", "ClickRegistered,mode=batch,batch=10")]["items_per_second"] > 0
+    assert results[("graphql", "animeStats,cache=warm,concurrency=1")]["db_calls_per_operation"] == 0
+    assert results[("graphql", "animeStats,cache=warm,concurrency=1")]["cache_hit_ratio"] == 1.0
+    assert results[("graphql", "animeStats,cache=cold,concurrency=1")]["db_calls_per_operation"] > 0
+
+
+@pytest.mark.asyncio
+async def test_run_benchmarks_rejects_unknown_scenarios():
+    """Un escenario inexistente falla antes de ejecutar nada."""
+    with pytest.raises(ValueError):
+        await run_benchmarks(["nope"], BenchmarkConfig())
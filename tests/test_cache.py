@@ -66,4 +66,83 @@ def test_cache_entry_expiration():
     assert not entry.is_expired()
     
     time.sleep(1.1)
-    assert entry.is_expired()
\ No newline at end of file
+    assert entry.is_expired()
+
+def test_cache_evicts_least_recently_used():
+    """Test que al superar max_entries se desaloja la entrada menos usada."""
+    cache = InMemoryCache(default_ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_cache_respects_max_bytes():
+    """Test que el caché desaloja entradas para respetar max_bytes."""
+    cache = InMemoryCache(default_ttl=60, max_bytes=2000)
+    for i in range(20):
+        cache.set(f"key{i}", {"anime_id": i, "title": "x" * 100})
+    
+    stats = cache.get_stats()
+    assert stats["bytes"] <= 2000
+    assert stats["evictions"] > 0
+    assert cache.get("key19") is not None
+
+
+def test_cache_skips_values_larger_than_max_bytes():
+    """Test que un valor mayor que max_bytes no se guarda ni desaloja el resto."""
+    cache = InMemoryCache(default_ttl=60, max_bytes=1000)
+    cache.set("small", 1)
+    cache.set("huge", "x" * 5000)
+    
+    assert cache.get("huge") is None
+    assert cache.get("small") == 1
+
+
+def test_cache_overwrite_updates_bytes():
+    """Test que sobrescribir una clave no duplica el tamaño contabilizado."""
+    cache = InMemoryCache(default_ttl=60, max_bytes=10000)
+    cache.set("key", "x" * 100)
+    first = cache.get_stats()["bytes"]
+    cache.set("key", "x" * 100)
+    
+    assert cache.get_stats()["bytes"] == first
+    cache.delete("key")
+    assert cache.get_stats()["bytes"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_sweeper_removes_expired_entries():
+    """Test que el sweeper elimina entradas expiradas sin necesidad de get()."""
+    import asyncio
+    cache = InMemoryCache(default_ttl=60)
+    cache.set("short", "value", ttl=1)
+    cache._cache["short"].expires_at = time.time() - 1
+    
+    cache.start_sweeper(0.01)
+    await asyncio.sleep(0.05)
+    await cache.stop_sweeper()
+    
+    assert len(cache._cache) == 0
+    assert cache._expirations == 1
+
+
+def test_cache_get_stale_within_grace_period():
+    """Test que get_stale() devuelve valores expirados dentro de stale_ttl."""
+    cache = InMemoryCache(default_ttl=60, stale_ttl=30)
+    cache.set("key", "value")
+    cache._cache["key"].expires_at = time.time() - 1
+    
+    assert cache.get("key") is None
+    assert cache.get_stale("key") == "value"
+    assert cache.get_stats()["stale_hits"] == 1
+    
+    cache._cache["key"].expires_at = time.time() - 31
+    assert cache.get_stale("key") is None
+    cache._cleanup_expired()
+    assert "key" not in cache._cache
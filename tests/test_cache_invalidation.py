@@ -0,0 +1,83 @@
+"""Tests para CacheInvalidationListener."""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.read_side.infrastructure.cache_invalidation import CacheInvalidationListener
+
+
+@pytest.fixture
+def callbacks():
+    """Fixture con los callbacks de invalidación."""
+    return MagicMock(), MagicMock()
+
+
+@pytest.fixture
+def listener(callbacks):
+    """Fixture para CacheInvalidationListener."""
+    on_invalidate, on_reset = callbacks
+    return CacheInvalidationListener(on_invalidate, on_reset, channel="test_channel")
+
+
+@pytest.mark.asyncio
+async def test_start_subscribes_to_channel(listener):
+    """Test que start() abre una conexión dedicada y escucha el canal."""
+    conn = MagicMock()
+    conn.add_listener = AsyncMock()
+    conn.is_closed = MagicMock(return_value=False)
+    conn.close = AsyncMock()
+    
+    with patch("app.read_side.infrastructure.cache_invalidation.asyncpg.connect", new_callable=AsyncMock, return_value=conn):
+        await listener.start()
+    
+    conn.add_listener.assert_called_once_with("test_channel", listener._handle_notification)
+    assert listener.is_connected
+    
+    await listener.stop()
+    conn.close.assert_called_once()
+    assert not listener.is_connected
+
+
+def test_handle_notification_invalidates_ids(listener, callbacks):
+    """Test que una notificación invalida los anime_id del payload."""
+    on_invalidate, _ = callbacks
+    
+    listener._handle_notification(None, 123, "test_channel", "[1, 5114]")
+    
+    on_invalidate.assert_called_once_with([1, 5114])
+
+
+def test_handle_notification_ignores_invalid_payload(listener, callbacks):
+    """Test que un payload inválido se ignora sin lanzar excepción."""
+    on_invalidate, _ = callbacks
+    
+    listener._handle_notification(None, 123, "test_channel", "no-json")
+    
+    on_invalidate.assert_not_called()
+
+
+def test_handle_notification_reset_payload(listener, callbacks):
+    """Test que el payload de reset vacía el caché completo."""
+    on_invalidate, on_reset = callbacks
+    
+    listener._handle_notification(None, 123, "test_channel", "*")
+    
+    on_reset.assert_called_once()
+    on_invalidate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_supervise_reconnects_and_resets_cache(listener, callbacks):
+    """Test que al reconectar se vacía el caché por las notificaciones perdidas."""
+    import asyncio
+    _, on_reset = callbacks
+    listener._reconnect_interval = 0.01
+    conn = MagicMock()
+    conn.add_listener = AsyncMock()
+    conn.is_closed = MagicMock(return_value=False)
+    
+    with patch("app.read_side.infrastructure.cache_invalidation.asyncpg.connect", new_callable=AsyncMock, return_value=conn):
+        task = asyncio.create_task(listener._supervise())
+        await asyncio.sleep(0.05)
+        task.cancel()
+    
+    on_reset.assert_called_once()
+    assert listener.is_connected
@@ -0,0 +1,211 @@
+"""Tests para la carga masiva del catálogo de MAL."""
+import csv
+import json
+import pytest
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.read_side.infrastructure.catalog_loader import (
+    ANIME_COLUMNS,
+    COLUMNS,
+    NOTIFY_CHUNK_SIZE,
+    STAGING_COLUMNS,
+    STAGING_TABLE,
+    SYNC_INSERT_QUERY,
+    SYNC_MISSING_QUERY,
+    SYNC_UPDATE_QUERY,
+    CatalogBulkLoader,
+    CatalogChangeSet,
+    content_hash,
+    header_positions,
+    iter_parsed_chunks,
+    parse_chunk,
+    parse_value,
+)
+from common.exceptions import CatalogSyncError
+
+HEADER = [csv_header for _, csv_header, _ in COLUMNS]
+
+
+def _row(anime_id, title="Cowboy Bebop", members="2,008,019", score="8.75", description="Space\n\"western\""):
+    values = {header: "" for header in HEADER}
+    values.update({
+        "myanimelist_id": str(anime_id),
+        "title": title,
+        "description": description,
+        "Episodes": "26.0",
+        "Score": score,
+        "Members": members,
+        "characters": json.dumps([{"name": "Spike"}]),
+    })
+    return [values[header] for header in HEADER]
+
+
+def _write_csv(path, rows, header=HEADER):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+def _transaction():
+    transaction = AsyncMock()
+    transaction.__aenter__ = AsyncMock(return_value=None)
+    transaction.__aexit__ = AsyncMock(return_value=None)
+    return transaction
+
+
+def _sync_conn(missing, inserted, updated, total=100):
+    """Conexión simulada para sync(): cada consulta devuelve los IDs indicados."""
+    results = {
+        SYNC_MISSING_QUERY: missing,
+        SYNC_INSERT_QUERY: inserted,
+        SYNC_UPDATE_QUERY: updated,
+    }
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+    conn.copy_records_to_table = AsyncMock()
+    conn.fetch = AsyncMock(side_effect=lambda query, *args: [
+        {"myanimelist_id": anime_id} for anime_id in results[query]
+    ])
+    conn.fetchval = AsyncMock(return_value=total)
+    conn.transaction = MagicMock(return_value=_transaction())
+    return conn
+
+
+def _executed(conn, fragment):
+    return [call.args for call in conn.execute.await_args_list if fragment in call.args[0]]
+
+
+def test_parse_value_types():
+    """parse_value convierte cada tipo del CSV."""
+    assert parse_value("2,008,019", "int") == 2008019
+    assert parse_value("26.0", "int") == 26
+    assert parse_value("8.75", "numeric") == Decimal("8.75")
+    assert parse_value("n/a", "int") is None
+    assert parse_value("  ", "str") is None
+    assert parse_value("[1, 2]", "json") == [1, 2]
+    assert parse_value("{bad", "json") is None
+
+
+def test_parse_chunk_maps_columns_by_header():
+    """Las columnas se localizan por cabecera y las que faltan quedan a None."""
+    header = list(reversed(HEADER[:-1]))
+    row = dict(zip(HEADER, _row(1)))
+    positions = header_positions(header)
+    
+    records = parse_chunk([[row[name] for name in header]], positions, first_row=40)
+    
+    record = dict(zip(STAGING_COLUMNS, records[0]))
+    assert record["myanimelist_id"] == 1
+    assert record["episodes"] == 26
+    assert record["members"] == 2008019
+    assert record["characters"] == json.dumps([{"name": "Spike"}])
+    assert record["source_url"] is None
+    assert record["row_number"] == 40
+
+
+def test_content_hash_tracks_changes():
+    """El hash es estable para el mismo contenido y cambia si cambia cualquier campo."""
+    positions = header_positions(HEADER)
+    first = parse_chunk([_row(1)], positions, 0)[0]
+    same = parse_chunk([_row(1)], positions, 7)[0]
+    changed = parse_chunk([_row(1, score="8.76")], positions, 0)[0]
+    
+    hash_index = STAGING_COLUMNS.index("content_hash")
+    assert first[hash_index] == same[hash_index]
+    assert first[hash_index] != changed[hash_index]
+    assert first[hash_index] == content_hash(first[:len(ANIME_COLUMNS)])
+
+
+@pytest.mark.asyncio
+async def test_iter_parsed_chunks_streams_in_order(tmp_path):
+    """El CSV se lee por bloques numerando las filas en orden."""
+    path = _write_csv(tmp_path / "mal.csv", [_row(anime_id) for anime_id in range(1, 6)])
+    
+    chunks = [chunk async for chunk in iter_parsed_chunks(path, chunk_size=2)]
+    
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [record[-1] for chunk in chunks for record in chunk] == [0, 1, 2, 3, 4]
+    assert [record[0] for chunk in chunks for record in chunk] == [1, 2, 3, 4, 5]
+
+
+@pytest.mark.asyncio
+async def test_bulk_loader_copies_chunks_and_merges(tmp_path):
+    """La carga copia cada bloque a staging y fusiona con un único merge."""
+    path = _write_csv(tmp_path / "mal.csv", [_row(anime_id) for anime_id in range(1, 6)])
+    conn = MagicMock()
+    conn.execute = AsyncMock()
+    conn.copy_records_to_table = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value={"inserted": 3, "updated": 1})
+    conn.transaction = MagicMock(return_value=_transaction())
+    
+    totals = await CatalogBulkLoader(chunk_size=2).load(conn, path)
+    
+    assert totals == {"rows": 5, "inserted": 3, "updated": 1, "unchanged": 1}
+    assert conn.copy_records_to_table.await_count == 3
+    call = conn.copy_records_to_table.await_args_list[0]
+    assert call.args[0] == STAGING_TABLE
+    assert call.kwargs["columns"] == STAGING_COLUMNS
+    merge = conn.fetchrow.await_args[0][0]
+    assert "ON CONFLICT (myanimelist_id) DO UPDATE" in merge
+    assert "animes.content_hash IS DISTINCT FROM EXCLUDED.content_hash" in merge
+
+
+@pytest.mark.asyncio
+async def test_iter_parsed_chunks_with_workers_keeps_order(tmp_path):
+    """Con varios procesos los bloques se devuelven en el orden del CSV."""
+    path = _write_csv(tmp_path / "mal.csv", [_row(anime_id) for anime_id in range(1, 8)])
+    
+    chunks = [chunk async for chunk in iter_parsed_chunks(path, chunk_size=2, workers=2)]
+    
+    assert [record[0] for chunk in chunks for record in chunk] == list(range(1, 8))
+
+
+@pytest.mark.asyncio
+async def test_sync_records_and_notifies_change_set(tmp_path):
+    """La sincronización registra altas, cambios y bajas y notifica los anime_id afectados."""
+    path = _write_csv(tmp_path / "mal.csv", [_row(anime_id) for anime_id in range(1, 4)])
+    conn = _sync_conn(missing=[9], inserted=[3, 2], updated=[1])
+    
+    with patch("app.read_side.infrastructure.catalog_loader.settings") as mock_settings:
+        mock_settings.CACHE_INVALIDATION_ENABLED = True
+        mock_settings.CACHE_INVALIDATION_CHANNEL = "anime_cache_invalidation"
+        changes = await CatalogBulkLoader().sync(conn, path)
+    
+    assert changes == CatalogChangeSet(inserted=[2, 3], updated=[1], deleted=[9])
+    assert changes.anime_ids == [1, 2, 3, 9]
+    assert _executed(conn, "DELETE FROM animes")[0][1] == [9]
+    logged = {args[2]: args[1] for args in _executed(conn, "INSERT INTO anime_catalog_changes")}
+    assert logged == {"insert": [2, 3], "update": [1], "delete": [9]}
+    notify = _executed(conn, "pg_notify")
+    assert notify == [("SELECT pg_notify($1, $2)", "anime_cache_invalidation", "[1, 2, 3, 9]")]
+
+
+@pytest.mark.asyncio
+async def test_sync_aborts_on_mass_delete(tmp_path):
+    """Si el CSV dejaría fuera demasiados animes la sincronización aborta sin escribir."""
+    path = _write_csv(tmp_path / "mal.csv", [_row(1)])
+    conn = _sync_conn(missing=list(range(2, 20)), inserted=[], updated=[], total=100)
+    
+    with pytest.raises(CatalogSyncError):
+        await CatalogBulkLoader().sync(conn, path, max_delete_fraction=0.1)
+    
+    assert not _executed(conn, "DELETE FROM animes")
+    assert not _executed(conn, "anime_catalog_changes")
+    conn.fetch.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_sync_chunks_notifications(tmp_path):
+    """Los anime_id se notifican en bloques que caben en un payload de NOTIFY."""
+    path = _write_csv(tmp_path / "mal.csv", [_row(1)])
+    conn = _sync_conn(missing=[], inserted=[], updated=list(range(NOTIFY_CHUNK_SIZE + 1)))
+    
+    with patch("app.read_side.infrastructure.catalog_loader.settings") as mock_settings:
+        mock_settings.CACHE_INVALIDATION_ENABLED = True
+        mock_settings.CACHE_INVALIDATION_CHANNEL = "anime_cache_invalidation"
+        await CatalogBulkLoader().sync(conn, path)
+    
+    payloads = [json.loads(args[2]) for args in _executed(conn, "pg_notify")]
+    assert [len(payload) for payload in payloads] == [NOTIFY_CHUNK_SIZE, 1]
@@ -0,0 +1,99 @@
+"""Tests para los endpoints de lotes del Command Side API."""
+import json
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.command_side.api import main as command_api
+from config.settings import settings
+
+
+def ok_results(commands):
+    """Resultado de handle_batch con todos los comandos aceptados."""
+    return [{"index": i, "status": "ok", "event_id": f"event-{i}"} for i in range(len(commands))]
+
+
+def ndjson(*items) -> bytes:
+    """Cuerpo NDJSON con un comando por línea."""
+    return b"\n".join(item if isinstance(item, bytes) else json.dumps(item).encode() for item in items)
+
+
+def click(anime_id: int) -> dict:
+    return {"type": "click", "anime_id": anime_id, "user_id": "user123"}
+
+
+def api_client() -> httpx.AsyncClient:
+    """Cliente HTTP contra la app en proceso, sin eventos de arranque."""
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=command_api.app), base_url="http://test")
+
+
+@pytest.mark.asyncio
+async def test_batch_returns_per_command_results():
+    """POST /batch valida el lote completo y devuelve el resultado de handle_batch."""
+    handle_batch = AsyncMock(return_value=[
+        {"index": 0, "status": "ok", "event_id": "e0"},
+        {"index": 1, "status": "error", "error": "not_found", "message": "no existe"},
+    ])
+    with patch.object(command_api.command_handler, "handle_batch", handle_batch):
+        async with api_client() as client:
+            response = await client.post("/batch", json={"commands": [
+                click(1),
+                {"type": "view", "anime_id": 2, "user_id": "user123", "duration_seconds": 60},
+            ]})
+    
+    assert response.status_code == 200
+    assert response.json()["status"] == "partial"
+    assert response.json()["accepted"] == 1
+    assert len(handle_batch.call_args.args[0]) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_oversized_and_invalid_payloads():
+    """Un lote mayor que COMMAND_BATCH_MAX_SIZE es 413; un tipo desconocido es 422."""
+    with patch.object(command_api.command_handler, "handle_batch", AsyncMock()) as handle_batch, \
+         patch.object(settings, "COMMAND_BATCH_MAX_SIZE", 1):
+        async with api_client() as client:
+            too_large = await client.post("/batch", json={"commands": [click(1), click(2)]})
+            invalid = await client.post("/batch", json={"commands": [{"type": "like", "anime_id": 1, "user_id": "u"}]})
+    
+    assert too_large.status_code == 413
+    assert invalid.status_code == 422
+    handle_batch.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_ndjson_persists_in_chunks_and_reports_invalid_lines():
+    """Las líneas se persisten en lotes de COMMAND_BATCH_MAX_SIZE y las inválidas se reportan por índice."""
+    handle_batch = AsyncMock(side_effect=ok_results)
+    body = ndjson(click(1), click(2), b"{no-json", b"", click(3))
+    with patch.object(command_api.command_handler, "handle_batch", handle_batch), \
+         patch.object(settings, "COMMAND_BATCH_MAX_SIZE", 2):
+        async with api_client() as client:
+            response = await client.post("/batch/ndjson", content=body)
+    
+    data = response.json()
+    assert response.status_code == 200
+    assert handle_batch.await_count == 2
+    assert [result["index"] for result in data["results"]] == [0, 1, 2, 3]
+    assert data["results"][2]["error"] == "invalid_command"
+    assert data["accepted"] == 3
+
+
+@pytest.mark.asyncio
+async def test_ndjson_failure_reports_committed_lines():
+    """Si falla un lote, la respuesta conserva los ya confirmados y marca el resto como error."""
+    handle_batch = AsyncMock(side_effect=[ok_results([1, 2]), RuntimeError("event store caído")])
+    body = ndjson(click(1), click(2), click(3), click(4), click(5))
+    with patch.object(command_api.command_handler, "handle_batch", handle_batch), \
+         patch.object(settings, "COMMAND_BATCH_MAX_SIZE", 2):
+        async with api_client() as client:
+            response = await client.post("/batch/ndjson", content=body)
+    
+    data = response.json()
+    assert response.status_code == 500
+    assert data["status"] == "error"
+    assert data["last_committed_index"] == 1
+    assert data["accepted"] == 2
+    assert [result["status"] for result in data["results"]] == ["ok", "ok", "error", "error", "error"]
+    assert [result.get("error") for result in data["results"][2:]] == ["batch_failed", "batch_failed", "not_processed"]
+    # Las líneas posteriores al fallo no se intentan persistir
+    assert handle_batch.await_count == 2
@@ -0,0 +1,142 @@
+"""Tests para el seguimiento de lag, throughput y latencia del consumer."""
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from aiokafka import TopicPartition
+from app.read_side.infrastructure.consumer_monitor import (
+    KAFKA_CONSUMER_COMMITTED_OFFSET,
+    KAFKA_CONSUMER_EVENTS_PER_SECOND,
+    KAFKA_CONSUMER_LAG,
+    ConsumerMonitor,
+    SlidingWindowCounter,
+)
+from app.read_side.infrastructure.kafka_consumer import KafkaEventConsumer
+from config.settings import settings
+
+
+class FakeClock:
+    """Reloj manual para las ventanas deslizantes."""
+    
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sliding_window_drops_old_buckets():
+    """Solo cuentan los segundos dentro de la ventana; los buckets se reutilizan al dar la vuelta."""
+    clock = FakeClock()
+    window = SlidingWindowCounter(max_window=60, clock=clock)
+    window.add(5, 10.0, 4.0)
+    clock.now += 30
+    window.add(3, 3.0, 1.0)
+    
+    assert window.stats(10)[:3] == (3, 3.0, 1.0)
+    assert window.stats(60)[:3] == (8, 13.0, 4.0)
+    
+    clock.now += 45
+    assert window.stats(60)[:3] == (3, 3.0, 1.0)
+    clock.now += 60
+    window.add(1)
+    assert window.stats(60)[0] == 1
+
+
+def test_sliding_window_rate_uses_elapsed_time_after_start():
+    """Recién arrancado, la tasa se divide por los segundos transcurridos, no por la ventana."""
+    clock = FakeClock()
+    window = SlidingWindowCounter(clock=clock)
+    window.add(20)
+    clock.now += 9
+    
+    assert window.rate(60) == 2.0
+    assert window.rate(10) == 2.0
+
+
+def test_monitor_lag_prefers_committed_offset():
+    """El lag es final menos confirmado; sin commit registrado se usa la posición."""
+    monitor = ConsumerMonitor(clock=FakeClock())
+    tp = TopicPartition("monitor-events", 0)
+    
+    monitor.record_positions({tp: 90}, {tp: 100})
+    assert monitor.total_lag() == 10
+    
+    monitor.record_commit({tp: 80})
+    assert monitor.total_lag() == 20
+    assert KAFKA_CONSUMER_LAG.labels("monitor-events", 0).get() == 20
+    assert KAFKA_CONSUMER_COMMITTED_OFFSET.labels("monitor-events", 0).get() == 80
+    assert monitor.snapshot()["partitions"] == [{
+        "topic": "monitor-events",
+        "partition": 0,
+        "end_offset": 100,
+        "committed": 80,
+        "position": 90,
+        "lag": 20,
+    }]
+
+
+def test_monitor_forgets_revoked_partitions():
+    """Tras un rebalanceo las particiones revocadas dejan de sumar lag y de exponerse."""
+    monitor = ConsumerMonitor(clock=FakeClock())
+    kept = TopicPartition("revoked-events", 0)
+    revoked = TopicPartition("revoked-events", 1)
+    monitor.record_positions({kept: 5, revoked: 5}, {kept: 10, revoked: 50})
+    
+    monitor.retain({kept})
+    
+    assert monitor.total_lag() == 5
+    assert ("revoked-events", "1") not in KAFKA_CONSUMER_LAG._children
+
+
+def test_monitor_throughput_and_end_to_end_latency():
+    """record_events alimenta eventos/segundo y la latencia desde occurred_at."""
+    clock = FakeClock()
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    monitor = ConsumerMonitor(clock=clock, wall_clock=lambda: (now - datetime(1970, 1, 1)).total_seconds())
+    
+    monitor.record_events([
+        {"occurred_at": now - timedelta(seconds=2)},
+        {"occurred_at": (now - timedelta(seconds=4)).isoformat() + "Z"},
+        {"occurred_at": "no-es-una-fecha"},
+    ])
+    clock.now += 9
+    snapshot = monitor.snapshot()
+    
+    assert snapshot["events_per_second"]["10s"] == 0.3
+    assert snapshot["end_to_end_latency_seconds"]["10s"] == {"avg": 3.0, "max": 4.0}
+    assert KAFKA_CONSUMER_EVENTS_PER_SECOND.labels(10).get() == pytest.approx(0.3)
+
+
+@pytest.mark.asyncio
+async def test_consumer_feeds_monitor_in_batch_mode():
+    """El consumer registra commits y eventos proyectados (sin los fallidos) y los expone."""
+    with patch("app.read_side.infrastructure.kafka_consumer.EventProcessor"), \
+         patch("app.read_side.infrastructure.kafka_consumer.DLQHandler"):
+        consumer = KafkaEventConsumer()
+    consumer._running = True
+    consumer.consumer = MagicMock()
+    consumer.consumer.commit = AsyncMock()
+    consumer.consumer.highwater = MagicMock(return_value=10)
+    consumer.consumer.assignment = MagicMock(return_value={TopicPartition("batch-events", 0)})
+    consumer.dlq_handler = AsyncMock()
+    tp = TopicPartition("batch-events", 0)
+    
+    messages = []
+    for offset in (3, 4):
+        message = MagicMock(topic="batch-events", partition=0, offset=offset, key=None)
+        message.value = {"event_id": f"e{offset}", "aggregate_id": "1", "occurred_at": datetime.utcnow()}
+        messages.append(message)
+    consumer.event_processor.process_batch = AsyncMock(return_value=[(messages[1].value, ValueError("x"))])
+    
+    with patch.object(settings, "KAFKA_CONSUMER_ENABLE_AUTO_COMMIT", False):
+        await consumer._process_poll({tp: messages}, asyncio.Semaphore(2))
+    report = await consumer.lag_report()
+    health = await consumer.health_check()
+    
+    assert report["status"] == "healthy"
+    assert report["partitions"][0]["committed"] == 5
+    assert report["total_lag"] == 5
+    assert report["end_to_end_latency_seconds"]["10s"]["max"] is not None
+    assert health["total_lag"] == 5
+    assert consumer.monitor._events.stats(10)[0] == 1
@@ -1,6 +1,6 @@
 """Tests para DTOs."""
 import pytest
-from common.dto.command_dto import ClickCommand, ViewCommand, RatingCommand
+from common.dto.command_dto import ClickCommand, ViewCommand, RatingCommand, BatchCommand
 
 
 def test_click_command():
@@ -43,3 +43,23 @@ def test_view_command_validation():
             duration_seconds=-1
         )
 
+
+def test_batch_command_mixed_items():
+    """Test que BatchCommand discrimina los comandos por su tipo."""
+    batch = BatchCommand(commands=[
+        {"type": "click", "anime_id": 1, "user_id": "user123"},
+        {"type": "view", "anime_id": 1, "user_id": "user123", "duration_seconds": 60},
+        {"type": "rating", "anime_id": 1, "user_id": "user123", "rating": 8.0},
+    ])
+    
+    assert isinstance(batch.commands[0], ClickCommand)
+    assert isinstance(batch.commands[1], ViewCommand)
+    assert isinstance(batch.commands[2], RatingCommand)
+
+
+def test_batch_command_validation():
+    """Test de validación de BatchCommand."""
+    with pytest.raises(Exception):
+        BatchCommand(commands=[])
+    with pytest.raises(Exception):
+        BatchCommand(commands=[{"type": "unknown", "anime_id": 1, "user_id": "user123"}])
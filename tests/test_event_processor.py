@@ -113,7 +113,6 @@ async def test_mark_event_processed(event_processor, mock_pool):
         event_id="event-123",
         event_type="ClickRegistered",
         aggregate_id="anime_1",
-        duration_ms=50,
         status="success"
     )
     
@@ -177,11 +176,12 @@ async def test_process_click_event_success(event_processor, mock_pool):
     await event_processor.process_click_event(event)
     
     event_processor._is_event_processed.assert_called_once_with("click-123")
-    assert conn.execute.call_count == 2
+    assert conn.execute.call_count == 3
+    assert conn.execute.call_args_list[2][0] == ("SELECT pg_notify($1, $2)", settings.CACHE_INVALIDATION_CHANNEL, "[1]")
     event_processor._mark_event_processed.assert_called_once()
 
     call_args = event_processor._mark_event_processed.call_args
-    assert call_args[0][4] == 'success'
+    assert call_args[0][3] == 'success'
 
 
 @pytest.mark.asyncio
@@ -252,3 +252,152 @@ async def test_process_rating_event_invalid_rating(event_processor, mock_pool):
     
     assert "Rating debe estar entre 1.0 y 10.0" in str(exc_info.value)
 
+
+
+@pytest.mark.asyncio
+async def test_process_batch_aggregates_and_upserts_in_one_transaction(event_processor, mock_pool):
+    """Test que process_batch agrega el lote y lo aplica con upserts set-based."""
+    pool, conn = mock_pool
+    event_processor._pool = pool
+    conn.fetch = AsyncMock(return_value=[{"event_id": "e1"}, {"event_id": "e2"}, {"event_id": "e3"}])
+    conn.transaction = MagicMock(return_value=AsyncMock())
+    
+    events = [
+        {"event_id": "e1", "event_type": "ClickRegistered", "aggregate_id": "anime_1",
+         "anime_id": 1, "user_id": "u1", "occurred_at": "2024-01-01T10:00:00"},
+        {"event_id": "e2", "event_type": "ClickRegistered", "aggregate_id": "anime_1",
+         "anime_id": 1, "user_id": "u1", "occurred_at": "2024-01-01T11:00:00Z"},
+        {"event_id": "e3", "event_type": "ViewRegistered", "aggregate_id": "anime_2",
+         "anime_id": 2, "user_id": "u2", "duration_seconds": 60, "occurred_at": datetime(2024, 1, 1)},
+    ]
+    
+    failed = await event_processor.process_batch(events)
+    
+    assert failed == []
+    conn.fetch.assert_called_once()
+    assert "processed_events" in conn.fetch.call_args[0][0]
+    assert conn.fetch.call_args[0][1] == ["e1", "e2", "e3"]
+    conn.transaction.assert_called_once()
+    
+    clicks_call = conn.execute.call_args_list[0]
+    assert "anime_clicks" in clicks_call[0][0]
+    assert clicks_call[0][1:] == ([1], ["u1"], [2], [datetime(2024, 1, 1, 11, 0)])
+    
+    stats_call = conn.execute.call_args_list[2]
+    assert "anime_stats" in stats_call[0][0]
+    assert stats_call[0][1:] == ([1, 2], [2, 0], [0, 1], [0, 60])
+
+
+@pytest.mark.asyncio
+async def test_process_batch_skips_already_processed(event_processor, mock_pool):
+    """Test que process_batch no reaplica eventos que no pudo reclamar en processed_events."""
+    pool, conn = mock_pool
+    event_processor._pool = pool
+    conn.fetch = AsyncMock(return_value=[])
+    conn.transaction = MagicMock(return_value=AsyncMock())
+    
+    events = [
+        {"event_id": "e1", "event_type": "ClickRegistered", "aggregate_id": "anime_1",
+         "anime_id": 1, "user_id": "u1", "occurred_at": "2024-01-01T10:00:00"},
+        {"event_id": "e1", "event_type": "ClickRegistered", "aggregate_id": "anime_1",
+         "anime_id": 1, "user_id": "u1", "occurred_at": "2024-01-01T10:00:00"},
+    ]
+    
+    failed = await event_processor.process_batch(events)
+    
+    assert failed == []
+    assert conn.fetch.call_args[0][1] == ["e1"]
+    conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_process_batch_returns_invalid_events(event_processor, mock_pool):
+    """Test que process_batch devuelve los eventos inválidos y procesa el resto."""
+    pool, conn = mock_pool
+    event_processor._pool = pool
+    conn.fetch = AsyncMock(return_value=[])
+    conn.transaction = MagicMock(return_value=AsyncMock())
+    
+    invalid = {"event_id": "e2", "event_type": "RatingGiven", "anime_id": 1,
+               "user_id": "u1", "rating": 11.0, "occurred_at": "2024-01-01T10:00:00"}
+    events = [
+        {"event_id": "e1", "event_type": "RatingGiven", "aggregate_id": "anime_1",
+         "anime_id": 1, "user_id": "u1", "rating": 8.0, "occurred_at": "2024-01-01T10:00:00"},
+        invalid,
+        {"event_id": "e3", "event_type": "UnknownEvent"},
+    ]
+    
+    failed = await event_processor.process_batch(events)
+    
+    assert len(failed) == 1
+    assert failed[0][0] is invalid
+    assert isinstance(failed[0][1], EventProcessingError)
+    assert conn.fetch.call_args_list[0][0][1] == ["e1"]
+
+
+@pytest.mark.asyncio
+async def test_apply_ratings_uses_delta_on_rerate(event_processor):
+    """Test que una recalificación actualiza rating_sum con la diferencia sin recontar."""
+    from decimal import Decimal
+    conn = AsyncMock()
+    conn.fetch = AsyncMock(side_effect=[
+        [{"anime_id": 1, "user_id": "u1", "rating": Decimal("8.00")}],
+        [
+            {"anime_id": 1, "user_id": "u1", "rating": Decimal("6.00"), "inserted": False},
+            {"anime_id": 1, "user_id": "u2", "rating": Decimal("9.00"), "inserted": True},
+        ],
+        [{"anime_id": 1, "average_rating": Decimal("7.50")}],
+    ])
+    
+    result = await event_processor._apply_ratings(conn, {
+        (1, "u1"): (6.0, datetime(2024, 1, 1)),
+        (1, "u2"): (9.0, datetime(2024, 1, 1)),
+    })
+    
+    assert result == {1: 7.5}
+    stats_call = conn.fetch.call_args_list[2]
+    assert "rating_sum = anime_stats.rating_sum + EXCLUDED.rating_sum" in stats_call[0][0]
+    assert "AVG" not in stats_call[0][0]
+    assert stats_call[0][1:] == ([1], [1], [Decimal("7.00")])
+
+
+@pytest.mark.asyncio
+async def test_apply_ratings_recomputes_on_concurrent_insert(event_processor):
+    """Test que si otra transacción insertó la fila se recalcula el agregado del anime."""
+    from decimal import Decimal
+    conn = AsyncMock()
+    conn.fetch = AsyncMock(side_effect=[
+        [],
+        [{"anime_id": 1, "user_id": "u1", "rating": Decimal("6.00"), "inserted": False}],
+        [{"anime_id": 1, "average_rating": Decimal("6.00")}],
+    ])
+    
+    result = await event_processor._apply_ratings(conn, {(1, "u1"): (6.0, datetime(2024, 1, 1))})
+    
+    assert result == {1: 6.0}
+    assert conn.fetch.call_count == 3
+    assert "AVG(rating)" in conn.fetch.call_args_list[2][0][0]
+
+
+@pytest.mark.asyncio
+async def test_notify_invalidation_chunks_payload(event_processor):
+    """Test que _notify_invalidation deduplica y trocea los anime_id en varios NOTIFY."""
+    conn = AsyncMock()
+    anime_ids = list(range(1, EventProcessor.NOTIFY_CHUNK_SIZE + 2)) + [1]
+    
+    with patch.object(settings, 'CACHE_INVALIDATION_ENABLED', True):
+        await event_processor._notify_invalidation(conn, anime_ids)
+    
+    assert conn.execute.call_count == 2
+    assert conn.execute.call_args_list[1][0][2] == f"[{EventProcessor.NOTIFY_CHUNK_SIZE + 1}]"
+
+
+@pytest.mark.asyncio
+async def test_notify_invalidation_disabled(event_processor):
+    """Test que no se emite NOTIFY si la invalidación está deshabilitada."""
+    conn = AsyncMock()
+    
+    with patch.object(settings, 'CACHE_INVALIDATION_ENABLED', False):
+        await event_processor._notify_invalidation(conn, [1])
+    
+    conn.execute.assert_not_called()
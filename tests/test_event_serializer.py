@@ -0,0 +1,96 @@
+"""Tests para la serialización de eventos para Kafka."""
+import json
+import pytest
+from datetime import datetime
+from common.events.anime_events import ClickRegistered, ViewRegistered, RatingGiven
+from common.events.serializer import (
+    BINARY_MAGIC,
+    BinaryEventSerializer,
+    JsonEventSerializer,
+    decode_event_payload,
+    get_event_serializer,
+)
+
+
+def _events():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    return [
+        ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id="user123", timestamp=timestamp),
+        ViewRegistered(
+            aggregate_id="anime_2", anime_id=2, user_id="user123",
+            duration_seconds=1440, timestamp=timestamp,
+        ),
+        RatingGiven(
+            aggregate_id="anime_3", anime_id=3, user_id="user123",
+            rating=8.75, timestamp=timestamp, metadata={"source": "web"},
+        ),
+    ]
+
+
+@pytest.mark.parametrize("event", _events(), ids=lambda e: e.event_type)
+def test_binary_round_trip_matches_json(event):
+    """El formato binario decodifica al mismo dict que el JSON."""
+    binary = BinaryEventSerializer().serialize(event)
+    
+    assert binary[0] == BINARY_MAGIC
+    assert decode_event_payload(binary) == json.loads(JsonEventSerializer().serialize(event))
+
+
+@pytest.mark.parametrize("event", _events(), ids=lambda e: e.event_type)
+def test_binary_is_smaller_than_json(event):
+    """El formato binario ocupa menos de la mitad que el JSON."""
+    binary = BinaryEventSerializer().serialize(event)
+    json_payload = JsonEventSerializer().serialize(event)
+    
+    assert len(binary) * 2 < len(json_payload)
+
+
+def test_decode_detects_json_payloads():
+    """Los mensajes JSON se siguen decodificando."""
+    event = _events()[0]
+    
+    decoded = decode_event_payload(JsonEventSerializer().serialize(event))
+    
+    assert decoded["event_id"] == event.event_id
+    assert decoded["event_type"] == "ClickRegistered"
+
+
+def test_binary_falls_back_to_json_for_unknown_types():
+    """Un tipo sin esquema binario se serializa en JSON."""
+    data = {"event_type": "AnimeArchived", "aggregate_id": "anime_1", "anime_id": 1}
+    
+    payload = BinaryEventSerializer().serialize_dict(data)
+    
+    assert payload[0] != BINARY_MAGIC
+    assert decode_event_payload(payload) == data
+
+
+def test_binary_falls_back_to_json_when_schema_does_not_fit():
+    """Un evento con campos fuera de rango se serializa en JSON."""
+    data = json.loads(JsonEventSerializer().serialize(_events()[0]))
+    data["anime_id"] = 2 ** 40
+    
+    payload = BinaryEventSerializer().serialize_dict(data)
+    
+    assert payload[0] != BINARY_MAGIC
+    assert decode_event_payload(payload) == data
+
+
+def test_binary_keeps_non_uuid_event_ids():
+    """Un event_id que no es un UUID canónico se conserva tal cual."""
+    data = json.loads(JsonEventSerializer().serialize(_events()[1]))
+    data["event_id"] = "legacy-42"
+    
+    payload = BinaryEventSerializer().serialize_dict(data)
+    
+    assert payload[0] == BINARY_MAGIC
+    assert decode_event_payload(payload) == data
+
+
+def test_get_event_serializer_uses_settings(monkeypatch):
+    """Sin nombre explícito se usa EVENT_SERIALIZATION_FORMAT."""
+    from config.settings import settings
+    monkeypatch.setattr(settings, "EVENT_SERIALIZATION_FORMAT", "binary")
+    
+    assert isinstance(get_event_serializer(), BinaryEventSerializer)
+    assert isinstance(get_event_serializer("json"), JsonEventSerializer)
@@ -223,3 +223,101 @@ async def test_close_no_pool(event_store):
     await event_store.close()
     assert event_store._pool is None
 
+
+
+@pytest.mark.asyncio
+async def test_save_events_group_commit(event_store, mock_pool):
+    """Test que save_events() delega en el GroupCommitWriter cuando está activo."""
+    pool, conn = mock_pool
+    event_store._pool = pool
+    event_store._group_writer = MagicMock()
+    event_store._group_writer.is_running = True
+    event_store._group_writer.submit = AsyncMock()
+    
+    events = [ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id="user123")]
+    await event_store.save_events(events)
+    
+    event_store._group_writer.submit.assert_called_once_with(events)
+    conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_insert_events_bulk_single_statement(event_store, mock_pool):
+    """Test que _insert_events_bulk() escribe todos los eventos con un solo INSERT."""
+    pool, conn = mock_pool
+    event_store._pool = pool
+    
+    transaction = MagicMock()
+    transaction.__aenter__ = AsyncMock(return_value=transaction)
+    transaction.__aexit__ = AsyncMock(return_value=None)
+    conn.transaction = MagicMock(return_value=transaction)
+    conn.execute = AsyncMock()
+    
+    events = [
+        ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id="user123"),
+        RatingGiven(aggregate_id="anime_2", anime_id=2, user_id="user123", rating=7.0),
+    ]
+    await event_store._insert_events_bulk(events)
+    
+    conn.execute.assert_called_once()
+    args = conn.execute.call_args[0]
+    assert "unnest" in args[0]
+    assert args[1] == [event.event_id for event in events]
+
+
+class _AsyncRows:
+    """Iterable asíncrono que simula un cursor de asyncpg."""
+    
+    def __init__(self, rows):
+        self._rows = iter(rows)
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        try:
+            return next(self._rows)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+@pytest.mark.asyncio
+async def test_iter_events_streams_typed_events(event_store, mock_pool):
+    """Test que iter_events() recorre un cursor y devuelve eventos tipados."""
+    pool, conn = mock_pool
+    event_store._pool = pool
+    click = ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id="user1")
+    rating = RatingGiven(aggregate_id="anime_1", anime_id=1, user_id="user1", rating=8.5)
+    conn.transaction = MagicMock(return_value=AsyncMock())
+    conn.cursor = MagicMock(return_value=_AsyncRows([
+        {"event_type": "ClickRegistered", "event_data": click.model_dump_json()},
+        {"event_type": "RatingGiven", "event_data": rating.model_dump_json()},
+    ]))
+    
+    events = [event async for event in event_store.iter_events("anime_1", chunk_size=50)]
+    
+    assert events == [click, rating]
+    assert isinstance(events[1], RatingGiven)
+    assert conn.cursor.call_args.kwargs["prefetch"] == 50
+    conn.transaction.assert_called_once_with(readonly=True)
+
+
+@pytest.mark.asyncio
+async def test_iter_events_applies_position_and_time_bounds(event_store, mock_pool):
+    """Test que iter_events() acota por posición de commit y sólo añade los filtros indicados."""
+    pool, conn = mock_pool
+    event_store._pool = pool
+    conn.transaction = MagicMock(return_value=AsyncMock())
+    conn.cursor = MagicMock(return_value=_AsyncRows([]))
+    to_time = datetime(2024, 1, 1)
+    
+    events = [event async for event in event_store.iter_events("anime_1", after=(700, 42), to_time=to_time)]
+    
+    assert events == []
+    query, *args = conn.cursor.call_args.args
+    assert "(transaction_id, id) > ($2::xid8, $3::bigint)" in query
+    assert "(transaction_id, id) <=" not in query
+    assert "occurred_at < $4" in query
+    assert "version" not in query
+    assert "ORDER BY transaction_id, id" in query
+    assert args == ["anime_1", 700, 42, to_time]
@@ -0,0 +1,117 @@
+"""Tests para el mantenimiento de particiones del Event Store."""
+import pytest
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock
+from app.command_side.infrastructure.event_store_partitions import (
+    EventStorePartitionManager,
+    Partition,
+    month_start,
+    parse_partition_name,
+    partition_for,
+)
+
+
+def _transaction():
+    context = AsyncMock()
+    context.__aenter__ = AsyncMock(return_value=None)
+    context.__aexit__ = AsyncMock(return_value=None)
+    return context
+
+
+@pytest.fixture
+def mock_conn():
+    """Fixture para una conexión mock con algunas particiones existentes."""
+    conn = MagicMock()
+    conn.fetch = AsyncMock(return_value=[
+        {"name": "event_store_y2026m10"},
+        {"name": "event_store_y2026m01"},
+        {"name": "event_store_y2026m02"},
+        {"name": "event_store_default"},
+    ])
+    conn.execute = AsyncMock()
+    conn.fetchval = AsyncMock(return_value=False)
+    conn.transaction = MagicMock(side_effect=lambda: _transaction())
+    return conn
+
+
+def _manager(conn, **kwargs):
+    manager = EventStorePartitionManager(archive_schema="event_store_archive", **kwargs)
+    manager._conn = conn
+    return manager
+
+
+def test_month_start_crosses_years():
+    """month_start desplaza meses atravesando cambios de año."""
+    assert month_start(date(2026, 11, 17), 2) == date(2027, 1, 1)
+    assert month_start(date(2026, 1, 31), -1) == date(2025, 12, 1)
+
+
+def test_partition_names_round_trip():
+    """El nombre de la partición codifica su rango mensual."""
+    partition = partition_for(date(2026, 12, 5))
+    
+    assert partition == Partition("event_store_y2026m12", date(2026, 12, 1), date(2027, 1, 1))
+    assert parse_partition_name(partition.name) == partition
+    assert parse_partition_name("event_store_default") is None
+
+
+@pytest.mark.asyncio
+async def test_ensure_partitions_creates_missing_months(mock_conn):
+    """Sólo se crean las particiones que faltan del mes actual y los siguientes."""
+    manager = _manager(mock_conn, premake_months=2)
+    
+    created = await manager.ensure_partitions(date(2026, 10, 17))
+    
+    assert [p.name for p in created] == ["event_store_y2026m11", "event_store_y2026m12"]
+    statement = mock_conn.execute.call_args_list[0][0][0]
+    assert "PARTITION OF event_store" in statement
+    assert "FROM ('2026-11-01') TO ('2026-12-01')" in statement
+
+
+@pytest.mark.asyncio
+async def test_archive_disabled_without_retention(mock_conn):
+    """Con retención 0 no se archiva ninguna partición."""
+    manager = _manager(mock_conn, retention_months=0)
+    
+    assert await manager.archive_partitions(date(2026, 10, 17)) == []
+    mock_conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_archive_detaches_partitions_past_retention(mock_conn, monkeypatch):
+    """Las particiones anteriores a la retención se desconectan y se mueven al archivo."""
+    from config.settings import settings
+    monkeypatch.setattr(settings, "EVENT_OUTBOX_ENABLED", False)
+    manager = _manager(mock_conn, retention_months=8)
+    
+    archived = await manager.archive_partitions(date(2026, 10, 17))
+    
+    assert [p.name for p in archived] == ["event_store_y2026m01"]
+    statements = [c[0][0] for c in mock_conn.execute.call_args_list]
+    assert "ALTER TABLE event_store DETACH PARTITION event_store_y2026m01" in statements
+    assert "ALTER TABLE event_store_y2026m01 SET SCHEMA event_store_archive" in statements
+
+
+@pytest.mark.asyncio
+async def test_archive_keeps_unpublished_partitions(mock_conn, monkeypatch):
+    """Con el outbox activo no se archivan eventos que el relay no ha publicado."""
+    from config.settings import settings
+    monkeypatch.setattr(settings, "EVENT_OUTBOX_ENABLED", True)
+    mock_conn.fetchval = AsyncMock(return_value=True)
+    manager = _manager(mock_conn, retention_months=3)
+    
+    assert await manager.archive_partitions(date(2026, 10, 17)) == []
+    mock_conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_archive_keeps_partitions_before_first_relay_run(mock_conn, monkeypatch):
+    """Sin checkpoint del outbox (el relay no ha arrancado nunca) no se archiva nada."""
+    from config.settings import settings
+    monkeypatch.setattr(settings, "EVENT_OUTBOX_ENABLED", True)
+    mock_conn.fetchval = AsyncMock(return_value=False)
+    manager = _manager(mock_conn, retention_months=3)
+    
+    assert await manager.archive_partitions(date(2026, 10, 17)) == []
+    mock_conn.execute.assert_not_called()
+    assert "outbox_checkpoints" in mock_conn.fetchval.call_args[0][0]
@@ -2,6 +2,8 @@
 import pytest
 from datetime import datetime
 from common.events.anime_events import ClickRegistered, ViewRegistered, RatingGiven
+from common.events.registry import deserialize_event
+from common.exceptions import UnknownEventTypeError
 
 
 def test_click_registered_event():
@@ -68,3 +70,24 @@ def test_rating_validation():
             rating=11.0
         )
 
+
+
+def test_deserialize_event_round_trip():
+    """Test que un evento serializado se reconstruye con su clase."""
+    event = ViewRegistered(
+        aggregate_id="anime_1",
+        anime_id=1,
+        user_id="user123",
+        duration_seconds=120
+    )
+    
+    restored = deserialize_event("ViewRegistered", event.model_dump_json())
+    
+    assert isinstance(restored, ViewRegistered)
+    assert restored == event
+
+
+def test_deserialize_event_unknown_type():
+    """Test que un tipo no registrado lanza UnknownEventTypeError."""
+    with pytest.raises(UnknownEventTypeError):
+        deserialize_event("AnimeDeleted", "{}")
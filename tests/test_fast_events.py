@@ -0,0 +1,80 @@
+"""Tests para la representación rápida de eventos."""
+import json
+import uuid
+import pytest
+from datetime import datetime
+from common.events.anime_events import ClickRegistered, ViewRegistered, RatingGiven
+from common.events.fast_events import (
+    FastClickRegistered,
+    FastViewRegistered,
+    FastRatingGiven,
+    event_json,
+    new_event_id,
+)
+from common.events.serializer import BinaryEventSerializer, JsonEventSerializer, decode_event_payload
+
+
+def _fast_events():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    return [
+        FastClickRegistered(aggregate_id="anime_1", anime_id=1, user_id='usuário "1"', timestamp=timestamp),
+        FastViewRegistered(
+            aggregate_id="anime_2", anime_id=2, user_id="user123",
+            duration_seconds=1440, timestamp=timestamp,
+        ),
+        FastRatingGiven(
+            aggregate_id="anime_3", anime_id=3, user_id="user123",
+            rating=8, timestamp=timestamp, metadata={"source": "web"},
+        ),
+    ]
+
+
+@pytest.mark.parametrize("event", _fast_events(), ids=lambda e: e.event_type)
+def test_fast_event_json_matches_pydantic(event):
+    """El JSON del evento rápido es idéntico al de su modelo Pydantic."""
+    model = event.to_model()
+    
+    assert event.to_json() == model.model_dump_json()
+    assert event.to_dict() == model.model_dump()
+
+
+def test_fast_event_to_model_types():
+    """Cada evento rápido se convierte a su modelo público."""
+    click, view, rating = _fast_events()
+    
+    assert isinstance(click.to_model(), ClickRegistered)
+    assert isinstance(view.to_model(), ViewRegistered)
+    assert isinstance(rating.to_model(), RatingGiven)
+    assert rating.to_model().event_id == rating.event_id
+
+
+def test_fast_event_serializes_once():
+    """El JSON se calcula una vez y lo reutilizan el Event Store y Kafka."""
+    event = _fast_events()[0]
+    
+    stored = event_json(event)
+    
+    assert event_json(event) is stored
+    assert JsonEventSerializer().serialize(event) is event.to_json_bytes()
+    assert event.to_json_bytes() == stored.encode("utf-8")
+
+
+def test_fast_event_binary_serialization():
+    """El serializador binario acepta eventos rápidos."""
+    event = _fast_events()[1]
+    
+    payload = BinaryEventSerializer().serialize(event)
+    
+    assert decode_event_payload(payload) == json.loads(event.to_json())
+
+
+def test_new_event_id_is_uuid4():
+    """new_event_id genera UUID4 canónicos y distintos."""
+    ids = {new_event_id() for _ in range(1000)}
+    
+    assert len(ids) == 1000
+    for event_id in ids:
+        parsed = uuid.UUID(event_id)
+        assert str(parsed) == event_id
+        assert parsed.version == 4
+        assert parsed.variant == uuid.RFC_4122
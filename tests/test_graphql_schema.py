@@ -3,7 +3,7 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from app.read_side.graphql.schema import Query, get_repository
 from app.read_side.infrastructure.repository import ReadModelRepository
-from app.read_side.graphql.exceptions import InvalidLimitError
+from app.read_side.graphql.exceptions import InvalidIdsError, InvalidLimitError
 from common.exceptions import AnimeNotFoundError, GraphQLError
 
 
@@ -57,7 +57,7 @@ async def test_anime_stats_not_found(query, mock_repository):
     """Test que anime_stats retorna None cuando no encuentra el anime."""
     with patch("app.read_side.graphql.schema.get_repository", return_value=mock_repository):
         mock_repository.get_anime_stats = AsyncMock(return_value=None)
-        result = await query.anime_stats(1)
+        result = await query.anime_stats(1, info=None)
         assert result is None
 
 
@@ -73,7 +73,7 @@ async def test_anime_stats_success(query, mock_repository):
             "average_rating": 8.5,
             "total_duration_seconds": 3600
         })
-        result = await query.anime_stats(1)
+        result = await query.anime_stats(1, info=None)
         assert result is not None
         assert result.anime_id == 1
         assert result.total_views == 100
@@ -85,7 +85,7 @@ async def test_anime_not_found(query, mock_repository):
     """Test que anime retorna None cuando no encuentra el anime."""
     with patch("app.read_side.graphql.schema.get_repository", return_value=mock_repository):
         mock_repository.get_anime = AsyncMock(return_value=None)
-        result = await query.anime(1)
+        result = await query.anime(1, info=None)
         assert result is None
 
 
@@ -103,7 +103,7 @@ async def test_anime_success(query, mock_repository):
             "score": 8.5,
             "popularity": 100
         })
-        result = await query.anime(1)
+        result = await query.anime(1, info=None)
         assert result is not None
         assert result.myanimelist_id == 1
         assert result.title == "Test Anime"
@@ -167,4 +167,90 @@ async def test_row_to_anime(query):
     assert result.type == "TV"
     assert result.episodes == 12
     assert result.score == 8.5
-    assert result.popularity == 100
\ No newline at end of file
+    assert result.popularity == 100
+
+@pytest.mark.asyncio
+async def test_aliased_fields_are_batched_with_dataloaders(mock_repository):
+    """Test que varios anime/animeStats y el anime anidado se resuelven con llamadas bulk."""
+    from app.read_side.graphql.schema import schema
+    from app.read_side.graphql.loaders import create_loaders
+    
+    stats_row = {
+        "anime_id": 1, "total_clicks": 1, "total_views": 2, "total_ratings": 0,
+        "average_rating": None, "total_duration_seconds": 0,
+    }
+    mock_repository.get_anime_stats_by_ids = AsyncMock(return_value={1: stats_row, 2: {**stats_row, "anime_id": 2}})
+    mock_repository.get_animes_by_ids = AsyncMock(return_value={
+        1: {"myanimelist_id": 1, "title": "Cowboy Bebop"},
+        2: {"myanimelist_id": 2, "title": "Trigun"},
+    })
+    
+    query = """
+        {
+            a: animeStats(animeId: 1) { totalViews anime { title } }
+            b: animeStats(animeId: 2) { totalViews anime { title } }
+        }
+    """
+    result = await schema.execute(query, context_value=create_loaders(mock_repository), root_value=Query())
+    
+    assert result.errors is None
+    assert result.data["a"]["anime"]["title"] == "Cowboy Bebop"
+    assert result.data["b"]["anime"]["title"] == "Trigun"
+    mock_repository.get_anime_stats_by_ids.assert_called_once_with([1, 2])
+    mock_repository.get_animes_by_ids.assert_called_once_with([1, 2])
+    mock_repository.get_anime_stats.assert_not_called()
+    mock_repository.get_anime.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_animes_list_preserves_order(query, mock_repository):
+    """Test que animes(ids) devuelve los animes en el orden pedido y None si no existen."""
+    with patch("app.read_side.graphql.schema.get_repository", return_value=mock_repository):
+        mock_repository.get_animes_by_ids = AsyncMock(return_value={
+            5: {"myanimelist_id": 5, "title": "B"},
+            1: {"myanimelist_id": 1, "title": "A"},
+        })
+        
+        result = await query.animes([1, 3, 5], info=None)
+    
+    assert [anime.title if anime else None for anime in result] == ["A", None, "B"]
+
+
+@pytest.mark.asyncio
+async def test_animes_list_rejects_too_many_ids(query):
+    """Test que animes(ids) limita la cantidad de IDs."""
+    with pytest.raises(InvalidIdsError):
+        await query.animes(list(range(1, 102)), info=None)
+
+
+@pytest.mark.asyncio
+async def test_animes_lists_share_the_request_dataloaders(mock_repository):
+    """Test que animes(ids) y animesStats(ids) usan los DataLoaders del request."""
+    from app.read_side.graphql.schema import schema
+    from app.read_side.graphql.loaders import create_loaders
+    
+    stats_row = {
+        "anime_id": 2, "total_clicks": 1, "total_views": 2, "total_ratings": 0,
+        "average_rating": None, "total_duration_seconds": 0,
+    }
+    mock_repository.get_anime_stats_by_ids = AsyncMock(return_value={2: stats_row})
+    mock_repository.get_animes_by_ids = AsyncMock(return_value={
+        1: {"myanimelist_id": 1, "title": "Cowboy Bebop"},
+        2: {"myanimelist_id": 2, "title": "Trigun"},
+    })
+    
+    query = """
+        {
+            animes(ids: [1, 3]) { title }
+            animesStats(ids: [2, 3]) { totalViews anime { title } }
+        }
+    """
+    result = await schema.execute(query, context_value=create_loaders(mock_repository), root_value=Query())
+    
+    assert result.errors is None
+    assert [anime["title"] if anime else None for anime in result.data["animes"]] == ["Cowboy Bebop", None]
+    assert result.data["animesStats"][0]["anime"]["title"] == "Trigun"
+    assert result.data["animesStats"][1] is None
+    mock_repository.get_anime_stats_by_ids.assert_called_once_with([2, 3])
+    # animes(ids) es una sola carga bulk; el anime anidado se agrupa en la siguiente
+    assert [call.args[0] for call in mock_repository.get_animes_by_ids.await_args_list] == [[1, 3], [2]]
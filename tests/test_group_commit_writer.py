@@ -0,0 +1,114 @@
+"""Tests para GroupCommitWriter."""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from app.command_side.infrastructure.group_commit_writer import GroupCommitWriter
+from common.events.anime_events import ClickRegistered
+
+
+def make_event(anime_id: int = 1) -> ClickRegistered:
+    """Crea un evento de click de prueba."""
+    return ClickRegistered(aggregate_id=f"anime_{anime_id}", anime_id=anime_id, user_id="user123")
+
+
+@pytest.mark.asyncio
+async def test_submit_coalesces_concurrent_requests():
+    """Test que submit() agrupa peticiones concurrentes en una sola escritura."""
+    write_batch = AsyncMock()
+    writer = GroupCommitWriter(write_batch, max_delay_ms=20, max_batch_size=100)
+    await writer.start()
+    
+    await asyncio.gather(*(writer.submit([make_event(i)]) for i in range(10)))
+    await writer.stop()
+    
+    write_batch.assert_called_once()
+    assert len(write_batch.call_args[0][0]) == 10
+
+
+@pytest.mark.asyncio
+async def test_submit_respects_max_batch_size():
+    """Test que un grupo no supera max_batch_size eventos."""
+    write_batch = AsyncMock()
+    writer = GroupCommitWriter(write_batch, max_delay_ms=20, max_batch_size=4)
+    await writer.start()
+    
+    await asyncio.gather(*(writer.submit([make_event(i)]) for i in range(10)))
+    await writer.stop()
+    
+    sizes = [len(call.args[0]) for call in write_batch.call_args_list]
+    assert sum(sizes) == 10
+    assert max(sizes) <= 4
+
+
+@pytest.mark.asyncio
+async def test_failure_is_isolated_per_request():
+    """Test que un fallo del grupo solo se propaga a la petición culpable."""
+    bad_event = make_event(999)
+    
+    async def write_batch(events):
+        if bad_event in events:
+            raise ValueError("evento inválido")
+    
+    writer = GroupCommitWriter(write_batch, max_delay_ms=20)
+    await writer.start()
+    
+    results = await asyncio.gather(
+        writer.submit([make_event(1)]),
+        writer.submit([bad_event]),
+        writer.submit([make_event(2)]),
+        return_exceptions=True,
+    )
+    await writer.stop()
+    
+    assert results[0] is None
+    assert isinstance(results[1], ValueError)
+    assert results[2] is None
+
+
+@pytest.mark.asyncio
+async def test_submit_not_started():
+    """Test que submit() falla si el writer no está iniciado."""
+    writer = GroupCommitWriter(AsyncMock())
+    
+    with pytest.raises(RuntimeError):
+        await writer.submit([make_event()])
+
+
+@pytest.mark.asyncio
+async def test_submit_during_stop_fails_instead_of_hanging():
+    """Test que submit() durante stop() falla de inmediato y lo ya encolado se escribe."""
+    write_started = asyncio.Event()
+    release_write = asyncio.Event()
+    
+    async def write_batch(events):
+        write_started.set()
+        await release_write.wait()
+    
+    writer = GroupCommitWriter(write_batch, max_delay_ms=1)
+    await writer.start()
+    pending = asyncio.ensure_future(writer.submit([make_event(1)]))
+    await write_started.wait()
+    
+    stopping = asyncio.ensure_future(writer.stop())
+    await asyncio.sleep(0)
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(writer.submit([make_event(2)]), timeout=1)
+    release_write.set()
+    await asyncio.wait_for(stopping, timeout=1)
+    
+    assert await pending is None
+    assert not writer.is_running
+
+
+@pytest.mark.asyncio
+async def test_items_queued_after_sentinel_are_failed():
+    """Test que los eventos que quedan detrás del centinela se rechazan al salir el worker."""
+    writer = GroupCommitWriter(AsyncMock(), max_delay_ms=1)
+    await writer.start()
+    future = asyncio.get_running_loop().create_future()
+    await writer._queue.put(None)
+    await writer._queue.put(([make_event()], future))
+    await writer._task
+    
+    with pytest.raises(RuntimeError):
+        await future
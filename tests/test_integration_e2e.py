@@ -3,7 +3,7 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch, call
 from app.command_side.application.anime_command_handler import AnimeCommandHandler
 from app.command_side.infrastructure.event_store import EventStore
-from app.command_side.infrastructure.kafka_producer import KafkaEventProducer
+from app.command_side.infrastructure.kafka_producer import AsyncKafkaEventProducer
 from app.read_side.projections.event_processor import EventProcessor
 from app.read_side.infrastructure.repository import ReadModelRepository
 from common.dto.command_dto import ClickCommand, ViewCommand, RatingCommand
@@ -25,11 +25,11 @@ def mock_event_store():
 @pytest.fixture
 def mock_kafka_producer():
     """Fixture para mock de KafkaProducer."""
-    producer = MagicMock(spec=KafkaEventProducer)
-    producer.publish_events = MagicMock()
-    producer.health_check = MagicMock(return_value=True)
-    producer.connect = MagicMock()
-    producer.close = MagicMock()
+    producer = MagicMock(spec=AsyncKafkaEventProducer)
+    producer.publish_events = AsyncMock()
+    producer.health_check = AsyncMock(return_value=True)
+    producer.connect = AsyncMock()
+    producer.close = AsyncMock()
     return producer
 
 
@@ -38,6 +38,7 @@ def mock_anime_validator():
     """Fixture para mock de AnimeValidator."""
     validator = MagicMock()
     validator.anime_exists = AsyncMock(return_value=True)
+    validator.initialize = AsyncMock()
     validator.close = AsyncMock()
     return validator
 
@@ -85,14 +86,14 @@ async def test_click_command_full_flow(command_handler, mock_event_store, mock_k
     mock_event_store.save_events.assert_called_once()
     saved_events = mock_event_store.save_events.call_args[0][0]
     assert len(saved_events) == 1
-    assert isinstance(saved_events[0], ClickRegistered)
+    assert isinstance(saved_events[0].to_model(), ClickRegistered)
     assert saved_events[0].anime_id == 1
     assert saved_events[0].user_id == "user123"
     
     mock_kafka_producer.publish_events.assert_called_once()
     published_events = mock_kafka_producer.publish_events.call_args[0][0]
     assert len(published_events) == 1
-    assert isinstance(published_events[0], ClickRegistered)
+    assert isinstance(published_events[0].to_model(), ClickRegistered)
 
 
 @pytest.mark.asyncio
@@ -105,7 +106,7 @@ async def test_view_command_full_flow(command_handler, mock_event_store, mock_ka
     mock_event_store.save_events.assert_called_once()
     saved_events = mock_event_store.save_events.call_args[0][0]
     assert len(saved_events) == 1
-    assert isinstance(saved_events[0], ViewRegistered)
+    assert isinstance(saved_events[0].to_model(), ViewRegistered)
     assert saved_events[0].duration_seconds == 300
     
     mock_kafka_producer.publish_events.assert_called_once()
@@ -121,7 +122,7 @@ async def test_rating_command_full_flow(command_handler, mock_event_store, mock_
     mock_event_store.save_events.assert_called_once()
     saved_events = mock_event_store.save_events.call_args[0][0]
     assert len(saved_events) == 1
-    assert isinstance(saved_events[0], RatingGiven)
+    assert isinstance(saved_events[0].to_model(), RatingGiven)
     assert saved_events[0].rating == 8.5
     
     mock_kafka_producer.publish_events.assert_called_once()
@@ -240,7 +241,7 @@ async def test_full_flow_command_to_read_model(
     saved_events = mock_event_store.save_events.call_args[0][0]
     event = saved_events[0]
     
-    event_data = event.model_dump()
+    event_data = event.to_dict()
     await mock_event_processor.process_click_event(event_data)
     
     stats = await mock_repository.get_anime_stats(1)
@@ -3,7 +3,10 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from datetime import datetime
 from app.read_side.infrastructure import dlq_handler
+from aiokafka import TopicPartition
 from app.read_side.infrastructure.kafka_consumer import KafkaEventConsumer
+from app.read_side.projections.event_processor import EventProcessingError
+from config.settings import settings
 
 
 @pytest.fixture
@@ -151,9 +154,13 @@ async def test_handle_message_error_dlq_failure(kafka_consumer, mock_kafka_messa
 
 @pytest.mark.asyncio
 async def test_consume_events_increments_counters(kafka_consumer):
-    """Test que consume_events incrementa contadores correctamente."""
+    """Test que consume_events incrementa contadores y confirma offsets una vez por poll."""
     kafka_consumer._running = True
-    kafka_consumer.consumer = AsyncMock()
+    kafka_consumer.consumer = MagicMock()
+    kafka_consumer.consumer.commit = AsyncMock()
+    kafka_consumer.consumer.highwater = MagicMock(return_value=10)
+    tp = TopicPartition("anime-events", 0)
+    kafka_consumer.consumer.assignment = MagicMock(return_value={tp})
     
     message1 = MagicMock()
     message1.value = {
@@ -163,6 +170,7 @@ async def test_consume_events_increments_counters(kafka_consumer):
         "user_id": "user1",
         "occurred_at": datetime.utcnow()
     }
+    message1.offset = 3
     
     message2 = MagicMock()
     message2.value = {
@@ -173,23 +181,49 @@ async def test_consume_events_increments_counters(kafka_consumer):
         "duration_seconds": 100,
         "occurred_at": datetime.utcnow()
     }
+    message2.offset = 4
     
-    async def mock_consume():
-        yield message1
-        yield message2
-        kafka_consumer._running = False 
+    async def mock_getmany(**kwargs):
+        kafka_consumer._running = kafka_consumer.consumer.getmany.await_count < 2
+        return {tp: [message1, message2]} if kafka_consumer._running else {}
     
-    kafka_consumer.consumer.__aiter__ = lambda self: mock_consume()
+    kafka_consumer.consumer.getmany = AsyncMock(side_effect=mock_getmany)
     kafka_consumer._process_message = AsyncMock()
     
     kafka_consumer._processed_count = 0
     kafka_consumer._error_count = 0
     
-    await kafka_consumer.consume_events()
+    with patch.object(settings, 'KAFKA_CONSUMER_BATCH_ENABLED', False), \
+         patch.object(settings, 'KAFKA_CONSUMER_ENABLE_AUTO_COMMIT', False):
+        await kafka_consumer.consume_events()
 
     assert kafka_consumer._process_message.call_count == 2
     assert kafka_consumer._processed_count == 2
     assert kafka_consumer._error_count == 0
+    kafka_consumer.consumer.commit.assert_called_once_with({tp: 5})
+
+
+@pytest.mark.asyncio
+async def test_process_poll_sequentially_commits_only_processed_on_stop(kafka_consumer):
+    """Test que si el consumidor se detiene a mitad de poll solo se confirma lo procesado."""
+    tp = TopicPartition("anime-events", 0)
+    messages = [_message(f"e{i}", "anime_1", 0, i) for i in range(3)]
+    kafka_consumer._running = True
+    kafka_consumer.consumer = MagicMock()
+    kafka_consumer.consumer.commit = AsyncMock()
+    kafka_consumer.consumer.highwater = MagicMock(return_value=3)
+    kafka_consumer.consumer.assignment = MagicMock(return_value={tp})
+    
+    async def process_message(message):
+        if message is messages[1]:
+            kafka_consumer._running = False
+    
+    kafka_consumer._process_message = AsyncMock(side_effect=process_message)
+    
+    with patch.object(settings, 'KAFKA_CONSUMER_ENABLE_AUTO_COMMIT', False):
+        await kafka_consumer._process_poll_sequentially({tp: messages})
+    
+    kafka_consumer.consumer.commit.assert_called_once_with({tp: 2})
 
 
 @pytest.mark.asyncio
@@ -208,3 +242,155 @@ async def test_health_check_healthy(kafka_consumer):
     assert result['consumer_running'] == True
 
 
+@pytest.mark.asyncio
+async def test_consume_events_batch_mode(kafka_consumer, mock_kafka_message):
+    """Test que en modo lote cada poll se procesa con process_batch."""
+    kafka_consumer._running = True
+    kafka_consumer.consumer = MagicMock()
+    kafka_consumer.consumer.commit = AsyncMock()
+    tp = TopicPartition("anime-events", 0)
+    kafka_consumer.consumer.highwater = MagicMock(return_value=12346)
+    kafka_consumer.consumer.assignment = MagicMock(return_value={tp})
+    
+    async def mock_getmany(**kwargs):
+        kafka_consumer._running = False
+        return {tp: [mock_kafka_message]}
+    
+    kafka_consumer.consumer.getmany = mock_getmany
+    kafka_consumer.event_processor = MagicMock()
+    kafka_consumer.event_processor.process_batch = AsyncMock(return_value=[])
+    
+    with patch.object(settings, 'KAFKA_CONSUMER_BATCH_ENABLED', True), \
+         patch.object(settings, 'KAFKA_CONSUMER_ENABLE_AUTO_COMMIT', False):
+        await kafka_consumer.consume_events()
+    
+    kafka_consumer.event_processor.process_batch.assert_called_once_with([mock_kafka_message.value])
+    kafka_consumer.consumer.commit.assert_called_once_with({tp: 12346})
+    assert kafka_consumer._processed_count == 1
+
+
+@pytest.mark.asyncio
+async def test_process_batch_sends_invalid_events_to_dlq(kafka_consumer, mock_kafka_message):
+    """Test que los eventos rechazados del lote van a la DLQ."""
+    error = EventProcessingError("inválido")
+    kafka_consumer.event_processor = MagicMock()
+    kafka_consumer.event_processor.process_batch = AsyncMock(
+        return_value=[(mock_kafka_message.value, error)]
+    )
+    kafka_consumer._handle_message_error = AsyncMock()
+    
+    await kafka_consumer._process_batch([mock_kafka_message])
+    
+    kafka_consumer._handle_message_error.assert_called_once_with(mock_kafka_message, error)
+    assert kafka_consumer._error_count == 1
+    assert kafka_consumer._processed_count == 0
+
+
+@pytest.mark.asyncio
+async def test_process_batch_falls_back_to_single_messages(kafka_consumer, mock_kafka_message):
+    """Test que si falla el lote se reprocesa mensaje a mensaje."""
+    kafka_consumer.event_processor = MagicMock()
+    kafka_consumer.event_processor.process_batch = AsyncMock(side_effect=EventProcessingError("fallo"))
+    kafka_consumer._process_message = AsyncMock()
+    
+    await kafka_consumer._process_batch([mock_kafka_message])
+    
+    kafka_consumer._process_message.assert_called_once_with(mock_kafka_message)
+    assert kafka_consumer._processed_count == 1
+
+
+def _message(event_id, aggregate_id, partition=0, offset=0):
+    message = MagicMock()
+    message.key = aggregate_id.encode("utf-8")
+    message.value = {"event_id": event_id, "aggregate_id": aggregate_id}
+    message.partition = partition
+    message.offset = offset
+    return message
+
+
+def test_group_messages_by_partition(kafka_consumer):
+    """Test que en modo partition cada partición es un grupo."""
+    m1, m2, m3 = _message("e1", "anime_1", 0, 1), _message("e2", "anime_1", 0, 2), _message("e3", "anime_2", 1, 1)
+    
+    with patch.object(settings, 'KAFKA_CONSUMER_PARALLEL_MODE', "partition"):
+        groups = kafka_consumer._group_messages({"tp0": [m1, m2], "tp1": [m3], "tp2": []})
+    
+    assert groups == [[m1, m2], [m3]]
+
+
+def test_group_messages_by_key_preserves_aggregate_order(kafka_consumer):
+    """Test que en modo key los mensajes de un mismo aggregate quedan en orden en un grupo."""
+    messages = [_message(f"e{i}", f"anime_{i % 3}", 0, i) for i in range(9)]
+    
+    with patch.object(settings, 'KAFKA_CONSUMER_PARALLEL_MODE', "key"), \
+         patch.object(settings, 'KAFKA_CONSUMER_MAX_CONCURRENCY', 2):
+        groups = kafka_consumer._group_messages({"tp0": messages})
+    
+    assert len(groups) <= 2
+    for aggregate_id in ("anime_0", "anime_1", "anime_2"):
+        containing = [g for g in groups if any(m.value["aggregate_id"] == aggregate_id for m in g)]
+        assert len(containing) == 1
+        offsets = [m.offset for m in containing[0] if m.value["aggregate_id"] == aggregate_id]
+        assert offsets == sorted(offsets)
+
+
+@pytest.mark.asyncio
+async def test_process_groups_respects_concurrency_limit(kafka_consumer):
+    """Test que los grupos se procesan en paralelo sin superar el límite."""
+    import asyncio
+    active = 0
+    max_active = 0
+    
+    async def process_batch(messages):
+        nonlocal active, max_active
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+    
+    kafka_consumer._process_batch = process_batch
+    groups = [[_message(f"e{i}", f"anime_{i}")] for i in range(5)]
+    
+    await kafka_consumer._process_groups(groups, asyncio.Semaphore(2))
+    
+    assert max_active == 2
+
+
+@pytest.mark.asyncio
+async def test_process_poll_commits_contiguous_offsets_on_failure(kafka_consumer):
+    """Test que si un grupo falla solo se confirma hasta su primer mensaje no aplicado."""
+    import asyncio
+    tp0, tp1 = TopicPartition("anime-events", 0), TopicPartition("anime-events", 1)
+    ok = [_message("e1", "anime_1", 0, 10), _message("e2", "anime_1", 0, 11)]
+    broken = [_message("e3", "anime_2", 1, 5), _message("e4", "anime_2", 1, 6)]
+    for message in ok + broken:
+        message.topic = "anime-events"
+    
+    async def process_batch(messages):
+        if messages is broken:
+            raise RuntimeError("DLQ no disponible")
+    
+    kafka_consumer.consumer = MagicMock()
+    kafka_consumer.consumer.commit = AsyncMock()
+    kafka_consumer.consumer.highwater = MagicMock(return_value=None)
+    kafka_consumer.consumer.assignment = MagicMock(return_value={tp0, tp1})
+    kafka_consumer._process_batch = process_batch
+    
+    with patch.object(settings, 'KAFKA_CONSUMER_PARALLEL_MODE', "partition"), \
+         patch.object(settings, 'KAFKA_CONSUMER_ENABLE_AUTO_COMMIT', False):
+        with pytest.raises(RuntimeError):
+            await kafka_consumer._process_poll({tp0: ok, tp1: broken}, asyncio.Semaphore(2))
+    
+    kafka_consumer.consumer.commit.assert_called_once_with({tp0: 12})
+
+
+@pytest.mark.asyncio
+async def test_commit_offsets_skipped_with_auto_commit(kafka_consumer):
+    """Test que no se confirman offsets manualmente con auto commit activo."""
+    kafka_consumer.consumer = MagicMock()
+    kafka_consumer.consumer.commit = AsyncMock()
+    
+    with patch.object(settings, 'KAFKA_CONSUMER_ENABLE_AUTO_COMMIT', True):
+        await kafka_consumer._commit_offsets({TopicPartition("anime-events", 0): 1})
+    
+    kafka_consumer.consumer.commit.assert_not_called()
@@ -1,9 +1,12 @@
 """Tests de integración para Kafka Producer."""
+import asyncio
 import pytest
-from unittest.mock import MagicMock, patch, call
-from app.command_side.infrastructure.kafka_producer import KafkaEventProducer
+from unittest.mock import AsyncMock, MagicMock, patch, call
+from app.command_side.infrastructure.kafka_producer import KafkaEventProducer, AsyncKafkaEventProducer
 from common.events.anime_events import ClickRegistered, ViewRegistered, RatingGiven
+from common.events.serializer import decode_event_payload
 from kafka.errors import KafkaError
+from config.settings import settings
 
 
 @pytest.fixture
@@ -30,6 +33,7 @@ async def test_connect_success(kafka_producer, mock_kafka_producer):
         kafka_producer.connect()
         
         mock_kafka.assert_called_once()
+        assert mock_kafka.call_args.kwargs["retries"] == settings.KAFKA_PRODUCER_RETRIES
         assert kafka_producer._producer == mock_kafka_producer
 
 
@@ -174,3 +178,84 @@ async def test_publish_multiple_events_different_aggregates(kafka_producer, mock
         assert mock_kafka_producer.send.call_count == 3
         mock_kafka_producer.flush.assert_called_once()
 
+
+@pytest.fixture
+def mock_aiokafka_producer():
+    """Fixture para mock de AIOKafkaProducer."""
+    producer = MagicMock()
+    producer.start = AsyncMock()
+    producer.stop = AsyncMock()
+    producer.flush = AsyncMock()
+    producer.partitions_for = AsyncMock(return_value={0, 1, 2})
+    
+    async def send(topic, key=None, value=None):
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(MagicMock(topic=topic))
+        return future
+    
+    producer.send = AsyncMock(side_effect=send)
+    return producer
+
+
+@pytest.mark.asyncio
+async def test_async_connect_success(mock_aiokafka_producer):
+    """Test que connect() arranca el producer asíncrono con la configuración de batching."""
+    producer = AsyncKafkaEventProducer()
+    with patch("app.command_side.infrastructure.kafka_producer.AIOKafkaProducer", return_value=mock_aiokafka_producer) as mock_kafka:
+        await producer.connect()
+        
+        mock_aiokafka_producer.start.assert_called_once()
+        kwargs = mock_kafka.call_args.kwargs
+        assert "linger_ms" in kwargs
+        assert "max_batch_size" in kwargs
+        assert "compression_type" in kwargs
+        assert kwargs["retry_backoff_ms"] == settings.KAFKA_PRODUCER_RETRY_BACKOFF_MS
+        assert kwargs["request_timeout_ms"] == settings.KAFKA_PRODUCER_REQUEST_TIMEOUT_MS
+
+
+@pytest.mark.asyncio
+async def test_async_publish_events_waits_for_delivery(mock_aiokafka_producer):
+    """Test que publish_events() espera los futures de entrega sin llamar a flush()."""
+    producer = AsyncKafkaEventProducer()
+    with patch("app.command_side.infrastructure.kafka_producer.AIOKafkaProducer", return_value=mock_aiokafka_producer):
+        events = [
+            ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id="user1"),
+            ViewRegistered(aggregate_id="anime_2", anime_id=2, user_id="user2", duration_seconds=100),
+        ]
+        
+        await producer.publish_events(events, wait=True)
+        
+        assert mock_aiokafka_producer.send.call_count == 2
+        mock_aiokafka_producer.flush.assert_not_called()
+        value = mock_aiokafka_producer.send.call_args_list[0].kwargs["value"]
+        assert isinstance(value, bytes)
+        assert isinstance(decode_event_payload(value)["occurred_at"], str)
+
+
+@pytest.mark.asyncio
+async def test_async_send_events_returns_futures(mock_aiokafka_producer):
+    """Test que send_events() devuelve un future de entrega por evento."""
+    producer = AsyncKafkaEventProducer()
+    with patch("app.command_side.infrastructure.kafka_producer.AIOKafkaProducer", return_value=mock_aiokafka_producer):
+        futures = await producer.send_events([
+            ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id="user1"),
+        ])
+        
+        assert len(futures) == 1
+        metadata = await futures[0]
+        assert metadata.topic is not None
+
+
+@pytest.mark.asyncio
+async def test_async_close_and_health_check(mock_aiokafka_producer):
+    """Test que health_check() consulta metadata y close() detiene el producer."""
+    producer = AsyncKafkaEventProducer()
+    with patch("app.command_side.infrastructure.kafka_producer.AIOKafkaProducer", return_value=mock_aiokafka_producer):
+        assert await producer.health_check() is True
+        
+        mock_aiokafka_producer.partitions_for.side_effect = Exception("Connection failed")
+        assert await producer.health_check() is False
+        
+        await producer.close()
+        mock_aiokafka_producer.stop.assert_called_once()
+        assert producer._producer is None
@@ -0,0 +1,78 @@
+"""Tests para Leaderboard."""
+import time
+from app.read_side.infrastructure.leaderboard import Leaderboard
+
+
+def _views_board(capacity=3):
+    return Leaderboard(
+        capacity,
+        score=lambda row: (row.get("total_views") or 0,),
+        qualifies=lambda row: (row.get("total_views") or 0) > 0,
+    )
+
+
+def _row(anime_id, views):
+    return {"anime_id": anime_id, "total_views": views}
+
+
+def test_load_and_top_slice():
+    """Test que top() sirve un slice ordenado del ranking."""
+    board = _views_board()
+    board.load([_row(1, 10), _row(2, 30), _row(3, 20)])
+    
+    assert [row["anime_id"] for row in board.top(2)] == [2, 3]
+    assert not board.needs_reload(3, max_age=60)
+
+
+def test_apply_inserts_row_that_beats_last():
+    """Test que una actualización que supera al último entra al ranking."""
+    board = _views_board()
+    board.load([_row(1, 10), _row(2, 30), _row(3, 20)])
+    
+    board.apply([4], {4: _row(4, 25)})
+    
+    assert [row["anime_id"] for row in board.top(3)] == [2, 4, 3]
+    assert len(board) == 3
+
+
+def test_apply_updates_existing_row_position():
+    """Test que una fila existente se reubica con su nuevo valor."""
+    board = _views_board()
+    board.load([_row(1, 10), _row(2, 30), _row(3, 20)])
+    
+    board.apply([1], {1: _row(1, 50)})
+    
+    assert [row["anime_id"] for row in board.top(3)] == [1, 2, 3]
+
+
+def test_apply_drops_row_below_known_range_and_requests_reload():
+    """Test que una fila que cae por debajo del ranking se descarta y se pide recarga."""
+    board = _views_board()
+    board.load([_row(1, 10), _row(2, 30), _row(3, 20)])
+    board.apply([5], {5: _row(5, 15)})
+    
+    board.apply([2], {2: _row(2, 1)})
+    
+    assert [row["anime_id"] for row in board.top(3)] == [3, 5]
+    assert board.needs_reload(3, max_age=60)
+    assert not board.needs_reload(2, max_age=60)
+
+
+def test_complete_board_accepts_any_qualifying_row():
+    """Test que si la carga trajo todas las filas, cualquier fila que califique entra."""
+    board = _views_board(capacity=10)
+    board.load([_row(1, 10)])
+    
+    board.apply([2, 3], {2: _row(2, 5), 3: _row(3, 0)})
+    
+    assert [row["anime_id"] for row in board.top(10)] == [1, 2]
+
+
+def test_needs_reload_when_expired():
+    """Test que el ranking pide recarga completa al superar max_age."""
+    board = _views_board()
+    assert board.needs_reload(1, max_age=60)
+    board.load([_row(1, 10)])
+    board.loaded_at = time.time() - 120
+    
+    assert board.needs_reload(1, max_age=60)
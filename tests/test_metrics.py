@@ -0,0 +1,266 @@
+"""Tests para el registro de métricas y su exposición en formato Prometheus."""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import MagicMock
+from aiokafka import TopicPartition
+from common.utils.metrics import (
+    CONTENT_TYPE,
+    HTTP_REQUEST_SECONDS,
+    MetricsMiddleware,
+    MetricsRegistry,
+    register_pool,
+    REGISTRY,
+    render_metrics,
+    run_snapshot_writer,
+    start_metrics_server,
+)
+
+
+def test_counter_and_gauge_render():
+    """Contadores y gauges se exponen con HELP, TYPE y labels escapados."""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Peticiones", ("path",))
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    in_flight = registry.gauge("in_flight", "En curso")
+    in_flight.set(3)
+    in_flight.dec()
+    
+    text = registry.render()
+    
+    assert "# HELP requests_total Peticiones\n# TYPE requests_total counter\n" in text
+    assert 'requests_total{path="/a\\"b"} 3\n' in text
+    assert "# TYPE in_flight gauge\nin_flight 2\n" in text
+
+
+def test_histogram_buckets_are_cumulative():
+    """Los buckets se acumulan, incluyen +Inf y el límite superior es inclusivo."""
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latencia", ("op",), buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.labels("write").observe(value)
+    
+    lines = registry.render().splitlines()
+    
+    assert 'latency_seconds_bucket{op="write",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{op="write",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{op="write",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{op="write"} 3.65' in lines
+    assert 'latency_seconds_count{op="write"} 4' in lines
+
+
+def test_registry_is_idempotent_and_validates_labels():
+    """Declarar dos veces la misma métrica devuelve la misma; labels incorrectos fallan."""
+    registry = MetricsRegistry()
+    first = registry.counter("events_total", "Eventos", ("type",))
+    
+    assert registry.counter("events_total", "Eventos", ("type",)) is first
+    with pytest.raises(ValueError):
+        registry.gauge("events_total", "Eventos", ("type",))
+    with pytest.raises(ValueError):
+        first.labels("a", "b")
+    with pytest.raises(ValueError):
+        first.inc()
+
+
+def test_function_values_are_read_on_render():
+    """set_function() lee el valor en cada scrape; un fallo omite la muestra."""
+    registry = MetricsRegistry()
+    pool = MagicMock()
+    pool.get_size.return_value = 8
+    pool.get_idle_size.return_value = 3
+    size = registry.gauge("pool_size", "Tamaño")
+    size.set_function(pool.get_size)
+    broken = registry.gauge("broken", "Roto")
+    broken.set_function(lambda: 1 / 0)
+    
+    assert "pool_size 8" in registry.render()
+    pool.get_size.return_value = 9
+    assert "pool_size 9" in registry.render()
+    assert "\nbroken " not in registry.render()
+
+
+def worker_registry(requests: int, in_flight: int, latency: float) -> MetricsRegistry:
+    """Registro de un worker con un contador, un gauge y un histograma."""
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Peticiones", ("path",)).labels("/a").inc(requests)
+    registry.gauge("in_flight", "En curso").set(in_flight)
+    registry.histogram("latency_seconds", "Latencia", buckets=(0.1, 1)).observe(latency)
+    return registry
+
+
+def write_worker_snapshot(directory, pid: int, registry: MetricsRegistry):
+    """Escribe el volcado de otro worker como lo haría write_snapshot()."""
+    with open(os.path.join(directory, f"metrics_{pid}.json"), "w", encoding="utf-8") as f:
+        json.dump({"pid": pid, "metrics": registry.snapshot()}, f)
+
+
+def test_render_metrics_sums_workers(tmp_path):
+    """Contadores e histogramas suman todos los volcados; los gauges sólo los de procesos vivos."""
+    # Un worker que ya terminó: su pid no existe
+    finished = subprocess.Popen([sys.executable, "-c", "pass"])
+    finished.wait()
+    write_worker_snapshot(tmp_path, os.getppid(), worker_registry(requests=2, in_flight=1, latency=0.5))
+    write_worker_snapshot(tmp_path, finished.pid, worker_registry(requests=4, in_flight=7, latency=3))
+    
+    lines = render_metrics(str(tmp_path), worker_registry(requests=1, in_flight=2, latency=0.05)).splitlines()
+    
+    assert 'requests_total{path="/a"} 7' in lines
+    assert "in_flight 3" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert "latency_seconds_count 3" in lines
+    assert os.path.exists(tmp_path / f"metrics_{os.getpid()}.json")
+
+
+def test_render_metrics_without_directory_is_process_local():
+    """Sin directorio multiproceso se expone sólo el registro del proceso."""
+    registry = worker_registry(requests=1, in_flight=2, latency=0.05)
+    
+    assert render_metrics(None, registry) == registry.render()
+
+
+def test_collectors_run_before_render_and_snapshot():
+    """Los collectors copian valores justo antes de renderizar o volcar."""
+    registry = MetricsRegistry()
+    entries = registry.gauge("entries", "Entradas")
+    stats = {"entries": 3}
+    registry.add_collector(lambda: entries.set(stats["entries"]))
+    
+    assert "entries 3" in registry.render()
+    stats["entries"] = 5
+    assert registry.snapshot()[0]["samples"] == [[[], 5]]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_writer_flushes_on_cancel(tmp_path):
+    """El writer vuelca periódicamente y una última vez al cancelarse."""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Peticiones")
+    writer = asyncio.ensure_future(run_snapshot_writer(str(tmp_path), 60, registry))
+    await asyncio.sleep(0)
+    requests.inc(4)
+    writer.cancel()
+    await asyncio.gather(writer, return_exceptions=True)
+    
+    with open(tmp_path / f"metrics_{os.getpid()}.json", encoding="utf-8") as f:
+        data = json.load(f)
+    
+    assert data["metrics"][0]["samples"] == [[[], 4]]
+
+
+def test_register_pool_exposes_utilization():
+    """register_pool() expone conexiones en uso, libres y el máximo del pool."""
+    pool = MagicMock()
+    pool.get_size.return_value = 5
+    pool.get_idle_size.return_value = 2
+    pool.get_max_size.return_value = 10
+    
+    register_pool("test_pool", pool)
+    text = REGISTRY.render()
+    
+    assert 'db_pool_connections{pool="test_pool",state="in_use"} 3' in text
+    assert 'db_pool_connections{pool="test_pool",state="idle"} 2' in text
+    assert 'db_pool_max_connections{pool="test_pool"} 10' in text
+
+
+def test_middleware_labels_requests_by_route_template():
+    """La latencia se etiqueta con la plantilla de la ruta y el status de la respuesta."""
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+    
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+    
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/items/x")
+    client.get("/missing")
+    
+    assert HTTP_REQUEST_SECONDS.labels("GET", "/items/{item_id}", "200").count == 2
+    assert HTTP_REQUEST_SECONDS.labels("GET", "/items/{item_id}", "422").count == 1
+    assert HTTP_REQUEST_SECONDS.labels("GET", "unmatched", "404").count >= 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_serves_metrics_and_health():
+    """El servidor de métricas del consumer responde /metrics, /health y las rutas JSON extra."""
+    registry = MetricsRegistry()
+    registry.counter("consumed_total", "Consumidos").inc(7)
+    
+    async def health():
+        return {"status": "stopped"}
+    
+    async def lag():
+        return {"total_lag": 3}
+    
+    server = await start_metrics_server(
+        "127.0.0.1", 0, health=health, registry=registry, routes={"/lag": lag}
+    )
+    port = server.sockets[0].getsockname()[1]
+    
+    async def get(path: str) -> bytes:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response
+    
+    try:
+        metrics = await get("/metrics")
+        health_response = await get("/health")
+        lag_response = await get("/lag")
+        missing = await get("/other")
+    finally:
+        server.close()
+        await server.wait_closed()
+    
+    assert metrics.startswith(b"HTTP/1.1 200 OK")
+    assert f"Content-Type: {CONTENT_TYPE}".encode() in metrics
+    assert metrics.endswith(b"consumed_total 7\n")
+    assert health_response.startswith(b"HTTP/1.1 503")
+    assert health_response.endswith(b'{"status": "stopped"}')
+    assert lag_response.startswith(b"HTTP/1.1 200 OK")
+    assert lag_response.endswith(b'{"total_lag": 3}')
+    assert missing.startswith(b"HTTP/1.1 404")
+
+
+@pytest.mark.asyncio
+async def test_metrics_server_fails_when_port_is_taken():
+    """Si el puerto ya está en uso el arranque falla en lugar de seguir sin métricas."""
+    server = await start_metrics_server("127.0.0.1", 0, registry=MetricsRegistry())
+    port = server.sockets[0].getsockname()[1]
+    try:
+        with pytest.raises(OSError):
+            await start_metrics_server("127.0.0.1", port, registry=MetricsRegistry())
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def test_consumer_records_lag_from_highwater():
+    """El consumer calcula el lag por partición como highwater menos la siguiente posición."""
+    from app.read_side.infrastructure.consumer_monitor import KAFKA_CONSUMER_LAG, ConsumerMonitor
+    from app.read_side.infrastructure.kafka_consumer import KafkaEventConsumer
+    
+    consumer = KafkaEventConsumer.__new__(KafkaEventConsumer)
+    consumer.monitor = ConsumerMonitor()
+    consumer.consumer = MagicMock()
+    consumer.consumer.highwater = MagicMock(side_effect=lambda tp: {0: 120, 1: None}[tp.partition])
+    consumer.consumer.assignment = MagicMock(
+        return_value={TopicPartition("anime-events", 0), TopicPartition("anime-events", 1)}
+    )
+    
+    consumer._record_lag({TopicPartition("anime-events", 0): 100, TopicPartition("anime-events", 1): 5})
+    
+    assert KAFKA_CONSUMER_LAG.labels("anime-events", 0).get() == 20
+    assert ("anime-events", "1") not in KAFKA_CONSUMER_LAG._children
@@ -0,0 +1,150 @@
+"""Tests para OutboxRelay."""
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+from app.command_side.infrastructure.outbox_relay import OutboxRelay
+from common.events.anime_events import ClickRegistered
+from common.events.serializer import BINARY_MAGIC, BinaryEventSerializer, decode_event_payload
+
+
+@pytest.fixture
+def mock_pool():
+    """Fixture para mock del pool de conexiones."""
+    pool = MagicMock()
+    conn = AsyncMock()
+    
+    context = AsyncMock()
+    context.__aenter__ = AsyncMock(return_value=conn)
+    context.__aexit__ = AsyncMock(return_value=None)
+    pool.acquire = MagicMock(return_value=context)
+    
+    return pool, conn
+
+
+@pytest.fixture
+def relay(mock_pool):
+    """Fixture para OutboxRelay con pool y producer mock."""
+    pool, _ = mock_pool
+    relay = OutboxRelay()
+    relay._pool = pool
+    relay.kafka_producer = MagicMock()
+    
+    async def send_records(records):
+        futures = []
+        for _ in records:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(None)
+            futures.append(future)
+        return futures
+    
+    relay.kafka_producer.send_records = AsyncMock(side_effect=send_records)
+    return relay
+
+
+@pytest.mark.asyncio
+async def test_relay_batch_publishes_and_checkpoints(relay, mock_pool):
+    """Test que relay_batch publica el lote y avanza el checkpoint al último evento."""
+    _, conn = mock_pool
+    conn.fetch = AsyncMock(return_value=[
+        {"id": 10, "transaction_id": 900, "aggregate_id": "anime_1", "event_data": '{"event_id": "a"}'},
+        {"id": 11, "transaction_id": 901, "aggregate_id": "anime_2", "event_data": '{"event_id": "b"}'},
+    ])
+    conn.execute = AsyncMock()
+    
+    published = await relay.relay_batch()
+    
+    assert published == 2
+    records = relay.kafka_producer.send_records.call_args[0][0]
+    assert records == [("anime_1", b'{"event_id": "a"}'), ("anime_2", b'{"event_id": "b"}')]
+    checkpoint_args = conn.execute.call_args[0]
+    assert "UPDATE outbox_checkpoints" in checkpoint_args[0]
+    assert checkpoint_args[2:] == (901, 11)
+    assert relay._last_transaction_id == 901
+    assert relay._last_position == 11
+
+
+@pytest.mark.asyncio
+async def test_relay_batch_binary_format(relay, mock_pool):
+    """Test que en formato binario el relay reencoda el event_data del Event Store."""
+    _, conn = mock_pool
+    event = ClickRegistered(aggregate_id="anime_1", anime_id=1, user_id="user123", timestamp=datetime.utcnow())
+    event_data = event.model_dump_json()
+    conn.fetch = AsyncMock(return_value=[
+        {"id": 10, "transaction_id": 900, "aggregate_id": "anime_1", "event_data": event_data},
+    ])
+    conn.execute = AsyncMock()
+    relay._serializer = BinaryEventSerializer()
+    
+    await relay.relay_batch()
+    
+    records = relay.kafka_producer.send_records.call_args[0][0]
+    assert records[0][1][0] == BINARY_MAGIC
+    assert decode_event_payload(records[0][1]) == json.loads(event_data)
+
+
+@pytest.mark.asyncio
+async def test_relay_batch_empty(relay, mock_pool):
+    """Test que relay_batch no publica ni guarda checkpoint si no hay eventos."""
+    _, conn = mock_pool
+    conn.fetch = AsyncMock(return_value=[])
+    conn.execute = AsyncMock()
+    
+    published = await relay.relay_batch()
+    
+    assert published == 0
+    relay.kafka_producer.send_records.assert_not_called()
+    conn.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_relay_batch_delivery_failure_keeps_checkpoint(relay, mock_pool):
+    """Test que un fallo de entrega no avanza el checkpoint (at-least-once)."""
+    _, conn = mock_pool
+    conn.fetch = AsyncMock(return_value=[
+        {"id": 10, "transaction_id": 900, "aggregate_id": "anime_1", "event_data": "{}"},
+    ])
+    conn.execute = AsyncMock()
+    
+    async def failing_send(records):
+        future = asyncio.get_running_loop().create_future()
+        future.set_exception(Exception("Broker no disponible"))
+        return [future]
+    
+    relay.kafka_producer.send_records = AsyncMock(side_effect=failing_send)
+    
+    with pytest.raises(Exception):
+        await relay.relay_batch()
+    
+    conn.execute.assert_not_called()
+    assert relay._last_position == 0
+
+
+@pytest.mark.asyncio
+async def test_fetch_batch_only_reads_committed_positions(relay, mock_pool):
+    """Test que la lectura filtra por transacciones ya cerradas y ordena por commit."""
+    _, conn = mock_pool
+    conn.fetch = AsyncMock(return_value=[])
+    
+    await relay._fetch_batch()
+    
+    query = conn.fetch.call_args[0][0]
+    assert "pg_snapshot_xmin(pg_current_snapshot())" in query
+    assert "ORDER BY transaction_id, id" in query
+
+
+@pytest.mark.asyncio
+async def test_load_checkpoint_seeds_at_current_safe_position(relay, mock_pool):
+    """Test que el primer arranque crea el checkpoint en pg_snapshot_xmin, no desde el principio."""
+    _, conn = mock_pool
+    conn.execute = AsyncMock()
+    conn.fetchrow = AsyncMock(return_value={"last_transaction_id": 4242, "last_position": 0})
+    
+    await relay._load_checkpoint()
+    
+    seed_sql = conn.execute.call_args[0][0]
+    assert "pg_snapshot_xmin(pg_current_snapshot())" in seed_sql
+    assert "ON CONFLICT (relay_name) DO NOTHING" in seed_sql
+    assert relay._last_transaction_id == 4242
+    assert relay._last_position == 0
@@ -0,0 +1,122 @@
+"""Tests para la reconstrucción de proyecciones."""
+import json
+import pytest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.read_side.projections.rebuild import (
+    ProjectionFold,
+    ProjectionRebuilder,
+    REBUILD_TABLES,
+    shadow_index_definition,
+    storable_rating,
+)
+
+
+def _row(row_id, event_type, anime_id=1, user_id="u1", occurred_at=None, duration_seconds=None, rating=None):
+    """Fila con la forma de EVENTS_QUERY."""
+    return (
+        row_id, f"evt-{row_id}", event_type, f"anime_{anime_id}",
+        occurred_at or datetime(2024, 1, 1), anime_id, user_id, duration_seconds, rating,
+    )
+
+
+def test_fold_aggregates_clicks_and_views():
+    """Test que el plegado acumula contadores y conserva el último timestamp."""
+    fold = ProjectionFold()
+    fold.apply(_row(1, "ClickRegistered", occurred_at=datetime(2024, 1, 2)))
+    fold.apply(_row(2, "ClickRegistered", occurred_at=datetime(2024, 1, 1)))
+    fold.apply(_row(3, "ViewRegistered", duration_seconds=100))
+    fold.apply(_row(4, "ViewRegistered", duration_seconds=50, user_id="u2"))
+    
+    assert fold.click_records() == [(1, "u1", 2, datetime(2024, 1, 2))]
+    assert sorted(fold.view_records()) == [
+        (1, "u1", 1, 100, datetime(2024, 1, 1)),
+        (1, "u2", 1, 50, datetime(2024, 1, 1)),
+    ]
+    stats = fold.stats_records(datetime(2024, 2, 1))
+    assert stats == [(1, 2, 2, 0, Decimal(0), 150, datetime(2024, 2, 1), Decimal(0))]
+
+
+def test_fold_keeps_latest_rating_per_user():
+    """Test que una recalificación sustituye a la anterior y cuenta una sola vez."""
+    fold = ProjectionFold()
+    fold.apply(_row(1, "RatingGiven", rating=Decimal("4"), occurred_at=datetime(2024, 1, 2)))
+    fold.apply(_row(2, "RatingGiven", rating=Decimal("9"), occurred_at=datetime(2024, 1, 1)))
+    fold.apply(_row(3, "RatingGiven", rating=Decimal("8"), user_id="u2"))
+    
+    assert sorted(fold.rating_records()) == [
+        (1, "u1", Decimal("4.00"), datetime(2024, 1, 2)),
+        (1, "u2", Decimal("8.00"), datetime(2024, 1, 1)),
+    ]
+    (_, _, _, total_ratings, average, _, _, rating_sum), = fold.stats_records(datetime(2024, 2, 1))
+    assert total_ratings == 2
+    assert rating_sum == Decimal("12.00")
+    assert average == Decimal("6.00")
+
+
+def test_fold_skips_events_rejected_by_live_processing():
+    """Test que se descartan los eventos que el consumer enviaría a la DLQ."""
+    fold = ProjectionFold()
+    
+    assert not fold.apply(_row(1, "ViewRegistered", duration_seconds=-5))
+    assert not fold.apply(_row(2, "RatingGiven", rating=Decimal("0.5")))
+    assert not fold.apply(_row(3, "RatingGiven", rating=Decimal("10")))
+    assert not fold.apply(_row(4, "ClickRegistered", user_id=None))
+    assert fold.apply(_row(5, "ClickRegistered"))
+    
+    assert fold.skipped == 4
+    assert fold.applied == 1
+
+
+def test_storable_rating_rounds_like_numeric_column():
+    """Test que el rating se redondea como NUMERIC(3, 2)."""
+    assert storable_rating(7.555) == Decimal("7.56")
+    assert storable_rating("1") == Decimal("1.00")
+    assert storable_rating(9.995) is None
+    assert storable_rating(None) is None
+
+
+def test_shadow_index_definition():
+    """Test que un índice de la tabla viva se reescribe sobre la tabla sombra."""
+    definition = "CREATE INDEX idx_anime_stats_views ON public.anime_stats USING btree (total_views DESC)"
+    
+    assert shadow_index_definition(definition, "idx_anime_stats_views", "anime_stats") == (
+        "CREATE INDEX idx_anime_stats_views__rebuild ON anime_stats__rebuild USING btree (total_views DESC)"
+    )
+
+
+@pytest.mark.asyncio
+async def test_swap_renames_tables_and_applies_tail():
+    """Test que el intercambio renombra tablas e índices y aplica los eventos posteriores al snapshot."""
+    target = MagicMock()
+    target.execute = AsyncMock()
+    target.transaction = MagicMock(return_value=AsyncMock())
+    target.fetch = AsyncMock(return_value=[{"event_id": "evt-1"}])
+    source = MagicMock()
+    event = {
+        "event_id": "evt-1", "event_type": "ClickRegistered", "aggregate_id": "anime_1",
+        "anime_id": 1, "user_id": "u1", "occurred_at": "2024-01-01T00:00:00",
+    }
+    invalid = dict(event, event_id="evt-2", event_type="RatingGiven", rating=10.0)
+    source.fetch = AsyncMock(return_value=[
+        {"event_data": json.dumps(event)}, {"event_data": json.dumps(invalid)},
+    ])
+    definitions = {table: ([], []) for table in REBUILD_TABLES}
+    definitions["anime_stats"] = (
+        [("anime_stats_pkey", "PRIMARY KEY (anime_id)")],
+        [("idx_anime_stats_views", "CREATE INDEX ...")],
+    )
+    
+    rebuilder = ProjectionRebuilder(workers=1)
+    with patch.object(rebuilder._processor, "_apply_batch", new_callable=AsyncMock) as apply_batch:
+        tail = await rebuilder._swap(target, source, "10:12:", definitions)
+    
+    assert tail == 1
+    apply_batch.assert_called_once_with(target, [event])
+    statements = [call.args[0] for call in target.execute.call_args_list]
+    assert statements[0].startswith("LOCK TABLE processed_events, anime_clicks")
+    assert "ALTER TABLE anime_stats__rebuild RENAME TO anime_stats" in statements
+    assert "ALTER TABLE anime_stats RENAME CONSTRAINT anime_stats_pkey__rebuild TO anime_stats_pkey" in statements
+    assert "ALTER INDEX idx_anime_stats_views__rebuild RENAME TO idx_anime_stats_views" in statements
+    assert target.execute.call_args_list[-1].args[1:] == ("anime_cache_invalidation", "*")
@@ -28,7 +28,9 @@ def mock_pool():
 @pytest.mark.asyncio
 async def test_connect_success(repository):
     """Test que connect() crea el pool correctamente."""
-    with patch("asyncpg.create_pool", new_callable=AsyncMock) as mock_create_pool:
+    with patch("asyncpg.create_pool", new_callable=AsyncMock) as mock_create_pool, \
+         patch("app.read_side.infrastructure.repository.CacheInvalidationListener") as mock_listener_cls:
+        mock_listener_cls.return_value.start = AsyncMock()
         mock_pool = MagicMock()
         mock_create_pool.return_value = mock_pool
         await repository.connect()
@@ -184,8 +186,249 @@ async def test_close_success(repository, mock_pool):
     pool.close.assert_called_once()
 
 
+@pytest.mark.asyncio
+async def test_close_waits_for_cancelled_leaderboard_update(repository, mock_pool):
+    """Test que close() espera a que termine la actualización de rankings antes de cerrar el pool."""
+    import asyncio
+    pool, conn = mock_pool
+    repository._pool = pool
+    fetch_started = asyncio.Event()
+    
+    async def fetch(*args):
+        fetch_started.set()
+        await asyncio.Event().wait()
+    
+    conn.fetch = AsyncMock(side_effect=fetch)
+    repository._pending_leaderboard_ids.add(1)
+    task = repository._leaderboard_task = asyncio.ensure_future(repository._drain_leaderboard_updates())
+    await fetch_started.wait()
+    
+    async def close_pool():
+        assert task.done()
+    
+    pool.close = AsyncMock(side_effect=close_pool)
+    await repository.close()
+    
+    pool.close.assert_awaited_once()
+    assert task.cancelled()
+
+
 @pytest.mark.asyncio
 async def test_close_no_pool(repository):
     """Test que close() no falla si no hay pool."""
     await repository.close()
-    assert repository._pool is None
\ No newline at end of file
+    assert repository._pool is None
+
+
+def test_invalidate_animes_clears_anime_and_ranking_keys(repository):
+    """Test que invalidate_animes borra las claves del anime y los rankings."""
+    repository._cache.set("anime_stats:1", {"anime_id": 1})
+    repository._cache.set("anime:1", {"myanimelist_id": 1})
+    repository._cache.set("anime_stats:2", {"anime_id": 2})
+    repository._cache.set("top_views:10", [])
+    repository._cache.set("top_rating:5", [])
+    
+    repository.invalidate_animes([1])
+    
+    assert repository._cache.get("anime_stats:1") is None
+    assert repository._cache.get("anime:1") is None
+    assert repository._cache.get("top_views:10") is None
+    assert repository._cache.get("top_rating:5") is None
+    assert repository._cache.get("anime_stats:2") == {"anime_id": 2}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_are_coalesced(repository, mock_pool):
+    """Test que peticiones concurrentes a la misma clave comparten una sola query."""
+    import asyncio
+    pool, conn = mock_pool
+    repository._pool = pool
+    
+    async def slow_fetchrow(*args):
+        await asyncio.sleep(0.01)
+        return {"anime_id": 1, "total_views": 10}
+    
+    conn.fetchrow = AsyncMock(side_effect=slow_fetchrow)
+    
+    results = await asyncio.gather(*(repository.get_anime_stats(1) for _ in range(10)))
+    
+    assert conn.fetchrow.call_count == 1
+    assert all(result == {"anime_id": 1, "total_views": 10} for result in results)
+    assert repository._in_flight == {}
+
+
+@pytest.mark.asyncio
+async def test_stale_while_revalidate_serves_expired_value(mock_pool):
+    """Test que con stale-while-revalidate se sirve el valor expirado y se recarga en background."""
+    import asyncio
+    import time
+    with patch.object(settings, 'CACHE_STALE_WHILE_REVALIDATE', True):
+        repository = ReadModelRepository()
+        pool, conn = mock_pool
+        repository._pool = pool
+        conn.fetchrow = AsyncMock(return_value={"anime_id": 1, "total_views": 20})
+        
+        repository._cache.set("anime_stats:1", {"anime_id": 1, "total_views": 10})
+        repository._cache._cache["anime_stats:1"].expires_at = time.time() - 1
+        
+        result = await repository.get_anime_stats(1)
+        assert result == {"anime_id": 1, "total_views": 10}
+        
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert repository._cache.get("anime_stats:1") == {"anime_id": 1, "total_views": 20}
+        conn.fetchrow.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_load_is_not_cached(repository, mock_pool):
+    """Test que una carga iniciada antes de una invalidación no repuebla el caché."""
+    import asyncio
+    pool, conn = mock_pool
+    repository._pool = pool
+    
+    async def fetchrow(*args):
+        repository.invalidate_animes([1])
+        return {"anime_id": 1, "total_views": 10}
+    
+    conn.fetchrow = AsyncMock(side_effect=fetchrow)
+    
+    result = await repository.get_anime_stats(1)
+    
+    assert result == {"anime_id": 1, "total_views": 10}
+    assert repository._cache.get("anime_stats:1") is None
+
+
+@pytest.mark.asyncio
+async def test_get_anime_stats_by_ids_uses_cache_and_single_query(repository, mock_pool):
+    """Test que la carga bulk sólo consulta los IDs que no están en caché."""
+    pool, conn = mock_pool
+    repository._pool = pool
+    repository._cache.set("anime_stats:1", {"anime_id": 1})
+    conn.fetch = AsyncMock(return_value=[{"anime_id": 2}, {"anime_id": 3}])
+    
+    result = await repository.get_anime_stats_by_ids([1, 2, 3, 2, 4])
+    
+    conn.fetch.assert_called_once()
+    assert "ANY($1::int[])" in conn.fetch.call_args[0][0]
+    assert conn.fetch.call_args[0][1] == [2, 3, 4]
+    assert set(result) == {1, 2, 3}
+    assert repository._cache.get("anime_stats:3") == {"anime_id": 3}
+
+
+@pytest.mark.asyncio
+async def test_top_animes_served_from_leaderboard_slices(repository, mock_pool):
+    """Test que distintos limit se sirven del mismo ranking con una sola query."""
+    pool, conn = mock_pool
+    repository._pool = pool
+    conn.fetch = AsyncMock(return_value=[
+        {"anime_id": i, "total_views": 100 - i} for i in range(1, 31)
+    ])
+    
+    top_10 = await repository.get_top_animes_by_views(10)
+    top_11 = await repository.get_top_animes_by_views(11)
+    
+    conn.fetch.assert_called_once()
+    assert conn.fetch.call_args[0][1] == settings.LEADERBOARD_CAPACITY
+    assert [row["anime_id"] for row in top_10] == list(range(1, 11))
+    assert len(top_11) == 11
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_updated_from_invalidation(repository, mock_pool):
+    """Test que una invalidación actualiza el ranking en memoria sin recargarlo."""
+    import asyncio
+    pool, conn = mock_pool
+    repository._pool = pool
+    conn.fetch = AsyncMock(return_value=[{"anime_id": 1, "total_views": 10}])
+    await repository.get_top_animes_by_views(10)
+    
+    conn.fetch = AsyncMock(return_value=[{"anime_id": 2, "total_views": 50}])
+    repository.invalidate_animes([2])
+    await repository._leaderboard_task
+    
+    results = await repository.get_top_animes_by_views(10)
+    
+    conn.fetch.assert_called_once()
+    assert "ANY($1::int[])" in conn.fetch.call_args[0][0]
+    assert [row["anime_id"] for row in results] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_update_during_reload_is_replayed(repository, mock_pool):
+    """Test que una actualización aplicada durante una recarga completa no se pierde con board.load."""
+    import asyncio
+    pool, conn = mock_pool
+    repository._pool = pool
+    current_views = {1: 10, 2: 5}
+    full_query_started = asyncio.Event()
+    full_query_done = asyncio.Event()
+    
+    async def fetch(query, *args):
+        if "ANY($1::int[])" in query:
+            return [{"anime_id": anime_id, "total_views": current_views[anime_id]} for anime_id in args[0]]
+        rows = [{"anime_id": anime_id, "total_views": views} for anime_id, views in current_views.items()]
+        if repository._leaderboards["views"].is_loaded:
+            # La recarga lee su snapshot y devuelve las filas después de que se aplique el cambio
+            full_query_started.set()
+            await full_query_done.wait()
+        return rows
+    
+    conn.fetch = AsyncMock(side_effect=fetch)
+    await repository.get_top_animes_by_views(10)
+    repository._leaderboards["views"].loaded_at -= settings.LEADERBOARD_FULL_REFRESH_INTERVAL + 1
+    
+    reload = asyncio.ensure_future(repository.get_top_animes_by_views(10))
+    await full_query_started.wait()
+    current_views[2] = 50
+    repository.invalidate_animes([2])
+    await repository._leaderboard_task
+    full_query_done.set()
+    await reload
+    await repository._leaderboard_task
+    
+    results = await repository.get_top_animes_by_views(10)
+    
+    assert [(row["anime_id"], row["total_views"]) for row in results] == [(2, 50), (1, 10)]
+
+
+@pytest.mark.asyncio
+async def test_unrelated_invalidation_during_load_still_caches(repository, mock_pool):
+    """Test que invalidar otro anime durante una carga no impide cachear su resultado."""
+    pool, conn = mock_pool
+    repository._pool = pool
+    
+    async def fetchrow(*args):
+        repository.invalidate_animes([2])
+        return {"anime_id": 1, "total_views": 10}
+    
+    async def fetch(*args):
+        repository.invalidate_animes([3])
+        return [{"anime_id": 3}, {"anime_id": 4}]
+    
+    conn.fetchrow = AsyncMock(side_effect=fetchrow)
+    conn.fetch = AsyncMock(side_effect=fetch)
+    
+    await repository.get_anime_stats(1)
+    await repository.get_anime_stats_by_ids([3, 4])
+    
+    assert repository._cache.get("anime_stats:1") == {"anime_id": 1, "total_views": 10}
+    assert repository._cache.get("anime_stats:3") is None
+    assert repository._cache.get("anime_stats:4") == {"anime_id": 4}
+
+
+@pytest.mark.asyncio
+async def test_reset_during_load_is_not_cached(repository, mock_pool):
+    """Test que reset_cache descarta todas las cargas en curso."""
+    pool, conn = mock_pool
+    repository._pool = pool
+    
+    async def fetchrow(*args):
+        repository.reset_cache()
+        return {"anime_id": 1, "total_views": 10}
+    
+    conn.fetchrow = AsyncMock(side_effect=fetchrow)
+    
+    await repository.get_anime_stats(1)
+    
+    assert repository._cache.get("anime_stats:1") is None